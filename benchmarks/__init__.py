@@ -0,0 +1,11 @@
+"""
+benchmarks: Throughput benchmarks for the kolko-ni-struva ETL pipeline.
+Responsibilities: generate deterministic synthetic daily ZIPs shaped like the
+kolkostruva.bg open-data exports (generate_zips.py) and time the transform
+stage against them, reporting JSON that can be compared between commits
+(run_transform.py).
+
+Run from the project root:
+
+    python -m benchmarks.run_transform --days 3
+"""
@@ -0,0 +1,274 @@
+"""
+generate_zips.py: Deterministic synthetic daily ZIPs for transform benchmarks.
+Part of the kolko-ni-struva ETL pipeline benchmarks.
+Responsibilities: write data/raw-style YYYY-MM-DD.zip archives whose shape
+matches the real kolkostruva.bg exports — ~200 company CSVs per day with a
+skewed size distribution, ~1.3M rows, a handful of semicolon-delimited files
+with comma decimals, UTF-8 BOMs, Sofia raion codes, padded / short EKATTE
+variants, unknown settlements, bad category codes and malformed rows.
+
+The same seed always yields byte-identical archives.  Stores, products and
+categories are stable across days and only prices drift, so consecutive days
+overlap the way real data does (which the lookback table relies on).
+"""
+import random
+import sys
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add src/ to sys.path so transform resolves without installation.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from transform import load_category_names, load_settlement_names  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Shape of a real daily export (see README "Benchmarks")
+# ---------------------------------------------------------------------------
+DEFAULT_ROWS = 1_300_000
+DEFAULT_COMPANIES = 200
+DEFAULT_SEMICOLON_FILES = 4
+DEFAULT_SETTLEMENTS = 256
+
+RAW_CSV_HEADER = [
+    "Населено място", "Търговски обект", "Наименование на продукта",
+    "Код на продукта", "Категория", "Цена на дребно", "Цена в промоция",
+]
+
+# Fractions of rows / files carrying each source-data defect.
+BOM_FILE_RATIO = 0.35
+SHORT_CODE_RATIO = 0.05     # '2659' instead of '02659'
+PADDED_CODE_RATIO = 0.03    # '068134' instead of '68134'
+UNKNOWN_SETTLEMENT_RATIO = 0.005
+BAD_CATEGORY_RATIO = 0.01
+NULL_RETAIL_RATIO = 0.03
+PROMO_RATIO = 0.2
+MALFORMED_ROW_RATIO = 0.0005
+
+BAD_CATEGORY_CODES = ["0", "999", "", "N/A"]
+
+# Fixed member timestamp so archives are byte-identical between runs.
+_ZIP_DATE_TIME = (2026, 1, 1, 0, 0, 0)
+
+
+def _settlement_pool(rnd: random.Random, size: int) -> List[str]:
+    """
+    Pick the settlement codes used by generated stores.
+
+    Args:
+        rnd:  Seeded random generator.
+        size: Number of distinct settlement codes to return.
+
+    Returns:
+        Sorted canonical EKATTE codes, always including every Sofia raion
+        code ('68134-NN') known to the nomenclatures.
+    """
+    names = load_settlement_names()
+    raions = sorted(code for code in names if code.startswith("68134-"))
+    plain = sorted(code for code in names if code.isdigit() and len(code) == 5)
+    if not plain:
+        plain = [f"{n:05d}" for n in range(1000, 1000 + size)]
+    picked = rnd.sample(plain, min(len(plain), max(size - len(raions), 0)))
+    return sorted(set(picked) | set(raions))
+
+
+def _spell_settlement(rnd: random.Random, code: str) -> str:
+    """
+    Return the code as a source file might spell it.
+
+    Args:
+        rnd:  Seeded random generator.
+        code: Canonical EKATTE code.
+
+    Returns:
+        The code unchanged, with leading zeros stripped, with an extra
+        leading zero, or an unresolvable code.
+    """
+    roll = rnd.random()
+    if roll < UNKNOWN_SETTLEMENT_RATIO:
+        return f"9{rnd.randrange(10000, 99999)}"
+    roll -= UNKNOWN_SETTLEMENT_RATIO
+    if roll < SHORT_CODE_RATIO and code.startswith("0"):
+        return code.lstrip("0")
+    roll -= SHORT_CODE_RATIO
+    if roll < PADDED_CODE_RATIO and "-" not in code:
+        return "0" + code
+    return code
+
+
+def build_catalogue(
+    seed: int,
+    rows: int = DEFAULT_ROWS,
+    companies: int = DEFAULT_COMPANIES,
+    semicolon_files: int = DEFAULT_SEMICOLON_FILES,
+    settlements: int = DEFAULT_SETTLEMENTS,
+) -> List[Dict]:
+    """
+    Build the day-independent part of the synthetic data set.
+
+    Company sizes follow a Zipf-like curve (a few national chains and a long
+    tail of small shops).  Each company has stores in a few settlements and a
+    product list; every store lists every product once per day.
+
+    Args:
+        seed:            Seed for the structure generator.
+        rows:            Target number of rows per day.
+        companies:       Number of company CSVs per day.
+        semicolon_files: Number of companies exporting ';'-delimited CSVs.
+        settlements:     Approximate number of distinct settlement codes.
+
+    Returns:
+        List of company dicts with keys 'file_name', 'delimiter', 'bom',
+        'rows' (rows per day), 'stores' (list of (raw_settlement,
+        store_name)) and 'products' (list of (product_code, product_name,
+        category_code, base_price)).
+    """
+    rnd = random.Random(seed)
+    pool = _settlement_pool(rnd, settlements)
+    categories = sorted(load_category_names(), key=lambda c: (len(c), c)) or ["1"]
+
+    weights = [1.0 / (idx + 1) ** 0.9 for idx in range(companies)]
+    scale = rows / sum(weights)
+    semicolon = set(rnd.sample(range(companies), min(semicolon_files, companies)))
+
+    catalogue: List[Dict] = []
+    for idx in range(companies):
+        company_rows = max(1, round(weights[idx] * scale))
+        n_stores = max(1, min(company_rows // 400, 600))
+        n_products = -(-company_rows // n_stores)
+
+        uic = f"{100000000 + rnd.randrange(899999999):09d}"
+        stores: List[Tuple[str, str]] = []
+        for s in range(n_stores):
+            code = rnd.choice(pool)
+            stores.append((_spell_settlement(rnd, code), f"Обект {idx:03d}-{s:03d}"))
+
+        products: List[Tuple[str, str, str, float]] = []
+        for p in range(n_products):
+            if rnd.random() < BAD_CATEGORY_RATIO:
+                category = rnd.choice(BAD_CATEGORY_CODES)
+            else:
+                category = rnd.choice(categories)
+            products.append((
+                f"{idx:03d}{p:05d}",
+                f"Продукт {p:05d} {rnd.choice(['500 г', '1 кг', '1 л', '250 г', 'бр.'])}",
+                category,
+                round(rnd.uniform(0.5, 40.0), 2),
+            ))
+
+        catalogue.append({
+            "file_name": f"Търговец {idx:03d}_{uic}.csv",
+            "delimiter": ";" if idx in semicolon else ",",
+            "bom": rnd.random() < BOM_FILE_RATIO,
+            "stores": stores,
+            "products": products,
+            "rows": company_rows,
+        })
+    return catalogue
+
+
+def _render_csv(company: Dict, rnd: random.Random) -> bytes:
+    """
+    Render one company's CSV for one day.
+
+    Args:
+        company: Company dict from build_catalogue().
+        rnd:     Day-specific seeded random generator (price drift, promos).
+
+    Returns:
+        Encoded CSV bytes (UTF-8, with a BOM when company['bom'] is set).
+    """
+    delimiter = company["delimiter"]
+    comma_decimals = delimiter == ";"
+    lines = [delimiter.join(RAW_CSV_HEADER)]
+    remaining = company["rows"]
+    random_ = rnd.random
+
+    for raw_settlement, store_name in company["stores"]:
+        for product_code, product_name, category, base in company["products"]:
+            if remaining <= 0:
+                break
+            remaining -= 1
+            if random_() < MALFORMED_ROW_RATIO:
+                lines.append(delimiter.join([raw_settlement, store_name, product_name]))
+                continue
+
+            retail = "" if random_() < NULL_RETAIL_RATIO else f"{base * (0.95 + random_() * 0.1):.2f}"
+            promo = f"{base * 0.8:.2f}" if random_() < PROMO_RATIO else ""
+            if comma_decimals:
+                retail = retail.replace(".", ",")
+                promo = promo.replace(".", ",")
+            else:
+                # Comma-delimited exporters quote decimals when they use a
+                # comma separator; emulate the common '"2,50"' spelling.
+                if retail and random_() < 0.1:
+                    retail = '"' + retail.replace(".", ",") + '"'
+            lines.append(delimiter.join([
+                raw_settlement, store_name, product_name, product_code,
+                category, retail, promo,
+            ]))
+
+    text = "\n".join(lines) + "\n"
+    return text.encode("utf-8-sig" if company["bom"] else "utf-8")
+
+
+def generate_daily_zip(
+    raw_dir: Path,
+    day: date,
+    catalogue: List[Dict],
+    seed: int,
+) -> Path:
+    """
+    Write one synthetic daily ZIP archive named YYYY-MM-DD.zip.
+
+    Args:
+        raw_dir:   Output directory (created if absent).
+        day:       Date of the export; becomes the archive stem.
+        catalogue: Company structure from build_catalogue().
+        seed:      Base seed; combined with the date for price drift.
+
+    Returns:
+        Path to the written archive.
+    """
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = raw_dir / f"{day.isoformat()}.zip"
+    rnd = random.Random(seed * 100003 + day.toordinal())
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for company in catalogue:
+            info = zipfile.ZipInfo(company["file_name"], date_time=_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, _render_csv(company, rnd))
+    return zip_path
+
+
+def generate_days(
+    raw_dir: Path,
+    days: int,
+    seed: int = 1,
+    start: date = date(2026, 4, 1),
+    rows: int = DEFAULT_ROWS,
+    companies: int = DEFAULT_COMPANIES,
+    semicolon_files: int = DEFAULT_SEMICOLON_FILES,
+) -> List[Path]:
+    """
+    Write `days` consecutive synthetic daily ZIPs.
+
+    Args:
+        raw_dir:         Output directory (created if absent).
+        days:            Number of consecutive days to generate.
+        seed:            Seed; identical arguments give identical archives.
+        start:           Date of the first archive.
+        rows:            Target rows per day.
+        companies:       Company CSVs per day.
+        semicolon_files: ';'-delimited CSVs per day.
+
+    Returns:
+        Paths of the written archives in date order.
+    """
+    catalogue = build_catalogue(seed, rows, companies, semicolon_files)
+    return [
+        generate_daily_zip(raw_dir, start + timedelta(days=offset), catalogue, seed)
+        for offset in range(days)
+    ]
@@ -0,0 +1,195 @@
+"""
+run_product_search.py: Time landing-page product-name search on synthetic names.
+Part of the kolko-ni-struva ETL pipeline benchmarks.
+Responsibilities: generate a production-sized list of Bulgarian product names,
+time the previous substring match (the ILIKE '%term%' filter, as a scan over
+every name) against the token-prefix lookup in search_tokens.py (the
+search_product_keys() RPC over dim_product_tokens), and print a JSON report
+per query shape: short Cyrillic prefix, whole word, multi-word and a Latin
+transliteration.
+
+Both sides run in-process, so the report compares the work each filter does
+rather than database round trips; run it before and after a change to the
+tokeniser to see its effect on index size and lookup time.
+
+Usage (from the project root):
+
+    python -m benchmarks.run_product_search --products 120000 --output search.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Add src/ to sys.path so search_tokens resolves without installation.
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from search_tokens import build_token_index, match_product_keys, product_token_rows  # noqa: E402
+from benchmarks.run_transform import git_revision  # noqa: E402
+
+# Roughly the number of distinct products in a retained three-day window.
+DEFAULT_PRODUCTS = 120_000
+DEFAULT_REPEATS = 5
+
+NOUNS = [
+    "мляко", "кисело мляко", "сирене", "кашкавал", "масло", "хляб", "шоколад",
+    "бисквити", "вафла", "кафе", "чай", "сок", "минерална вода", "бира", "вино",
+    "олио", "захар", "брашно", "ориз", "леща", "боб", "паста", "кренвирши",
+    "луканка", "шунка", "пилешко филе", "кайма", "яйца", "домати", "краставици",
+    "ябълки", "банани", "картофи", "лук", "препарат за съдове", "прах за пране",
+    "тоалетна хартия", "паста за зъби", "шампоан", "сапун",
+]
+ADJECTIVES = [
+    "", "", "прясно", "пълномаслено", "обезмаслено", "био", "домашно", "класическо",
+    "натурално", "черен", "бял", "пушено", "варено", "сушено", "екстра",
+]
+BRANDS = [
+    "Верея", "Олимпус", "Данон", "Милка", "Нестле", "Якобс", "Загорка", "Каменица",
+    "Девин", "Банкя", "Боженци", "Маджаров", "Тандем", "Крина", "Ариел", "Colgate",
+    "Coca-Cola", "Lavazza", "Lidl", "Billa", "Kaufland", "Фантастико",
+]
+SIZES = ["100 г", "250 г", "400 г", "500 г", "1 кг", "330 мл", "500 мл", "1 л", "1,5 л", "бр.", "6x0,5 л"]
+
+# (label, term) pairs covering the query shapes the landing page receives.
+QUERIES: List[Tuple[str, str]] = [
+    ("short_cyrillic", "мл"),
+    ("word", "кашкавал"),
+    ("multi_word", "кисело мляко верея"),
+    ("latin_transliteration", "kiselo mlyako"),
+]
+
+
+def generate_product_names(count: int, seed: int = 1) -> List[Tuple[int, str]]:
+    """
+    Build deterministic (product_key, product_name) pairs.
+
+    Args:
+        count: Number of products.
+        seed:  Generator seed.
+
+    Returns:
+        List of (product_key, product_name), keys starting at 1.
+    """
+    rnd = random.Random(seed)
+    products = []
+    for key in range(1, count + 1):
+        words = [rnd.choice(NOUNS), rnd.choice(ADJECTIVES), rnd.choice(BRANDS), rnd.choice(SIZES)]
+        if rnd.random() < 0.3:
+            words.insert(0, words.pop(2))
+        name = " ".join(word for word in words if word)
+        products.append((key, name.upper() if rnd.random() < 0.2 else name.capitalize()))
+    return products
+
+
+def _median_ms(func: Callable[[], object], repeats: int) -> Tuple[float, object]:
+    """Run func repeats times; return (median wall time in ms, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3), result
+
+
+def run_benchmark(
+    products: int = DEFAULT_PRODUCTS,
+    repeats: int = DEFAULT_REPEATS,
+    seed: int = 1,
+) -> Dict:
+    """
+    Time substring and token-prefix product search over synthetic names.
+
+    Args:
+        products: Number of synthetic product names.
+        repeats:  Runs per query; the median is reported.
+        seed:     Generator seed.
+
+    Returns:
+        JSON-serialisable report dict.
+    """
+    names = generate_product_names(products, seed)
+
+    started = time.perf_counter()
+    token_rows = list(product_token_rows(names))
+    index = build_token_index(token_rows)
+    build_seconds = time.perf_counter() - started
+
+    # The ILIKE filter compared case-folded text on every row.
+    folded = [(key, name.casefold()) for key, name in names]
+
+    queries: Dict[str, Dict] = {}
+    for label, term in QUERIES:
+        needle = term.casefold()
+        before_ms, before = _median_ms(
+            lambda: [key for key, name in folded if needle in name], repeats,
+        )
+        after_ms, after = _median_ms(lambda: match_product_keys(index, term), repeats)
+        queries[label] = {
+            "term": term,
+            "substring_ms": before_ms,
+            "substring_matches": len(before),
+            "token_prefix_ms": after_ms,
+            "token_prefix_matches": len(after or ()),
+            "speedup": round(before_ms / after_ms, 1) if after_ms > 0 else None,
+        }
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {"products": products, "repeats": repeats, "seed": seed},
+        "token_rows": len(token_rows),
+        "tokens_per_product": round(len(token_rows) / max(products, 1), 2),
+        "index_build_seconds": round(build_seconds, 3),
+        "queries": queries,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse run_product_search.py command-line options.
+
+    Args:
+        argv: Argument list (defaults to sys.argv[1:]).
+
+    Returns:
+        Namespace with products, repeats, seed and output.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark landing-page product-name search on synthetic names.",
+    )
+    parser.add_argument("--products", type=int, default=DEFAULT_PRODUCTS,
+                        help=f"Synthetic product names (default: {DEFAULT_PRODUCTS}).")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help=f"Runs per query, median reported (default: {DEFAULT_REPEATS}).")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Generator seed (default: 1).")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Also write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Entry point: run the benchmark and print the JSON report to stdout.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:]).
+    """
+    args = parse_args(argv)
+    report = run_benchmark(products=args.products, repeats=args.repeats, seed=args.seed)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+run_transform.py: Time the transform stage on synthetic daily ZIPs.
+Part of the kolko-ni-struva ETL pipeline benchmarks.
+Responsibilities: generate archives with generate_zips.py into a scratch
+directory, point transform.py's path constants at it, time build_schema(),
+build_lookback_table() and patch_unknown_settlements(), and print a JSON
+report (rows/sec, peak RSS, per-phase wall time) that can be diffed between
+commits.
+
+Usage (from the project root):
+
+    python -m benchmarks.run_transform --days 3 --workers 4 --output bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is reported as null.
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Add src/ to sys.path so transform resolves without installation.
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import transform as tr  # noqa: E402
+from benchmarks.generate_zips import (  # noqa: E402
+    DEFAULT_COMPANIES,
+    DEFAULT_ROWS,
+    DEFAULT_SEMICOLON_FILES,
+    generate_days,
+)
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """
+    Return the peak resident set size of this process and its children.
+
+    Returns:
+        Dict with 'self' and 'children' peak RSS in MiB (None when the
+        resource module is unavailable).  Children covers the transform
+        worker processes once they have exited.
+    """
+    if resource is None:
+        return {"self": None, "children": None}
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1),
+    }
+
+
+def git_revision() -> str:
+    """
+    Return the current git commit hash, or '' outside a git checkout.
+
+    Returns:
+        Full commit hash string of HEAD.
+    """
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return out.stdout.strip()
+
+
+@contextmanager
+def transform_dirs(root: Path) -> Iterator[Path]:
+    """
+    Point transform.py's data directories at a scratch tree for the duration.
+
+    Args:
+        root: Scratch directory; raw/, schema/, schema/facts/ and quality/
+              are used below it.
+
+    Yields:
+        The raw ZIP directory (root/raw).
+    """
+    saved = (tr.RAW_DIR, tr.SCHEMA_DIR, tr.FACTS_DIR, tr.QUALITY_DIR)
+    tr.RAW_DIR = root / "raw"
+    tr.SCHEMA_DIR = root / "schema"
+    tr.FACTS_DIR = tr.SCHEMA_DIR / "facts"
+    tr.QUALITY_DIR = root / "quality"
+    try:
+        yield tr.RAW_DIR
+    finally:
+        tr.RAW_DIR, tr.SCHEMA_DIR, tr.FACTS_DIR, tr.QUALITY_DIR = saved
+
+
+def _timed(phases: Dict[str, Dict], name: str, func, *args, **kwargs):
+    """Run func(*args, **kwargs), recording its wall time under phases[name]."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    phases[name] = {"seconds": round(time.perf_counter() - started, 3)}
+    return result
+
+
+def _rate(rows: int, seconds: float) -> Optional[float]:
+    """Return rows / seconds rounded to whole rows, or None for a zero duration."""
+    return round(rows / seconds) if seconds > 0 else None
+
+
+def run_benchmark(
+    work_dir: Path,
+    days: int = 3,
+    rows: int = DEFAULT_ROWS,
+    companies: int = DEFAULT_COMPANIES,
+    semicolon_files: int = DEFAULT_SEMICOLON_FILES,
+    workers: int = 1,
+    seed: int = 1,
+    lookback_days: int = tr.DEFAULT_LOOKBACK_DAYS,
+    price_format: str = tr.PRICE_FORMAT_DECIMAL,
+    columnar: bool = False,
+) -> Dict:
+    """
+    Generate synthetic ZIPs in work_dir and time the transform phases.
+
+    Args:
+        work_dir:        Empty scratch directory.
+        days:            Number of consecutive daily ZIPs.
+        rows:            Target rows per ZIP.
+        companies:       Company CSVs per ZIP.
+        semicolon_files: ';'-delimited CSVs per ZIP.
+        workers:         Worker processes passed to build_schema().
+        seed:            Generator seed.
+        lookback_days:   Prior days joined by build_lookback_table().
+        price_format:    Fact price format passed to build_schema().
+        columnar:        Also write .kcol partitions (columnar_facts).
+
+    Returns:
+        JSON-serialisable report dict.
+    """
+    phases: Dict[str, Dict] = {}
+
+    with transform_dirs(work_dir) as raw_dir:
+        zips: List[Path] = _timed(
+            phases, "generate", generate_days,
+            raw_dir, days, seed=seed, rows=rows, companies=companies,
+            semicolon_files=semicolon_files,
+        )
+
+        _max_date, quality_rows = _timed(
+            phases, "build_schema", tr.build_schema, "", workers=workers,
+            price_format=price_format, columnar=columnar,
+        )
+        parsed_rows = sum(int(q["total_rows"]) for q in quality_rows)
+        phases["build_schema"]["rows"] = parsed_rows
+        phases["build_schema"]["rows_per_sec"] = _rate(
+            parsed_rows, phases["build_schema"]["seconds"],
+        )
+
+        lookback_path = tr.SCHEMA_DIR / "fact_prices_lookback.csv"
+        _timed(phases, "build_lookback_table", tr.build_lookback_table,
+               tr.FACTS_DIR, lookback_path, lookback_days=lookback_days,
+               columnar=columnar)
+        lookback_rows = 0
+        if lookback_path.exists():
+            with open(lookback_path, encoding="utf-8") as fh:
+                lookback_rows = max(sum(1 for _ in fh) - 1, 0)
+        phases["build_lookback_table"]["rows"] = lookback_rows
+        phases["build_lookback_table"]["rows_per_sec"] = _rate(
+            lookback_rows, phases["build_lookback_table"]["seconds"],
+        )
+
+        settlement_names = tr.load_settlement_names()
+        patched = _timed(
+            phases, "patch_unknown_settlements", tr.patch_unknown_settlements,
+            tr.SCHEMA_DIR / "dim_settlement.csv", settlement_names,
+        )
+        phases["patch_unknown_settlements"]["patched"] = patched
+
+        fact_bytes = sum(p.stat().st_size for p in tr.FACTS_DIR.glob("*.csv"))
+        partition_bytes = sum(p.stat().st_size for p in tr.FACTS_DIR.glob("*.kcol"))
+
+    measured = ("build_schema", "build_lookback_table", "patch_unknown_settlements")
+    transform_seconds = sum(phases[name]["seconds"] for name in measured)
+    # Sample RSS before git_revision() forks, so the fork does not count as a child.
+    rss = peak_rss_mb()
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {
+            "days": days,
+            "rows_per_zip": rows,
+            "companies": companies,
+            "semicolon_files": semicolon_files,
+            "workers": workers,
+            "seed": seed,
+            "lookback_days": lookback_days,
+            "price_format": price_format,
+            "columnar": columnar,
+        },
+        "zip_bytes": sum(p.stat().st_size for p in zips),
+        "fact_bytes": fact_bytes,
+        "partition_bytes": partition_bytes,
+        "rows": parsed_rows,
+        "rows_per_sec": _rate(parsed_rows, transform_seconds),
+        "wall_seconds": round(transform_seconds, 3),
+        "peak_rss_mb": rss,
+        "phases": phases,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse run_transform.py command-line options.
+
+    Args:
+        argv: Argument list (defaults to sys.argv[1:]).
+
+    Returns:
+        Namespace with days, rows, companies, semicolon_files, workers, seed,
+        lookback_days, price_format, columnar, work_dir, output and verbose.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the transform stage on synthetic daily ZIPs.",
+    )
+    parser.add_argument("--days", type=int, default=3,
+                        help="Consecutive daily ZIPs to generate (default: 3).")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help=f"Rows per ZIP (default: {DEFAULT_ROWS}).")
+    parser.add_argument("--companies", type=int, default=DEFAULT_COMPANIES,
+                        help=f"Company CSVs per ZIP (default: {DEFAULT_COMPANIES}).")
+    parser.add_argument("--semicolon-files", type=int, default=DEFAULT_SEMICOLON_FILES,
+                        help="Semicolon-delimited CSVs per ZIP "
+                             f"(default: {DEFAULT_SEMICOLON_FILES}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for build_schema (default: 1).")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Generator seed (default: 1).")
+    parser.add_argument("--lookback-days", type=int, default=tr.DEFAULT_LOOKBACK_DAYS,
+                        help="Prior days in the lookback table "
+                             f"(default: {tr.DEFAULT_LOOKBACK_DAYS}).")
+    parser.add_argument("--price-format", default=tr.PRICE_FORMAT_DECIMAL,
+                        choices=tuple(tr.FACT_HEADERS),
+                        help="Fact price format (default: decimal).")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write .kcol columnar partitions.")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Scratch directory to keep (default: a removed temp dir).")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Also write the JSON report to this file.")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Show transform INFO logging on stderr.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Entry point: run the benchmark and print the JSON report to stdout.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:]).
+    """
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+
+    kwargs = dict(
+        days=args.days, rows=args.rows, companies=args.companies,
+        semicolon_files=args.semicolon_files, workers=args.workers, seed=args.seed,
+        lookback_days=args.lookback_days, price_format=args.price_format,
+        columnar=args.columnar,
+    )
+    if args.work_dir is not None:
+        args.work_dir.mkdir(parents=True, exist_ok=True)
+        report = run_benchmark(args.work_dir, **kwargs)
+    else:
+        with tempfile.TemporaryDirectory(prefix="kns-bench-") as tmp:
+            report = run_benchmark(Path(tmp), **kwargs)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
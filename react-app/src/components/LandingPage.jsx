@@ -1,6 +1,7 @@
 /**
  * LandingPage.jsx: Unified single-page interface for the Kolko Ni Struva React app.
- * Presents the screen-scoped filter, browse, and grouped views backed by Supabase RPCs.
+ * Presents the screen-scoped filter, browse, and grouped views backed by Supabase RPCs,
+ * static snapshots, and — for a selected date and settlement — rows filtered in the browser.
  */
 
 import { useState, useEffect, useRef } from 'react';
@@ -8,6 +9,7 @@ import {
   fetchLandingPageRows,
   fetchLandingPageGrouped,
   fetchLandingPageOptions,
+  fetchLandingPageTotal,
   formatDateBG,
 } from '../lib/dataService';
 
@@ -42,6 +44,35 @@ function formatPrice(val) {
   return Number(val).toFixed(2);
 }
 
+/**
+ * Formats the flat-table row total, marking estimated totals with "≈".
+ *
+ * @param {{totalCount: number, isExact: boolean}} total - Result of fetchLandingPageTotal.
+ * @returns {string} Display text such as "Общо резултати: 12 345".
+ */
+function formatTotal(total) {
+  const count = total.totalCount.toLocaleString('bg-BG');
+  return `Общо резултати: ${total.isExact ? '' : '≈ '}${count}`;
+}
+
+/**
+ * Picks the known keyset cursor closest before a page, so a jump only skips
+ * the pages between that cursor and the requested one.
+ *
+ * @param {Object} cursors - Page index → cursor returned by fetchLandingPageRows.
+ * @param {number} page - Zero-based page about to be loaded.
+ * @returns {Object|null} Cursor with the highest page <= page, or null.
+ */
+function findStartCursor(cursors, page) {
+  let best = null;
+  Object.values(cursors).forEach((cursor) => {
+    if (cursor.page <= page && (!best || cursor.page > best.page)) {
+      best = cursor;
+    }
+  });
+  return best;
+}
+
 /**
  * Unified landing-page component. Loads only the active screen data and fetches
  * selector options lazily when the user interacts with a specific control.
@@ -63,6 +94,7 @@ function LandingPage() {
   const [groupBy2,           setGroupBy2]            = useState('');
   const [availableOptions,   setAvailableOptions]    = useState(EMPTY_OPTIONS);
   const [rows,          setRows]          = useState([]);
+  const [total,         setTotal]         = useState(null);
   const [groupedRows,   setGroupedRows]   = useState([]);
   const [currentPage,   setCurrentPage]   = useState(0);
   const [pageInput,     setPageInput]     = useState(String(FIRST_PAGE_NUMBER));
@@ -75,6 +107,8 @@ function LandingPage() {
   const refreshRequestIdRef = useRef(0);
   const optionRequestIdRef  = useRef({});
   const optionRequestKeyRef = useRef({});
+  // Keyset cursors for the current filters, keyed by the page each one starts.
+  const pageCursorsRef      = useRef({});
 
   // ---------------------------------------------------------------------------
   // Helpers
@@ -167,13 +201,34 @@ function LandingPage() {
     });
   }
 
+  // The total is shown when it arrives and never blocks or fails the row load.
+  async function loadTotal(filters, requestId) {
+    setTotal(null);
+    try {
+      const result = await fetchLandingPageTotal(filters);
+      if (requestId === refreshRequestIdRef.current) {
+        setTotal(result);
+      }
+    } catch (err) {
+      console.error('loadTotal error:', err);
+    }
+  }
+
   async function loadRows(filters, page, requestId) {
     setLoading(true);
     setError('');
 
+    // Every filter change reloads page 0, so cursors from older filters are dropped
+    // and the total is fetched alongside the first page.
+    if (page === 0) {
+      pageCursorsRef.current = {};
+      loadTotal(filters, requestId);
+    }
+
     try {
       // Fetch only the requested page; pagination no longer depends on a total-count RPC.
-      const { rows: newRows } = await fetchLandingPageRows(filters, page, PAGE_SIZE);
+      const cursor = findStartCursor(pageCursorsRef.current, page);
+      const { rows: newRows, nextCursor } = await fetchLandingPageRows(filters, page, PAGE_SIZE, cursor);
       if (requestId !== refreshRequestIdRef.current) {
         return;
       }
@@ -182,6 +237,9 @@ function LandingPage() {
         setPageInput(String(currentPage + FIRST_PAGE_NUMBER));
         return;
       }
+      if (nextCursor) {
+        pageCursorsRef.current[nextCursor.page] = nextCursor;
+      }
       setRows(newRows);
       setCurrentPage(page);
       setPageInput(String(page + FIRST_PAGE_NUMBER));
@@ -637,6 +695,7 @@ function LandingPage() {
       {/* Flat detail table */}
       {!loading && !isGrouped && (
         <>
+          {total && <p className="results-total">{formatTotal(total)}</p>}
           <div className="table-scroll-wrapper">
             <table className="results-table">
               <thead>
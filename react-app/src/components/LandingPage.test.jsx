@@ -10,6 +10,7 @@ vi.mock('../lib/dataService', () => ({
   fetchLandingPageRows: vi.fn(),
   fetchLandingPageGrouped: vi.fn(),
   fetchLandingPageOptions: vi.fn(),
+  fetchLandingPageTotal: vi.fn(),
   formatDateBG: vi.fn((dateValue) => dateValue),
 }));
 
@@ -18,6 +19,7 @@ import {
   fetchLandingPageRows,
   fetchLandingPageGrouped,
   fetchLandingPageOptions,
+  fetchLandingPageTotal,
 } from '../lib/dataService';
 
 function makeOptionsResult() {
@@ -56,6 +58,7 @@ describe('LandingPage', () => {
     );
     vi.mocked(fetchLandingPageRows).mockResolvedValue(makeRowResult());
     vi.mocked(fetchLandingPageGrouped).mockResolvedValue([]);
+    vi.mocked(fetchLandingPageTotal).mockResolvedValue({ totalCount: 1, isExact: true });
   });
 
   it('renders intro text with kolkostruva.bg link', async () => {
@@ -73,8 +76,18 @@ describe('LandingPage', () => {
     expect(vi.mocked(fetchLandingPageRows)).toHaveBeenCalledWith(
       expect.objectContaining({ dateKey: 20260428 }),
       0,
-      100
+      100,
+      null
+    );
+  });
+
+  it('shows the row total, marking estimates', async () => {
+    vi.mocked(fetchLandingPageTotal).mockResolvedValue({ totalCount: 52000, isExact: false });
+    await act(async () => { render(<LandingPage />); });
+    expect(vi.mocked(fetchLandingPageTotal)).toHaveBeenCalledWith(
+      expect.objectContaining({ dateKey: 20260428 })
     );
+    expect(screen.getByText(/Общо резултати: ≈/)).toBeInTheDocument();
   });
 
   it('renders the flat results table headers', async () => {
@@ -122,7 +135,8 @@ describe('LandingPage', () => {
     expect(vi.mocked(fetchLandingPageRows)).toHaveBeenCalledWith(
       expect.objectContaining({ settlementKey: 1 }),
       0,
-      100
+      100,
+      null
     );
   });
 
@@ -233,8 +247,39 @@ describe('LandingPage', () => {
     expect(vi.mocked(fetchLandingPageRows)).toHaveBeenLastCalledWith(
       expect.any(Object),
       1,
-      100
+      100,
+      null
     );
     expect(screen.getByDisplayValue('2')).toBeInTheDocument();
   });
+
+  it('passes the keyset cursor of the previous page when paging forward', async () => {
+    const manyRows = Array.from({ length: 100 }, (_, index) => ({
+      file_name: `f${index}.csv`,
+      product_name: `P${index}`,
+      category_name: 'Dairy',
+      settlement_name: 'Sofia',
+      store_name: 'Shop',
+      company_name: 'Chain',
+      retail_price: '1.00',
+      promo_price: null,
+      price: '1.00',
+    }));
+    const nextCursor = { page: 1, productName: 'P99', storeName: 'Shop', productKey: 99, storeKey: 1, fileKey: 1, dateKey: 20260428 };
+    vi.mocked(fetchLandingPageRows)
+      .mockResolvedValueOnce({ rows: manyRows, nextCursor })
+      .mockResolvedValueOnce({ rows: manyRows.slice(0, 5), nextCursor: null });
+
+    await act(async () => { render(<LandingPage />); });
+    await act(async () => {
+      fireEvent.click(screen.getByRole('button', { name: 'Следваща страница' }));
+    });
+
+    expect(vi.mocked(fetchLandingPageRows)).toHaveBeenLastCalledWith(
+      expect.any(Object),
+      1,
+      100,
+      nextCursor
+    );
+  });
 });
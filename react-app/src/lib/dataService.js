@@ -3,9 +3,16 @@
  * Provides async helpers for the landing-page screen-scoped Supabase queries.
  * Responsibilities: RPC-backed landing-page rows, grouped aggregations, selector
  * option fetching, price/date formatting, and session query-activity logging.
+ * Date-level options, totals, groupings and report-1 category prices are read
+ * first from the static snapshots published with the deploy (/data/*.json.gz),
+ * falling back to the RPCs for product search, other filters and row pages,
+ * and for everything when the snapshot's dates no longer match the database.
+ * With a date and settlement selected, rows and totals are filtered and paged
+ * locally from the settlement's row shard when one was published.
  */
 import supabase from './supabase';
 import { addQueryLogEntry } from './queryLog';
+import { expandShardRows, selectShardRows } from './rowShard';
 
 /**
  * Creates a query-log context used to measure duration and record final outcome.
@@ -49,9 +56,33 @@ function finalizeQueryLog(logContext, status, extra = {}) {
 function summarizeResultCount(data) {
   if (Array.isArray(data)) return data.length;
   if (data == null) return 0;
+  if (isColumnCompact(data)) return columnCompactLength(data);
   return 1;
 }
 
+/**
+ * Tells whether an RPC payload uses the column-compact format returned by the
+ * *_columns RPCs: an object holding one equal-length array per column.
+ *
+ * @param {unknown} data - Response payload returned by Supabase.
+ * @returns {boolean} True for a non-empty object whose values are all arrays.
+ */
+function isColumnCompact(data) {
+  if (data == null || typeof data !== 'object' || Array.isArray(data)) return false;
+  const columns = Object.values(data);
+  return columns.length > 0 && columns.every(Array.isArray);
+}
+
+/**
+ * Returns the number of rows in a column-compact payload.
+ *
+ * @param {Object<string, Array>} data - Column name → column values.
+ * @returns {number} Length of the first column.
+ */
+function columnCompactLength(data) {
+  return Object.values(data)[0].length;
+}
+
 /**
  * Executes one Supabase request and records its observable outcome in the session log.
  *
@@ -144,6 +175,203 @@ export function calculatePrice(row) {
   return retail;
 }
 
+/**
+ * Decodes a landing-page RPC payload into row objects. Accepts both result
+ * formats: the JSON array of row objects returned by get_landing_page_rows_keyset
+ * and get_landing_page_grouped, and the column-compact object returned by their
+ * *_columns variants ({ column: [value, …], … }), which sends each column name
+ * once instead of once per row.
+ *
+ * @param {Array<Object>|Object<string, Array>|null} data - RPC payload.
+ * @returns {Object[]} Row objects in server order (empty for null or unknown payloads).
+ */
+export function decodeResultRows(data) {
+  if (Array.isArray(data)) return data;
+  if (!isColumnCompact(data)) return [];
+
+  const names = Object.keys(data);
+  const length = columnCompactLength(data);
+  const rows = new Array(length);
+  for (let i = 0; i < length; i += 1) {
+    const row = {};
+    for (const name of names) {
+      row[name] = data[name][i];
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
+// ============================================================
+// Static data snapshots (src/publish_snapshots.py)
+// ============================================================
+
+/** URL prefix of the gzip JSON shards published with the Netlify deploy. */
+const SNAPSHOT_BASE = '/data';
+
+/** Shard layout version this module understands (publish_snapshots.SNAPSHOT_VERSION). */
+const SNAPSHOT_VERSION = 1;
+
+/** Shard path → promise of the decoded payload (null when unavailable). */
+const snapshotCache = new Map();
+
+/**
+ * Downloads and decompresses one snapshot shard. Shards are served as plain
+ * .json.gz files, so the browser inflates them with DecompressionStream. Any
+ * failure (no snapshot in this build, dev server, unsupported browser) yields
+ * null and the caller falls back to the RPC; only served shards are logged.
+ *
+ * @param {string} path - Shard path relative to SNAPSHOT_BASE.
+ * @returns {Promise<Object|null>} Decoded shard payload, or null.
+ */
+async function readSnapshot(path) {
+  if (typeof fetch !== 'function' || typeof DecompressionStream !== 'function') return null;
+
+  const logContext = createQueryLogContext({
+    source: 'loadSnapshot',
+    kind: 'snapshot',
+    target: path,
+    action: 'fetch',
+  });
+  try {
+    const response = await fetch(`${SNAPSHOT_BASE}/${path}`);
+    if (!response.ok || !response.body) return null;
+    const inflated = response.body.pipeThrough(new DecompressionStream('gzip'));
+    const data = JSON.parse(await new Response(inflated).text());
+    finalizeQueryLog(logContext, 'success', { rowCount: 1 });
+    return data;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Returns a snapshot shard, downloading it at most once per session.
+ *
+ * @param {string} path - Shard path relative to SNAPSHOT_BASE.
+ * @returns {Promise<Object|null>} Decoded shard payload, or null.
+ */
+function loadSnapshot(path) {
+  if (!snapshotCache.has(path)) {
+    snapshotCache.set(path, readSnapshot(path));
+  }
+  return snapshotCache.get(path);
+}
+
+/** Promise of the validated snapshot index, checked once per session. */
+let snapshotIndexPromise = null;
+
+/**
+ * Identifies the database state a snapshot was rendered from, exactly as
+ * publish_snapshots.data_version() does: the retained date keys, ascending.
+ *
+ * @param {number[]} dateKeys - Retained dim_date keys, in any order.
+ * @returns {string} Comma-separated date keys.
+ */
+function snapshotDataVersion(dateKeys) {
+  return [...dateKeys].sort((a, b) => a - b).join(',');
+}
+
+/**
+ * Downloads the snapshot index and checks it against the database. Snapshots
+ * are published only on deploy, while load_supabase.py syncs a new day
+ * without one, so the index is trusted only while its data version matches
+ * the dates get_lp_options_date returns now.
+ *
+ * @returns {Promise<Object|null>} The index, or null when it is missing or stale.
+ */
+async function readSnapshotIndex() {
+  const index = await loadSnapshot('index.json.gz');
+  if (index?.version !== SNAPSHOT_VERSION) return null;
+
+  const params = buildOptionsParams('date', {});
+  try {
+    const { data, error } = await executeLoggedQuery({
+      source: 'loadSnapshotIndex',
+      kind: 'rpc',
+      target: 'get_lp_options_date',
+      action: 'rpc',
+      params,
+      execute: () => supabase.rpc('get_lp_options_date', params),
+    });
+    if (error || !Array.isArray(data)) return null;
+    const current = snapshotDataVersion(data.map((row) => row.date_key));
+    return current === index.data_version ? index : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Returns the snapshot index when it matches the supported layout version
+ * and the database's current dates.
+ *
+ * @returns {Promise<Object|null>} Index with dates, groupings and shard paths, or null.
+ */
+function loadSnapshotIndex() {
+  if (!snapshotIndexPromise) snapshotIndexPromise = readSnapshotIndex();
+  return snapshotIndexPromise;
+}
+
+/**
+ * Returns one per-date snapshot shard.
+ *
+ * @param {number|null} dateKey - dim_date key of the shard.
+ * @param {string} part - Shard name: 'options', 'grouped' or 'report_1'.
+ * @returns {Promise<Object|null>} Shard payload, or null when it was not published.
+ */
+async function loadDateSnapshot(dateKey, part) {
+  if (dateKey == null) return null;
+  const index = await loadSnapshotIndex();
+  const path = index?.shards?.[String(dateKey)]?.[part];
+  return path ? loadSnapshot(path) : null;
+}
+
+/**
+ * Returns the row shard of the filters' date and settlement.
+ *
+ * @param {Object} filters - Landing-page filter state.
+ * @returns {Promise<Object|null>} Row shard payload, or null when none was published.
+ */
+async function loadRowShard(filters) {
+  const { dateKey = null, settlementKey = null } = filters;
+  if (dateKey == null || settlementKey == null) return null;
+  const index = await loadSnapshotIndex();
+  const path = index?.rows?.[String(dateKey)]?.[String(settlementKey)];
+  return path ? loadSnapshot(path) : null;
+}
+
+/** Last row-shard selection: { shard, key, positions }, reused while paging. */
+let lastShardSelection = null;
+
+/**
+ * Selects the shard rows matching the filters, reusing the previous selection
+ * when only the page changed or the total is requested for the same filters.
+ *
+ * @param {Object} shard - Row shard payload.
+ * @param {Object} filters - Landing-page filter state.
+ * @returns {number[]} Matching row positions in display order.
+ */
+function selectRowsCached(shard, filters) {
+  const key = JSON.stringify(buildLandingPageFilterParams(filters));
+  if (lastShardSelection?.shard !== shard || lastShardSelection.key !== key) {
+    lastShardSelection = { shard, key, positions: selectShardRows(shard, filters) };
+  }
+  return lastShardSelection.positions;
+}
+
+/**
+ * Tells whether every RPC parameter other than the listed ones is null, i.e.
+ * the request is one of the date-only combinations that the shards hold.
+ *
+ * @param {Object} params - RPC parameter record.
+ * @param {string[]} [allowed] - Parameter names that may be set.
+ * @returns {boolean} True when no other parameter is set.
+ */
+function onlyParamsSet(params, allowed = []) {
+  return Object.entries(params).every(([name, value]) => allowed.includes(name) || value == null);
+}
+
 // ============================================================
 // Landing-page data fetching (R-20260525-1400)
 // ============================================================
@@ -224,12 +452,42 @@ function buildLandingPageFilterParams(filters) {
   };
 }
 
+/**
+ * Builds the keyset cursor that starts the page after the given row. Missing
+ * names become '', as the projection stores them, so the cursor compares
+ * equal to its own row instead of yielding NULL server-side.
+ *
+ * @param {Object} row - Last row of a page returned by get_landing_page_rows_keyset.
+ * @param {number} page - Zero-based index of the page the cursor starts.
+ * @returns {Object} Cursor passed back to fetchLandingPageRows.
+ */
+function buildRowCursor(row, page) {
+  return {
+    page,
+    productName: row.product_name ?? '',
+    storeName: row.store_name ?? '',
+    productKey: row.product_key,
+    storeKey: row.store_key,
+    fileKey: row.file_key,
+    dateKey: row.date_key,
+  };
+}
+
 /**
  * Fetches a paginated page of flat detail rows from the landing-page RPC.
  * All filtering is applied server-side against the read-optimized Supabase
  * projection owned by src/load_supabase.py, and the RPC returns only the
  * requested page rows.
  *
+ * Pages are read with keyset pagination (get_landing_page_rows_keyset): the
+ * cursor carries the sort key of the last row before its page, so the server
+ * seeks straight to it instead of scanning and discarding earlier rows. A
+ * cursor for an earlier page still works; the remaining whole pages are
+ * skipped server-side. The page is requested in the column-compact format
+ * (get_landing_page_rows_keyset_columns) and decoded by decodeResultRows.
+ * When the date and settlement have a published row shard, the page is sliced
+ * from the locally filtered shard instead and no request is made.
+ *
  * @param {Object} filters - Active filter state.
  * @param {number|null} filters.dateKey - dim_date surrogate key filter, or null.
  * @param {number|null} filters.settlementKey - Settlement filter, or null.
@@ -241,37 +499,131 @@ function buildLandingPageFilterParams(filters) {
  * @param {number|null} filters.priceMax - Maximum effective price filter, or null.
  * @param {number} page - Zero-based page index.
  * @param {number} pageSize - Rows per page.
- * @returns {Promise<{rows: Object[]}>} Requested page rows for the current filter state.
+ * @param {Object|null} [cursor] - nextCursor of an earlier page (page <= the
+ *   requested page) for the same filters, or null to count from the first row.
+ * @returns {Promise<{rows: Object[], nextCursor: Object|null}>} Requested page rows
+ *   and the cursor for the following page (null when this page is not full).
  * @throws {Error} If the Supabase RPC call returns an error.
  */
-export async function fetchLandingPageRows(filters, page, pageSize) {
+export async function fetchLandingPageRows(filters, page, pageSize, cursor = null) {
+  const shard = await loadRowShard(filters);
+  if (shard) {
+    const positions = selectRowsCached(shard, filters).slice(page * pageSize, (page + 1) * pageSize);
+    const rows = expandShardRows(shard, positions);
+    const nextCursor = rows.length === pageSize && pageSize > 0
+      ? buildRowCursor(rows[rows.length - 1], page + 1)
+      : null;
+    return { rows, nextCursor };
+  }
+
+  const start = cursor && cursor.page <= page ? cursor : null;
   const params = {
     ...buildLandingPageFilterParams(filters),
-    p_offset: page * pageSize,
+    p_after_product_name: start ? start.productName : null,
+    p_after_store_name: start ? start.storeName : null,
+    p_after_product_key: start ? start.productKey : null,
+    p_after_store_key: start ? start.storeKey : null,
+    p_after_file_key: start ? start.fileKey : null,
+    p_after_date_key: start ? start.dateKey : null,
+    p_offset: (page - (start ? start.page : 0)) * pageSize,
     p_limit: pageSize,
   };
 
   const { data, error } = await executeLoggedQuery({
     source: 'fetchLandingPageRows',
     kind: 'rpc',
-    target: 'get_landing_page_rows',
+    target: 'get_landing_page_rows_keyset_columns',
     action: 'rpc',
     params,
-    execute: () => supabase.rpc('get_landing_page_rows', params),
+    execute: () => supabase.rpc('get_landing_page_rows_keyset_columns', params),
   });
 
   if (error) throw new Error(`fetchLandingPageRows: ${error.message}`);
 
   // The RPC returns only the requested page rows. The landing-page UI now derives
   // forward availability from page size instead of fetching a companion total count.
-  const rows = Array.isArray(data) ? data : [];
-  return { rows };
+  const rows = decodeResultRows(data);
+  const nextCursor = rows.length === pageSize && pageSize > 0
+    ? buildRowCursor(rows[rows.length - 1], page + 1)
+    : null;
+  return { rows, nextCursor };
+}
+
+/** Most filter combinations whose totals are kept for the session. */
+const TOTAL_CACHE_LIMIT = 200;
+
+/** RPC parameter key → resolved { totalCount, isExact }, oldest first. */
+const totalCache = new Map();
+
+/** Key parameters whose per-key totals the options shard holds. */
+const SNAPSHOT_TOTAL_KEYS = ['p_settlement_key', 'p_category_key', 'p_company_key', 'p_store_key'];
+
+/**
+ * Fetches the number of rows matching the landing-page filters via the
+ * get_landing_page_total RPC. Key-only filters are answered exactly from
+ * precomputed per-combination counts; product-name and price filters are
+ * counted exactly up to a limit and estimated above it (isExact false).
+ * Results are cached per filter combination for the session, so returning
+ * to an earlier selection costs no request. A date with at most one other key
+ * filter is answered from the published options snapshot without an RPC, and
+ * any filters on a date and settlement with a row shard are counted locally.
+ *
+ * @param {Object} filters - Active filter state (same shape as fetchLandingPageRows).
+ * @returns {Promise<{totalCount: number, isExact: boolean}>} Matching row total.
+ * @throws {Error} If the Supabase RPC call returns an error.
+ */
+export async function fetchLandingPageTotal(filters) {
+  const params = buildLandingPageFilterParams(filters);
+  const cacheKey = JSON.stringify(params);
+  if (totalCache.has(cacheKey)) {
+    return totalCache.get(cacheKey);
+  }
+
+  const shard = await loadRowShard(filters);
+  if (shard) {
+    return { totalCount: selectRowsCached(shard, filters).length, isExact: true };
+  }
+
+  // The options shard holds the date total and the total per single key.
+  const keyParams = SNAPSHOT_TOTAL_KEYS.filter((name) => params[name] != null);
+  if (keyParams.length <= 1 && onlyParamsSet(params, ['p_date_key', ...keyParams])) {
+    const totals = (await loadDateSnapshot(params.p_date_key, 'options'))?.totals;
+    if (totals) {
+      const keyColumn = keyParams[0]?.slice(2);
+      const count = keyColumn ? totals[keyColumn]?.[String(params[`p_${keyColumn}`])] : totals.all;
+      return { totalCount: Number(count ?? 0), isExact: true };
+    }
+  }
+
+  const { data, error } = await executeLoggedQuery({
+    source: 'fetchLandingPageTotal',
+    kind: 'rpc',
+    target: 'get_landing_page_total',
+    action: 'rpc',
+    params,
+    execute: () => supabase.rpc('get_landing_page_total', params),
+  });
+
+  if (error) throw new Error(`fetchLandingPageTotal: ${error.message}`);
+
+  const total = {
+    totalCount: Number(data?.total_count ?? 0),
+    isExact: data?.is_exact !== false,
+  };
+  if (totalCache.size >= TOTAL_CACHE_LIMIT) {
+    totalCache.delete(totalCache.keys().next().value);
+  }
+  totalCache.set(cacheKey, total);
+  return total;
 }
 
 /**
  * Fetches aggregated rows from fact_prices_lookback via the get_landing_page_grouped RPC.
  * Results are grouped by up to two dimension columns with avg/min/max for price and promo
- * price. Group-by dimension names are validated server-side against a whitelist.
+ * price. Group-by dimension names are validated server-side against a whitelist. The
+ * column-compact variant (get_landing_page_grouped_columns) is requested and decoded.
+ * Groupings of a date alone that publish_snapshots.py pre-rendered are read from
+ * the grouped snapshot instead.
  *
  * @param {Object} filters - Active filter state (same shape as fetchLandingPageRows).
  * @param {string} groupBy1 - First grouping dimension name (e.g. 'category_name').
@@ -286,24 +638,31 @@ export async function fetchLandingPageGrouped(filters, groupBy1, groupBy2) {
     p_group_by_2: groupBy2 || null,
   };
 
+  if (onlyParamsSet(params, ['p_date_key', 'p_group_by_1', 'p_group_by_2'])) {
+    const shardKey = groupBy2 ? `${groupBy1}|${groupBy2}` : groupBy1;
+    const grouped = (await loadDateSnapshot(params.p_date_key, 'grouped'))?.grouped;
+    if (grouped?.[shardKey]) return decodeResultRows(grouped[shardKey]);
+  }
+
   const { data, error } = await executeLoggedQuery({
     source: 'fetchLandingPageGrouped',
     kind: 'rpc',
-    target: 'get_landing_page_grouped',
+    target: 'get_landing_page_grouped_columns',
     action: 'rpc',
     params,
-    execute: () => supabase.rpc('get_landing_page_grouped', params),
+    execute: () => supabase.rpc('get_landing_page_grouped_columns', params),
   });
 
   if (error) throw new Error(`fetchLandingPageGrouped: ${error.message}`);
 
-  // The RPC returns a JSON array directly.
-  return Array.isArray(data) ? data : [];
+  return decodeResultRows(data);
 }
 
 /**
  * Fetches the valid option list for a single dimension filter given the current
- * active state of the other four filters. Calls the appropriate cross-filter RPC.
+ * active state of the other four filters. The date list, and each dimension's
+ * options for a date alone, come from the published snapshot; other filter
+ * states call the appropriate cross-filter RPC.
  *
  * @param {string} dimension - One of: 'settlement', 'category', 'company', 'store', 'date'.
  * @param {Object} currentFilters - Current active filter state (same shape as fetchLandingPageRows).
@@ -316,6 +675,14 @@ export async function fetchLandingPageOptions(dimension, currentFilters) {
 
   const params = buildOptionsParams(dimension, currentFilters);
 
+  if (dimension === 'date' && onlyParamsSet(params)) {
+    const index = await loadSnapshotIndex();
+    if (index?.dates) return decodeResultRows(index.dates);
+  } else if (onlyParamsSet(params, ['p_date_key'])) {
+    const options = (await loadDateSnapshot(params.p_date_key, 'options'))?.options;
+    if (options?.[dimension]) return decodeResultRows(options[dimension]);
+  }
+
   const { data, error } = await executeLoggedQuery({
     source: 'fetchLandingPageOptions',
     kind: 'rpc',
@@ -330,3 +697,40 @@ export async function fetchLandingPageOptions(dimension, currentFilters) {
   return Array.isArray(data) ? data : [];
 }
 
+/**
+ * Fetches the average price per category in one settlement for a date (report 1),
+ * cheapest first, as computed by the get_report_1_category_prices RPC. The
+ * published report_1 snapshot answers every settlement of a retained date;
+ * the RPC is called only when no snapshot covers the request.
+ *
+ * @param {number} dateKey - dim_date surrogate key.
+ * @param {number} settlementKey - Settlement key.
+ * @param {string} [priceOffset] - 'current', 'day1' or 'day2'.
+ * @returns {Promise<Object[]>} Rows of { category_key, avg_price }.
+ * @throws {Error} If the Supabase RPC call returns an error.
+ */
+export async function fetchCategoryPrices(dateKey, settlementKey, priceOffset = 'current') {
+  const report = (await loadDateSnapshot(dateKey, 'report_1'))?.report_1;
+  if (report?.[priceOffset]) {
+    return decodeResultRows(report[priceOffset][String(settlementKey)] ?? null);
+  }
+
+  const params = {
+    p_date_key: dateKey,
+    p_settlement_key: settlementKey,
+    p_price_offset: priceOffset,
+  };
+
+  const { data, error } = await executeLoggedQuery({
+    source: 'fetchCategoryPrices',
+    kind: 'rpc',
+    target: 'get_report_1_category_prices',
+    action: 'rpc',
+    params,
+    execute: () => supabase.rpc('get_report_1_category_prices', params),
+  });
+
+  if (error) throw new Error(`fetchCategoryPrices: ${error.message}`);
+
+  return Array.isArray(data) ? data : [];
+}
@@ -53,7 +53,7 @@ describe('fetchLandingPageRows', () => {
     vi.resetModules();
   });
 
-  it('calls get_landing_page_rows RPC with correct params and returns rows', async () => {
+  it('calls get_landing_page_rows_keyset_columns RPC with correct params and returns rows', async () => {
     const mockSupabase = {
       rpc: vi.fn().mockResolvedValue({ data: [{ product_name: 'Milk' }], error: null }),
     };
@@ -66,16 +66,17 @@ describe('fetchLandingPageRows', () => {
       100
     );
 
-    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows', expect.objectContaining({
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows_keyset_columns', expect.objectContaining({
       p_date_key: 20260428,
       p_settlement_key: 3,
       p_product_name: 'milk',
       p_price_min: 1.5,
       p_price_max: 5,
+      p_after_product_key: null,
       p_offset: 0,
       p_limit: 100,
     }));
-    expect(result).toEqual({ rows: [{ product_name: 'Milk' }] });
+    expect(result).toEqual({ rows: [{ product_name: 'Milk' }], nextCursor: null });
   });
 
   it('returns empty rows when RPC returns null', async () => {
@@ -87,7 +88,7 @@ describe('fetchLandingPageRows', () => {
     const { fetchLandingPageRows } = await import('./dataService');
     const result = await fetchLandingPageRows({}, 0, 100);
 
-    expect(result).toEqual({ rows: [] });
+    expect(result).toEqual({ rows: [], nextCursor: null });
   });
 
   it('throws when RPC returns an error', async () => {
@@ -109,12 +110,64 @@ describe('fetchLandingPageRows', () => {
     const { fetchLandingPageRows } = await import('./dataService');
     await fetchLandingPageRows({}, 2, 100);
 
-    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows', expect.objectContaining({
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows_keyset_columns', expect.objectContaining({
       p_offset: 200,
       p_limit: 100,
     }));
   });
 
+  it('seeks past the cursor and returns the next page cursor', async () => {
+    const lastRow = {
+      product_name: 'Milk', store_name: 'Shop', product_key: 7, store_key: 3, file_key: 2, date_key: 20260428,
+    };
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: [{ product_name: 'Bread' }, lastRow], error: null }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageRows } = await import('./dataService');
+    const cursor = {
+      page: 3, productName: 'Apple', storeName: 'Shop', productKey: 1, storeKey: 3, fileKey: 2, dateKey: 20260428,
+    };
+    const result = await fetchLandingPageRows({}, 4, 2, cursor);
+
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows_keyset_columns', expect.objectContaining({
+      p_after_product_name: 'Apple',
+      p_after_store_name: 'Shop',
+      p_after_product_key: 1,
+      p_after_store_key: 3,
+      p_after_file_key: 2,
+      p_after_date_key: 20260428,
+      p_offset: 2,
+      p_limit: 2,
+    }));
+    expect(result.nextCursor).toEqual({
+      page: 5, productName: 'Milk', storeName: 'Shop', productKey: 7, storeKey: 3, fileKey: 2, dateKey: 20260428,
+    });
+  });
+
+  it('builds a NULL-safe cursor when the last row has no names', async () => {
+    const lastRow = {
+      product_name: null, store_name: null, product_key: 9, store_key: 4, file_key: 2, date_key: 20260428,
+    };
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: [{ product_name: 'Bread' }, lastRow], error: null }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageRows } = await import('./dataService');
+    const first = await fetchLandingPageRows({}, 0, 2);
+    await fetchLandingPageRows({}, 1, 2, first.nextCursor);
+
+    expect(first.nextCursor).toMatchObject({ page: 1, productName: '', storeName: '', productKey: 9 });
+    expect(mockSupabase.rpc).toHaveBeenLastCalledWith('get_landing_page_rows_keyset_columns', expect.objectContaining({
+      p_after_product_name: '',
+      p_after_store_name: '',
+      p_after_product_key: 9,
+      p_offset: 0,
+    }));
+  });
+
   it('records row-query activity in the session query log', async () => {
     const mockSupabase = {
       rpc: vi.fn().mockResolvedValue({ data: [{ product_name: 'Milk' }], error: null }),
@@ -129,7 +182,7 @@ describe('fetchLandingPageRows', () => {
 
     expect(getQueryLogSnapshot()[0]).toMatchObject({
       source: 'fetchLandingPageRows',
-      target: 'get_landing_page_rows',
+      target: 'get_landing_page_rows_keyset_columns',
       kind: 'rpc',
       status: 'success',
       rowCount: 1,
@@ -137,12 +190,85 @@ describe('fetchLandingPageRows', () => {
   });
 });
 
+describe('decodeResultRows', () => {
+  it('turns column-compact payloads into row objects in order', async () => {
+    const { decodeResultRows } = await import('./dataService');
+    expect(decodeResultRows({
+      product_name: ['Bread', 'Milk'],
+      price: [1.2, 2.5],
+    })).toEqual([
+      { product_name: 'Bread', price: 1.2 },
+      { product_name: 'Milk', price: 2.5 },
+    ]);
+  });
+
+  it('passes row arrays through and maps empty payloads to no rows', async () => {
+    const { decodeResultRows } = await import('./dataService');
+    expect(decodeResultRows([{ group1: 'Dairy' }])).toEqual([{ group1: 'Dairy' }]);
+    expect(decodeResultRows({ product_name: [], price: [] })).toEqual([]);
+    expect(decodeResultRows(null)).toEqual([]);
+  });
+});
+
+describe('fetchLandingPageTotal', () => {
+  beforeEach(() => {
+    vi.resetModules();
+  });
+
+  it('calls get_landing_page_total RPC with the filter params', async () => {
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: { total_count: 1234, is_exact: true }, error: null }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageTotal } = await import('./dataService');
+    const result = await fetchLandingPageTotal({ dateKey: 20260428, settlementKey: 5 });
+
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_total', {
+      p_date_key: 20260428,
+      p_settlement_key: 5,
+      p_category_key: null,
+      p_company_key: null,
+      p_store_key: null,
+      p_product_name: null,
+      p_price_min: null,
+      p_price_max: null,
+    });
+    expect(result).toEqual({ totalCount: 1234, isExact: true });
+  });
+
+  it('reports estimated totals and serves repeated filters from the cache', async () => {
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: { total_count: 52000, is_exact: false }, error: null }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageTotal } = await import('./dataService');
+    const first = await fetchLandingPageTotal({ dateKey: 20260428, productName: 'мляко' });
+    const second = await fetchLandingPageTotal({ dateKey: 20260428, productName: 'мляко' });
+
+    expect(first).toEqual({ totalCount: 52000, isExact: false });
+    expect(second).toEqual(first);
+    expect(mockSupabase.rpc).toHaveBeenCalledTimes(1);
+  });
+
+  it('throws when RPC returns an error', async () => {
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: null, error: { message: 'timeout' } }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageTotal } = await import('./dataService');
+    await expect(fetchLandingPageTotal({})).rejects.toThrow('fetchLandingPageTotal: timeout');
+  });
+});
+
 describe('fetchLandingPageGrouped', () => {
   beforeEach(() => {
     vi.resetModules();
   });
 
-  it('calls get_landing_page_grouped RPC with correct groupBy params', async () => {
+  it('calls get_landing_page_grouped_columns RPC with correct groupBy params', async () => {
     const mockSupabase = {
       rpc: vi.fn().mockResolvedValue({ data: [{ group1: 'Dairy' }], error: null }),
     };
@@ -155,7 +281,7 @@ describe('fetchLandingPageGrouped', () => {
       null
     );
 
-    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_grouped', expect.objectContaining({
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_grouped_columns', expect.objectContaining({
       p_date_key: 20260428,
       p_company_key: 7,
       p_group_by_1: 'category_name',
@@ -173,12 +299,29 @@ describe('fetchLandingPageGrouped', () => {
     const { fetchLandingPageGrouped } = await import('./dataService');
     await fetchLandingPageGrouped({}, 'settlement_name', 'company_name');
 
-    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_grouped', expect.objectContaining({
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_grouped_columns', expect.objectContaining({
       p_group_by_1: 'settlement_name',
       p_group_by_2: 'company_name',
     }));
   });
 
+  it('decodes the column-compact grouped payload', async () => {
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({
+        data: { group1: ['Dairy', 'Bread'], group2: [null, null], price_avg: [2.1, 1.4] },
+        error: null,
+      }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageGrouped } = await import('./dataService');
+    const result = await fetchLandingPageGrouped({}, 'category_name', null);
+    expect(result).toEqual([
+      { group1: 'Dairy', group2: null, price_avg: 2.1 },
+      { group1: 'Bread', group2: null, price_avg: 1.4 },
+    ]);
+  });
+
   it('returns empty array when RPC returns null', async () => {
     const mockSupabase = {
       rpc: vi.fn().mockResolvedValue({ data: null, error: null }),
@@ -285,3 +428,240 @@ describe('fetchLandingPageOptions', () => {
     });
   });
 });
+
+/**
+ * Builds a fetch stub serving gzip-compressed JSON shards from /data.
+ *
+ * @param {Object<string, Object>} shards - Shard path → payload.
+ * @returns {Function} vi.fn fetch replacement (404 for unknown paths).
+ */
+function stubSnapshotFetch(shards) {
+  const fetchStub = vi.fn(async (url) => {
+    const payload = shards[url.replace('/data/', '')];
+    if (!payload) return new Response(null, { status: 404 });
+    const body = new Blob([JSON.stringify(payload)]).stream()
+      .pipeThrough(new CompressionStream('gzip'));
+    return new Response(body);
+  });
+  vi.stubGlobal('fetch', fetchStub);
+  return fetchStub;
+}
+
+/** get_lp_options_date rows matching the data_version of the index fixtures. */
+const CURRENT_DATES = [{ date_key: 20260428, date: '2026-04-28' }];
+
+/**
+ * Builds an rpc stub that answers the snapshot date check with CURRENT_DATES.
+ *
+ * @param {Function} [respond] - Response for every other RPC, given its name and params.
+ * @returns {Function} vi.fn rpc replacement.
+ */
+function stubSnapshotRpc(respond = () => ({ data: null, error: null })) {
+  return vi.fn(async (name, params) => (
+    name === 'get_lp_options_date' ? { data: CURRENT_DATES, error: null } : respond(name, params)
+  ));
+}
+
+const SNAPSHOT_SHARDS = {
+  'index.json.gz': {
+    version: 1,
+    data_version: '20260428',
+    dates: { date_key: [20260428], date: ['2026-04-28'] },
+    shards: {
+      20260428: {
+        options: '20260428/options.json.gz',
+        grouped: '20260428/grouped.json.gz',
+        report_1: '20260428/report_1.json.gz',
+      },
+    },
+  },
+  '20260428/options.json.gz': {
+    options: { category: { category_key: [5], name: ['Dairy'] } },
+    totals: { all: 300, settlement_key: { 1: 120 } },
+  },
+  '20260428/grouped.json.gz': {
+    grouped: { 'settlement_name|category_name': { group1: ['Sofia'], group2: ['Dairy'], price_avg: [2.5] } },
+  },
+  '20260428/report_1.json.gz': {
+    report_1: { current: { 1: { category_key: [5, 6], avg_price: [1.1, 2.2] } } },
+  },
+};
+
+describe('static data snapshots', () => {
+  beforeEach(() => {
+    vi.resetModules();
+    vi.unstubAllGlobals();
+  });
+
+  it('serves date options, totals, groupings and category prices without RPCs', async () => {
+    const fetchStub = stubSnapshotFetch(SNAPSHOT_SHARDS);
+    const mockSupabase = { rpc: stubSnapshotRpc() };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const dataService = await import('./dataService');
+
+    expect(await dataService.fetchLandingPageOptions('date', {})).toEqual([
+      { date_key: 20260428, date: '2026-04-28' },
+    ]);
+    expect(await dataService.fetchLandingPageOptions('category', { dateKey: 20260428 })).toEqual([
+      { category_key: 5, name: 'Dairy' },
+    ]);
+    expect(await dataService.fetchLandingPageTotal({ dateKey: 20260428 }))
+      .toEqual({ totalCount: 300, isExact: true });
+    expect(await dataService.fetchLandingPageTotal({ dateKey: 20260428, settlementKey: 1 }))
+      .toEqual({ totalCount: 120, isExact: true });
+    expect(await dataService.fetchLandingPageTotal({ dateKey: 20260428, settlementKey: 2 }))
+      .toEqual({ totalCount: 0, isExact: true });
+    expect(await dataService.fetchLandingPageGrouped({ dateKey: 20260428 }, 'settlement_name', 'category_name'))
+      .toEqual([{ group1: 'Sofia', group2: 'Dairy', price_avg: 2.5 }]);
+    expect(await dataService.fetchCategoryPrices(20260428, 1)).toEqual([
+      { category_key: 5, avg_price: 1.1 },
+      { category_key: 6, avg_price: 2.2 },
+    ]);
+
+    // Only the once-per-session date check reaches the database.
+    expect(mockSupabase.rpc.mock.calls.map(([name]) => name)).toEqual(['get_lp_options_date']);
+    // Each shard is downloaded once per session.
+    expect(fetchStub).toHaveBeenCalledTimes(4);
+  });
+
+  it('falls back to RPCs for product search and filters the shards do not cover', async () => {
+    stubSnapshotFetch(SNAPSHOT_SHARDS);
+    const mockSupabase = {
+      rpc: stubSnapshotRpc((name) => (name === 'get_landing_page_total'
+        ? { data: { total_count: 7, is_exact: true }, error: null }
+        : { data: [], error: null })),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageTotal, fetchLandingPageOptions } = await import('./dataService');
+    await fetchLandingPageTotal({ dateKey: 20260428, productName: 'мляко' });
+    await fetchLandingPageTotal({ dateKey: 20260428, settlementKey: 1, categoryKey: 5 });
+    await fetchLandingPageOptions('store', { dateKey: 20260428 });
+
+    expect(mockSupabase.rpc.mock.calls.map(([name]) => name)).toEqual([
+      'get_landing_page_total',
+      'get_lp_options_date',
+      'get_landing_page_total',
+      'get_lp_options_store',
+    ]);
+  });
+
+  it('uses the RPCs when no snapshot was published', async () => {
+    stubSnapshotFetch({});
+    const mockSupabase = {
+      rpc: vi.fn().mockResolvedValue({ data: [{ category_key: 5, avg_price: 1.1 }], error: null }),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchCategoryPrices } = await import('./dataService');
+    const result = await fetchCategoryPrices(20260428, 1, 'day1');
+
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_report_1_category_prices', {
+      p_date_key: 20260428,
+      p_settlement_key: 1,
+      p_price_offset: 'day1',
+    });
+    expect(result).toEqual([{ category_key: 5, avg_price: 1.1 }]);
+  });
+
+  it('ignores a snapshot whose dates no longer match the database', async () => {
+    const fetchStub = stubSnapshotFetch(SNAPSHOT_SHARDS);
+    const mockSupabase = {
+      rpc: vi.fn(async (name) => (name === 'get_lp_options_date'
+        ? { data: [{ date_key: 20260429, date: '2026-04-29' }, ...CURRENT_DATES], error: null }
+        : { data: [{ category_key: 5, avg_price: 1.4 }], error: null })),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchCategoryPrices, fetchLandingPageOptions } = await import('./dataService');
+    const prices = await fetchCategoryPrices(20260428, 1);
+    const dates = await fetchLandingPageOptions('date', {});
+
+    expect(prices).toEqual([{ category_key: 5, avg_price: 1.4 }]);
+    expect(dates).toHaveLength(2);
+    expect(mockSupabase.rpc.mock.calls.map(([name]) => name)).toEqual([
+      'get_lp_options_date',
+      'get_report_1_category_prices',
+      'get_lp_options_date',
+    ]);
+    // Only the index was downloaded; the stale shards were never read.
+    expect(fetchStub).toHaveBeenCalledTimes(1);
+  });
+});
+
+describe('row shards', () => {
+  beforeEach(() => {
+    vi.resetModules();
+    vi.unstubAllGlobals();
+  });
+
+  const ROW_SHARDS = {
+    'index.json.gz': {
+      version: 1,
+      data_version: '20260428',
+      dates: { date_key: [20260428], date: ['2026-04-28'] },
+      shards: {},
+      rows: { 20260428: { 1: 'rows/20260428/1.0123456789abcdef.json.gz' } },
+    },
+    'rows/20260428/1.0123456789abcdef.json.gz': {
+      date_key: 20260428,
+      settlement_key: 1,
+      settlement_name: 'Sofia',
+      dictionaries: {
+        product: { key: [10, 11, 12], name: ['Bread', 'Milk', 'Milk bar'], tokens: ['bread', 'milk', 'milk bar'] },
+        category: { key: [5], name: ['Food'] },
+        company: { key: [3], name: ['Chain'] },
+        store: { key: [100], name: ['Shop'] },
+        file: { key: [2], name: ['a.csv'] },
+      },
+      rows: {
+        product: [0, 1, 2],
+        category: [0, 0, 0],
+        company: [0, 0, 0],
+        store: [0, 0, 0],
+        file: [0, 0, 0],
+        retail_price: [1.1, 2.5, 3.0],
+        promo_price: [null, null, null],
+        price: [1.1, 2.5, 3.0],
+      },
+    },
+  };
+
+  it('filters, pages and counts a settlement locally after one download', async () => {
+    const fetchStub = stubSnapshotFetch(ROW_SHARDS);
+    const mockSupabase = { rpc: stubSnapshotRpc() };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageRows, fetchLandingPageTotal } = await import('./dataService');
+    const filters = { dateKey: 20260428, settlementKey: 1, productName: 'milk' };
+
+    const first = await fetchLandingPageRows(filters, 0, 1);
+    const second = await fetchLandingPageRows(filters, 1, 1, first.nextCursor);
+    const total = await fetchLandingPageTotal(filters);
+
+    expect(first.rows.map((row) => row.product_name)).toEqual(['Milk']);
+    expect(first.rows[0]).toMatchObject({ settlement_name: 'Sofia', store_key: 100, date_key: 20260428 });
+    expect(first.nextCursor).toMatchObject({ page: 1, productKey: 11 });
+    expect(second.rows.map((row) => row.product_key)).toEqual([12]);
+    expect(total).toEqual({ totalCount: 2, isExact: true });
+    expect(mockSupabase.rpc.mock.calls.map(([name]) => name)).toEqual(['get_lp_options_date']);
+    expect(fetchStub).toHaveBeenCalledTimes(2);
+  });
+
+  it('uses the row RPC for settlements without a shard', async () => {
+    stubSnapshotFetch(ROW_SHARDS);
+    const mockSupabase = {
+      rpc: stubSnapshotRpc(() => ({ data: { product_name: ['Milk'] }, error: null })),
+    };
+    vi.doMock('./supabase', () => ({ default: mockSupabase, credentialsError: null }));
+
+    const { fetchLandingPageRows } = await import('./dataService');
+    const result = await fetchLandingPageRows({ dateKey: 20260428, settlementKey: 2 }, 0, 100);
+
+    expect(mockSupabase.rpc).toHaveBeenCalledWith('get_landing_page_rows_keyset_columns', expect.objectContaining({
+      p_settlement_key: 2,
+    }));
+    expect(result.rows).toEqual([{ product_name: 'Milk' }]);
+  });
+});
@@ -0,0 +1,140 @@
+/**
+ * rowShard.js: Local filtering of landing-page row shards for the Kolko Ni Struva React app.
+ * Provides the browser counterpart of get_landing_page_rows_keyset for one settlement and date.
+ * Responsibilities: normalise product-search terms like src/search_tokens.py, select the
+ * rows of a dictionary-encoded shard (written by src/publish_snapshots.py) that match the
+ * landing-page filters, and expand selected rows into the RPC's row objects.
+ *
+ * Shard rows are stored in the RPC's order (product, store, keys), so a selection
+ * is already sorted and a page is a slice of it.
+ */
+
+/** Lower-case Cyrillic letter → Latin spelling (search_tokens.TRANSLITERATION). */
+const TRANSLITERATION = {
+  а: 'a', б: 'b', в: 'v', г: 'g', д: 'd', е: 'e', ж: 'zh',
+  з: 'z', и: 'i', й: 'y', к: 'k', л: 'l', м: 'm', н: 'n',
+  о: 'o', п: 'p', р: 'r', с: 's', т: 't', у: 'u', ф: 'f',
+  х: 'h', ц: 'ts', ч: 'ch', ш: 'sh', щ: 'sht', ъ: 'a', ь: 'y',
+  ю: 'yu', я: 'ya',
+  ё: 'e', ы: 'y', э: 'e', і: 'i', ї: 'yi', є: 'ye',
+};
+
+const SEPARATOR = /[^a-z0-9]+/;
+
+/** Key filter → shard dictionary column it compares. */
+const KEY_FILTERS = {
+  categoryKey: 'category',
+  companyKey: 'company',
+  storeKey: 'store',
+};
+
+/**
+ * Returns the distinct normalised tokens of a product name or search term,
+ * exactly as search_tokens.search_tokens() does.
+ *
+ * @param {string|null} text - Raw text.
+ * @returns {string[]} Tokens in first-occurrence order, without duplicates.
+ */
+export function searchTokens(text) {
+  if (!text) return [];
+  let latin = '';
+  for (const letter of text.toLowerCase()) {
+    latin += TRANSLITERATION[letter] ?? letter;
+  }
+  return [...new Set(latin.split(SEPARATOR).filter(Boolean))];
+}
+
+/**
+ * Marks the shard's products whose tokens match a search term: every term
+ * token must be a prefix of one of the product's tokens.
+ *
+ * @param {Object} product - Product dictionary of a row shard (key, name, tokens).
+ * @param {string[]} terms - Tokens of the search term.
+ * @returns {Uint8Array} 1 for matching product indexes, 0 otherwise.
+ */
+function matchProducts(product, terms) {
+  const matches = new Uint8Array(product.key.length);
+  product.tokens.forEach((joined, index) => {
+    const tokens = joined.split(' ');
+    if (terms.every((term) => tokens.some((token) => token.startsWith(term)))) {
+      matches[index] = 1;
+    }
+  });
+  return matches;
+}
+
+/**
+ * Selects the rows of a shard that match the landing-page filters. The shard
+ * already fixes the date and settlement; key filters compare dictionary
+ * indexes, so each dictionary is searched once per call, not once per row.
+ *
+ * @param {Object} shard - Row shard payload (dictionaries, rows).
+ * @param {Object} filters - Landing-page filter state (see fetchLandingPageRows).
+ * @returns {number[]} Positions of matching rows, in shard order.
+ */
+export function selectShardRows(shard, filters) {
+  const { dictionaries, rows } = shard;
+  const checks = [];
+
+  for (const [filter, column] of Object.entries(KEY_FILTERS)) {
+    if (filters[filter] == null) continue;
+    const wanted = dictionaries[column].key.indexOf(filters[filter]);
+    if (wanted < 0) return [];
+    const indexes = rows[column];
+    checks.push((position) => indexes[position] === wanted);
+  }
+
+  const terms = searchTokens(filters.productName);
+  if (terms.length > 0) {
+    const matches = matchProducts(dictionaries.product, terms);
+    const products = rows.product;
+    checks.push((position) => matches[products[position]] === 1);
+  }
+
+  const prices = rows.price;
+  if (filters.priceMin != null) {
+    checks.push((position) => prices[position] != null && prices[position] >= filters.priceMin);
+  }
+  if (filters.priceMax != null) {
+    checks.push((position) => prices[position] != null && prices[position] <= filters.priceMax);
+  }
+
+  const selected = [];
+  for (let position = 0; position < prices.length; position += 1) {
+    if (checks.every((check) => check(position))) selected.push(position);
+  }
+  return selected;
+}
+
+/**
+ * Expands shard rows into the row objects returned by get_landing_page_rows_keyset.
+ *
+ * @param {Object} shard - Row shard payload.
+ * @param {number[]} positions - Row positions to expand, in display order.
+ * @returns {Object[]} Row objects.
+ */
+export function expandShardRows(shard, positions) {
+  const { dictionaries: dict, rows } = shard;
+  return positions.map((position) => {
+    const product = rows.product[position];
+    const category = rows.category[position];
+    const company = rows.company[position];
+    const store = rows.store[position];
+    const file = rows.file[position];
+    return {
+      file_name: dict.file.name[file],
+      product_name: dict.product.name[product],
+      category_name: dict.category.name[category],
+      settlement_name: shard.settlement_name,
+      store_name: dict.store.name[store],
+      company_name: dict.company.name[company],
+      retail_price: rows.retail_price[position],
+      promo_price: rows.promo_price[position],
+      price: rows.price[position],
+      product_key: dict.product.key[product],
+      store_key: dict.store.key[store],
+      file_key: dict.file.key[file],
+      date_key: shard.date_key,
+    };
+  });
+}
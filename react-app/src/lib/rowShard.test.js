@@ -0,0 +1,77 @@
+/**
+ * rowShard.test.js: Unit tests for local row-shard filtering.
+ * Responsibilities: verify search-term normalisation against src/search_tokens.py,
+ * filter selection over dictionary-encoded rows, and expansion to RPC row objects.
+ */
+import { describe, it, expect } from 'vitest';
+import { expandShardRows, searchTokens, selectShardRows } from './rowShard';
+
+const SHARD = {
+  date_key: 20260428,
+  settlement_key: 1,
+  settlement_name: 'София',
+  dictionaries: {
+    product: { key: [10, 11], name: ['Кисело мляко', 'Хляб'], tokens: ['kiselo mlyako', 'hlyab'] },
+    category: { key: [5, 6], name: ['Мляко', 'Хлебни'] },
+    company: { key: [3, null], name: ['Верига', null] },
+    store: { key: [100, 101], name: ['Магазин А', 'Магазин Б'] },
+    file: { key: [1], name: ['a.csv'] },
+  },
+  rows: {
+    product: [0, 0, 1],
+    category: [0, 0, 1],
+    company: [0, 1, 0],
+    store: [0, 1, 0],
+    file: [0, 0, 0],
+    retail_price: [2.0, 2.2, 1.1],
+    promo_price: [null, 1.9, null],
+    price: [2.0, 1.9, 1.1],
+  },
+};
+
+describe('searchTokens', () => {
+  it('matches the Python normalisation in both scripts', () => {
+    expect(searchTokens('Кисело МЛЯКО 2%')).toEqual(['kiselo', 'mlyako', '2']);
+    expect(searchTokens('kiselo mlyako 2')).toEqual(['kiselo', 'mlyako', '2']);
+    expect(searchTokens('Щастие ЖЪЛТО')).toEqual(['shtastie', 'zhalto']);
+    expect(searchTokens('Coca-Cola 1,5л coca')).toEqual(['coca', 'cola', '1', '5l']);
+    expect(searchTokens(' -- ')).toEqual([]);
+    expect(searchTokens(null)).toEqual([]);
+  });
+});
+
+describe('selectShardRows', () => {
+  it('returns every row in shard order without filters', () => {
+    expect(selectShardRows(SHARD, { dateKey: 20260428, settlementKey: 1 })).toEqual([0, 1, 2]);
+  });
+
+  it('filters by dictionary keys, product tokens and price', () => {
+    expect(selectShardRows(SHARD, { storeKey: 101 })).toEqual([1]);
+    expect(selectShardRows(SHARD, { companyKey: 3, categoryKey: 6 })).toEqual([2]);
+    expect(selectShardRows(SHARD, { categoryKey: 99 })).toEqual([]);
+    expect(selectShardRows(SHARD, { productName: 'мл кисело' })).toEqual([0, 1]);
+    expect(selectShardRows(SHARD, { productName: 'hlyab' })).toEqual([2]);
+    expect(selectShardRows(SHARD, { productName: '%' })).toEqual([0, 1, 2]);
+    expect(selectShardRows(SHARD, { priceMin: 1.5, priceMax: 1.95 })).toEqual([1]);
+  });
+});
+
+describe('expandShardRows', () => {
+  it('rebuilds get_landing_page_rows_keyset row objects', () => {
+    expect(expandShardRows(SHARD, [1])).toEqual([{
+      file_name: 'a.csv',
+      product_name: 'Кисело мляко',
+      category_name: 'Мляко',
+      settlement_name: 'София',
+      store_name: 'Магазин Б',
+      company_name: null,
+      retail_price: 2.2,
+      promo_price: 1.9,
+      price: 1.9,
+      product_key: 10,
+      store_key: 101,
+      file_key: 1,
+      date_key: 20260428,
+    }]);
+  });
+});
@@ -0,0 +1,254 @@
+"""
+columnar.py: Compressed columnar partition files for fact and lookback tables.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: write and read .kcol partitions — a binary companion to a
+fact (or lookback) CSV holding one zlib-compressed int64 array per column —
+so consumers can load typed column arrays without parsing CSV text.
+
+File layout (all integers little-endian):
+
+    MAGIC (8 bytes) | header length (uint32) | JSON header | column blocks
+
+The JSON header records the format version, row count, the source CSV's
+(mtime_ns, size) signature, free-form metadata, and per column its name,
+scale, and the offset / length of its compressed block relative to the end
+of the header.  Prices are stored as integers: a column with scale 100 holds
+stotinki, scale 10000 holds the decimal price × 10^4 (the precision of the
+NUMERIC(12, 4) columns in Supabase).  NULL is NULL_VALUE.
+
+Files are read through mmap and only the requested columns are decompressed.
+"""
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"KNSCOL1\n"
+FORMAT_VERSION = 1
+PARTITION_SUFFIX = ".kcol"
+TYPECODE = "q"
+NULL_VALUE = -(2 ** 63)
+COMPRESSION_LEVEL = 6
+
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def partition_path(csv_path: Path) -> Path:
+    """
+    Return the partition path that sits next to a CSV.
+
+    Args:
+        csv_path: Fact or lookback CSV, e.g. facts/2026-04-29.csv.
+
+    Returns:
+        The same path with PARTITION_SUFFIX (facts/2026-04-29.kcol).
+    """
+    return csv_path.with_suffix(PARTITION_SUFFIX)
+
+
+def source_signature(path: Path) -> List[int]:
+    """
+    Return the (mtime_ns, size) signature recorded for a partition's source.
+
+    Args:
+        path: Existing source CSV.
+
+    Returns:
+        Two-element list [st_mtime_ns, st_size].
+    """
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_partition(
+    path: Path,
+    columns: Dict[str, array],
+    scales: Optional[Dict[str, int]] = None,
+    source: Optional[Path] = None,
+    meta: Optional[Dict] = None,
+) -> None:
+    """
+    Atomically write column arrays to a partition file.
+
+    Args:
+        path:    Destination .kcol path (written via path + '.partial').
+        columns: Column name → array('q'), in output order; all the same length.
+        scales:  Column name → integer scale (default 1 for unlisted columns).
+        source:  CSV the partition mirrors; its signature is recorded so
+                 current_partition() can detect a stale partition.
+        meta:    Extra JSON-serialisable metadata (e.g. price_format).
+
+    Raises:
+        ValueError: If a column is not an int64 array or lengths differ.
+    """
+    lengths = {len(col) for col in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Column lengths differ: {sorted(lengths)}")
+    scales = scales or {}
+
+    blocks: List[bytes] = []
+    entries: List[Dict] = []
+    offset = 0
+    for name, col in columns.items():
+        if col.typecode != TYPECODE:
+            raise ValueError(f"Column {name} has typecode {col.typecode!r}, expected {TYPECODE!r}")
+        if sys.byteorder == "big":
+            col = array(TYPECODE, col)
+            col.byteswap()
+        block = zlib.compress(col.tobytes(), COMPRESSION_LEVEL)
+        entries.append({
+            "name": name,
+            "scale": scales.get(name, 1),
+            "offset": offset,
+            "length": len(block),
+        })
+        blocks.append(block)
+        offset += len(block)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "rows": lengths.pop() if lengths else 0,
+        "source": source_signature(source) if source is not None else None,
+        "meta": meta or {},
+        "columns": entries,
+    }, ensure_ascii=False).encode("utf-8")
+
+    partial_path = path.with_suffix(path.suffix + ".partial")
+    with open(partial_path, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(_HEADER_LENGTH.pack(len(header)))
+        fh.write(header)
+        for block in blocks:
+            fh.write(block)
+    partial_path.replace(path)
+
+
+def _parse_header(buf) -> Tuple[Dict, int]:
+    """
+    Parse the magic and JSON header at the start of a partition buffer.
+
+    Args:
+        buf: bytes or mmap of the whole file.
+
+    Returns:
+        Tuple of (header dict, offset of the first column block).
+
+    Raises:
+        ValueError: On a bad magic, truncated header or unsupported version.
+    """
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a columnar partition (bad magic)")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    if len(buf) < start:
+        raise ValueError("truncated partition header")
+    (header_length,) = _HEADER_LENGTH.unpack(buf[len(MAGIC):start])
+    header = json.loads(bytes(buf[start:start + header_length]).decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported partition version {header.get('version')!r}")
+    return header, start + header_length
+
+
+def read_partition_header(path: Path) -> Dict:
+    """
+    Return a partition's JSON header without decompressing any column.
+
+    Args:
+        path: .kcol partition file.
+
+    Returns:
+        Header dict with 'version', 'rows', 'source', 'meta' and 'columns'
+        (list of {'name', 'scale', 'offset', 'length'}).
+
+    Raises:
+        OSError:    If the file cannot be read.
+        ValueError: If the file is not a valid partition.
+    """
+    with open(path, "rb") as fh:
+        prefix = fh.read(len(MAGIC) + _HEADER_LENGTH.size)
+        if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size:
+            raise ValueError("truncated partition header")
+        (header_length,) = _HEADER_LENGTH.unpack(prefix[len(MAGIC):])
+        header, _ = _parse_header(prefix + fh.read(header_length))
+    return header
+
+
+def read_partition(
+    path: Path,
+    names: Optional[Iterable[str]] = None,
+) -> Tuple[Dict, Dict[str, array]]:
+    """
+    Memory-map a partition and decompress the requested columns.
+
+    Args:
+        path:  .kcol partition file.
+        names: Columns to load, in the order wanted; all columns when None.
+
+    Returns:
+        Tuple of (header dict, column name → array('q') of raw integers, with
+        NULL_VALUE for NULL).  Divide by the column's 'scale' for its value.
+
+    Raises:
+        OSError:    If the file cannot be read.
+        KeyError:   If a requested column is absent.
+        ValueError: If the file is not a valid partition or a block is corrupt.
+    """
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header, data_start = _parse_header(mm)
+        entries = {entry["name"]: entry for entry in header["columns"]}
+        wanted = list(entries) if names is None else list(names)
+        columns: Dict[str, array] = {}
+        for name in wanted:
+            entry = entries[name]
+            start = data_start + entry["offset"]
+            try:
+                raw = zlib.decompress(mm[start:start + entry["length"]])
+            except zlib.error as exc:
+                raise ValueError(f"corrupt column {name}: {exc}") from exc
+            col = array(TYPECODE)
+            col.frombytes(raw)
+            if sys.byteorder == "big":
+                col.byteswap()
+            if len(col) != header["rows"]:
+                raise ValueError(f"column {name} has {len(col)} rows, expected {header['rows']}")
+            columns[name] = col
+    return header, columns
+
+
+def current_partition(csv_path: Path) -> Optional[Path]:
+    """
+    Return the partition next to csv_path if it still mirrors that CSV.
+
+    Args:
+        csv_path: Fact or lookback CSV.
+
+    Returns:
+        The partition path when it exists, is readable and records the CSV's
+        current (mtime_ns, size); None otherwise (callers fall back to CSV).
+    """
+    path = partition_path(csv_path)
+    if not path.exists() or not csv_path.exists():
+        return None
+    try:
+        header = read_partition_header(path)
+    except (OSError, ValueError):
+        return None
+    if header.get("source") != source_signature(csv_path):
+        return None
+    return path
+
+
+def column_scales(header: Dict) -> Dict[str, int]:
+    """
+    Return column name → scale from a partition header.
+
+    Args:
+        header: Header dict from read_partition_header() / read_partition().
+
+    Returns:
+        Dict mapping each column name to its integer scale.
+    """
+    return {entry["name"]: entry["scale"] for entry in header["columns"]}
@@ -3,7 +3,8 @@ deploy_netlify.py: Netlify deployment script for the React Analytics App.
 Part of the kolko-ni-struva ETL pipeline (request R-20260425-1304).
 Responsibilities: detect Netlify CLI availability, load deployment credentials
 from environment variables or the project-root .env file (with interactive
-fallback and auto-save on first use), build the React app via npm, and
+fallback and auto-save on first use), build the React app via npm, publish
+the static data snapshots into the build (src/publish_snapshots.py), and
 deploy to Netlify. Falls back to manual deploy instructions when CLI is absent.
 
 Credential loading precedence:
@@ -26,6 +27,7 @@ from dotenv import load_dotenv, set_key
 BASE_DIR: Path = Path(__file__).resolve().parent.parent
 REACT_APP_DIR: Path = BASE_DIR / "react-app"
 REACT_DIST_DIR: Path = REACT_APP_DIR / "dist"
+PUBLISH_SNAPSHOTS_SCRIPT: Path = BASE_DIR / "src" / "publish_snapshots.py"
 
 # Project-root .env file used for persistent credential storage.
 _ENV_FILE_PATH: Path = BASE_DIR / ".env"
@@ -200,6 +202,32 @@ def build_react_app() -> bool:
         return False
 
 
+def publish_data_snapshots() -> bool:
+    """
+    Run ``src/publish_snapshots.py`` to add static data shards to the build.
+
+    Must run after ``build_react_app()``, because the Vite build replaces
+    ``react-app/dist/``.  A failure is not fatal to the deploy: without
+    shards the React app reads everything from the Supabase RPCs.
+
+    Returns:
+        True if the script exited with code 0; False otherwise.
+
+    Side effects:
+        Writes ``react-app/dist/data/`` and progress output to stdout.
+    """
+    print()
+    print("  Publishing static data snapshots ...")
+    result = subprocess.run([sys.executable, str(PUBLISH_SNAPSHOTS_SCRIPT)], cwd=BASE_DIR)
+    if result.returncode != 0:
+        print(
+            f"  Warning: publish_snapshots.py failed with exit code {result.returncode}; "
+            "deploying without snapshots (the app will query Supabase directly)."
+        )
+        return False
+    return True
+
+
 def deploy_to_netlify(netlify_cmd: list[str], auth_token: str, site_id: str) -> bool:
     """
     Run the Netlify CLI production deploy command.
@@ -260,7 +288,8 @@ def main() -> None:
     4. Collect NETLIFY_SITE_ID via precedence chain (env → .env → prompt).
     5. Auto-save any interactively entered credential to .env for future runs.
     6. Build the React app via npm.
-    7. Deploy via Netlify CLI.
+    7. Publish static data snapshots into the build (non-fatal on failure).
+    8. Deploy via Netlify CLI.
 
     Side effects:
         Reads stdin when credentials are not available in env or .env.
@@ -330,6 +359,8 @@ def main() -> None:
     if not build_react_app():
         sys.exit(1)
 
+    publish_data_snapshots()
+
     if not deploy_to_netlify(netlify_cmd, auth_token, site_id):
         sys.exit(1)
 
@@ -2,22 +2,45 @@
 load_supabase.py: Supabase sync module for the kolko-ni-struva star-schema.
 Part of the kolko-ni-struva ETL pipeline (requests R-20260420-1730 and
 R-20260526-2039).
-Responsibilities: provision star-schema tables in Supabase, upsert all seven
-dimension CSVs, truncate and reinsert fact_prices_lookback on every sync run,
-prune remote dim_date to the latest local fact dates (rolling retention
-window), and prune remote dim_category to only the category keys referenced by
-the retained fact window.
+Responsibilities: provision star-schema tables in Supabase, sync all seven
+dimension CSVs (sending only rows changed since the local sync manifest),
+rebuild fact_prices_lookback on every sync run (streamed with COPY FROM STDIN,
+or execute_batch with --execute-batch) into a staging table that is
+rename-swapped into place, prune remote dim_date to the latest local fact
+dates (rolling retention window), and prune remote dim_category to only the
+category keys referenced by the retained fact window.
 """
+import argparse
 import csv
+import hashlib
+import io
+import itertools
+import json
 import os
+import queue
+import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 from dotenv import load_dotenv
 
+from columnar import (
+    NULL_VALUE,
+    PARTITION_SUFFIX,
+    column_scales,
+    current_partition,
+    read_partition,
+    read_partition_header,
+)
+from search_tokens import PREFIX_END, search_key_sql
+
 # ---------------------------------------------------------------------------
 # Path constants
 # ---------------------------------------------------------------------------
@@ -25,9 +48,112 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SCHEMA_DIR = BASE_DIR / "data" / "schema"
 FACTS_DIR = SCHEMA_DIR / "facts"
 LANDING_PAGE_ROW_PROJECTION = "landing_page_row_projection"
+REPORT_PRICE_AGGREGATES = "report_price_aggregates"
+LANDING_PAGE_FILTER_COMBINATIONS = "landing_page_filter_combinations"
+PRODUCT_SEARCH_TOKENS = "dim_product_tokens"
+PRODUCT_TOKENS_CSV_PATH = SCHEMA_DIR / "dim_product_tokens.csv"
+# Bumped when landing_page_filter_combinations gains columns: a sync manifest
+# recording an older version forces one full projection rebuild.
+FILTER_COMBINATIONS_VERSION = 2
+# get_landing_page_total() counts free-text and price-filtered totals exactly
+# up to this many rows, and falls back to the planner's estimate above it.
+LANDING_PAGE_EXACT_COUNT_LIMIT = 1000
 BATCH_PAGE_SIZE = 2000
+# Pages parsed ahead of the one being sent by execute_batch_rows().
+PREFETCH_PAGES = 2
+COPY_CHUNK_BYTES = 1 << 20
+
+# Staging-table swap: tables are rebuilt as <table>_staging and renamed into
+# place in a short transaction.  The swap gives up after SWAP_LOCK_TIMEOUT
+# waiting for readers and is retried SWAP_ATTEMPTS times.
+STAGING_SUFFIX = "_staging"
+RETIRED_SUFFIX = "_retired"
+SWAP_LOCK_TIMEOUT = "500ms"
+SWAP_ATTEMPTS = 5
+SWAP_RETRY_DELAY = 2.0
+LOCK_NOT_AVAILABLE = "55P03"
+
+# Optional declarative partitioning (create_tables(partition_by_date=True)):
+# these tables become LIST-partitioned on PARTITION_KEY, one partition per day.
+PARTITION_KEY = "date_key"
+PARTITIONED_TABLES = ("fact_prices_lookback", LANDING_PAGE_ROW_PROJECTION)
 PROJECTION_REFRESH_BATCH_SIZE = 250
 
+# fact_prices_lookback columns: the fact columns followed by one retail/promo
+# pair per lookback day.  The day count is taken from the lookback CSV header
+# written by transform.py ([settings] lookback_days); the RPCs read day1/day2,
+# so the table always has at least DEFAULT_LOOKBACK_DAYS pairs.
+LOOKBACK_BASE_COLUMNS = [
+    "date_key", "store_key", "file_key", "category_key", "product_key",
+    "retail_price", "promo_price",
+]
+DEFAULT_LOOKBACK_DAYS = 2
+
+# Stotinki lookback CSVs (transform.py [settings] price_format = stotinki)
+# carry integer prices plus the effective price precomputed at transform
+# time.  insert_lookback() sends them as integers and divides by 100 in the
+# INSERT, filling effective_price so the projection, the report aggregates and
+# the grouped fact path skip LEAST/COALESCE.
+LOOKBACK_STOTINKI_BASE_COLUMNS = [
+    "date_key", "store_key", "file_key", "category_key", "product_key",
+    "retail_stotinki", "promo_stotinki", "effective_stotinki",
+]
+
+
+def lookback_columns(lookback_days: int) -> List[str]:
+    """
+    Return the fact_prices_lookback column list for an N-day window.
+
+    Args:
+        lookback_days: Number of prior-day price pairs.
+
+    Returns:
+        LOOKBACK_BASE_COLUMNS followed by retail_price_dayK, promo_price_dayK
+        for K = 1..lookback_days (same order as transform.lookback_header).
+    """
+    columns = list(LOOKBACK_BASE_COLUMNS)
+    for k in range(1, lookback_days + 1):
+        columns += [f"retail_price_day{k}", f"promo_price_day{k}"]
+    return columns
+
+
+def lookback_stotinki_columns(lookback_days: int) -> List[str]:
+    """
+    Return the stotinki lookback CSV header for an N-day window.
+
+    Args:
+        lookback_days: Number of prior-day price pairs.
+
+    Returns:
+        LOOKBACK_STOTINKI_BASE_COLUMNS followed by retail_stotinki_dayK,
+        promo_stotinki_dayK for K = 1..lookback_days (same order as
+        transform.lookback_header with the stotinki format).
+    """
+    columns = list(LOOKBACK_STOTINKI_BASE_COLUMNS)
+    for k in range(1, lookback_days + 1):
+        columns += [f"retail_stotinki_day{k}", f"promo_stotinki_day{k}"]
+    return columns
+
+
+def lookback_column_ddl(first_day: int, last_day: int) -> str:
+    """
+    Build idempotent ADD COLUMN statements for a range of lookback days.
+
+    Args:
+        first_day: First day number K to add (inclusive).
+        last_day:  Last day number K to add (inclusive).
+
+    Returns:
+        One ALTER TABLE … ADD COLUMN IF NOT EXISTS statement per price
+        column, newline-separated; empty string for an empty range.
+    """
+    return "".join(
+        f"ALTER TABLE IF EXISTS fact_prices_lookback "
+        f"ADD COLUMN IF NOT EXISTS {kind}_price_day{k} NUMERIC(12, 4);\n"
+        for k in range(first_day, last_day + 1)
+        for kind in ("retail", "promo")
+    )
+
 # ---------------------------------------------------------------------------
 # Dim table descriptors: (table_name, csv_path, pk_col, all_columns)
 # ---------------------------------------------------------------------------
@@ -76,10 +202,43 @@ DIM_TABLES: List[Tuple[str, Path, str, List[str]]] = [
     ),
 ]
 
+# Dimension change detection: rows whose content hash matches the local sync
+# manifest are not re-sent.  dim_date and dim_category are pruned remotely
+# after each sync, so the manifest cannot vouch for them: sync_dim() is
+# called with send_all, which copies every row into its temp table and lets
+# the IS DISTINCT FROM merge skip rows that are already identical remotely.
+DIM_SYNC_MANIFEST_PATH = SCHEMA_DIR / ".supabase_dim_sync.json"
+DIM_SYNC_MANIFEST_VERSION = 1
+FULL_SYNC_DIMS = ("dim_date", "dim_category")
+# Independent dimension tables are synced concurrently on up to this many
+# pooled connections (see sync_dims()).
+DIM_SYNC_WORKERS = 4
+# Dimensions whose attributes are copied into the landing-page projection:
+# an updated row in any of them forces a full projection rebuild.
+PROJECTION_NAME_DIMS = (
+    "dim_product", "dim_category", "dim_store", "dim_company", "dim_settlement", "dim_file",
+)
+
 # ---------------------------------------------------------------------------
 # DDL definitions
 # ---------------------------------------------------------------------------
-_CREATE_DDL = f"""
+_LOOKBACK_DAY_COLUMNS = ",\n".join(
+    f"    {column:<17} NUMERIC(12, 4)"
+    for column in lookback_columns(DEFAULT_LOOKBACK_DAYS)[len(LOOKBACK_BASE_COLUMNS):]
+)
+
+def _create_ddl(partition_clause: str = "") -> str:
+    """
+    Return the CREATE TABLE IF NOT EXISTS script for the star schema.
+
+    Args:
+        partition_clause: Appended to the fact_prices_lookback and projection
+                          definitions (see _PARTITION_CLAUSE).
+
+    Returns:
+        DDL script for all eleven tables.
+    """
+    return f"""
 CREATE TABLE IF NOT EXISTS dim_date (
     date_key   INTEGER PRIMARY KEY,
     date       DATE    NOT NULL,
@@ -126,6 +285,11 @@ CREATE TABLE IF NOT EXISTS dim_file (
     zip_date  DATE
 );
 
+CREATE TABLE IF NOT EXISTS {PRODUCT_SEARCH_TOKENS} (
+    product_key INTEGER NOT NULL,
+    token       TEXT COLLATE "C" NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS fact_prices_lookback (
     date_key          INTEGER NOT NULL REFERENCES dim_date(date_key),
     store_key         INTEGER NOT NULL REFERENCES dim_store(store_key),
@@ -134,11 +298,9 @@ CREATE TABLE IF NOT EXISTS fact_prices_lookback (
     product_key       INTEGER NOT NULL REFERENCES dim_product(product_key),
     retail_price      NUMERIC(12, 4),
     promo_price       NUMERIC(12, 4),
-    retail_price_day1 NUMERIC(12, 4),
-    promo_price_day1  NUMERIC(12, 4),
-    retail_price_day2 NUMERIC(12, 4),
-    promo_price_day2  NUMERIC(12, 4)
-);
+    effective_price   NUMERIC(12, 4),
+{_LOOKBACK_DAY_COLUMNS}
+){partition_clause};
 
 CREATE TABLE IF NOT EXISTS {LANDING_PAGE_ROW_PROJECTION} (
     date_key        INTEGER NOT NULL,
@@ -149,32 +311,99 @@ CREATE TABLE IF NOT EXISTS {LANDING_PAGE_ROW_PROJECTION} (
     file_key        INTEGER,
     product_key     INTEGER NOT NULL,
     file_name       TEXT,
-    product_name    TEXT,
+    product_name    TEXT NOT NULL DEFAULT '',
     category_name   TEXT,
     settlement_name TEXT,
-    store_name      TEXT,
+    store_name      TEXT NOT NULL DEFAULT '',
     company_name    TEXT,
     retail_price    NUMERIC(12, 4),
     promo_price     NUMERIC(12, 4),
     price           NUMERIC(12, 4)
+){partition_clause};
+
+CREATE TABLE IF NOT EXISTS {REPORT_PRICE_AGGREGATES} (
+    date_key        INTEGER NOT NULL,
+    settlement_key  INTEGER,
+    category_key    INTEGER NOT NULL,
+    company_key     INTEGER,
+    row_count       INTEGER NOT NULL,
+    price_sum       NUMERIC,
+    price_sum_day1  NUMERIC,
+    price_sum_day2  NUMERIC,
+    eff_count       INTEGER NOT NULL,
+    eff_sum         NUMERIC,
+    eff_min         NUMERIC(12, 4),
+    eff_max         NUMERIC(12, 4),
+    promo_count     INTEGER NOT NULL,
+    promo_sum       NUMERIC,
+    promo_min       NUMERIC(12, 4),
+    promo_max       NUMERIC(12, 4)
+);
+
+CREATE TABLE IF NOT EXISTS {LANDING_PAGE_FILTER_COMBINATIONS} (
+    date_key        INTEGER NOT NULL,
+    settlement_key  INTEGER,
+    category_key    INTEGER NOT NULL,
+    company_key     INTEGER,
+    store_key       INTEGER NOT NULL,
+    settlement_name TEXT,
+    category_name   TEXT,
+    company_name    TEXT,
+    store_name      TEXT,
+    row_count       INTEGER NOT NULL
 );
 """
 
+
+_PARTITION_CLAUSE = f" PARTITION BY LIST ({PARTITION_KEY})"
+_CREATE_DDL = _create_ddl()
+# Used for new installs by create_tables(partition_by_date=True).
+_CREATE_PARTITIONED_DDL = _create_ddl(_PARTITION_CLAUSE)
+
 # Idempotent schema migration: drop NOT NULL constraints that may exist on
 # nullable columns from a previous DDL iteration.  PostgreSQL silently
 # succeeds when a column is already nullable, so these statements are safe
 # to run on every invocation regardless of the current column state.
 # The ADD COLUMN IF NOT EXISTS guards for fact_prices_lookback ensure
 # forward-compatibility when the table was created by an older DDL iteration
-# that omitted the lookback columns (request R-20260420-2055).
+# that omitted the lookback columns (request R-20260420-2055) or the
+# effective_price column filled from stotinki lookback CSVs.
+# The projection's page sort key columns go the other way: a projection
+# created before they were NOT NULL has its NULL names replaced by '' once,
+# then gains the constraint (see _PROJECTION_INSERT_SELECT_SQL).
 _ENSURE_NULLABLE_DDL = """
 ALTER TABLE IF EXISTS dim_store ALTER COLUMN settlement_key DROP NOT NULL;
 ALTER TABLE IF EXISTS dim_store ALTER COLUMN company_key DROP NOT NULL;
 ALTER TABLE IF EXISTS dim_file ALTER COLUMN zip_date DROP NOT NULL;
-ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS retail_price_day1 NUMERIC(12, 4);
-ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS promo_price_day1  NUMERIC(12, 4);
-ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS retail_price_day2 NUMERIC(12, 4);
-ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS promo_price_day2  NUMERIC(12, 4);
+ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS effective_price NUMERIC(12, 4);
+""" + lookback_column_ddl(1, DEFAULT_LOOKBACK_DAYS) + "".join(
+    f"ALTER TABLE IF EXISTS {LANDING_PAGE_FILTER_COMBINATIONS} ADD COLUMN IF NOT EXISTS {column} TEXT;\n"
+    for column in ("settlement_name", "category_name", "company_name", "store_name")
+) + f"""
+DO $$
+DECLARE
+    v_column TEXT;
+BEGIN
+    FOREACH v_column IN ARRAY ARRAY['product_name', 'store_name'] LOOP
+        IF EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = to_regclass('{LANDING_PAGE_ROW_PROJECTION}')
+              AND attname = v_column
+              AND NOT attnotnull
+        ) THEN
+            EXECUTE format(
+                'UPDATE {LANDING_PAGE_ROW_PROJECTION} SET %I = '''' WHERE %I IS NULL',
+                v_column, v_column
+            );
+            EXECUTE format(
+                'ALTER TABLE {LANDING_PAGE_ROW_PROJECTION} '
+                || 'ALTER COLUMN %I SET DEFAULT '''', ALTER COLUMN %I SET NOT NULL',
+                v_column, v_column
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
 """
 
 # ---------------------------------------------------------------------------
@@ -182,15 +411,29 @@ ALTER TABLE IF EXISTS fact_prices_lookback ADD COLUMN IF NOT EXISTS promo_price_
 # ---------------------------------------------------------------------------
 # The legacy fact_prices table and the removed backend SQL audit table are
 # dropped here to keep existing Supabase databases aligned with the current
-# schema on every loader run.
+# schema on every loader run, as are the product-name trigram indexes that
+# dim_product_tokens replaced.
 _MIGRATION_DDL = """
 DROP TABLE IF EXISTS backend_sql_audit_log;
 DROP TABLE IF EXISTS fact_prices CASCADE;
 DROP FUNCTION IF EXISTS get_landing_page_count(INT, INT, INT, INT, INT, TEXT, NUMERIC, NUMERIC);
+DROP INDEX IF EXISTS idx_dim_product_name_trgm;
+DROP INDEX IF EXISTS idx_lp_row_projection_product_name_trgm;
 """
 
-_REFRESH_LANDING_PAGE_PROJECTION_SQL = f"""
-INSERT INTO {LANDING_PAGE_ROW_PROJECTION} (
+# The INSERT statements are templates: {target} is the projection table being
+# written (its staging copy for a full rebuild, the live table for an
+# incremental refresh).  They share one INSERT … SELECT and differ only in
+# the fact rows selected: all rows, one batch of file_keys, or a list of
+# (date_key, file_key) groups passed as two parallel arrays.
+# The projection's price is fact_prices_lookback.effective_price when the
+# lookback CSV supplied it (stotinki format); otherwise it is derived here.
+# product_name and store_name are stored as '' rather than NULL (the columns
+# are NOT NULL): they lead the page sort key, and
+# get_landing_page_rows_keyset() compares row values, which never match a
+# NULL.
+_PROJECTION_INSERT_SELECT_SQL = """
+INSERT INTO {target} (
     date_key,
     settlement_key,
     category_key,
@@ -217,14 +460,15 @@ SELECT
     f.file_key,
     f.product_key,
     df.file_name,
-    dp.product_name,
+    COALESCE(dp.product_name, ''),
     dc.category_name,
     dst.settlement_name,
-    dstore.store_name,
+    COALESCE(dstore.store_name, ''),
     dcomp.company_name,
     f.retail_price,
     f.promo_price,
     COALESCE(
+        f.effective_price,
         CASE
             WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
                 THEN LEAST(f.retail_price, f.promo_price)
@@ -238,60 +482,119 @@ JOIN dim_category dc ON dc.category_key = f.category_key
 JOIN dim_store dstore ON dstore.store_key = f.store_key
 JOIN dim_company dcomp ON dcomp.company_key = dstore.company_key
 JOIN dim_settlement dst ON dst.settlement_key = dstore.settlement_key
-LEFT JOIN dim_file df ON df.file_key = f.file_key;
+LEFT JOIN dim_file df ON df.file_key = f.file_key"""
+
+_REFRESH_LANDING_PAGE_PROJECTION_SQL = _PROJECTION_INSERT_SELECT_SQL + ";\n"
+
+_REFRESH_LANDING_PAGE_PROJECTION_BATCH_SQL = (
+    _PROJECTION_INSERT_SELECT_SQL + "\nWHERE f.file_key = ANY(%s);\n"
+)
+
+_REFRESH_LANDING_PAGE_PROJECTION_GROUPS_SQL = (
+    _PROJECTION_INSERT_SELECT_SQL
+    + "\nWHERE (f.date_key, f.file_key) IN (SELECT * FROM unnest(%s::int[], %s::int[]));\n"
+)
+
+_DELETE_LANDING_PAGE_PROJECTION_GROUPS_SQL = f"""
+DELETE FROM {LANDING_PAGE_ROW_PROJECTION}
+WHERE (date_key, file_key) IN (SELECT * FROM unnest(%s::int[], %s::int[]));
 """
 
-_REFRESH_LANDING_PAGE_PROJECTION_BATCH_SQL = f"""
-INSERT INTO {LANDING_PAGE_ROW_PROJECTION} (
-    date_key,
-    settlement_key,
-    category_key,
-    company_key,
-    store_key,
-    file_key,
-    product_key,
-    file_name,
-    product_name,
-    category_name,
-    settlement_name,
-    store_name,
-    company_name,
-    retail_price,
-    promo_price,
-    price
+# Row counts per distinct (date, settlement, category, company, store)
+# combination of the projection, with the names the selectors display, so
+# get_landing_page_total() sums counts and the get_lp_options_* RPCs read
+# option lists from a table orders of magnitude smaller than the projection.
+# Names depend only on their keys, so grouping by them adds no rows.  A
+# combination's rows all share its date_key, so an incremental refresh
+# rebuilds only the dates it touched.  {target} is the staging copy or the
+# live table.
+_FILTER_COMBINATIONS_INSERT_SELECT_SQL = f"""
+INSERT INTO {{target}} (
+    date_key, settlement_key, category_key, company_key, store_key,
+    settlement_name, category_name, company_name, store_name, row_count
+)
+SELECT
+    date_key, settlement_key, category_key, company_key, store_key,
+    settlement_name, category_name, company_name, store_name, COUNT(*)
+FROM {LANDING_PAGE_ROW_PROJECTION}{{where}}
+GROUP BY
+    date_key, settlement_key, category_key, company_key, store_key,
+    settlement_name, category_name, company_name, store_name;
+"""
+
+_REFRESH_FILTER_COMBINATIONS_SQL = _FILTER_COMBINATIONS_INSERT_SELECT_SQL.replace("{where}", "")
+
+_REFRESH_FILTER_COMBINATIONS_DATES_SQL = _FILTER_COMBINATIONS_INSERT_SELECT_SQL.replace(
+    "{where}", "\nWHERE date_key = ANY(%s)",
+)
+
+_DELETE_FILTER_COMBINATIONS_DATES_SQL = f"""
+DELETE FROM {LANDING_PAGE_FILTER_COMBINATIONS}
+WHERE date_key = ANY(%s);
+"""
+
+# Sums, counts and extremes per (date_key, settlement_key, category_key,
+# company_key), so the report RPCs re-aggregate a few thousand rows instead
+# of pricing every fact row per call.  price_sum* use get_report_1's
+# effective price (NULL retail counts as 0, every row counted in row_count);
+# eff_* use get_landing_page_grouped's (NULL prices ignored); promo_* cover
+# positive promo prices only.  Averages are SUM(…_sum) / SUM(…_count), which
+# equals AVG() over the underlying rows.  {target} is the staging copy.
+# eff_* read fact_prices_lookback.effective_price when the stotinki lookback
+# supplied it, as the projection does; price_sum* keep their own rule.
+_REFRESH_REPORT_AGGREGATES_SQL = """
+INSERT INTO {target} (
+    date_key, settlement_key, category_key, company_key,
+    row_count, price_sum, price_sum_day1, price_sum_day2,
+    eff_count, eff_sum, eff_min, eff_max,
+    promo_count, promo_sum, promo_min, promo_max
 )
 SELECT
     f.date_key,
-    dstore.settlement_key,
+    ds.settlement_key,
     f.category_key,
-    dstore.company_key,
-    f.store_key,
-    f.file_key,
-    f.product_key,
-    df.file_name,
-    dp.product_name,
-    dc.category_name,
-    dst.settlement_name,
-    dstore.store_name,
-    dcomp.company_name,
-    f.retail_price,
-    f.promo_price,
-    COALESCE(
-        CASE
-            WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
-                THEN LEAST(f.retail_price, f.promo_price)
-            ELSE f.retail_price
-        END,
-        f.retail_price
-    ) AS price
+    ds.company_key,
+    COUNT(*),
+    SUM(CASE
+        WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
+            THEN LEAST(COALESCE(f.retail_price, 0), f.promo_price)
+        ELSE COALESCE(f.retail_price, 0)
+    END),
+    SUM(CASE
+        WHEN f.promo_price_day1 IS NOT NULL AND f.promo_price_day1 > 0
+            THEN LEAST(COALESCE(f.retail_price_day1, 0), f.promo_price_day1)
+        ELSE COALESCE(f.retail_price_day1, 0)
+    END),
+    SUM(CASE
+        WHEN f.promo_price_day2 IS NOT NULL AND f.promo_price_day2 > 0
+            THEN LEAST(COALESCE(f.retail_price_day2, 0), f.promo_price_day2)
+        ELSE COALESCE(f.retail_price_day2, 0)
+    END),
+    COUNT(e.eff_price),
+    SUM(e.eff_price),
+    MIN(e.eff_price),
+    MAX(e.eff_price),
+    COUNT(e.promo),
+    SUM(e.promo),
+    MIN(e.promo),
+    MAX(e.promo)
 FROM fact_prices_lookback f
-JOIN dim_product dp ON dp.product_key = f.product_key
-JOIN dim_category dc ON dc.category_key = f.category_key
-JOIN dim_store dstore ON dstore.store_key = f.store_key
-JOIN dim_company dcomp ON dcomp.company_key = dstore.company_key
-JOIN dim_settlement dst ON dst.settlement_key = dstore.settlement_key
-LEFT JOIN dim_file df ON df.file_key = f.file_key
-WHERE f.file_key = ANY(%s);
+JOIN dim_store ds ON ds.store_key = f.store_key
+CROSS JOIN LATERAL (
+    SELECT
+        COALESCE(
+            f.effective_price,
+            CASE WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
+                THEN LEAST(f.retail_price, f.promo_price)
+                ELSE f.retail_price
+            END,
+            f.retail_price
+        ) AS eff_price,
+        CASE WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
+            THEN f.promo_price
+        END AS promo
+) e
+GROUP BY f.date_key, ds.settlement_key, f.category_key, ds.company_key;
 """
 
 # ---------------------------------------------------------------------------
@@ -307,9 +610,10 @@ WHERE f.file_key = ANY(%s);
 #   get_available_dates() (SELECT DISTINCT date_key FROM fact_prices_lookback).
 # idx_fact_prices_lookback_date_store: composite index covering both the WHERE
 #   predicate and the JOIN column for get_settlements_for_date().
+# idx_lp_filter_combinations_*: the get_lp_options_* RPCs filter on any subset
+#   of the five keys; with a date the (date_key, …) index applies, and without
+#   one (the date selector) each other key leads an index of its own.
 _CREATE_INDEXES = f"""
-CREATE EXTENSION IF NOT EXISTS pg_trgm;
-
 CREATE INDEX IF NOT EXISTS idx_fact_prices_lookback_date_key
     ON fact_prices_lookback(date_key);
 
@@ -325,8 +629,8 @@ CREATE INDEX IF NOT EXISTS idx_fpl_product_key
 CREATE INDEX IF NOT EXISTS idx_fpl_file_key
     ON fact_prices_lookback(file_key);
 
-CREATE INDEX IF NOT EXISTS idx_dim_product_name_trgm
-    ON dim_product USING GIN (product_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_dim_product_tokens_token
+    ON {PRODUCT_SEARCH_TOKENS}(token, product_key);
 
 CREATE INDEX IF NOT EXISTS idx_dim_product_name_sort
     ON dim_product(product_name, product_key);
@@ -334,6 +638,30 @@ CREATE INDEX IF NOT EXISTS idx_dim_product_name_sort
 CREATE INDEX IF NOT EXISTS idx_dim_store_name_sort
     ON dim_store(store_name, store_key);
 
+CREATE INDEX IF NOT EXISTS idx_report_price_aggregates_grain
+    ON {REPORT_PRICE_AGGREGATES}(date_key, settlement_key, category_key, company_key);
+
+CREATE INDEX IF NOT EXISTS idx_lp_filter_combinations_keys
+    ON {LANDING_PAGE_FILTER_COMBINATIONS}(
+        date_key,
+        settlement_key,
+        category_key,
+        company_key,
+        store_key
+    );
+
+CREATE INDEX IF NOT EXISTS idx_lp_filter_combinations_settlement
+    ON {LANDING_PAGE_FILTER_COMBINATIONS}(settlement_key, date_key);
+
+CREATE INDEX IF NOT EXISTS idx_lp_filter_combinations_category
+    ON {LANDING_PAGE_FILTER_COMBINATIONS}(category_key, date_key);
+
+CREATE INDEX IF NOT EXISTS idx_lp_filter_combinations_company
+    ON {LANDING_PAGE_FILTER_COMBINATIONS}(company_key, date_key);
+
+CREATE INDEX IF NOT EXISTS idx_lp_filter_combinations_store
+    ON {LANDING_PAGE_FILTER_COMBINATIONS}(store_key, date_key);
+
 CREATE INDEX IF NOT EXISTS idx_lp_row_projection_page
     ON {LANDING_PAGE_ROW_PROJECTION}(
         date_key,
@@ -353,10 +681,239 @@ CREATE INDEX IF NOT EXISTS idx_lp_row_projection_filter_keys
         store_key
     );
 
-CREATE INDEX IF NOT EXISTS idx_lp_row_projection_product_name_trgm
-    ON {LANDING_PAGE_ROW_PROJECTION} USING GIN (product_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_lp_row_projection_product
+    ON {LANDING_PAGE_ROW_PROJECTION}(product_key, date_key);
+"""
+
+# ---------------------------------------------------------------------------
+# Landing-page option RPCs
+# ---------------------------------------------------------------------------
+# RPC parameter → landing_page_filter_combinations column, in parameter order.
+_LP_OPTION_FILTERS = (
+    ("p_date_key", "date_key"),
+    ("p_settlement_key", "settlement_key"),
+    ("p_category_key", "category_key"),
+    ("p_company_key", "company_key"),
+    ("p_store_key", "store_key"),
+)
+
+
+def _lp_options_function(
+    name: str,
+    own_column: str,
+    returns: str,
+    select_sql: str,
+    order_sql: str,
+    base_predicate: str = "1=1",
+) -> str:
+    """
+    Return the CREATE FUNCTION script for one get_lp_options_* RPC.
+
+    The RPC takes the four filter keys other than own_column and appends an
+    equality predicate only for the ones that are set, then runs the query
+    with EXECUTE … USING.  Each call is therefore planned for its actual
+    filter combination and can use the matching
+    idx_lp_filter_combinations_* index, which the (p IS NULL OR col = p)
+    form of a static query prevents.
+
+    Args:
+        name:           Function name.
+        own_column:     Key column whose options the RPC lists.
+        returns:        RETURNS TABLE column list.
+        select_sql:     Query text up to its WHERE clause; it must not
+                        contain single quotes.
+        order_sql:      Query text after the WHERE clause.
+        base_predicate: Predicate the WHERE clause starts with.
+
+    Returns:
+        plpgsql function DDL.
+    """
+    params = [(param, column) for param, column in _LP_OPTION_FILTERS if column != own_column]
+    signature = ",\n".join(f"    {param:<16} INT" for param, _ in params)
+    predicates = "\n\n".join(
+        f"    IF {param} IS NOT NULL THEN\n"
+        f"        v_where := v_where || ' AND {column} = ${position} ';\n"
+        f"    END IF;"
+        for position, (param, column) in enumerate(params, 1)
+    )
+    using = ", ".join(param for param, _ in params)
+    return f"""
+CREATE OR REPLACE FUNCTION {name}(
+{signature}
+)
+RETURNS TABLE({returns})
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_where TEXT := ' WHERE {base_predicate} ';
+BEGIN
+{predicates}
+
+    RETURN QUERY EXECUTE
+        '{select_sql}' || v_where || '{order_sql}'
+    USING {using};
+END;
+$$;
+"""
+
+
+_LP_OPTIONS_FUNCTIONS = "".join((
+    _lp_options_function(
+        "get_lp_options_settlement", "settlement_key", "settlement_key INT, name TEXT",
+        f"SELECT DISTINCT settlement_key, settlement_name FROM {LANDING_PAGE_FILTER_COMBINATIONS}",
+        " ORDER BY settlement_name, settlement_key",
+        base_predicate="settlement_key IS NOT NULL",
+    ),
+    _lp_options_function(
+        "get_lp_options_category", "category_key", "category_key INT, name TEXT",
+        f"SELECT DISTINCT category_key, category_name FROM {LANDING_PAGE_FILTER_COMBINATIONS}",
+        " ORDER BY category_name, category_key",
+    ),
+    _lp_options_function(
+        "get_lp_options_company", "company_key", "company_key INT, name TEXT",
+        f"SELECT DISTINCT company_key, company_name FROM {LANDING_PAGE_FILTER_COMBINATIONS}",
+        " ORDER BY company_name, company_key",
+        base_predicate="company_key IS NOT NULL",
+    ),
+    _lp_options_function(
+        "get_lp_options_store", "store_key", "store_key INT, store_name TEXT",
+        f"SELECT DISTINCT store_key, store_name FROM {LANDING_PAGE_FILTER_COMBINATIONS}",
+        " ORDER BY store_name, store_key",
+    ),
+    _lp_options_function(
+        "get_lp_options_date", "date_key", "date_key INT, date DATE",
+        "SELECT dd.date_key, dd.date FROM dim_date dd WHERE dd.date_key IN "
+        f"(SELECT date_key FROM {LANDING_PAGE_FILTER_COMBINATIONS}",
+        ") ORDER BY dd.date_key DESC",
+    ),
+))
+
+# Result columns of the set-returning landing-page RPCs, in output order.
+_LP_ROW_COLUMNS = (
+    ("file_name", "TEXT"),
+    ("product_name", "TEXT"),
+    ("category_name", "TEXT"),
+    ("settlement_name", "TEXT"),
+    ("store_name", "TEXT"),
+    ("company_name", "TEXT"),
+    ("retail_price", "NUMERIC"),
+    ("promo_price", "NUMERIC"),
+    ("price", "NUMERIC"),
+    ("product_key", "INT"),
+    ("store_key", "INT"),
+    ("file_key", "INT"),
+    ("date_key", "INT"),
+)
+_LP_GROUP_COLUMNS = (
+    ("group1", "TEXT"),
+    ("group2", "TEXT"),
+    ("price_avg", "NUMERIC"),
+    ("price_min", "NUMERIC"),
+    ("price_max", "NUMERIC"),
+    ("promo_avg", "NUMERIC"),
+    ("promo_min", "NUMERIC"),
+    ("promo_max", "NUMERIC"),
+)
+_LP_ROW_COLUMNS_DDL = ", ".join(f"{name} {kind}" for name, kind in _LP_ROW_COLUMNS)
+_LP_GROUP_COLUMNS_DDL = ", ".join(f"{name} {kind}" for name, kind in _LP_GROUP_COLUMNS)
+
+# Parameters of the landing-page RPCs, in call order.
+_LP_FILTER_PARAMS = (
+    ("p_date_key", "INT"),
+    ("p_settlement_key", "INT"),
+    ("p_category_key", "INT"),
+    ("p_company_key", "INT"),
+    ("p_store_key", "INT"),
+    ("p_product_name", "TEXT"),
+    ("p_price_min", "NUMERIC"),
+    ("p_price_max", "NUMERIC"),
+)
+_LP_KEYSET_PARAMS = _LP_FILTER_PARAMS + (
+    ("p_after_product_name", "TEXT"),
+    ("p_after_store_name", "TEXT"),
+    ("p_after_product_key", "INT"),
+    ("p_after_store_key", "INT"),
+    ("p_after_file_key", "INT"),
+    ("p_after_date_key", "INT"),
+    ("p_offset", "INT"),
+    ("p_limit", "INT"),
+)
+_LP_GROUP_PARAMS = _LP_FILTER_PARAMS + (
+    ("p_group_by_1", "TEXT"),
+    ("p_group_by_2", "TEXT"),
+)
+
+
+def _lp_result_functions(
+    name: str,
+    params: Sequence[Tuple[str, str]],
+    columns: Sequence[Tuple[str, str]],
+) -> str:
+    """
+    Return the JSON wrappers and grants for the set-returning RPC {name}_set.
+
+    {name} keeps the original contract, a JSON array with one object per
+    row.  {name}_columns returns one JSON array per column instead
+    ({"col": [v1, v2, …], …}), so column names are sent once rather than
+    once per row.  Both aggregate the rows in the order {name}_set returns
+    them (WITH ORDINALITY).
+
+    Args:
+        name:    Base function name; {name}_set must be defined before.
+        params:  (parameter, type) pairs of {name}_set, in call order.
+        columns: (column, type) pairs of its RETURNS TABLE, in order.
+
+    Returns:
+        SQL functions and GRANT statements.
+    """
+    signature = ",\n".join(f"    {param:<20} {kind}" for param, kind in params)
+    args = ", ".join(param for param, _ in params)
+    types = ", ".join(kind for _, kind in params)
+    source = f"FROM {name}_set({args}) WITH ORDINALITY AS t"
+    objects = ",\n".join(f"        '{column}', t.{column}" for column, _ in columns)
+    arrays = ",\n".join(
+        f"        '{column}', COALESCE(json_agg(t.{column} ORDER BY t.ordinality), '[]'::json)"
+        for column, _ in columns
+    )
+    return f"""
+CREATE OR REPLACE FUNCTION {name}(
+{signature}
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(json_agg(json_build_object(
+{objects}
+    ) ORDER BY t.ordinality), '[]'::json)
+    {source};
+$$;
+
+CREATE OR REPLACE FUNCTION {name}_columns(
+{signature}
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+{arrays}
+    )
+    {source};
+$$;
+
+GRANT EXECUTE ON FUNCTION {name}_set({types}) TO anon;
+GRANT EXECUTE ON FUNCTION {name}({types}) TO anon;
+GRANT EXECUTE ON FUNCTION {name}_columns({types}) TO anon;
 """
 
+
+_LP_RESULT_FUNCTIONS = "".join((
+    _lp_result_functions("get_landing_page_rows_keyset", _LP_KEYSET_PARAMS, _LP_ROW_COLUMNS),
+    _lp_result_functions("get_landing_page_grouped", _LP_GROUP_PARAMS, _LP_GROUP_COLUMNS),
+))
+
 # ---------------------------------------------------------------------------
 # RPC function DDL (request R-20260422-0902, updated R-20260512-0529)
 # ---------------------------------------------------------------------------
@@ -423,40 +980,22 @@ RETURNS TABLE(category_key integer, avg_price numeric)
 LANGUAGE sql
 STABLE
 AS $$
-    WITH priced_rows AS (
-        SELECT
-            fp.category_key,
-            CASE
-                WHEN p_price_offset = 'day1' THEN
-                    CASE
-                        WHEN fp.promo_price_day1 IS NOT NULL AND fp.promo_price_day1 > 0
-                            THEN LEAST(COALESCE(fp.retail_price_day1, 0), fp.promo_price_day1)
-                        ELSE COALESCE(fp.retail_price_day1, 0)
-                    END
-                WHEN p_price_offset = 'day2' THEN
-                    CASE
-                        WHEN fp.promo_price_day2 IS NOT NULL AND fp.promo_price_day2 > 0
-                            THEN LEAST(COALESCE(fp.retail_price_day2, 0), fp.promo_price_day2)
-                        ELSE COALESCE(fp.retail_price_day2, 0)
-                    END
-                ELSE
-                    CASE
-                        WHEN fp.promo_price IS NOT NULL AND fp.promo_price > 0
-                            THEN LEAST(COALESCE(fp.retail_price, 0), fp.promo_price)
-                        ELSE COALESCE(fp.retail_price, 0)
-                    END
-            END AS effective_price
-        FROM fact_prices_lookback fp
-        JOIN dim_store ds ON ds.store_key = fp.store_key
-        WHERE fp.date_key = p_date_key
-          AND ds.settlement_key = p_settlement_key
-    )
+    -- Re-aggregates the per-company rows of report_price_aggregates
+    -- (refreshed by load_supabase.py) instead of pricing every fact row.
     SELECT
-        priced_rows.category_key,
-        AVG(priced_rows.effective_price) AS avg_price
-    FROM priced_rows
-    GROUP BY priced_rows.category_key
-    ORDER BY avg_price ASC, priced_rows.category_key ASC;
+        a.category_key,
+        SUM(
+            CASE
+                WHEN p_price_offset = 'day1' THEN a.price_sum_day1
+                WHEN p_price_offset = 'day2' THEN a.price_sum_day2
+                ELSE a.price_sum
+            END
+        ) / SUM(a.row_count) AS avg_price
+    FROM {REPORT_PRICE_AGGREGATES} a
+    WHERE a.date_key = p_date_key
+      AND a.settlement_key = p_settlement_key
+    GROUP BY a.category_key
+    ORDER BY avg_price ASC, a.category_key ASC;
 $$;
 
 CREATE OR REPLACE FUNCTION get_report_2_rows(
@@ -604,173 +1143,86 @@ GRANT EXECUTE ON FUNCTION get_report_3_rows(bigint, bigint, text) TO anon;
 -- -----------------------------------------------------------------------
 -- Each RPC returns the valid option list for one dimension filter given
 -- the current values of the other four active filters.  All filters are
--- optional (NULL = unfiltered).  The option path now reads from the same
--- landing_page_row_projection surface as the visible row path so selector
--- interactions stay aligned with the narrowed frontend request model.
-
-CREATE OR REPLACE FUNCTION get_lp_options_settlement(
-    p_date_key     INT,
-    p_category_key INT,
-    p_company_key  INT,
-    p_store_key    INT
-)
-RETURNS TABLE(settlement_key INT, name TEXT)
-LANGUAGE sql
-STABLE
-AS $$
-    WITH filtered_settlements AS (
-        SELECT DISTINCT settlement_key, settlement_name
-        FROM {LANDING_PAGE_ROW_PROJECTION}
-        WHERE settlement_key IS NOT NULL
-          AND (p_date_key     IS NULL OR date_key       = p_date_key)
-          AND (p_category_key IS NULL OR category_key   = p_category_key)
-          AND (p_company_key  IS NULL OR company_key    = p_company_key)
-          AND (p_store_key    IS NULL OR store_key      = p_store_key)
-    )
-    SELECT
-        settlement_key,
-        settlement_name AS name
-    FROM filtered_settlements
-    ORDER BY settlement_name, settlement_key;
-$$;
+-- optional (NULL = unfiltered).  The option path reads the distinct
+-- combinations that landing_page_row_projection holds, from
+-- landing_page_filter_combinations, with dynamic predicates (see
+-- _lp_options_function()).
 
-CREATE OR REPLACE FUNCTION get_lp_options_category(
-    p_date_key       INT,
-    p_settlement_key INT,
-    p_company_key    INT,
-    p_store_key      INT
-)
-RETURNS TABLE(category_key INT, name TEXT)
+{_LP_OPTIONS_FUNCTIONS}
+GRANT EXECUTE ON FUNCTION get_lp_options_settlement(INT, INT, INT, INT) TO anon;
+GRANT EXECUTE ON FUNCTION get_lp_options_category(INT, INT, INT, INT) TO anon;
+GRANT EXECUTE ON FUNCTION get_lp_options_company(INT, INT, INT, INT) TO anon;
+GRANT EXECUTE ON FUNCTION get_lp_options_store(INT, INT, INT, INT) TO anon;
+GRANT EXECUTE ON FUNCTION get_lp_options_date(INT, INT, INT, INT) TO anon;
+GRANT SELECT ON {LANDING_PAGE_ROW_PROJECTION} TO anon;
+GRANT SELECT ON {REPORT_PRICE_AGGREGATES} TO anon;
+GRANT SELECT ON {LANDING_PAGE_FILTER_COMBINATIONS} TO anon;
+
+-- -----------------------------------------------------------------------
+-- Landing-page main data RPCs (R-20260525-1400, updated R-20260525-2203)
+-- -----------------------------------------------------------------------
+-- get_landing_page_rows: server-side paginated flat detail rows backed by a
+--   read-optimized materialized projection; returns rows only (no window count).
+-- get_landing_page_total: the matching row total, exact or estimated, read
+--   from precomputed per-combination counts where the filters allow.
+-- get_landing_page_grouped: dynamic two-level GROUP BY aggregation; group
+--   column names are validated against a whitelist before %I interpolation
+--   to prevent SQL injection (security-critical).
+-- The keyset and grouped RPCs are set-returning functions (*_set) that return
+--   typed rows; get_landing_page_rows_keyset / get_landing_page_grouped wrap
+--   them as a JSON array of objects and the *_columns variants as one JSON
+--   array per column (see _lp_result_functions()).
+
+-- search_product_keys: product keys matching a landing-page product_name
+--   filter, resolved through {PRODUCT_SEARCH_TOKENS} (see search_tokens.py).
+--   The term is normalised like the tokens; a product matches when every
+--   term token prefixes one of its tokens, each an index range scan on
+--   idx_dim_product_tokens_token.  NULL when the term has no tokens, which
+--   callers treat as no product filter.
+CREATE OR REPLACE FUNCTION search_product_keys(p_term TEXT)
+RETURNS INT[]
 LANGUAGE sql
 STABLE
 AS $$
-    WITH filtered_categories AS (
-        SELECT DISTINCT category_key, category_name
-        FROM {LANDING_PAGE_ROW_PROJECTION}
-        WHERE (p_date_key       IS NULL OR date_key        = p_date_key)
-          AND (p_settlement_key IS NULL OR settlement_key  = p_settlement_key)
-          AND (p_company_key    IS NULL OR company_key     = p_company_key)
-          AND (p_store_key      IS NULL OR store_key       = p_store_key)
+    WITH terms AS (
+        SELECT DISTINCT term COLLATE "C" AS term
+        FROM regexp_split_to_table({search_key_sql("p_term")}, ' ') AS term
+        WHERE term <> ''
+    ),
+    matches AS (
+        SELECT t.product_key
+        FROM terms
+        JOIN {PRODUCT_SEARCH_TOKENS} t
+          ON t.token >= terms.term AND t.token < terms.term || '{PREFIX_END}'
+        GROUP BY t.product_key
+        HAVING COUNT(DISTINCT terms.term) = (SELECT COUNT(*) FROM terms)
     )
-    SELECT
-        category_key,
-        category_name AS name
-    FROM filtered_categories
-    ORDER BY category_name, category_key;
+    SELECT CASE
+        WHEN NOT EXISTS (SELECT 1 FROM terms) THEN NULL
+        ELSE COALESCE((SELECT array_agg(product_key) FROM matches), '{{}}'::INT[])
+    END;
 $$;
 
-CREATE OR REPLACE FUNCTION get_lp_options_company(
+CREATE OR REPLACE FUNCTION get_landing_page_rows(
     p_date_key       INT,
     p_settlement_key INT,
     p_category_key   INT,
-    p_store_key      INT
+    p_company_key    INT,
+    p_store_key      INT,
+    p_product_name   TEXT,
+    p_price_min      NUMERIC,
+    p_price_max      NUMERIC,
+    p_offset         INT,
+    p_limit          INT
 )
-RETURNS TABLE(company_key INT, name TEXT)
-LANGUAGE sql
-STABLE
-AS $$
-    WITH filtered_companies AS (
-        SELECT DISTINCT company_key, company_name
-        FROM {LANDING_PAGE_ROW_PROJECTION}
-        WHERE company_key IS NOT NULL
-          AND (p_date_key       IS NULL OR date_key        = p_date_key)
-          AND (p_settlement_key IS NULL OR settlement_key  = p_settlement_key)
-          AND (p_category_key   IS NULL OR category_key    = p_category_key)
-          AND (p_store_key      IS NULL OR store_key       = p_store_key)
-    )
-    SELECT
-        company_key,
-        company_name AS name
-    FROM filtered_companies
-    ORDER BY company_name, company_key;
-$$;
-
-CREATE OR REPLACE FUNCTION get_lp_options_store(
-    p_date_key       INT,
-    p_settlement_key INT,
-    p_category_key   INT,
-    p_company_key    INT
-)
-RETURNS TABLE(store_key INT, store_name TEXT)
-LANGUAGE sql
-STABLE
-AS $$
-    WITH filtered_stores AS (
-        SELECT DISTINCT store_key, store_name
-        FROM {LANDING_PAGE_ROW_PROJECTION}
-        WHERE (p_date_key       IS NULL OR date_key        = p_date_key)
-          AND (p_settlement_key IS NULL OR settlement_key  = p_settlement_key)
-          AND (p_category_key   IS NULL OR category_key    = p_category_key)
-          AND (p_company_key    IS NULL OR company_key     = p_company_key)
-    )
-    SELECT
-        store_key,
-        store_name
-    FROM filtered_stores
-    ORDER BY store_name, store_key;
-$$;
-
-CREATE OR REPLACE FUNCTION get_lp_options_date(
-    p_settlement_key INT,
-    p_category_key   INT,
-    p_company_key    INT,
-    p_store_key      INT
-)
-RETURNS TABLE(date_key INT, date DATE)
-LANGUAGE sql
-STABLE
-AS $$
-    WITH filtered_date_keys AS (
-                SELECT DISTINCT date_key
-                FROM {LANDING_PAGE_ROW_PROJECTION}
-                WHERE (p_settlement_key IS NULL OR settlement_key = p_settlement_key)
-                    AND (p_category_key   IS NULL OR category_key   = p_category_key)
-                    AND (p_company_key    IS NULL OR company_key    = p_company_key)
-                    AND (p_store_key      IS NULL OR store_key      = p_store_key)
-    )
-    SELECT
-        dd.date_key,
-        dd.date
-    FROM filtered_date_keys keys
-    JOIN dim_date dd ON dd.date_key = keys.date_key
-    ORDER BY dd.date_key DESC;
-$$;
-
-GRANT EXECUTE ON FUNCTION get_lp_options_settlement(INT, INT, INT, INT) TO anon;
-GRANT EXECUTE ON FUNCTION get_lp_options_category(INT, INT, INT, INT) TO anon;
-GRANT EXECUTE ON FUNCTION get_lp_options_company(INT, INT, INT, INT) TO anon;
-GRANT EXECUTE ON FUNCTION get_lp_options_store(INT, INT, INT, INT) TO anon;
-GRANT EXECUTE ON FUNCTION get_lp_options_date(INT, INT, INT, INT) TO anon;
-GRANT SELECT ON {LANDING_PAGE_ROW_PROJECTION} TO anon;
-
--- -----------------------------------------------------------------------
--- Landing-page main data RPCs (R-20260525-1400, updated R-20260525-2203)
--- -----------------------------------------------------------------------
--- get_landing_page_rows: server-side paginated flat detail rows backed by a
---   read-optimized materialized projection; returns rows only (no window count).
--- get_landing_page_grouped: dynamic two-level GROUP BY aggregation; group
---   column names are validated against a whitelist before %I interpolation
---   to prevent SQL injection (security-critical).
-
-CREATE OR REPLACE FUNCTION get_landing_page_rows(
-    p_date_key       INT,
-    p_settlement_key INT,
-    p_category_key   INT,
-    p_company_key    INT,
-    p_store_key      INT,
-    p_product_name   TEXT,
-    p_price_min      NUMERIC,
-    p_price_max      NUMERIC,
-    p_offset         INT,
-    p_limit          INT
-)
-RETURNS JSON
-LANGUAGE plpgsql
+RETURNS JSON
+LANGUAGE plpgsql
 STABLE
 AS $$
 DECLARE
     v_sql TEXT;
     v_json JSON;
+    v_product_keys INT[] := search_product_keys(p_product_name);
 BEGIN
     v_sql := '
         SELECT COALESCE(json_agg(row_to_json(t)), ''[]''::json)
@@ -808,8 +1260,8 @@ BEGIN
         v_sql := v_sql || ' AND store_key = $5 ';
     END IF;
 
-    IF p_product_name IS NOT NULL THEN
-        v_sql := v_sql || ' AND product_name ILIKE ''%'' || $6 || ''%'' ';
+    IF v_product_keys IS NOT NULL THEN
+        v_sql := v_sql || ' AND product_key = ANY($6) ';
     END IF;
 
     IF p_price_min IS NOT NULL THEN
@@ -830,12 +1282,210 @@ BEGIN
             OFFSET $9 LIMIT $10
         ) t';
 
-    EXECUTE v_sql INTO v_json USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key, p_product_name, p_price_min, p_price_max, p_offset, p_limit;
+    EXECUTE v_sql INTO v_json USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key, v_product_keys, p_price_min, p_price_max, p_offset, p_limit;
     RETURN v_json;
 END;
 $$;
 
-CREATE OR REPLACE FUNCTION get_landing_page_grouped(
+-- get_landing_page_rows_keyset_set: get_landing_page_rows with keyset pagination.
+--   p_after_* is the sort key of the last row already shown (all NULL for the
+--   first page).  Rows after it are found with a row-value comparison in the
+--   order of idx_lp_row_projection_page, so with a date filter every page is
+--   an index range scan of p_limit rows, however deep.  Names are NOT NULL
+--   in the projection ('' when missing) and a NULL cursor name is read as
+--   '', so the comparison never yields NULL.  p_offset skips whole
+--   pages past the cursor (page-number jumps); date_key breaks ties across
+--   dates.  Rows carry their sort key so the caller can build the next cursor.
+CREATE OR REPLACE FUNCTION get_landing_page_rows_keyset_set(
+    p_date_key           INT,
+    p_settlement_key     INT,
+    p_category_key       INT,
+    p_company_key        INT,
+    p_store_key          INT,
+    p_product_name       TEXT,
+    p_price_min          NUMERIC,
+    p_price_max          NUMERIC,
+    p_after_product_name TEXT,
+    p_after_store_name   TEXT,
+    p_after_product_key  INT,
+    p_after_store_key    INT,
+    p_after_file_key     INT,
+    p_after_date_key     INT,
+    p_offset             INT,
+    p_limit              INT
+)
+RETURNS TABLE({_LP_ROW_COLUMNS_DDL})
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_sql TEXT;
+    v_product_keys INT[] := search_product_keys(p_product_name);
+BEGIN
+    v_sql := '
+            SELECT
+                file_name,
+                product_name,
+                category_name,
+                settlement_name,
+                store_name,
+                company_name,
+                retail_price,
+                promo_price,
+                price,
+                product_key,
+                store_key,
+                file_key,
+                date_key
+            FROM {LANDING_PAGE_ROW_PROJECTION}
+            WHERE 1=1 ';
+
+    IF p_date_key IS NOT NULL THEN
+        v_sql := v_sql || ' AND date_key = $1 ';
+    END IF;
+
+    IF p_settlement_key IS NOT NULL THEN
+        v_sql := v_sql || ' AND settlement_key = $2 ';
+    END IF;
+
+    IF p_category_key IS NOT NULL THEN
+        v_sql := v_sql || ' AND category_key = $3 ';
+    END IF;
+
+    IF p_company_key IS NOT NULL THEN
+        v_sql := v_sql || ' AND company_key = $4 ';
+    END IF;
+
+    IF p_store_key IS NOT NULL THEN
+        v_sql := v_sql || ' AND store_key = $5 ';
+    END IF;
+
+    IF v_product_keys IS NOT NULL THEN
+        v_sql := v_sql || ' AND product_key = ANY($6) ';
+    END IF;
+
+    IF p_price_min IS NOT NULL THEN
+        v_sql := v_sql || ' AND price >= $7 ';
+    END IF;
+
+    IF p_price_max IS NOT NULL THEN
+        v_sql := v_sql || ' AND price <= $8 ';
+    END IF;
+
+    IF p_after_product_key IS NOT NULL THEN
+        v_sql := v_sql || '
+            AND (product_name, store_name, product_key, store_key, file_key, date_key)
+              > (COALESCE($9, ''''), COALESCE($10, ''''), $11, $12, $13, $14) ';
+    END IF;
+
+    v_sql := v_sql || '
+            ORDER BY
+                product_name ASC,
+                store_name ASC,
+                product_key ASC,
+                store_key ASC,
+                file_key ASC,
+                date_key ASC
+            OFFSET $15 LIMIT $16';
+
+    RETURN QUERY EXECUTE v_sql
+    USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key,
+          v_product_keys, p_price_min, p_price_max,
+          p_after_product_name, p_after_store_name, p_after_product_key,
+          p_after_store_key, p_after_file_key, p_after_date_key,
+          p_offset, p_limit;
+END;
+$$;
+
+-- get_landing_page_total: total row count for the landing-page filters as
+--   {{"total_count": n, "is_exact": bool}}.  Key-only filters sum row_count in
+--   {LANDING_PAGE_FILTER_COMBINATIONS} (exact).  Product-name and price filters
+--   cannot be answered there: the projection is counted exactly up to
+--   {LANDING_PAGE_EXACT_COUNT_LIMIT} rows, and above that the planner's row
+--   estimate is returned with is_exact = false.
+CREATE OR REPLACE FUNCTION get_landing_page_total(
+    p_date_key       INT,
+    p_settlement_key INT,
+    p_category_key   INT,
+    p_company_key    INT,
+    p_store_key      INT,
+    p_product_name   TEXT,
+    p_price_min      NUMERIC,
+    p_price_max      NUMERIC
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_where TEXT := ' WHERE 1=1 ';
+    v_total BIGINT;
+    v_plan  JSON;
+    v_product_keys INT[] := search_product_keys(p_product_name);
+BEGIN
+    IF p_date_key IS NOT NULL THEN
+        v_where := v_where || ' AND date_key = $1 ';
+    END IF;
+
+    IF p_settlement_key IS NOT NULL THEN
+        v_where := v_where || ' AND settlement_key = $2 ';
+    END IF;
+
+    IF p_category_key IS NOT NULL THEN
+        v_where := v_where || ' AND category_key = $3 ';
+    END IF;
+
+    IF p_company_key IS NOT NULL THEN
+        v_where := v_where || ' AND company_key = $4 ';
+    END IF;
+
+    IF p_store_key IS NOT NULL THEN
+        v_where := v_where || ' AND store_key = $5 ';
+    END IF;
+
+    IF v_product_keys IS NULL AND p_price_min IS NULL AND p_price_max IS NULL THEN
+        EXECUTE 'SELECT COALESCE(SUM(row_count), 0) FROM {LANDING_PAGE_FILTER_COMBINATIONS}' || v_where
+        INTO v_total
+        USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key;
+        RETURN json_build_object('total_count', v_total, 'is_exact', true);
+    END IF;
+
+    IF v_product_keys IS NOT NULL THEN
+        v_where := v_where || ' AND product_key = ANY($6) ';
+    END IF;
+
+    IF p_price_min IS NOT NULL THEN
+        v_where := v_where || ' AND price >= $7 ';
+    END IF;
+
+    IF p_price_max IS NOT NULL THEN
+        v_where := v_where || ' AND price <= $8 ';
+    END IF;
+
+    -- Narrow searches stop before the limit and are counted exactly.
+    EXECUTE 'SELECT COUNT(*) FROM (SELECT 1 FROM {LANDING_PAGE_ROW_PROJECTION}' || v_where
+        || ' LIMIT {LANDING_PAGE_EXACT_COUNT_LIMIT + 1}) t'
+    INTO v_total
+    USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key,
+          v_product_keys, p_price_min, p_price_max;
+    IF v_total <= {LANDING_PAGE_EXACT_COUNT_LIMIT} THEN
+        RETURN json_build_object('total_count', v_total, 'is_exact', true);
+    END IF;
+
+    EXECUTE 'EXPLAIN (FORMAT JSON) SELECT 1 FROM {LANDING_PAGE_ROW_PROJECTION}' || v_where
+    INTO v_plan
+    USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key,
+          v_product_keys, p_price_min, p_price_max;
+    -- The estimate can undershoot a count already known to exceed the limit.
+    v_total := GREATEST(
+        (v_plan -> 0 -> 'Plan' ->> 'Plan Rows')::NUMERIC::BIGINT,
+        {LANDING_PAGE_EXACT_COUNT_LIMIT + 1}
+    );
+    RETURN json_build_object('total_count', v_total, 'is_exact', false);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION get_landing_page_grouped_set(
     p_date_key       INT,
     p_settlement_key INT,
     p_category_key   INT,
@@ -847,7 +1497,7 @@ CREATE OR REPLACE FUNCTION get_landing_page_grouped(
     p_group_by_1     TEXT,
     p_group_by_2     TEXT
 )
-RETURNS JSON
+RETURNS TABLE({_LP_GROUP_COLUMNS_DDL})
 LANGUAGE plpgsql
 STABLE
 AS $$
@@ -857,10 +1507,10 @@ DECLARE
     v_valid_dims CONSTANT TEXT[] := ARRAY[
         'settlement_name', 'category_name', 'company_name', 'store_name', 'date_key'
     ];
-    v_select_group2 TEXT := '';
+    v_select_group2 TEXT := ', NULL::TEXT AS group2';
     v_groupby_extra TEXT := '';
     v_sql           TEXT;
-    v_result        JSON;
+    v_product_keys  INT[] := search_product_keys(p_product_name);
 BEGIN
     -- Security gate: reject group-by values not in the whitelist.
     -- %I provides identifier quoting, but validation is the primary defence.
@@ -873,19 +1523,68 @@ BEGIN
 
     -- Build optional second-level GROUP BY SQL fragments using validated identifiers.
     IF p_group_by_2 IS NOT NULL THEN
-        v_select_group2 := format(', %I AS group2', p_group_by_2);
+        v_select_group2 := format(', %I::TEXT AS group2', p_group_by_2);
         v_groupby_extra := format(', %I', p_group_by_2);
     END IF;
 
+    -- Groupings and filters at the report_price_aggregates grain (date,
+    -- settlement, category, company) are answered from the aggregates: an
+    -- index range scan over pre-summed rows instead of a fact-table GROUP BY.
+    IF p_store_key IS NULL AND v_product_keys IS NULL
+       AND p_price_min IS NULL AND p_price_max IS NULL
+       AND p_group_by_1 <> 'store_name'
+       AND (p_group_by_2 IS NULL OR p_group_by_2 <> 'store_name') THEN
+        v_sql := format($q$
+                SELECT
+                    %I::TEXT AS group1
+                    %s,
+                    SUM(eff_sum) / NULLIF(SUM(eff_count), 0)     AS price_avg,
+                    MIN(eff_min)                                 AS price_min,
+                    MAX(eff_max)                                 AS price_max,
+                    SUM(promo_sum) / NULLIF(SUM(promo_count), 0) AS promo_avg,
+                    MIN(promo_min)                               AS promo_min,
+                    MAX(promo_max)                               AS promo_max
+                FROM (
+                    SELECT
+                        dc.category_name,
+                        dst.settlement_name,
+                        dcomp.company_name,
+                        a.date_key,
+                        a.eff_count,
+                        a.eff_sum,
+                        a.eff_min,
+                        a.eff_max,
+                        a.promo_count,
+                        a.promo_sum,
+                        a.promo_min,
+                        a.promo_max
+                    FROM {REPORT_PRICE_AGGREGATES} a
+                    JOIN dim_category dc   ON dc.category_key   = a.category_key
+                    JOIN dim_company dcomp ON dcomp.company_key = a.company_key
+                    JOIN dim_settlement dst ON dst.settlement_key = a.settlement_key
+                    WHERE 1=1
+                    %s
+                ) inner_data
+                GROUP BY %I %s
+                ORDER BY %I
+        $q$, p_group_by_1, v_select_group2,
+        (CASE WHEN p_date_key IS NOT NULL THEN ' AND a.date_key = $1 ' ELSE '' END) ||
+        (CASE WHEN p_settlement_key IS NOT NULL THEN ' AND a.settlement_key = $2 ' ELSE '' END) ||
+        (CASE WHEN p_category_key IS NOT NULL THEN ' AND a.category_key = $3 ' ELSE '' END) ||
+        (CASE WHEN p_company_key IS NOT NULL THEN ' AND a.company_key = $4 ' ELSE '' END),
+        p_group_by_1, v_groupby_extra, p_group_by_1);
+
+        RETURN QUERY EXECUTE v_sql
+        USING p_date_key, p_settlement_key, p_category_key, p_company_key;
+        RETURN;
+    END IF;
+
     -- Dynamically assemble the aggregation query.
     -- %I: identifier quoting for validated group-by names.
     -- %s: pre-built SQL fragments that already carry %I quoting.
-    -- %%: escapes to a literal % inside the ILIKE pattern.
     v_sql := format($q$
-        SELECT COALESCE(json_agg(row_to_json(g)), '[]'::json)
-        FROM (
             SELECT
-                %I AS group1
+                %I::TEXT AS group1
                 %s,
                 AVG(eff_price)    AS price_avg,
                 MIN(eff_price)    AS price_min,
@@ -905,6 +1604,7 @@ BEGIN
                     f.date_key,
                     f.promo_price,
                     COALESCE(
+                        f.effective_price,
                         CASE WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
                             THEN LEAST(f.retail_price, f.promo_price)
                             ELSE f.retail_price
@@ -912,7 +1612,6 @@ BEGIN
                         f.retail_price
                     ) AS eff_price
                 FROM fact_prices_lookback f
-                JOIN dim_product dp    ON dp.product_key    = f.product_key
                 JOIN dim_category dc   ON dc.category_key   = f.category_key
                 JOIN dim_store dstore  ON dstore.store_key  = f.store_key
                 JOIN dim_company dcomp ON dcomp.company_key = dstore.company_key
@@ -922,7 +1621,6 @@ BEGIN
             ) inner_data
             GROUP BY %I %s
             ORDER BY %I
-        ) g
     $q$, p_group_by_1, v_select_group2,
     
     (CASE WHEN p_date_key IS NOT NULL THEN ' AND f.date_key = $1 ' ELSE '' END) || 
@@ -930,13 +1628,15 @@ BEGIN
     (CASE WHEN p_category_key IS NOT NULL THEN ' AND f.category_key = $3 ' ELSE '' END) || 
     (CASE WHEN p_company_key IS NOT NULL THEN ' AND dstore.company_key = $4 ' ELSE '' END) || 
     (CASE WHEN p_store_key IS NOT NULL THEN ' AND f.store_key = $5 ' ELSE '' END) || 
-    (CASE WHEN p_product_name IS NOT NULL THEN ' AND dp.product_name ILIKE ''%%'' || $6 || ''%%'' ' ELSE '' END) || 
+    (CASE WHEN v_product_keys IS NOT NULL THEN ' AND f.product_key = ANY($6) ' ELSE '' END) || 
     (CASE WHEN p_price_min IS NOT NULL THEN ' AND COALESCE(
+                        f.effective_price,
                         CASE WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
                             THEN LEAST(f.retail_price, f.promo_price)
                             ELSE f.retail_price END,
                         f.retail_price) >= $7 ' ELSE '' END) || 
     (CASE WHEN p_price_max IS NOT NULL THEN ' AND COALESCE(
+                        f.effective_price,
                         CASE WHEN f.promo_price IS NOT NULL AND f.promo_price > 0
                             THEN LEAST(f.retail_price, f.promo_price)
                             ELSE f.retail_price END,
@@ -944,29 +1644,88 @@ BEGIN
     
     p_group_by_1, v_groupby_extra, p_group_by_1);
 
-    EXECUTE v_sql INTO v_result
+    RETURN QUERY EXECUTE v_sql
     USING p_date_key, p_settlement_key, p_category_key, p_company_key, p_store_key,
-          p_product_name, p_price_min, p_price_max;
-    RETURN v_result;
+          v_product_keys, p_price_min, p_price_max;
 END;
 $$;
 
+{_LP_RESULT_FUNCTIONS}
+GRANT SELECT ON {PRODUCT_SEARCH_TOKENS} TO anon;
+GRANT EXECUTE ON FUNCTION search_product_keys(TEXT) TO anon;
 GRANT EXECUTE ON FUNCTION get_landing_page_rows(INT, INT, INT, INT, INT, TEXT, NUMERIC, NUMERIC, INT, INT) TO anon;
-GRANT EXECUTE ON FUNCTION get_landing_page_grouped(INT, INT, INT, INT, INT, TEXT, NUMERIC, NUMERIC, TEXT, TEXT) TO anon;
+GRANT EXECUTE ON FUNCTION get_landing_page_total(INT, INT, INT, INT, INT, TEXT, NUMERIC, NUMERIC) TO anon;
 """
 
-def _chunk_rows(rows: List[tuple], page_size: int) -> List[List[tuple]]:
+def _iter_pages(
+    rows: Iterable[tuple],
+    page_size: int,
+    prefetch: int = PREFETCH_PAGES,
+) -> Iterator[List[tuple]]:
     """
-    Split rows into stable execute_batch-sized pages.
+    Group rows into execute_batch-sized pages, reading ahead in a thread.
+
+    A background thread pulls rows (typically a CSV reader → coerce
+    generator) into pages and hands them over through a queue holding at
+    most prefetch pages.  The next page is parsed while the current one is
+    on the wire, and memory stays bounded by a few pages whatever the size
+    of the file.
 
     Args:
-        rows: Parameter rows scheduled for batched execution.
-        page_size: Maximum number of rows per batch page.
+        rows:      Parameter rows, consumed lazily.
+        page_size: Maximum number of rows per page.
+        prefetch:  Pages read ahead; 0 builds pages in the caller's thread.
 
-    Returns:
-        List of row pages in original order.
+    Yields:
+        Lists of up to page_size rows in original order.
+
+    Raises:
+        Any exception raised while producing rows, re-raised in the caller.
     """
-    return [rows[index:index + page_size] for index in range(0, len(rows), page_size)]
+    row_iter = iter(rows)
+    if prefetch <= 0:
+        while True:
+            page = list(itertools.islice(row_iter, page_size))
+            if not page:
+                return
+            yield page
+
+    pages: "queue.Queue" = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    end = object()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read() -> None:
+        try:
+            while True:
+                page = list(itertools.islice(row_iter, page_size))
+                if not put(page or end) or not page:
+                    return
+        except BaseException as exc:  # handed to the consumer thread
+            put(exc)
+
+    reader = threading.Thread(target=read, name="load-supabase-pages", daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is end:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblocks the reader when the consumer stops early (e.g. on a DB error).
+        stop.set()
+        reader.join()
 
 
 def execute_sql(
@@ -988,30 +1747,40 @@ def execute_sql(
 def execute_batch_rows(
     cur: "psycopg2.extensions.cursor",
     sql: str,
-    rows: List[tuple],
+    rows: Iterable[tuple],
     page_size: int = BATCH_PAGE_SIZE,
-) -> None:
+) -> int:
     """
     Execute batched SQL in stable pages.
 
     Args:
         cur: Open cursor used for the current transaction.
         sql: Parameterized SQL template for one logical statement.
-        rows: Parameter rows to execute.
+        rows: Parameter rows to execute; a generator is consumed one page
+            at a time (see _iter_pages()).
         page_size: Maximum number of parameter rows per emitted batch page.
+
+    Returns:
+        Number of rows executed.
     """
-    for page_rows in _chunk_rows(rows, page_size):
+    sent = 0
+    for page_rows in _iter_pages(rows, page_size):
         psycopg2.extras.execute_batch(cur, sql, page_rows, page_size=len(page_rows))
+        sent += len(page_rows)
+    return sent
 
 
-def create_tables(conn: "psycopg2.extensions.connection") -> None:
+def create_tables(
+    conn: "psycopg2.extensions.connection",
+    partition_by_date: bool = False,
+) -> None:
     """
     Provision the star-schema tables, apply nullable migrations, run the
     fact_prices migration (DROP TABLE IF EXISTS), provision the landing-page
     row projection and RPC helper functions, and create targeted indexes.
 
     Execution order:
-    1. _CREATE_DDL         — CREATE TABLE IF NOT EXISTS for all eight tables
+    1. _CREATE_DDL         — CREATE TABLE IF NOT EXISTS for all eleven tables
                              (fact_prices_lookback is the sole fact table).
     2. _ENSURE_NULLABLE_DDL — idempotent nullable-column migration guards.
     3. _MIGRATION_DDL      — DROP TABLE IF EXISTS backend_sql_audit_log and
@@ -1026,111 +1795,1016 @@ def create_tables(conn: "psycopg2.extensions.connection") -> None:
     5. _CREATE_INDEXES     — CREATE INDEX IF NOT EXISTS on fact_prices_lookback,
                              including the report-oriented composite indexes.
 
+    With partition_by_date, new PARTITIONED_TABLES are created LIST-partitioned
+    on date_key and existing ordinary ones are migrated by
+    migrate_to_partitioned().  Later runs detect the layout from the catalog,
+    so the flag is only needed once.
+
     Args:
-        conn: Open psycopg2 connection to the Supabase PostgreSQL database.
+        conn:              Open psycopg2 connection to the Supabase PostgreSQL
+                           database.
+        partition_by_date: Partition fact_prices_lookback and the landing-page
+                           projection by date_key.
 
     Side effects:
         Issues five DDL execute calls within a single transaction on conn;
         commits on success.  All DDL blocks are idempotent and safe to run
         on every invocation.
     """
-    with conn.cursor() as cur:
-        execute_sql(cur, _MIGRATION_DDL)
-        execute_sql(cur, _CREATE_DDL)
-        # Apply the nullable migration after table creation so that any pre-existing
-        # tables with erroneous NOT NULL constraints are corrected idempotently.
-        execute_sql(cur, _ENSURE_NULLABLE_DDL)
-        # Provision the landing-page projection and RPC helper functions.
-        execute_sql(cur, _CREATE_RPC_FUNCTIONS)
-        # Create targeted indexes on fact_prices_lookback so the RPC functions
-        # execute via index-only scans.  Both use IF NOT EXISTS and are idempotent.
-        execute_sql(cur, _CREATE_INDEXES)
-    conn.commit()
-    print("Tables created / verified.")
-    print("Indexes created / verified.")
+    with conn.cursor() as cur:
+        execute_sql(cur, _MIGRATION_DDL)
+        execute_sql(cur, _CREATE_PARTITIONED_DDL if partition_by_date else _CREATE_DDL)
+        # Apply the nullable migration after table creation so that any pre-existing
+        # tables with erroneous NOT NULL constraints are corrected idempotently.
+        execute_sql(cur, _ENSURE_NULLABLE_DDL)
+        # Provision the landing-page projection and RPC helper functions.
+        execute_sql(cur, _CREATE_RPC_FUNCTIONS)
+        # Create targeted indexes on fact_prices_lookback so the RPC functions
+        # execute via index-only scans.  Both use IF NOT EXISTS and are idempotent.
+        execute_sql(cur, _CREATE_INDEXES)
+    conn.commit()
+    print("Tables created / verified.")
+    print("Indexes created / verified.")
+    if partition_by_date:
+        for table in PARTITIONED_TABLES:
+            migrate_to_partitioned(conn, table)
+
+
+_INDEXDEF_RE = re.compile(
+    r"^CREATE (?P<unique>UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ (?P<rest>USING .*)$",
+    re.DOTALL,
+)
+
+
+def _quote_ident(name: str) -> str:
+    """Return name as a double-quoted SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _staging_index_name(index_name: str) -> str:
+    """Return the staging-table name for index_name, within the 63-byte identifier limit."""
+    return index_name[:63 - len(STAGING_SUFFIX)] + STAGING_SUFFIX
+
+
+def partition_name(table: str, date_key: int) -> str:
+    """Return the name of table's LIST partition for one date_key."""
+    return f"{table}_p{int(date_key)}"
+
+
+def is_partitioned(cur: "psycopg2.extensions.cursor", table: str) -> bool:
+    """
+    Return True when table is a partitioned (PARTITION BY) parent table.
+
+    Args:
+        cur:   Open cursor.
+        table: Table name.
+
+    Returns:
+        True for relkind 'p'; False for an ordinary table.
+    """
+    execute_sql(cur, "SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def _table_extras(
+    cur: "psycopg2.extensions.cursor",
+    table: str,
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Read a table's foreign keys, indexes and grants from the catalog.
+
+    CREATE TABLE … (LIKE …) copies columns, defaults and CHECK constraints
+    only.  The rest is read here, so indexes added to _CREATE_INDEXES (or by
+    hand) are rebuilt without listing them in the loader.
+
+    Args:
+        cur:   Open cursor.
+        table: Live table name (e.g. fact_prices_lookback).
+
+    Returns:
+        Tuple of ([(fk name, definition)], [(index name, indexdef)],
+        [(grantee, privileges)]).
+    """
+    execute_sql(
+        cur,
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname",
+        (table,),
+    )
+    foreign_keys = list(cur.fetchall())
+    execute_sql(
+        cur,
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s ORDER BY indexname",
+        (table,),
+    )
+    indexes = list(cur.fetchall())
+    execute_sql(
+        cur,
+        "SELECT grantee, string_agg(privilege_type, ', ') "
+        "FROM information_schema.role_table_grants "
+        "WHERE table_schema = current_schema() AND table_name = %s "
+        "AND grantee <> current_user GROUP BY grantee ORDER BY grantee",
+        (table,),
+    )
+    grants = list(cur.fetchall())
+    return foreign_keys, indexes, grants
+
+
+def _apply_table_extras(
+    cur: "psycopg2.extensions.cursor",
+    target: str,
+    extras: Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[Tuple[str, str]]],
+    index_suffix: str = "",
+    staged: bool = True,
+) -> List[Tuple[str, str]]:
+    """
+    Recreate foreign keys, indexes and grants from _table_extras() on target.
+
+    Indexes are built after target is loaded, which is much cheaper than
+    maintaining them row by row.
+
+    Args:
+        cur:          Cursor in the transaction that loaded target.
+        target:       Table to add the objects to.
+        extras:       Result of _table_extras() for the live table.
+        index_suffix: Appended to each index name (partitions use _p<date>).
+        staged:       Create indexes under a _staging name, to be renamed
+                      once the live objects are gone; False creates them
+                      under their final names.
+
+    Returns:
+        List of (staging index name, final index name) pairs to rename at
+        swap time (empty when staged is False).
+
+    Raises:
+        ValueError: If pg_indexes returned a definition this parser does
+            not recognise.
+    """
+    foreign_keys, indexes, grants = extras
+    for name, definition in foreign_keys:
+        # FK constraint names are per table, so the live names are reused.
+        execute_sql(cur, f"ALTER TABLE {target} ADD CONSTRAINT {_quote_ident(name)} {definition}")
+
+    renames: List[Tuple[str, str]] = []
+    for name, definition in indexes:
+        match = _INDEXDEF_RE.match(definition)
+        if match is None:
+            raise ValueError(f"Unexpected index definition: {definition}")
+        final_name = (name + index_suffix)[:63]
+        created_name = _staging_index_name(final_name) if staged else final_name
+        execute_sql(
+            cur,
+            f"CREATE {match.group('unique') or ''}INDEX {_quote_ident(created_name)} "
+            f"ON {target} {match.group('rest')}",
+        )
+        if staged:
+            renames.append((created_name, final_name))
+
+    for grantee, privileges in grants:
+        grantee_sql = grantee if grantee == "PUBLIC" else _quote_ident(grantee)
+        execute_sql(cur, f"GRANT {privileges} ON {target} TO {grantee_sql}")
+    return renames
+
+
+def _clone_table_extras(
+    cur: "psycopg2.extensions.cursor",
+    table: str,
+    staging: str,
+) -> List[Tuple[str, str]]:
+    """
+    Copy a live table's foreign keys, indexes and grants onto its staging copy.
+
+    Args:
+        cur:     Cursor in the transaction that loaded the staging table.
+        table:   Live table name (e.g. fact_prices_lookback).
+        staging: Loaded staging table name.
+
+    Returns:
+        List of (staging index name, live index name) pairs to rename at
+        swap time.
+
+    Raises:
+        ValueError: If pg_indexes returns a definition this parser does not
+            recognise.
+    """
+    return _apply_table_extras(cur, staging, _table_extras(cur, table))
+
+
+def _run_swap(
+    conn: "psycopg2.extensions.connection",
+    table: str,
+    swap: Callable[["psycopg2.extensions.cursor"], None],
+    attempts: int = SWAP_ATTEMPTS,
+) -> float:
+    """
+    Run a short DDL swap transaction under SWAP_LOCK_TIMEOUT, with retries.
+
+    Args:
+        conn:     Open psycopg2 connection.
+        table:    Table being swapped (for the retry message).
+        swap:     Callback issuing the swap statements on the given cursor.
+        attempts: Attempts before giving up.
+
+    Returns:
+        Seconds spent in the successful swap transaction.
+
+    Raises:
+        psycopg2.OperationalError: If the lock is still unavailable after
+            the last attempt.
+        psycopg2.DatabaseError: On any other database error (rolled back).
+    """
+    for attempt in range(1, attempts + 1):
+        started = time.perf_counter()
+        try:
+            with conn.cursor() as cur:
+                execute_sql(cur, f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+                swap(cur)
+            conn.commit()
+            break
+        except psycopg2.OperationalError as exc:
+            conn.rollback()
+            if getattr(exc, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            print(f"  {table} is busy; retrying swap ({attempt}/{attempts}) …")
+            time.sleep(SWAP_RETRY_DELAY * attempt)
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            raise
+    return time.perf_counter() - started
+
+
+def _rename_indexes(
+    cur: "psycopg2.extensions.cursor",
+    index_renames: List[Tuple[str, str]],
+) -> None:
+    """Give staged indexes their final names."""
+    for staged_name, name in index_renames:
+        execute_sql(
+            cur,
+            f"ALTER INDEX {_quote_ident(staged_name)} RENAME TO {_quote_ident(name)}",
+        )
+
+
+def swap_staging_table(
+    conn: "psycopg2.extensions.connection",
+    table: str,
+    staging: str,
+    index_renames: List[Tuple[str, str]],
+    attempts: int = SWAP_ATTEMPTS,
+) -> float:
+    """
+    Atomically replace a live table with its loaded staging copy.
+
+    One short transaction renames the live table aside, renames the staging
+    table into place, drops the old table and gives the staging indexes the
+    live index names.  Readers see either the old or the new snapshot.  The
+    transaction waits at most SWAP_LOCK_TIMEOUT for the ACCESS EXCLUSIVE
+    lock, so a long-running reader makes the swap back off and retry rather
+    than queue every new reader behind it.
+
+    Args:
+        conn:          Open psycopg2 connection.
+        table:         Live table name.
+        staging:       Loaded staging table (from _clone_table_extras()).
+        index_renames: (staging index, live index) name pairs.
+        attempts:      Swap attempts before giving up.
+
+    Returns:
+        Seconds spent in the successful swap transaction.
+
+    Raises:
+        psycopg2.OperationalError: If the lock is still unavailable after
+            the last attempt; the staging table is left for the next run.
+        psycopg2.DatabaseError: On any other database error (rolled back).
+    """
+    retired = f"{table}{RETIRED_SUFFIX}"
+
+    def swap(cur: "psycopg2.extensions.cursor") -> None:
+        execute_sql(cur, f"ALTER TABLE {table} RENAME TO {retired}")
+        execute_sql(cur, f"ALTER TABLE {staging} RENAME TO {table}")
+        execute_sql(cur, f"DROP TABLE {retired}")
+        _rename_indexes(cur, index_renames)
+
+    seconds = _run_swap(conn, table, swap, attempts)
+    print(f"  Swapped {staging} into {table} in {seconds * 1000:,.0f} ms.")
+    return seconds
+
+
+def _stage_partitions(
+    cur: "psycopg2.extensions.cursor",
+    table: str,
+    staging: str,
+    extras: Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[Tuple[str, str]]],
+) -> Tuple[List[Tuple[int, str]], List[Tuple[str, str]]]:
+    """
+    Turn a loaded staging table into one ready-to-attach table per date_key.
+
+    The usual single-date load is renamed rather than copied.  Each staged
+    partition gets a CHECK (date_key = …) constraint, which lets ATTACH
+    PARTITION skip its validation scan, plus the parent's foreign keys and
+    indexes so ATTACH adopts them instead of building new ones under lock.
+
+    Args:
+        cur:     Cursor in the transaction that loaded staging.
+        table:   Partitioned parent table.
+        staging: Loaded staging table (dropped or renamed here).
+        extras:  _table_extras() of the parent.
+
+    Returns:
+        Tuple of ([(date_key, staged partition table)], index renames).
+    """
+    execute_sql(cur, f"SELECT DISTINCT {PARTITION_KEY} FROM {staging} ORDER BY 1")
+    date_keys = [int(row[0]) for row in cur.fetchall()]
+
+    staged: List[Tuple[int, str]] = []
+    index_renames: List[Tuple[str, str]] = []
+    for date_key in date_keys:
+        final = partition_name(table, date_key)
+        part = f"{final}{STAGING_SUFFIX}"
+        execute_sql(cur, f"DROP TABLE IF EXISTS {part}")
+        if len(date_keys) == 1:
+            execute_sql(cur, f"ALTER TABLE {staging} RENAME TO {part}")
+        else:
+            execute_sql(cur, f"CREATE TABLE {part} (LIKE {staging} INCLUDING ALL)")
+            execute_sql(
+                cur,
+                f"INSERT INTO {part} SELECT * FROM {staging} WHERE {PARTITION_KEY} = %s",
+                (date_key,),
+            )
+        execute_sql(
+            cur,
+            f"ALTER TABLE {part} ADD CONSTRAINT {final}_{PARTITION_KEY}_check "
+            f"CHECK ({PARTITION_KEY} = {date_key})",
+        )
+        index_renames += _apply_table_extras(cur, part, extras, index_suffix=f"_p{date_key}")
+        execute_sql(cur, f"ANALYZE {part}")
+        staged.append((date_key, part))
+    if len(date_keys) != 1:
+        execute_sql(cur, f"DROP TABLE {staging}")
+    return staged, index_renames
+
+
+def swap_partitions(
+    conn: "psycopg2.extensions.connection",
+    table: str,
+    staged: List[Tuple[int, str]],
+    index_renames: List[Tuple[str, str]],
+    attempts: int = SWAP_ATTEMPTS,
+) -> float:
+    """
+    Replace every partition of a date_key-partitioned table with staged ones.
+
+    In one short transaction (SWAP_LOCK_TIMEOUT, retried like
+    swap_staging_table()) the current partitions — expired days and days
+    being reloaded — are detached and dropped, and the staged tables are
+    attached FOR VALUES IN (their date_key).
+
+    Args:
+        conn:          Open psycopg2 connection.
+        table:         Partitioned parent table.
+        staged:        (date_key, staged table) pairs from _stage_partitions().
+        index_renames: Staged index renames from _stage_partitions().
+        attempts:      Swap attempts before giving up.
+
+    Returns:
+        Seconds spent in the successful swap transaction.
+    """
+    def swap(cur: "psycopg2.extensions.cursor") -> None:
+        execute_sql(
+            cur,
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY 1",
+            (table,),
+        )
+        for (name,) in cur.fetchall():
+            execute_sql(cur, f"ALTER TABLE {table} DETACH PARTITION {_quote_ident(name)}")
+            execute_sql(cur, f"DROP TABLE {_quote_ident(name)}")
+        for date_key, part in staged:
+            final = partition_name(table, date_key)
+            execute_sql(cur, f"ALTER TABLE {part} RENAME TO {final}")
+            execute_sql(cur, f"ALTER TABLE {table} ATTACH PARTITION {final} FOR VALUES IN ({date_key})")
+        _rename_indexes(cur, index_renames)
+
+    seconds = _run_swap(conn, table, swap, attempts)
+    days = ", ".join(str(date_key) for date_key, _ in staged) or "none"
+    print(f"  Attached {table} partitions ({days}) in {seconds * 1000:,.0f} ms.")
+    return seconds
+
+
+def replace_table(
+    conn: "psycopg2.extensions.connection",
+    table: str,
+    load: Callable[["psycopg2.extensions.cursor", str], None],
+) -> float:
+    """
+    Rebuild a table off to the side and swap it in (zero-downtime refresh).
+
+    Creates <table>_staging with the live table's columns, calls
+    load(cur, staging) to fill it, copies foreign keys, indexes and grants,
+    analyzes it and commits; then swap_staging_table() puts it in place.
+    For a table partitioned by date_key the staging table is split into one
+    table per day instead and swap_partitions() detaches the old days and
+    attaches the new ones.  The live table stays readable throughout the
+    load.
+
+    Args:
+        conn:  Open psycopg2 connection.
+        table: Live table to replace.
+        load:  Callback that populates the staging table named by its
+               second argument using the given cursor.
+
+    Returns:
+        Seconds spent in the swap transaction.
+
+    Raises:
+        psycopg2.DatabaseError: On any database error while loading (rolled
+            back; the live table is untouched) or swapping.
+    """
+    staging = f"{table}{STAGING_SUFFIX}"
+    try:
+        with conn.cursor() as cur:
+            partitioned = is_partitioned(cur, table)
+            # A staging table left over from a failed run is discarded.
+            execute_sql(cur, f"DROP TABLE IF EXISTS {staging}")
+            execute_sql(
+                cur,
+                f"CREATE TABLE {staging} (LIKE {table} "
+                "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)",
+            )
+            load(cur, staging)
+            extras = _table_extras(cur, table)
+            if partitioned:
+                staged, index_renames = _stage_partitions(cur, table, staging, extras)
+            else:
+                index_renames = _apply_table_extras(cur, staging, extras)
+                execute_sql(cur, f"ANALYZE {staging}")
+        conn.commit()
+    except psycopg2.DatabaseError:
+        conn.rollback()
+        raise
+    if partitioned:
+        return swap_partitions(conn, table, staged, index_renames)
+    return swap_staging_table(conn, table, staging, index_renames)
+
+
+def migrate_to_partitioned(
+    conn: "psycopg2.extensions.connection",
+    table: str,
+) -> bool:
+    """
+    Convert an ordinary table into one LIST-partitioned by date_key.
+
+    One-off migration used by create_tables(partition_by_date=True): the
+    table is renamed aside, a partitioned parent with the same columns is
+    created under the original name with one partition per date_key
+    present, the rows are moved across, and the foreign keys, indexes and
+    grants are recreated on the parent (and so on every partition).  Runs
+    in a single transaction; readers wait for it once.
+
+    Args:
+        conn:  Open psycopg2 connection.
+        table: fact_prices_lookback or LANDING_PAGE_ROW_PROJECTION.
+
+    Returns:
+        True when the table was migrated; False when already partitioned.
+
+    Raises:
+        psycopg2.DatabaseError: On any database error; the transaction is
+            rolled back before re-raising.
+    """
+    legacy = f"{table}_unpartitioned"
+    try:
+        with conn.cursor() as cur:
+            if is_partitioned(cur, table):
+                return False
+            extras = _table_extras(cur, table)
+            execute_sql(cur, f"ALTER TABLE {table} RENAME TO {legacy}")
+            execute_sql(
+                cur,
+                f"CREATE TABLE {table} (LIKE {legacy} "
+                "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+                f"PARTITION BY LIST ({PARTITION_KEY})",
+            )
+            execute_sql(cur, f"SELECT DISTINCT {PARTITION_KEY} FROM {legacy} ORDER BY 1")
+            for (date_key,) in cur.fetchall():
+                execute_sql(
+                    cur,
+                    f"CREATE TABLE {partition_name(table, date_key)} "
+                    f"PARTITION OF {table} FOR VALUES IN ({int(date_key)})",
+                )
+            execute_sql(cur, f"INSERT INTO {table} SELECT * FROM {legacy}")
+            # The legacy table goes first so the parent can reuse its index names.
+            execute_sql(cur, f"DROP TABLE {legacy}")
+            _apply_table_extras(cur, table, extras, staged=False)
+            execute_sql(cur, f"ANALYZE {table}")
+        conn.commit()
+    except psycopg2.DatabaseError:
+        conn.rollback()
+        raise
+    print(f"  Migrated {table} to LIST partitions on {PARTITION_KEY}.")
+    return True
+
+
+def refresh_landing_page_projection(
+    conn: "psycopg2.extensions.connection",
+    groups: Optional[List[Tuple[int, int]]] = None,
+) -> None:
+    """
+    Rebuild the landing-page derived table after retained-window changes.
+
+    With groups=None the whole projection is rebuilt in a staging copy and
+    swapped in (replace_table()).  With a list of (date_key, file_key)
+    groups — the fact_prices_lookback groups changed by this sync, see
+    projection_changes() — only those groups are deleted and re-inserted
+    in place, in one transaction; an empty list is a no-op.
+
+    Args:
+        conn:   Open psycopg2 connection to the Supabase PostgreSQL database.
+        groups: Changed (date_key, file_key) groups, or None for a full
+                rebuild.
+
+    The landing_page_filter_combinations counts are rebuilt alongside: in
+    full after a full rebuild, and for the changed groups' dates after an
+    incremental refresh (in the same transaction).
+
+    Side effects:
+        Rewrites the derived tables that back the landing-page row and count
+        RPCs; anonymous pagination keeps reading the previous snapshot until
+        the refresh commits.
+
+    Raises:
+        psycopg2.DatabaseError: On any database error; the transaction is
+            rolled back before re-raising.
+    """
+    if groups is not None:
+        if not groups:
+            print("Landing-page projection is up to date.")
+            return
+        params = ([date_key for date_key, _ in groups], [file_key for _, file_key in groups])
+        try:
+            with conn.cursor() as cur:
+                execute_sql(cur, _DELETE_LANDING_PAGE_PROJECTION_GROUPS_SQL, params)
+                execute_sql(
+                    cur,
+                    _REFRESH_LANDING_PAGE_PROJECTION_GROUPS_SQL.format(
+                        target=LANDING_PAGE_ROW_PROJECTION,
+                    ),
+                    params,
+                )
+                execute_sql(cur, f"ANALYZE {LANDING_PAGE_ROW_PROJECTION}")
+                dates = (sorted({date_key for date_key, _ in groups}),)
+                execute_sql(cur, _DELETE_FILTER_COMBINATIONS_DATES_SQL, dates)
+                execute_sql(
+                    cur,
+                    _REFRESH_FILTER_COMBINATIONS_DATES_SQL.format(
+                        target=LANDING_PAGE_FILTER_COMBINATIONS,
+                    ),
+                    dates,
+                )
+            conn.commit()
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            raise
+        print(f"Landing-page projection refreshed for {len(groups):,} changed file groups.")
+        return
+
+    def load(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        execute_sql(cur, "SELECT DISTINCT file_key FROM fact_prices_lookback ORDER BY file_key")
+        file_keys = [row[0] for row in cur.fetchall()]
+
+        batch_sql = _REFRESH_LANDING_PAGE_PROJECTION_BATCH_SQL.format(target=staging)
+        for batch_start in range(0, len(file_keys), PROJECTION_REFRESH_BATCH_SIZE):
+            batch_keys = file_keys[batch_start:batch_start + PROJECTION_REFRESH_BATCH_SIZE]
+            execute_sql(cur, batch_sql, (batch_keys,))
+
+        if not file_keys:
+            execute_sql(cur, _REFRESH_LANDING_PAGE_PROJECTION_SQL.format(target=staging))
+
+    replace_table(conn, LANDING_PAGE_ROW_PROJECTION, load)
+
+    def load_combinations(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        execute_sql(cur, _REFRESH_FILTER_COMBINATIONS_SQL.format(target=staging))
+
+    replace_table(conn, LANDING_PAGE_FILTER_COMBINATIONS, load_combinations)
+    print("Landing-page projection refreshed.")
+
+
+def refresh_report_aggregates(conn: "psycopg2.extensions.connection") -> None:
+    """
+    Rebuild report_price_aggregates from the current fact_prices_lookback.
+
+    The table is aggregated server-side in one INSERT … SELECT … GROUP BY
+    into a staging copy and swapped in (replace_table()), so
+    get_report_1_category_prices() and get_landing_page_grouped() keep
+    reading the previous aggregates until the new ones are complete.  Run
+    after every lookback load and dim_store change: the grain follows each
+    store's current settlement and company.
+
+    Args:
+        conn: Open psycopg2 connection to the Supabase PostgreSQL database.
+
+    Raises:
+        psycopg2.DatabaseError: On any database error; the transaction is
+            rolled back before re-raising.
+    """
+    def load(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        execute_sql(cur, _REFRESH_REPORT_AGGREGATES_SQL.format(target=staging))
+
+    replace_table(conn, REPORT_PRICE_AGGREGATES, load)
+    print("Report aggregates refreshed.")
+
+
+def _iter_csv_rows(
+    csv_path: Path,
+    coerce: Callable[[str], object],
+    columns: Optional[List[str]] = None,
+) -> Iterator[tuple]:
+    """
+    Stream coerced row tuples from a CSV without loading the file.
+
+    Args:
+        csv_path: CSV file with a header row.
+        coerce:   Per-cell conversion (_coerce or _coerce_int).
+        columns:  Header names to emit, in this order; all columns in file
+                  order when None.
+
+    Yields:
+        One tuple per data row.
+
+    Raises:
+        KeyError: If a requested column is missing from the header.
+    """
+    with open(csv_path, encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        if columns is None:
+            for row in reader:
+                yield tuple(coerce(cell) for cell in row)
+            return
+        positions = {name: index for index, name in enumerate(header)}
+        indexes = [positions[name] for name in columns]
+        for row in reader:
+            yield tuple(coerce(row[index]) for index in indexes)
+
+
+def _iter_partition_rows(arrays: Dict[str, Iterable[int]]) -> Iterator[tuple]:
+    """Yield row tuples from columnar partition arrays, NULL_VALUE as None."""
+    for row in zip(*arrays.values()):
+        yield tuple(None if value == NULL_VALUE else value for value in row)
+
+
+def dim_row_hash(row: Tuple[Optional[str], ...]) -> str:
+    """
+    Return the content hash recorded for one coerced dimension row.
+
+    Args:
+        row: Row tuple as produced by _coerce() for every column.
+
+    Returns:
+        16-character hex BLAKE2b digest; NULL and '' hash differently.
+    """
+    text = "\x1f".join("\x00" if cell is None else cell for cell in row)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
 
 
-def refresh_landing_page_projection(
-    conn: "psycopg2.extensions.connection",
-) -> None:
+def sync_target(conn: "psycopg2.extensions.connection") -> str:
     """
-    Rebuild the landing-page derived table after retained-window changes.
+    Identify the database a dimension sync manifest belongs to.
 
     Args:
-        conn: Open psycopg2 connection to the Supabase PostgreSQL database.
+        conn: Open psycopg2 connection.
 
-    Side effects:
-        Truncates and repopulates the derived table that backs the landing-page row and
-        count RPCs so anonymous pagination reads the latest retained data.
+    Returns:
+        'host:port/dbname' of the connection (no credentials).
     """
-    with conn.cursor() as cur:
-        execute_sql(cur, "SELECT DISTINCT file_key FROM fact_prices_lookback ORDER BY file_key")
-        file_keys = [row[0] for row in cur.fetchall()]
+    params = conn.get_dsn_parameters()
+    return f"{params.get('host', '')}:{params.get('port', '')}/{params.get('dbname', '')}"
 
-        execute_sql(cur, f"TRUNCATE TABLE {LANDING_PAGE_ROW_PROJECTION}")
-        for batch_start in range(0, len(file_keys), PROJECTION_REFRESH_BATCH_SIZE):
-            batch_keys = file_keys[batch_start:batch_start + PROJECTION_REFRESH_BATCH_SIZE]
-            execute_sql(cur, _REFRESH_LANDING_PAGE_PROJECTION_BATCH_SQL, (batch_keys,))
 
-        if not file_keys:
-            execute_sql(cur, _REFRESH_LANDING_PAGE_PROJECTION_SQL)
-        execute_sql(cur, f"ANALYZE {LANDING_PAGE_ROW_PROJECTION}")
-    conn.commit()
-    print("Landing-page projection refreshed.")
+def load_dim_manifest(path: Path, target: str) -> Dict:
+    """
+    Read the local dimension sync manifest for target.
+
+    Args:
+        path:   Manifest path (DIM_SYNC_MANIFEST_PATH).
+        target: sync_target() of the current connection.
 
+    Returns:
+        Manifest dict {'version', 'target', 'tables': {table: entry}}.  A
+        missing, unreadable or outdated manifest, or one written for another
+        database, yields an empty manifest (every row is sent).
+    """
+    empty = {"version": DIM_SYNC_MANIFEST_VERSION, "target": target, "tables": {}}
+    try:
+        with open(path, encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return empty
+    if (
+        not isinstance(manifest, dict)
+        or manifest.get("version") != DIM_SYNC_MANIFEST_VERSION
+        or manifest.get("target") != target
+    ):
+        return empty
+    return manifest
+
+
+def save_dim_manifest(path: Path, manifest: Dict) -> None:
+    """
+    Atomically write the dimension sync manifest (via path + '.partial').
 
-def upsert_dim(
+    Args:
+        path:     Manifest path (DIM_SYNC_MANIFEST_PATH).
+        manifest: Dict from load_dim_manifest(), updated by sync_dim().
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = path.with_suffix(path.suffix + ".partial")
+    with open(partial_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, separators=(",", ":"))
+    partial_path.replace(path)
+
+
+def _csv_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Yield rows as headerless CSV bytes (None as ''), BATCH_PAGE_SIZE rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == BATCH_PAGE_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def sync_dim(
     conn: "psycopg2.extensions.connection",
     table: str,
     csv_path: Path,
     pk_col: str,
     columns: List[str],
-) -> int:
+    entry: Optional[Dict] = None,
+    send_all: bool = False,
+) -> Tuple[int, int, Optional[int], Dict]:
     """
-    Upsert all rows from a dimension CSV into the corresponding Supabase table.
+    Send only new or changed dimension rows, using the sync manifest entry.
 
-    Uses INSERT … ON CONFLICT (pk_col) DO UPDATE SET … executed in a single
-    transaction via execute_batch (page size 2000).
+    Rows whose key is above the entry's max_key, or whose content hash
+    differs from the recorded one, are streamed with COPY into a temp table
+    and merged with one INSERT … SELECT … ON CONFLICT DO UPDATE.  The
+    update is skipped for rows that are already identical remotely, so no
+    dead tuples are produced for them.  Rows are read, hashed and filtered
+    while COPY pulls them, so memory grows only with the manifest hashes,
+    not with the rows sent.  The entry is ignored when its
+    columns differ or when the remote max(pk_col) is below its max_key
+    (the remote table was reset).
+
+    With send_all every row is sent (tables pruned remotely, see
+    FULL_SYNC_DIMS), but the entry is still used to count updated rows.
 
     Args:
         conn:     Open psycopg2 connection.
-        table:    Name of the target PostgreSQL table.
-        csv_path: Path to the local dimension CSV file.
-        pk_col:   Name of the primary-key column used as the conflict target.
-        columns:  Ordered list of all column names in the CSV / table.
+        table:    Target dimension table.
+        csv_path: Local dimension CSV.
+        pk_col:   Integer surrogate key column.
+        columns:  Ordered column names in the CSV / table.
+        entry:    Manifest entry from the previous sync of this table, or
+                  None to send every row.
+        send_all: Send every row regardless of the entry.
 
     Returns:
-        Number of rows processed.
+        Tuple of (rows sent, rows skipped, rows updated, new manifest
+        entry).  Rows updated counts existing keys whose content changed;
+        it is None when there was no usable entry to compare against.
+        Persist the entry only after this returns: the merge has been
+        committed.
 
     Raises:
         FileNotFoundError: If csv_path does not exist.
+        psycopg2.DatabaseError: On any database error; the transaction is
+            rolled back before re-raising.
     """
     if not csv_path.exists():
         raise FileNotFoundError(f"Dimension CSV not found: {csv_path}")
 
-    # Build non-pk column list for the DO UPDATE SET clause.
-    update_cols = [c for c in columns if c != pk_col]
-    set_clause = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)
+    if entry is not None and entry.get("columns") != columns:
+        entry = None
+    if entry is not None and not send_all:
+        with conn.cursor() as cur:
+            execute_sql(cur, f"SELECT max({pk_col}) FROM {table}")
+            remote_max = cur.fetchone()[0]
+        if remote_max is None or remote_max < entry["max_key"]:
+            entry = None
+    known: Dict[str, str] = entry["hashes"] if entry is not None else {}
+    last_max = entry["max_key"] if entry is not None else 0
+
+    hashes: Dict[str, str] = {}
+    sent = 0
+    updated = 0
+    max_key = 0
+    pk_index = columns.index(pk_col)
+
+    def changed_rows() -> Iterator[tuple]:
+        """Hash every CSV row and yield the ones to send, counting as they pass."""
+        nonlocal sent, updated, max_key
+        for row in _iter_csv_rows(csv_path, _coerce, columns):
+            key = row[pk_index]
+            key_int = int(key)
+            digest = dim_row_hash(row)
+            hashes[key] = digest
+            max_key = max(max_key, key_int)
+            if key_int > last_max or known.get(key) != digest:
+                updated += key in known
+            elif not send_all:
+                continue
+            sent += 1
+            yield row
+
+    # Peek for a first row to send; when there is none the generator has
+    # already hashed the whole file and no transaction is opened.
+    rows = changed_rows()
+    first = next(rows, None)
+    if first is not None:
+        staging = f"{table}_sync"
+        col_list = ", ".join(columns)
+        update_cols = [c for c in columns if c != pk_col]
+        set_clause = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)
+        distinct = (
+            f"({', '.join(f'{table}.{c}' for c in update_cols)}) IS DISTINCT FROM "
+            f"({', '.join(f'EXCLUDED.{c}' for c in update_cols)})"
+        )
+        try:
+            with conn.cursor() as cur:
+                execute_sql(
+                    cur,
+                    f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP",
+                )
+                cur.copy_expert(
+                    f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv, NULL '')",
+                    _CopyStream(_csv_chunks(itertools.chain((first,), rows))),
+                    size=COPY_CHUNK_BYTES,
+                )
+                execute_sql(
+                    cur,
+                    f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {staging}"
+                    f" ON CONFLICT ({pk_col}) DO UPDATE SET {set_clause}"
+                    f" WHERE {distinct}",
+                )
+            conn.commit()
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            raise
+
+    skipped = len(hashes) - sent
+    print(f"  {table}: sent {sent:,} new/changed rows, skipped {skipped:,} unchanged.")
+    new_entry = {"columns": columns, "max_key": max_key, "hashes": hashes}
+    return sent, skipped, updated if entry is not None else None, new_entry
+
+
+def dim_dependencies(
+    dim_tables: List[Tuple[str, Path, str, List[str]]],
+) -> Dict[str, Set[str]]:
+    """
+    Derive the foreign-key graph between dimension tables from DIM_TABLES.
 
-    placeholders = ", ".join(["%s"] * len(columns))
-    col_list = ", ".join(columns)
-    sql = (
-        f"INSERT INTO {table} ({col_list}) VALUES ({placeholders})"
-        f" ON CONFLICT ({pk_col}) DO UPDATE SET {set_clause}"
-    )
+    A table depends on another when one of its non-key columns is that
+    table's primary key (dim_store.settlement_key → dim_settlement), which
+    is how every dimension reference in _CREATE_DDL is named.
 
-    rows: List[tuple] = []
-    with open(csv_path, encoding="utf-8", newline="") as fh:
-        reader = csv.DictReader(fh)
-        for row in reader:
-            # Convert empty strings to None for nullable numeric FK columns.
-            rows.append(tuple(_coerce(row[c]) for c in columns))
+    Args:
+        dim_tables: DIM_TABLES-shaped (table, csv, pk_col, columns) tuples.
 
-    with conn.cursor() as cur:
-        execute_batch_rows(cur, sql, rows)
-    conn.commit()
-    print(f"  Upserted {len(rows):,} rows into {table}.")
-    return len(rows)
+    Returns:
+        Dict table → set of tables it references.
+    """
+    owners = {pk_col: table for table, _csv, pk_col, _cols in dim_tables}
+    return {
+        table: {owners[col] for col in columns if col != pk_col and col in owners}
+        for table, _csv, pk_col, columns in dim_tables
+    }
+
+
+def dim_sync_waves(
+    dim_tables: List[Tuple[str, Path, str, List[str]]],
+) -> List[List[Tuple[str, Path, str, List[str]]]]:
+    """
+    Order dimension tables into waves that can each be synced concurrently.
+
+    Every table lands in the first wave after all the tables it references
+    (see dim_dependencies()); within a wave the DIM_TABLES order is kept.
+
+    Args:
+        dim_tables: DIM_TABLES-shaped tuples.
+
+    Returns:
+        List of waves, each a list of dim_tables entries.
+
+    Raises:
+        ValueError: If the references form a cycle.
+    """
+    pending = dim_dependencies(dim_tables)
+    done: Set[str] = set()
+    waves: List[List[Tuple[str, Path, str, List[str]]]] = []
+    while len(done) < len(dim_tables):
+        wave = [spec for spec in dim_tables if spec[0] not in done and pending[spec[0]] <= done]
+        if not wave:
+            cycle = sorted(set(pending) - done)
+            raise ValueError(f"Dimension foreign keys form a cycle: {', '.join(cycle)}")
+        waves.append(wave)
+        done.update(spec[0] for spec in wave)
+    return waves
+
+
+def sync_dims(
+    db_url: str,
+    manifest: Dict,
+    workers: int = DIM_SYNC_WORKERS,
+    dim_tables: Optional[List[Tuple[str, Path, str, List[str]]]] = None,
+) -> Tuple[int, int, bool]:
+    """
+    Sync all dimension tables, independent ones concurrently.
+
+    Tables are run wave by wave (dim_sync_waves()), so referenced rows exist
+    before dependent tables are loaded; inside a wave each table is synced
+    by sync_dim() on its own connection from a ThreadedConnectionPool of
+    at most workers connections.  Each table's manifest entry is saved as
+    soon as its merge has committed, and its wall time is printed.  When a
+    PROJECTION_NAME_DIMS table changed, manifest['projection_dirty'] is set
+    in the same save, so the names stay marked stale until
+    sync_landing_page_projection() has rebuilt the projection.
+
+    Args:
+        db_url:     Connection string for the pool.
+        manifest:   Dimension sync manifest (updated in place and saved).
+        workers:    Maximum concurrent connections.
+        dim_tables: Tables to sync (default DIM_TABLES).
+
+    Returns:
+        Tuple of (rows sent, rows skipped, names_changed), where
+        names_changed is True when a PROJECTION_NAME_DIMS table had updated
+        rows (or no entry to compare against).
+
+    Raises:
+        psycopg2.DatabaseError: If any table fails; the other tables of that
+            wave still finish, later waves are not started.
+    """
+    dim_tables = DIM_TABLES if dim_tables is None else dim_tables
+    waves = dim_sync_waves(dim_tables)
+    width = max(1, min(workers, max(len(wave) for wave in waves)))
+    pool = psycopg2.pool.ThreadedConnectionPool(1, width, db_url)
+
+    def run(spec: Tuple[str, Path, str, List[str]]) -> Tuple[Tuple[int, int, Optional[int], Dict], float]:
+        table, csv_path, pk_col, columns = spec
+        conn = pool.getconn()
+        started = time.perf_counter()
+        try:
+            result = sync_dim(
+                conn, table, csv_path, pk_col, columns, manifest["tables"].get(table),
+                send_all=table in FULL_SYNC_DIMS,
+            )
+        finally:
+            pool.putconn(conn)
+        return result, time.perf_counter() - started
+
+    sent_total = skipped_total = 0
+    names_changed = False
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=width, thread_name_prefix="dim-sync") as executor:
+            for number, wave in enumerate(waves, 1):
+                futures = {executor.submit(run, spec): spec[0] for spec in wave}
+                error: Optional[BaseException] = None
+                for future in as_completed(futures):
+                    table = futures[future]
+                    try:
+                        (sent, skipped, updated, entry), seconds = future.result()
+                    except Exception as exc:
+                        print(f"  {table} failed: {exc}", file=sys.stderr)
+                        error = error or exc
+                        continue
+                    if table in PROJECTION_NAME_DIMS and updated != 0:
+                        names_changed = True
+                        manifest["projection_dirty"] = True
+                    manifest["tables"][table] = entry
+                    save_dim_manifest(DIM_SYNC_MANIFEST_PATH, manifest)
+                    print(f"  {table} synced in {seconds:.2f} s (wave {number}).")
+                    sent_total += sent
+                    skipped_total += skipped
+                if error is not None:
+                    raise error
+    finally:
+        pool.closeall()
+    print(f"  Dimension sync took {time.perf_counter() - started:.2f} s "
+          f"on {width} connection(s).")
+    return sent_total, skipped_total, names_changed
 
 
 def _coerce(value: str) -> Optional[str]:
@@ -1147,6 +2821,20 @@ def _coerce(value: str) -> Optional[str]:
     return None if stripped == "" else stripped
 
 
+def _coerce_int(value: str) -> Optional[int]:
+    """
+    Convert a stotinki-format CSV cell to an int, or None when empty.
+
+    Args:
+        value: Raw cell value from csv.reader.
+
+    Returns:
+        None for empty/blank strings; the integer value otherwise.
+    """
+    stripped = value.strip()
+    return None if stripped == "" else int(stripped)
+
+
 def get_latest_local_date(facts_dir: Path) -> Optional[str]:
     """
     Return the stem (YYYY-MM-DD) of the newest fact CSV in facts_dir.
@@ -1324,73 +3012,575 @@ def prune_dim_category(
     return deleted
 
 
+def lookback_csv_layout(csv_path: Path) -> Tuple[int, bool]:
+    """
+    Return the lookback day count and price format of a lookback CSV header.
+
+    Args:
+        csv_path: Path to data/schema/fact_prices_lookback.csv, or to its
+                  columnar partition (fact_prices_lookback.kcol), whose
+                  column names are the CSV header.
+
+    Returns:
+        Tuple of (lookback_days, is_stotinki).  lookback_days is the number of
+        retail/promo day pairs in the header; (DEFAULT_LOOKBACK_DAYS, False)
+        when the file is absent or empty.
+
+    Raises:
+        ValueError: If the header is neither lookback_columns(n) nor
+            lookback_stotinki_columns(n) for some n.
+    """
+    if not csv_path.exists():
+        return DEFAULT_LOOKBACK_DAYS, False
+    if csv_path.suffix == PARTITION_SUFFIX:
+        header = [entry["name"] for entry in read_partition_header(csv_path)["columns"]]
+    else:
+        with open(csv_path, encoding="utf-8", newline="") as fh:
+            header = next(csv.reader(fh), None)
+    if not header:
+        return DEFAULT_LOOKBACK_DAYS, False
+    for base, columns_for, is_stotinki in (
+        (LOOKBACK_BASE_COLUMNS, lookback_columns, False),
+        (LOOKBACK_STOTINKI_BASE_COLUMNS, lookback_stotinki_columns, True),
+    ):
+        extra = len(header) - len(base)
+        if extra >= 0 and extra % 2 == 0 and header == columns_for(extra // 2):
+            return extra // 2, is_stotinki
+    raise ValueError(f"Unexpected lookback CSV header in {csv_path.name}: {header}")
+
+
+def lookback_days_from_csv(csv_path: Path) -> int:
+    """
+    Return the number of lookback days encoded in a lookback CSV header.
+
+    Args:
+        csv_path: Path to data/schema/fact_prices_lookback.csv.
+
+    Returns:
+        Number of retail/promo day pairs in the header, or
+        DEFAULT_LOOKBACK_DAYS when the file is absent or empty.
+
+    Raises:
+        ValueError: If the header is not a decimal or stotinki lookback header.
+    """
+    return lookback_csv_layout(csv_path)[0]
+
+
+def ensure_lookback_columns(
+    conn: "psycopg2.extensions.connection",
+    lookback_days: int,
+) -> None:
+    """
+    Add fact_prices_lookback price columns for days beyond the default window.
+
+    create_tables() always provisions day1..DEFAULT_LOOKBACK_DAYS; wider
+    windows configured in transform.py get their extra columns here.
+    Columns from an earlier, wider window are left in place (NULL after the
+    next full replacement).
+
+    Args:
+        conn:          Open psycopg2 connection.
+        lookback_days: Number of lookback days in the CSV being loaded.
+
+    Side effects:
+        Issues idempotent ALTER TABLE … ADD COLUMN IF NOT EXISTS statements
+        and commits; no-op when lookback_days <= DEFAULT_LOOKBACK_DAYS.
+    """
+    ddl = lookback_column_ddl(DEFAULT_LOOKBACK_DAYS + 1, lookback_days)
+    if not ddl:
+        return
+    with conn.cursor() as cur:
+        execute_sql(cur, ddl)
+    conn.commit()
+    print(f"  fact_prices_lookback columns verified for {lookback_days} lookback days.")
+
+
 def insert_lookback(
     conn: "psycopg2.extensions.connection",
     csv_path: Path,
 ) -> int:
     """
-    Truncate and reinsert all rows from the lookback CSV into fact_prices_lookback.
+    Replace fact_prices_lookback with the rows of the lookback CSV.
 
     The table is always fully replaced on each sync run because
     fact_prices_lookback is a derived snapshot artifact (see request
-    R-20260420-2055, Assumption A6).  Uses execute_batch (page size 2000)
-    within a single transaction; rolls back and re-raises on error.
+    R-20260420-2055, Assumption A6).  The column list is taken from the CSV
+    header, so any lookback_days window written by transform.py loads
+    without code changes (call ensure_lookback_columns() first for windows
+    wider than DEFAULT_LOOKBACK_DAYS).  Rows are inserted with execute_batch
+    (page size 2000) into a staging copy that replace_table() swaps in, so
+    readers keep the previous snapshot until the load is complete.
+
+    A stotinki-format CSV is sent as integers: prices are divided by 100 in
+    the INSERT, and effective_stotinki fills effective_price.  A decimal CSV
+    leaves effective_price NULL.  A columnar partition (.kcol, written by
+    transform.py with [settings] columnar_facts) is read through mmap and
+    sent as integers too, each price column divided by its stored scale.
 
     Args:
         conn:     Open psycopg2 connection.
-        csv_path: Path to data/schema/fact_prices_lookback.csv.  If the file
-                  is absent or empty, the table is truncated and the function
-                  returns 0 without raising an error.
+        csv_path: Path to data/schema/fact_prices_lookback.csv or its .kcol
+                  partition.  If the file is absent or empty, the table is
+                  replaced by an empty one and the function returns 0
+                  without raising an error.
 
     Returns:
         Number of rows inserted.
 
     Raises:
+        ValueError: If the CSV header is not a decimal or stotinki lookback
+            header.
         psycopg2.DatabaseError: On any database error; transaction is rolled
             back before re-raising.
     """
-    columns = [
-        "date_key",
-        "store_key",
-        "file_key",
-        "category_key",
-        "product_key",
-        "retail_price",
-        "promo_price",
-        "retail_price_day1",
-        "promo_price_day1",
-        "retail_price_day2",
-        "promo_price_day2",
-    ]
-    placeholders = ", ".join(["%s"] * len(columns))
-    col_list = ", ".join(columns)
-    insert_sql = (
-        f"INSERT INTO fact_prices_lookback ({col_list}) VALUES ({placeholders})"
+    lookback_days, is_stotinki = lookback_csv_layout(csv_path)
+    columns = lookback_columns(lookback_days)
+    n_keys = len(LOOKBACK_BASE_COLUMNS) - 2
+    if is_stotinki:
+        # Same order as lookback_stotinki_columns(): effective after promo.
+        columns[n_keys + 2:n_keys + 2] = ["effective_price"]
+
+    # Rows are streamed page by page from the file (CSV reader → coerce →
+    # _iter_pages()) rather than collected up front.
+    rows: Iterable[tuple] = ()
+    if csv_path.suffix == PARTITION_SUFFIX and csv_path.exists():
+        header, arrays = read_partition(csv_path)
+        scales = list(column_scales(header).values())
+        rows = _iter_partition_rows(arrays)
+    else:
+        if is_stotinki:
+            scales = [1] * n_keys + [100] * (len(columns) - n_keys)
+            coerce = _coerce_int
+        else:
+            scales = [1] * len(columns)
+            coerce = _coerce
+        if csv_path.exists():
+            rows = _iter_csv_rows(csv_path, coerce)
+
+    # Integer-scaled columns are divided back to NUMERIC inside the INSERT.
+    placeholders = ", ".join(
+        "%s" if scale == 1 else f"%s / {scale}.0" for scale in scales
     )
+    col_list = ", ".join(columns)
+    inserted = 0
 
-    rows: List[tuple] = []
-    if csv_path.exists():
-        with open(csv_path, encoding="utf-8", newline="") as fh:
-            reader = csv.DictReader(fh)
-            for row in reader:
-                rows.append(tuple(_coerce(row[c]) for c in columns))
+    def load(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        nonlocal inserted
+        insert_sql = f"INSERT INTO {staging} ({col_list}) VALUES ({placeholders})"
+        inserted = execute_batch_rows(cur, insert_sql, rows)
 
-    try:
+    started = time.perf_counter()
+    replace_table(conn, "fact_prices_lookback", load)
+    rate = _rows_per_sec(inserted, time.perf_counter() - started)
+    print(f"  Inserted {inserted:,} rows into fact_prices_lookback ({rate}).")
+    return inserted
+
+
+def _rows_per_sec(rows: int, seconds: float) -> str:
+    """Return a 'N rows/sec' label for the lookback load summary line."""
+    if seconds <= 0:
+        return "n/a rows/sec"
+    return f"{rows / seconds:,.0f} rows/sec"
+
+
+class _CopyStream:
+    """
+    Read-only file object over byte chunks, as consumed by copy_expert().
+
+    Counts line terminators as the server pulls data, so the loader can
+    report how many CSV lines it streamed without a second pass.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._buffer = b""
+        self._pos = 0
+        self._ends_with_newline = True
+        self.lines = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Return up to size bytes (all remaining bytes when size < 0)."""
+        pieces: List[bytes] = []
+        wanted = size
+        while size < 0 or wanted > 0:
+            if self._pos >= len(self._buffer):
+                self._buffer = next(self._chunks, b"")
+                self._pos = 0
+                if not self._buffer:
+                    break
+                self.lines += self._buffer.count(b"\n")
+                self._ends_with_newline = self._buffer.endswith(b"\n")
+            stop = len(self._buffer) if size < 0 else self._pos + wanted
+            piece = self._buffer[self._pos:stop]
+            self._pos += len(piece)
+            wanted -= len(piece)
+            pieces.append(piece)
+        return b"".join(pieces)
+
+    def readline(self, size: int = -1) -> bytes:
+        """Alias of read(); COPY FROM STDIN does not need line boundaries."""
+        return self.read(size)
+
+    @property
+    def rows(self) -> int:
+        """Data rows streamed so far, excluding the header line."""
+        lines = self.lines + (0 if self._ends_with_newline else 1)
+        return max(lines - 1, 0)
+
+
+def _file_chunks(path: Path) -> Iterator[bytes]:
+    """Yield the raw bytes of path in COPY_CHUNK_BYTES pieces."""
+    with open(path, "rb") as fh:
+        yield from iter(lambda: fh.read(COPY_CHUNK_BYTES), b"")
+
+
+def _partition_csv_chunks(path: Path) -> Iterator[bytes]:
+    """
+    Yield a columnar partition as CSV bytes (header first, NULL as '').
+
+    Args:
+        path: .kcol partition file.
+
+    Yields:
+        Encoded CSV text, BATCH_PAGE_SIZE rows per chunk.
+    """
+    header, arrays = read_partition(path)
+    cols = list(arrays.values())
+    yield (",".join(arrays) + "\n").encode("ascii")
+    for start in range(0, header["rows"], BATCH_PAGE_SIZE):
+        stop = start + BATCH_PAGE_SIZE
+        lines = [
+            ",".join("" if value == NULL_VALUE else str(value) for value in row)
+            for row in zip(*(col[start:stop] for col in cols))
+        ]
+        yield ("\n".join(lines) + "\n").encode("ascii")
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split a stream of byte chunks into lines (terminators removed)."""
+    tail = b""
+    for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def lookback_groups(path: Path) -> Dict[str, str]:
+    """
+    Fingerprint each (date_key, file_key) group of a lookback file.
+
+    The landing-page projection is derived from fact_prices_lookback one
+    group at a time, so comparing these fingerprints between syncs tells
+    which groups projection_changes() has to refresh.
+
+    Args:
+        path: Lookback CSV or its .kcol partition (the file being loaded).
+
+    Returns:
+        Dict 'date_key:file_key' → hex digest of that group's rows; empty
+        when the file is absent.
+    """
+    if not path.exists():
+        return {}
+    chunks = _partition_csv_chunks(path) if path.suffix == PARTITION_SUFFIX else _file_chunks(path)
+    hashers: Dict[bytes, "hashlib.blake2b"] = {}
+    lines = _iter_lines(chunks)
+    next(lines, None)
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = line.split(b",", 3)
+        group = fields[0] + b":" + fields[2]
+        hasher = hashers.get(group)
+        if hasher is None:
+            hasher = hashers[group] = hashlib.blake2b(digest_size=8)
+        hasher.update(line.rstrip(b"\r"))
+    return {group.decode("ascii"): hasher.hexdigest() for group, hasher in hashers.items()}
+
+
+def projection_changes(previous: Dict[str, str], current: Dict[str, str]) -> List[Tuple[int, int]]:
+    """
+    Return the (date_key, file_key) groups whose projection rows must be redone.
+
+    Args:
+        previous: lookback_groups() of the file the projection was built from.
+        current:  lookback_groups() of the file just loaded.
+
+    Returns:
+        Sorted groups that are new, changed, or no longer present.
+    """
+    changed = {
+        group for group in previous.keys() | current.keys()
+        if previous.get(group) != current.get(group)
+    }
+    return sorted(tuple(int(part) for part in group.split(":")) for group in changed)
+
+
+def group_dates(groups: Dict[str, str]) -> Set[int]:
+    """
+    Return the date_keys present in lookback_groups() output.
+
+    Args:
+        groups: Dict 'date_key:file_key' → digest.
+
+    Returns:
+        Set of integer date_keys.
+    """
+    return {int(group.split(":", 1)[0]) for group in groups}
+
+
+def sync_landing_page_projection(
+    conn: "psycopg2.extensions.connection",
+    manifest: Dict,
+    lookback_source: Path,
+) -> None:
+    """
+    Refresh the landing-page projection for the lookback file just loaded.
+
+    Only the (date_key, file_key) groups that differ from the file the
+    projection was last built from are redone.  The whole projection is
+    rebuilt instead when there is no previous build, the manifest predates
+    the current filter-combination layout, a partitioned projection gains
+    or loses days, or manifest['projection_dirty'] is set.  sync_dims()
+    sets that marker before it saves the entry of a table whose names are
+    shown in the projection, so a run that fails before this refresh still
+    leaves the next run to rebuild in full.
+
+    Args:
+        conn:            Open psycopg2 connection.
+        manifest:        Dimension sync manifest (updated in place and saved).
+        lookback_source: Lookback CSV or .kcol partition loaded by this run.
+
+    Side effects:
+        Records the new groups and clears projection_dirty in the manifest
+        once the refresh has committed.
+    """
+    groups = lookback_groups(lookback_source)
+    previous_groups = manifest.get("projection_groups")
+    with conn.cursor() as cur:
+        partitioned = is_partitioned(cur, LANDING_PAGE_ROW_PROJECTION)
+    if (
+        previous_groups is None
+        or manifest.get("filter_combinations") != FILTER_COMBINATIONS_VERSION
+        or manifest.get("projection_dirty")
+        or (partitioned and group_dates(previous_groups) != group_dates(groups))
+    ):
+        refresh_landing_page_projection(conn)
+    else:
+        refresh_landing_page_projection(conn, projection_changes(previous_groups, groups))
+    manifest["projection_groups"] = groups
+    manifest["filter_combinations"] = FILTER_COMBINATIONS_VERSION
+    manifest.pop("projection_dirty", None)
+    save_dim_manifest(DIM_SYNC_MANIFEST_PATH, manifest)
+
+
+def copy_lookback(
+    conn: "psycopg2.extensions.connection",
+    csv_path: Path,
+) -> int:
+    """
+    Replace fact_prices_lookback by streaming the lookback file in with COPY.
+
+    The bulk-load counterpart of insert_lookback(): the file is sent to the
+    server with COPY … FROM STDIN (FORMAT csv, HEADER, NULL '') in
+    COPY_CHUNK_BYTES reads, without building Python row tuples.  A decimal
+    CSV is copied straight into the staging copy of fact_prices_lookback
+    (see replace_table()).  Integer-scaled sources (stotinki CSVs and .kcol
+    partitions) are copied into a BIGINT temp table first and moved across
+    with one INSERT … SELECT that divides each price column by its scale.
+
+    Args:
+        conn:     Open psycopg2 connection.
+        csv_path: Path to data/schema/fact_prices_lookback.csv or its .kcol
+                  partition.  If the file is absent or empty, the table is
+                  replaced by an empty one and the function returns 0.
+
+    Returns:
+        Number of rows copied.
+
+    Raises:
+        ValueError: If the header is not a decimal or stotinki lookback
+            header.
+        psycopg2.DatabaseError: On any database error; transaction is rolled
+            back before re-raising.
+    """
+    lookback_days, is_stotinki = lookback_csv_layout(csv_path)
+    columns = lookback_columns(lookback_days)
+    n_keys = len(LOOKBACK_BASE_COLUMNS) - 2
+    if is_stotinki:
+        columns[n_keys + 2:n_keys + 2] = ["effective_price"]
+
+    stream: Optional[_CopyStream] = None
+    if csv_path.suffix == PARTITION_SUFFIX and csv_path.exists():
+        scales = list(column_scales(read_partition_header(csv_path)).values())
+        stream = _CopyStream(_partition_csv_chunks(csv_path))
+    elif csv_path.exists() and csv_path.stat().st_size > 0:
+        if is_stotinki:
+            scales = [1] * n_keys + [100] * (len(columns) - n_keys)
+        else:
+            scales = [1] * len(columns)
+        stream = _CopyStream(_file_chunks(csv_path))
+
+    col_list = ", ".join(columns)
+    copy_options = "(FORMAT csv, HEADER true, NULL '')"
+
+    def load(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        if stream is None:
+            return
+        if all(scale == 1 for scale in scales):
+            cur.copy_expert(
+                f"COPY {staging} ({col_list}) FROM STDIN WITH {copy_options}",
+                stream,
+                size=COPY_CHUNK_BYTES,
+            )
+            return
+        # Integer-scaled prices are divided back to NUMERIC on the server.
+        execute_sql(
+            cur,
+            "CREATE TEMP TABLE fact_prices_lookback_copy ("
+            + ", ".join(f"{column} BIGINT" for column in columns)
+            + ") ON COMMIT DROP",
+        )
+        cur.copy_expert(
+            f"COPY fact_prices_lookback_copy ({col_list}) FROM STDIN WITH {copy_options}",
+            stream,
+            size=COPY_CHUNK_BYTES,
+        )
+        select_list = ", ".join(
+            column if scale == 1 else f"{column} / {scale}.0"
+            for column, scale in zip(columns, scales)
+        )
+        execute_sql(
+            cur,
+            f"INSERT INTO {staging} ({col_list}) "
+            f"SELECT {select_list} FROM fact_prices_lookback_copy",
+        )
+
+    started = time.perf_counter()
+    replace_table(conn, "fact_prices_lookback", load)
+    rows = stream.rows if stream is not None else 0
+    rate = _rows_per_sec(rows, time.perf_counter() - started)
+    print(f"  Copied {rows:,} rows into fact_prices_lookback ({rate}).")
+    return rows
+
+
+def file_digest(path: Path) -> str:
+    """
+    Return the content hash recorded in the sync manifest for a whole file.
+
+    Args:
+        path: Existing file.
+
+    Returns:
+        32-character hex BLAKE2b digest of the file's bytes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in _file_chunks(path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_product_tokens(
+    conn: "psycopg2.extensions.connection",
+    csv_path: Path,
+    manifest: Dict,
+) -> int:
+    """
+    Replace dim_product_tokens from dim_product_tokens.csv when it changed.
+
+    The token file is derived from dim_product.csv by transform.py and is
+    small next to the fact tables, so it is rebuilt wholesale with COPY
+    through replace_table() rather than diffed row by row.  The file's
+    digest is kept in manifest['product_tokens']; an unchanged file is not
+    sent again unless the remote table is empty (the database was restored
+    or recreated behind the same URL), mirroring sync_dim()'s max(key) check.
+
+    Args:
+        conn:     Open psycopg2 connection.
+        csv_path: Path to data/schema/dim_product_tokens.csv.
+        manifest: Dict from load_dim_manifest(); updated with the new digest.
+
+    Returns:
+        Number of rows copied (0 when the file is missing, or unchanged and
+        already loaded).
+
+    Raises:
+        psycopg2.DatabaseError: On any database error; the live table is
+            left untouched.
+    """
+    if not csv_path.exists():
+        print(f"  {csv_path.name} not found; product search index left as is.")
+        return 0
+    digest = file_digest(csv_path)
+    if manifest.get("product_tokens") == digest:
         with conn.cursor() as cur:
-            # Full replacement: truncate first, then reinsert.
-            execute_sql(cur, "TRUNCATE TABLE fact_prices_lookback")
-            if rows:
-                execute_batch_rows(cur, insert_sql, rows)
-        conn.commit()
-    except psycopg2.DatabaseError:
-        conn.rollback()
-        raise
+            execute_sql(cur, f"SELECT EXISTS (SELECT 1 FROM {PRODUCT_SEARCH_TOKENS})")
+            loaded = cur.fetchone()[0]
+        if loaded:
+            print(f"  {PRODUCT_SEARCH_TOKENS} unchanged; skipped.")
+            return 0
+        print(f"  {PRODUCT_SEARCH_TOKENS} is empty remotely; copying it again.")
+
+    stream = _CopyStream(_file_chunks(csv_path))
+
+    def load(cur: "psycopg2.extensions.cursor", staging: str) -> None:
+        cur.copy_expert(
+            f"COPY {staging} (product_key, token) FROM STDIN WITH (FORMAT csv, HEADER true)",
+            stream,
+            size=COPY_CHUNK_BYTES,
+        )
+
+    replace_table(conn, PRODUCT_SEARCH_TOKENS, load)
+    manifest["product_tokens"] = digest
+    print(f"  Copied {stream.rows:,} rows into {PRODUCT_SEARCH_TOKENS}.")
+    return stream.rows
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse load_supabase.py command-line options.
+
+    Args:
+        argv: Argument list (defaults to sys.argv[1:]).
 
-    print(f"  Inserted {len(rows):,} rows into fact_prices_lookback.")
-    return len(rows)
+    Returns:
+        Namespace with 'execute_batch', 'full_dim_sync' and
+        'partition_by_date' (bools) and 'dim_workers' (int).
+    """
+    parser = argparse.ArgumentParser(
+        description="Sync the star-schema data layer to Supabase.",
+    )
+    parser.add_argument(
+        "--execute-batch",
+        action="store_true",
+        help="Load fact_prices_lookback with batched INSERTs instead of "
+             "COPY FROM STDIN (fallback for connections that cannot COPY).",
+    )
+    parser.add_argument(
+        "--full-dim-sync",
+        action="store_true",
+        help="Ignore the local dimension sync manifest and send every "
+             "dimension row (e.g. after the remote tables were restored).",
+    )
+    parser.add_argument(
+        "--dim-workers",
+        type=int,
+        default=DIM_SYNC_WORKERS,
+        help="Connections used to sync independent dimension tables "
+             f"concurrently (default: {DIM_SYNC_WORKERS}).",
+    )
+    parser.add_argument(
+        "--partition-by-date",
+        action="store_true",
+        help="Partition fact_prices_lookback and the landing-page projection "
+             "by date_key, migrating existing tables (one-off; kept afterwards).",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Orchestrate the Supabase sync: provision tables (dropping legacy
     fact_prices via migration DDL), upsert dims, prune remote dim_date to the
@@ -1398,18 +3588,22 @@ def main() -> None:
 
     The retention window is defined as the latest 3 local fact dates found in
     data/schema/facts/ (request R-20260429-0825).  fact_prices_lookback is
-    always fully replaced (TRUNCATE + reinsert) on every sync run.
+    always fully replaced (staging load + rename swap) on every sync run.
     fact_prices was removed in request R-20260430-0825.
 
     Exits with code 1 on missing DATABASE_URL or connection failure,
     surfacing a clear error message without a stack trace.
 
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:]).
+
     Side effects:
         Reads .env from the project root via python-dotenv.
         Reads dim CSVs from data/schema/.
         Reads the latest fact CSV from data/schema/facts/.
         Writes to the Supabase PostgreSQL database.
     """
+    args = parse_args(argv)
     # Load .env from the project root so DATABASE_URL is available.
     load_dotenv(BASE_DIR / ".env")
     db_url = os.getenv("DATABASE_URL")
@@ -1432,13 +3626,29 @@ def main() -> None:
     try:
         # Step 1: Provision tables.
         print("Provisioning schema …")
-        create_tables(conn)
+        create_tables(conn, partition_by_date=args.partition_by_date)
 
         # Step 2: Upsert all dimension tables in FK-dependency order so that
-        # referenced rows exist before dependent tables are populated.
+        # referenced rows exist before dependent tables are populated.  Tables
+        # with no dependency between them are synced concurrently.
+        # Tables other than FULL_SYNC_DIMS only send rows that changed since
+        # the last sync recorded in the local manifest.
         print("Upserting dimension tables …")
-        for table, csv_path, pk_col, columns in DIM_TABLES:
-            upsert_dim(conn, table, csv_path, pk_col, columns)
+        target = sync_target(conn)
+        manifest = load_dim_manifest(DIM_SYNC_MANIFEST_PATH, target)
+        if args.full_dim_sync:
+            manifest["tables"] = {}
+            manifest.pop("projection_groups", None)
+            manifest.pop("product_tokens", None)
+        sent_total, skipped_total, _ = sync_dims(
+            db_url, manifest, workers=args.dim_workers,
+        )
+        print(f"  Dimension sync: {sent_total:,} rows sent, {skipped_total:,} unchanged rows skipped.")
+
+        # Step 2b: Rebuild the product search tokens when transform.py
+        # rederived them (they follow dim_product, synced just above).
+        print("Syncing product search tokens …")
+        copy_product_tokens(conn, PRODUCT_TOKENS_CSV_PATH, manifest)
 
         # Step 3: Determine the rolling retention window from local fact files.
         # Retained dates are the newest 3 local fact partitions; remote dim_date
@@ -1458,9 +3668,15 @@ def main() -> None:
 
         # Step 4: Sync the derived lookback table (always full replacement).
         # fact_prices_lookback is the sole fact table after R-20260430-0825.
+        # The columnar partition is preferred while it still mirrors the CSV.
         lookback_csv = SCHEMA_DIR / "fact_prices_lookback.csv"
-        print("Syncing fact_prices_lookback …")
-        insert_lookback(conn, lookback_csv)
+        lookback_source = current_partition(lookback_csv) or lookback_csv
+        print(f"Syncing fact_prices_lookback from {lookback_source.name} …")
+        ensure_lookback_columns(conn, lookback_days_from_csv(lookback_source))
+        if args.execute_batch:
+            insert_lookback(conn, lookback_source)
+        else:
+            copy_lookback(conn, lookback_source)
 
         # Step 5: Prune remote dim_date to match the retained fact dates so
         # the React app date selector shows only dates with fact data.
@@ -1472,15 +3688,29 @@ def main() -> None:
         # Step 6: Prune remote dim_category to only the category keys that are
         # referenced by the retained fact window (R-20260507-2248).  Must be
         # called after insert_lookback (Step 4) so the fact table reflects
-        # the fully refreshed data, and after upsert_dim for dim_category
+        # the fully refreshed data, and after sync_dims has merged dim_category
         # (Step 2) so newly added categories are not immediately pruned.
         print("Pruning remote dim_category to retained fact window …")
         prune_dim_category(conn)
 
         # Step 7: Refresh the denormalized landing-page projection after all
         # retained-window mutations so the anon RPC reads the current snapshot.
+        # Only the (date_key, file_key) groups that differ from the lookback
+        # file the projection was last built from are redone, unless names
+        # shown in the projection changed since the last completed refresh
+        # (projection_dirty, written by sync_dims in Step 2, survives a run
+        # that fails in between) or there is no previous build.  A
+        # partitioned projection is rebuilt when the set of days changes, so
+        # new days are attached and expired ones detached as whole partitions.
+        # A manifest written before the current filter-combination layout
+        # also forces one full rebuild, which fills it for every retained day.
         print("Refreshing landing-page projection …")
-        refresh_landing_page_projection(conn)
+        sync_landing_page_projection(conn, manifest, lookback_source)
+
+        # Step 8: Re-aggregate the report / grouped-view sums from the
+        # refreshed lookback table (cheap: one server-side GROUP BY).
+        print("Refreshing report aggregates …")
+        refresh_report_aggregates(conn)
 
         print("Supabase sync complete.")
 
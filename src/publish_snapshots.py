@@ -0,0 +1,544 @@
+"""
+publish_snapshots.py: Pre-render landing-page data into static JSON shards.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: after load_supabase.py has refreshed the database and
+`npm run build` has produced react-app/dist/, query the read-only landing-page
+RPCs once and write their answers for every retained date as gzip-compressed
+JSON files under react-app/dist/data/.  The React app reads these shards
+before calling Supabase, so anonymous visitors only reach the database for
+free-text product search, extra filter combinations and row pages.
+
+Shard layout (all files gzip-compressed JSON, tables column-compact — one
+array per column, as returned by the *_columns RPCs):
+
+    data/index.json.gz                 version, data_version, generated_at, dates,
+                                       shards, rows
+    data/<date_key>/options.json.gz    selector options and row totals for the date
+    data/<date_key>/grouped.json.gz    get_landing_page_grouped for SNAPSHOT_GROUPINGS
+    data/<date_key>/report_1.json.gz   get_report_1_category_prices per settlement
+    data/rows/<date_key>/<settlement_key>.<hash>.json.gz
+                                       every projection row of one settlement
+
+Row shards are dictionary-encoded (see encode_row_shard()) and named after a
+hash of their bytes, so the CDN may cache them forever: new data gets a new
+name, listed in the index.  The browser filters, pages and counts a
+settlement's rows locally once its shard is loaded.
+
+The index records data_version(), the retained date window the snapshot was
+rendered from.  dataService.js compares it once per session with the dates
+get_lp_options_date returns and ignores the snapshot when load_supabase.py
+has moved the window since the deploy.
+
+The shards are written to data.partial/ and renamed into place, so a failed
+run never leaves a half-written snapshot behind.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+from search_tokens import search_tokens
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REACT_DIST_DIR = BASE_DIR / "react-app" / "dist"
+SNAPSHOT_DIR_NAME = "data"
+
+# Bumped when the shard layout changes; dataService.js ignores other versions.
+SNAPSHOT_VERSION = 1
+
+# gzip level for the shards: they are written once per deploy and read by
+# every visitor, so the slowest level is worth it.
+SNAPSHOT_COMPRESSION_LEVEL = 9
+
+# (group_by_1, group_by_2) pairs pre-rendered from get_landing_page_grouped
+# with only a date filter.  Keys in grouped.json.gz are "g1" or "g1|g2".
+SNAPSHOT_GROUPINGS: Tuple[Tuple[str, Optional[str]], ...] = (
+    ("settlement_name", None),
+    ("category_name", None),
+    ("company_name", None),
+    ("settlement_name", "category_name"),
+    ("category_name", "settlement_name"),
+)
+
+# Price offsets accepted by get_report_1_category_prices.
+REPORT_1_PRICE_OFFSETS = ("current", "day1", "day2")
+
+# Selector dimensions whose options are listed for a date alone.  Each
+# get_lp_options_* RPC takes the four other filter keys, date first.
+OPTION_DIMENSIONS = ("settlement", "category", "company", "store")
+
+# Key columns whose per-key row totals are pre-computed for a date.
+TOTAL_KEYS = ("settlement_key", "category_key", "company_key", "store_key")
+
+# Settlements with more rows than this on a date get no row shard; the
+# browser keeps paging them through get_landing_page_rows_keyset.
+ROW_SHARD_MAX_ROWS = 50_000
+
+# Hex digits of the content hash in row shard file names.
+ROW_SHARD_HASH_LENGTH = 16
+
+# Dictionary-encoded row shard columns: (shard column, key column, name column).
+# Each row stores an index into the column's dictionary instead of the key and
+# name, so a store or product that appears on many rows is spelled out once.
+ROW_SHARD_DICTIONARIES = (
+    ("product", "product_key", "product_name"),
+    ("category", "category_key", "category_name"),
+    ("company", "company_key", "company_name"),
+    ("store", "store_key", "store_name"),
+    ("file", "file_key", "file_name"),
+)
+ROW_SHARD_PRICES = ("retail_price", "promo_price", "price")
+
+# Row shard query: one settlement and date in get_landing_page_rows_keyset order.
+_ROW_SHARD_SQL = (
+    "SELECT "
+    + ", ".join(f"{key}, {name}" for _, key, name in ROW_SHARD_DICTIONARIES)
+    + ", " + ", ".join(ROW_SHARD_PRICES)
+    + " FROM landing_page_row_projection"
+    " WHERE date_key = %s AND settlement_key = %s"
+    " ORDER BY product_name, store_name, product_key, store_key, file_key, date_key"
+)
+
+
+def _json_default(value):
+    """Encode NUMERIC and DATE values returned by psycopg2."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def shard_key(group_by_1: str, group_by_2: Optional[str]) -> str:
+    """
+    Return the grouped.json.gz key of a grouping.
+
+    Args:
+        group_by_1: First grouping column.
+        group_by_2: Optional second grouping column.
+
+    Returns:
+        'group_by_1' or 'group_by_1|group_by_2'.
+    """
+    return group_by_1 if group_by_2 is None else f"{group_by_1}|{group_by_2}"
+
+
+def encode_shard(payload: Dict) -> bytes:
+    """
+    Encode payload as gzip-compressed JSON.
+
+    The gzip header carries no file name or timestamp, so unchanged data
+    produces byte-identical shards.
+
+    Args:
+        payload: JSON-serialisable dict (Decimal and date values allowed).
+
+    Returns:
+        Compressed shard bytes.
+    """
+    data = json.dumps(
+        payload, default=_json_default, ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+    return gzip.compress(data, compresslevel=SNAPSHOT_COMPRESSION_LEVEL, mtime=0)
+
+
+def data_version(date_keys: Sequence[int]) -> str:
+    """
+    Identify the database state a snapshot was rendered from.
+
+    load_supabase.py adds the newest day and prunes the oldest on every
+    sync, so the set of retained dates changes whenever the served data
+    does.  dataService.snapshotDataVersion() computes the same string.
+
+    Args:
+        date_keys: Retained dim_date keys, in any order.
+
+    Returns:
+        The keys in ascending order, comma-separated.
+    """
+    return ",".join(str(key) for key in sorted(date_keys))
+
+
+def write_shard(path: Path, payload: Dict) -> int:
+    """
+    Write payload as gzip-compressed JSON.
+
+    Args:
+        path:    Destination .json.gz path; parent directories are created.
+        payload: JSON-serialisable dict (Decimal and date values allowed).
+
+    Returns:
+        Compressed size in bytes.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    compressed = encode_shard(payload)
+    path.write_bytes(compressed)
+    return len(compressed)
+
+
+def write_hashed_shard(directory: Path, stem: str, payload: Dict) -> Tuple[str, int]:
+    """
+    Write payload under a name that includes a hash of its bytes.
+
+    Args:
+        directory: Destination directory; created when missing.
+        stem:      File name before the hash.
+        payload:   JSON-serialisable dict.
+
+    Returns:
+        Tuple of (file name '<stem>.<hash>.json.gz', compressed size in bytes).
+    """
+    compressed = encode_shard(payload)
+    digest = hashlib.blake2b(compressed, digest_size=ROW_SHARD_HASH_LENGTH // 2).hexdigest()
+    name = f"{stem}.{digest}.json.gz"
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_bytes(compressed)
+    return name, len(compressed)
+
+
+def read_shard(path: Path) -> Dict:
+    """
+    Read a shard written by write_shard().
+
+    Args:
+        path: .json.gz shard path.
+
+    Returns:
+        The decoded payload.
+    """
+    return json.loads(gzip.decompress(path.read_bytes()).decode("utf-8"))
+
+
+def fetch_columns(
+    cur: "psycopg2.extensions.cursor",
+    sql: str,
+    params: Sequence = (),
+) -> Dict[str, List]:
+    """
+    Run a query and return its result column-compact.
+
+    Args:
+        cur:    Open cursor.
+        sql:    Query text with %s placeholders.
+        params: Query parameters.
+
+    Returns:
+        Column name → list of values, in result order (the format of the
+        *_columns RPCs that dataService.decodeResultRows() reads).
+    """
+    cur.execute(sql, params)
+    names = [column[0] for column in cur.description]
+    columns: Dict[str, List] = {name: [] for name in names}
+    for row in cur.fetchall():
+        for name, value in zip(names, row):
+            columns[name].append(value)
+    return columns
+
+
+def build_options_shard(cur: "psycopg2.extensions.cursor", date_key: int) -> Dict:
+    """
+    Collect the selector options and row totals for one date.
+
+    Args:
+        cur:      Open cursor.
+        date_key: dim_date key.
+
+    Returns:
+        Dict with 'options' (dimension → columns from get_lp_options_*) and
+        'totals' ('all' plus key column → {key: row count}) read from
+        landing_page_filter_combinations.
+    """
+    options = {
+        dimension: fetch_columns(
+            cur, f"SELECT * FROM get_lp_options_{dimension}(%s, NULL, NULL, NULL)", (date_key,),
+        )
+        for dimension in OPTION_DIMENSIONS
+    }
+    totals: Dict = {}
+    cur.execute(
+        "SELECT COALESCE(SUM(row_count), 0) FROM landing_page_filter_combinations "
+        "WHERE date_key = %s",
+        (date_key,),
+    )
+    totals["all"] = cur.fetchone()[0]
+    for column in TOTAL_KEYS:
+        cur.execute(
+            f"SELECT {column}, SUM(row_count) FROM landing_page_filter_combinations "
+            f"WHERE date_key = %s AND {column} IS NOT NULL GROUP BY {column}",
+            (date_key,),
+        )
+        totals[column] = {str(key): count for key, count in cur.fetchall()}
+    return {"date_key": date_key, "options": options, "totals": totals}
+
+
+def build_grouped_shard(cur: "psycopg2.extensions.cursor", date_key: int) -> Dict:
+    """
+    Collect get_landing_page_grouped results for one date.
+
+    Args:
+        cur:      Open cursor.
+        date_key: dim_date key.
+
+    Returns:
+        Dict with 'grouped': shard_key() → columns of get_landing_page_grouped_set
+        filtered by the date only.
+    """
+    grouped = {
+        shard_key(group_by_1, group_by_2): fetch_columns(
+            cur,
+            "SELECT * FROM get_landing_page_grouped_set("
+            "%s, NULL, NULL, NULL, NULL, NULL, NULL, NULL, %s, %s)",
+            (date_key, group_by_1, group_by_2),
+        )
+        for group_by_1, group_by_2 in SNAPSHOT_GROUPINGS
+    }
+    return {"date_key": date_key, "grouped": grouped}
+
+
+def build_report_1_shard(cur: "psycopg2.extensions.cursor", date_key: int) -> Dict:
+    """
+    Collect get_report_1_category_prices for every settlement of one date.
+
+    One query per price offset calls the RPC laterally for each settlement
+    present in report_price_aggregates, instead of one round trip each.
+
+    Args:
+        cur:      Open cursor.
+        date_key: dim_date key.
+
+    Returns:
+        Dict with 'report_1': price offset → {settlement_key: columns
+        (category_key, avg_price) in the RPC's order}.
+    """
+    report: Dict[str, Dict[str, Dict[str, List]]] = {}
+    for offset in REPORT_1_PRICE_OFFSETS:
+        cur.execute(
+            "SELECT s.settlement_key, r.category_key, r.avg_price "
+            "FROM (SELECT DISTINCT settlement_key FROM report_price_aggregates "
+            "      WHERE date_key = %s AND settlement_key IS NOT NULL) s "
+            "CROSS JOIN LATERAL get_report_1_category_prices(%s, s.settlement_key, %s) "
+            "WITH ORDINALITY AS r "
+            "ORDER BY s.settlement_key, r.ordinality",
+            (date_key, date_key, offset),
+        )
+        by_settlement: Dict[str, Dict[str, List]] = {}
+        for settlement_key, category_key, avg_price in cur.fetchall():
+            columns = by_settlement.setdefault(
+                str(settlement_key), {"category_key": [], "avg_price": []},
+            )
+            columns["category_key"].append(category_key)
+            columns["avg_price"].append(avg_price)
+        report[offset] = by_settlement
+    return {"date_key": date_key, "report_1": report}
+
+
+def encode_row_shard(
+    date_key: int,
+    settlement_key: int,
+    settlement_name: Optional[str],
+    rows: Sequence[Sequence],
+) -> Dict:
+    """
+    Dictionary-encode the projection rows of one settlement and date.
+
+    Args:
+        date_key:        dim_date key of the rows.
+        settlement_key:  Settlement of the rows.
+        settlement_name: Its display name.
+        rows:            Rows of _ROW_SHARD_SQL: a (key, name) pair per
+                         ROW_SHARD_DICTIONARIES entry, then ROW_SHARD_PRICES.
+
+    Returns:
+        Dict with 'dictionaries' (shard column → {'key': [...], 'name': [...]},
+        products also carrying 'tokens', their space-joined search_tokens())
+        and 'rows' (shard column → dictionary indexes, price column → values),
+        rows in the input order.
+    """
+    dictionaries: Dict[str, Dict[str, List]] = {
+        column: {"key": [], "name": []} for column, _, _ in ROW_SHARD_DICTIONARIES
+    }
+    positions: Dict[str, Dict] = {column: {} for column, _, _ in ROW_SHARD_DICTIONARIES}
+    columns: Dict[str, List] = {column: [] for column, _, _ in ROW_SHARD_DICTIONARIES}
+    columns.update({price: [] for price in ROW_SHARD_PRICES})
+
+    for row in rows:
+        for number, (column, _, _) in enumerate(ROW_SHARD_DICTIONARIES):
+            key, name = row[2 * number], row[2 * number + 1]
+            index = positions[column].get(key)
+            if index is None:
+                index = positions[column][key] = len(dictionaries[column]["key"])
+                dictionaries[column]["key"].append(key)
+                dictionaries[column]["name"].append(name)
+            columns[column].append(index)
+        for number, price in enumerate(ROW_SHARD_PRICES, 2 * len(ROW_SHARD_DICTIONARIES)):
+            columns[price].append(row[number])
+
+    dictionaries["product"]["tokens"] = [
+        " ".join(search_tokens(name)) for name in dictionaries["product"]["name"]
+    ]
+    return {
+        "date_key": date_key,
+        "settlement_key": settlement_key,
+        "settlement_name": settlement_name,
+        "dictionaries": dictionaries,
+        "rows": columns,
+    }
+
+
+def build_row_shards(
+    cur: "psycopg2.extensions.cursor",
+    date_key: int,
+    directory: Path,
+) -> Tuple[Dict[str, str], int]:
+    """
+    Write a content-hashed row shard for every small settlement of one date.
+
+    Settlements are sized from landing_page_filter_combinations; those above
+    ROW_SHARD_MAX_ROWS are skipped.
+
+    Args:
+        cur:       Open cursor.
+        date_key:  dim_date key.
+        directory: Directory receiving the date's shards.
+
+    Returns:
+        Tuple of (settlement_key → shard file name, total bytes written).
+    """
+    cur.execute(
+        "SELECT settlement_key, MIN(settlement_name) FROM landing_page_filter_combinations "
+        "WHERE date_key = %s AND settlement_key IS NOT NULL "
+        "GROUP BY settlement_key HAVING SUM(row_count) <= %s ORDER BY settlement_key",
+        (date_key, ROW_SHARD_MAX_ROWS),
+    )
+    settlements = cur.fetchall()
+    names: Dict[str, str] = {}
+    total_bytes = 0
+    for settlement_key, settlement_name in settlements:
+        cur.execute(_ROW_SHARD_SQL, (date_key, settlement_key))
+        payload = encode_row_shard(date_key, settlement_key, settlement_name, cur.fetchall())
+        name, size = write_hashed_shard(directory, str(settlement_key), payload)
+        names[str(settlement_key)] = name
+        total_bytes += size
+    return names, total_bytes
+
+
+def publish_snapshots(conn: "psycopg2.extensions.connection", dist_dir: Path) -> Dict:
+    """
+    Render every shard for the retained dates into dist_dir/data/.
+
+    Args:
+        conn:     Open psycopg2 connection.
+        dist_dir: Built React app directory (react-app/dist).
+
+    Returns:
+        The index payload written to data/index.json.gz.
+
+    Raises:
+        FileNotFoundError:      If dist_dir does not exist (app not built).
+        psycopg2.DatabaseError: On any database error; nothing is replaced.
+    """
+    if not dist_dir.is_dir():
+        raise FileNotFoundError(f"{dist_dir} not found; build the React app first.")
+    target = dist_dir / SNAPSHOT_DIR_NAME
+    staging = dist_dir / f"{SNAPSHOT_DIR_NAME}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    total_bytes = 0
+    shards: Dict[str, Dict[str, str]] = {}
+    row_shards: Dict[str, Dict[str, str]] = {}
+    try:
+        with conn.cursor() as cur:
+            dates = fetch_columns(cur, "SELECT * FROM get_lp_options_date(NULL, NULL, NULL, NULL)")
+            for date_key in dates.get("date_key", []):
+                parts = {
+                    "options": build_options_shard(cur, date_key),
+                    "grouped": build_grouped_shard(cur, date_key),
+                    "report_1": build_report_1_shard(cur, date_key),
+                }
+                shards[str(date_key)] = {}
+                for part, payload in parts.items():
+                    relative = f"{date_key}/{part}.json.gz"
+                    total_bytes += write_shard(staging / relative, payload)
+                    shards[str(date_key)][part] = relative
+                names, size = build_row_shards(cur, date_key, staging / "rows" / str(date_key))
+                row_shards[str(date_key)] = {
+                    settlement: f"rows/{date_key}/{name}" for settlement, name in names.items()
+                }
+                total_bytes += size
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        # The session only read; end its transaction either way.
+        conn.rollback()
+
+    index = {
+        "version": SNAPSHOT_VERSION,
+        "data_version": data_version(dates.get("date_key", [])),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dates": dates,
+        "groupings": [shard_key(g1, g2) for g1, g2 in SNAPSHOT_GROUPINGS],
+        "shards": shards,
+        "rows": row_shards,
+    }
+    total_bytes += write_shard(staging / "index.json.gz", index)
+
+    shutil.rmtree(target, ignore_errors=True)
+    staging.replace(target)
+    print(f"  Wrote {len(shards)} dates of snapshots ({total_bytes:,} bytes) to {target}.")
+    return index
+
+
+def main() -> None:
+    """
+    Entry point: publish snapshots for the built React app.
+
+    Exits with code 1 on missing DATABASE_URL, a missing build, or a
+    connection failure, surfacing a clear error message without a stack
+    trace.
+
+    Side effects:
+        Reads .env from the project root via python-dotenv.
+        Replaces react-app/dist/data/.
+    """
+    load_dotenv(BASE_DIR / ".env")
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        print(
+            "ERROR: DATABASE_URL is not set. "
+            "Create a .env file at the project root (see .env.example).",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    print("Connecting to Supabase …")
+    try:
+        conn = psycopg2.connect(db_url)
+    except psycopg2.OperationalError as exc:
+        print(f"ERROR: Could not connect to the database: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        print("Publishing static data snapshots …")
+        publish_snapshots(conn, REACT_DIST_DIR)
+    except FileNotFoundError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f"Snapshots published in {time.perf_counter() - started:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
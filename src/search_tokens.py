@@ -0,0 +1,150 @@
+"""
+search_tokens.py: Normalised product-search tokens for the landing-page filter.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: split product names into case-folded, transliterated search
+tokens (written by transform.py as dim_product_tokens.csv), resolve a search
+term to product keys by token prefix, and render the same normalisation as a
+SQL expression so the Supabase RPCs tokenise search terms identically.
+
+Normalisation: case-fold, transliterate Cyrillic to Latin with the Bulgarian
+streamlined system (ж → zh, щ → sht, ъ → a, …), then split on every character
+outside [a-z0-9].  "Кисело мляко 2%" and "kiselo mlyako" both become
+["kiselo", "mlyako", "2"], so a search typed in either script finds the
+product, and Latin brand names match Cyrillic spellings ("милка" → "milka").
+
+A product matches a term when every term token is a prefix of one of the
+product's tokens.  Prefix lookups are a range scan over the sorted tokens,
+which stays selective for short terms where a trigram index cannot help.
+"""
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Lower-case Cyrillic letter → Latin spelling.  Upper case is folded first.
+TRANSLITERATION: Dict[str, str] = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f",
+    "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sht", "ъ": "a", "ь": "y",
+    "ю": "yu", "я": "ya",
+    # Russian and Ukrainian letters seen in imported product names.
+    "ё": "e", "ы": "y", "э": "e", "і": "i", "ї": "yi", "є": "ye",
+}
+
+# Upper bound of every token that starts with a prefix: tokens only contain
+# [a-z0-9], and "{" sorts after all of them (in Python and in COLLATE "C").
+PREFIX_END = "{"
+
+_SEPARATOR = re.compile(r"[^a-z0-9]+")
+_TRANSLATE_TABLE = str.maketrans(TRANSLITERATION)
+
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    """
+    Return the distinct normalised tokens of a product name or search term.
+
+    Args:
+        text: Raw text; None and '' yield no tokens.
+
+    Returns:
+        Tokens in first-occurrence order, without duplicates.
+    """
+    if not text:
+        return []
+    latin = text.casefold().translate(_TRANSLATE_TABLE)
+    return list(dict.fromkeys(token for token in _SEPARATOR.split(latin) if token))
+
+
+def product_token_rows(products: Iterable[Tuple[int, Optional[str]]]) -> Iterable[Tuple[int, str]]:
+    """
+    Yield the (product_key, token) rows of dim_product_tokens.
+
+    Args:
+        products: (product_key, product_name) pairs.
+
+    Yields:
+        One (product_key, token) pair per distinct token of each name.
+    """
+    for product_key, name in products:
+        for token in search_tokens(name):
+            yield product_key, token
+
+
+def build_token_index(rows: Iterable[Tuple[int, str]]) -> Tuple[List[str], List[int]]:
+    """
+    Sort (product_key, token) rows into parallel token / key lists.
+
+    Args:
+        rows: Rows from product_token_rows() or dim_product_tokens.csv.
+
+    Returns:
+        Tuple of (tokens sorted ascending, product keys in the same order),
+        the in-memory counterpart of idx_dim_product_tokens_token.
+    """
+    ordered = sorted((token, product_key) for product_key, token in rows)
+    return [token for token, _ in ordered], [key for _, key in ordered]
+
+
+def match_product_keys(index: Tuple[List[str], List[int]], term: Optional[str]) -> Optional[Set[int]]:
+    """
+    Resolve a search term to the keys of the products it matches.
+
+    Reference implementation of the search_product_keys() SQL function.
+
+    Args:
+        index: (tokens, keys) from build_token_index().
+        term:  Search term as typed.
+
+    Returns:
+        Keys of products that have a token starting with every term token,
+        or None when the term has no tokens (no product filter).
+    """
+    terms = search_tokens(term)
+    if not terms:
+        return None
+    tokens, keys = index
+    matched: Optional[Set[int]] = None
+    # The longest token is usually the most selective; start from it.
+    for prefix in sorted(terms, key=len, reverse=True):
+        lo = bisect_left(tokens, prefix)
+        hi = bisect_left(tokens, prefix + PREFIX_END, lo)
+        found = set(keys[lo:hi])
+        matched = found if matched is None else matched & found
+        if not matched:
+            return set()
+    return matched
+
+
+def _sql_literal(text: str) -> str:
+    """Quote text as a SQL string literal."""
+    return "'" + text.replace("'", "''") + "'"
+
+
+def search_key_sql(expression: str) -> str:
+    """
+    Render search_tokens()' normalisation as a SQL expression.
+
+    The result is the space-separated token string of expression (plus
+    leading / trailing separators), ready for
+    regexp_split_to_table(…, ' ').  Upper-case Cyrillic is transliterated
+    directly, so the expression does not rely on lower() knowing Cyrillic
+    in the database's collation.
+
+    Args:
+        expression: SQL expression of type TEXT, e.g. a parameter name.
+
+    Returns:
+        SQL expression text.
+    """
+    mapping = dict(TRANSLITERATION)
+    mapping.update({letter.upper(): latin for letter, latin in TRANSLITERATION.items()})
+    single = {letter: latin for letter, latin in mapping.items() if len(latin) == 1}
+    sql = f"lower({expression})"
+    for letter, latin in mapping.items():
+        if len(latin) > 1:
+            sql = f"replace({sql}, {_sql_literal(letter)}, {_sql_literal(latin)})"
+    sql = (
+        f"translate({sql}, {_sql_literal(''.join(single))}, "
+        f"{_sql_literal(''.join(single.values()))})"
+    )
+    return f"regexp_replace({sql}, '[^a-z0-9]+', ' ', 'g')"
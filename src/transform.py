@@ -6,16 +6,36 @@ Responsibilities: parse CSVs inside each daily ZIP, build seven dimension tables
 dim_file), write date-partitioned fact CSVs under data/schema/facts/, produce a
 quality report in data/quality/, and log progress to logs/.
 """
+import argparse
 import csv
+import io
 import json
 import logging
+import marshal
+import os
 import sys
 import zipfile as _zipfile
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from columnar import (
+    NULL_VALUE,
+    column_scales,
+    current_partition,
+    partition_path,
+    read_partition,
+    read_partition_header,
+    write_partition,
+)
 from config_utils import load_config, save_state
+from search_tokens import product_token_rows
 
 
 # ---------------------------------------------------------------------------
@@ -51,14 +71,66 @@ DIM_PRODUCT_HEADER = ["product_key", "product_code", "product_name"]
 DIM_STORE_HEADER = ["store_key", "store_name", "settlement_key", "company_key"]
 DIM_FILE_HEADER = ["file_key", "file_name", "zip_date"]
 
+# Normalised product-name search tokens (see search_tokens.py), derived from
+# dim_product.csv: one row per distinct token of each product name.
+PRODUCT_TOKENS_FILE = "dim_product_tokens.csv"
+PRODUCT_TOKENS_HEADER = ["product_key", "token"]
+
+# Dimension name → (CSV file name under SCHEMA_DIR, header, natural-key fields).
+# The surrogate key column is always header[0].
+DIM_SPECS: Dict[str, Tuple[str, List[str], List[str]]] = {
+    "date":       ("dim_date.csv", DIM_DATE_HEADER, ["date"]),
+    "company":    ("dim_company.csv", DIM_COMPANY_HEADER, ["uic"]),
+    "settlement": ("dim_settlement.csv", DIM_SETTLEMENT_HEADER, ["ekatte"]),
+    "category":   ("dim_category.csv", DIM_CATEGORY_HEADER, ["category_code"]),
+    "product":    ("dim_product.csv", DIM_PRODUCT_HEADER, ["product_code", "product_name"]),
+    "store":      ("dim_store.csv", DIM_STORE_HEADER, ["store_name", "settlement_key", "company_key"]),
+    "file":       ("dim_file.csv", DIM_FILE_HEADER, ["file_name", "zip_date"]),
+}
+
 FACT_HEADER = [
     "date_key", "store_key", "file_key",
     "category_key", "product_key",
     "retail_price", "promo_price",
 ]
 
-# Header for the derived lookback fact table produced by build_lookback_table.
-# Extends FACT_HEADER with four day-over-day lookback price columns.
+# Opt-in integer price format ([settings] price_format = stotinki): prices are
+# whole stotinki (1/100 BGN) and effective_stotinki is precomputed as
+# min(retail, promo) when promo > 0, promo when retail is NULL, else retail.
+# A fact file's header names its format, so readers detect it per file and
+# both formats can coexist in facts/.  NULL is an empty cell in CSV and
+# PRICE_NULL in integer arrays.
+PRICE_FORMAT_DECIMAL = "decimal"
+PRICE_FORMAT_STOTINKI = "stotinki"
+PRICE_NULL = -1
+FACT_HEADER_STOTINKI = [
+    "date_key", "store_key", "file_key",
+    "category_key", "product_key",
+    "retail_stotinki", "promo_stotinki", "effective_stotinki",
+]
+FACT_HEADERS = {
+    PRICE_FORMAT_DECIMAL: FACT_HEADER,
+    PRICE_FORMAT_STOTINKI: FACT_HEADER_STOTINKI,
+}
+# Fact-file (retail, promo) column names per format.
+FACT_PRICE_COLUMNS = {
+    PRICE_FORMAT_DECIMAL: ("retail_price", "promo_price"),
+    PRICE_FORMAT_STOTINKI: ("retail_stotinki", "promo_stotinki"),
+}
+
+# Integer scale of price columns in columnar partitions ([settings]
+# columnar_facts, see columnar.py): stotinki are stored as they are, decimal
+# prices × 10^4, the precision of the NUMERIC(12, 4) columns in Supabase.
+PARTITION_PRICE_SCALES = {
+    PRICE_FORMAT_DECIMAL: 10000,
+    PRICE_FORMAT_STOTINKI: 100,
+}
+
+# Header for the derived lookback fact table produced by build_lookback_table
+# with the default window.  Extends FACT_HEADER with retail/promo price
+# columns for each of the previous DEFAULT_LOOKBACK_DAYS fact days; other
+# window sizes use lookback_header(n).
+DEFAULT_LOOKBACK_DAYS = 2
 LOOKBACK_HEADER = [
     "date_key", "store_key", "file_key",
     "category_key", "product_key",
@@ -67,6 +139,25 @@ LOOKBACK_HEADER = [
     "retail_price_day2", "promo_price_day2",
 ]
 
+# Columns of a lookback day index and their array typecodes: int64 keys, and
+# prices as float64 with NaN for NULL (decimal fact files) or as int64
+# stotinki with PRICE_NULL for NULL (stotinki fact files).
+DAY_INDEX_KEY_COLUMNS = ("store_key", "category_key", "product_key")
+DAY_INDEX_PRICE_COLUMNS = ("retail_price", "promo_price")
+DAY_INDEX_PRICE_TYPECODES = {PRICE_FORMAT_DECIMAL: "d", PRICE_FORMAT_STOTINKI: "q"}
+_NAN = float("nan")
+
+# Day-index cache used by build_lookback_table, created next to its output.
+# Entries are marshal-serialised column buffers; bump LOOKBACK_CACHE_VERSION
+# whenever the layout changes.
+LOOKBACK_CACHE_DIR_NAME = ".lookback_cache"
+LOOKBACK_CACHE_SUFFIX = ".marshal"
+LOOKBACK_MANIFEST_NAME = "manifest.json"
+LOOKBACK_CACHE_VERSION = 3
+
+# JSON-lines checkpoint of dimension rows inserted since the last compaction.
+DIM_JOURNAL_NAME = "dim_journal.jsonl"
+
 QUALITY_HEADER = [
     "zip_date", "total_rows", "null_prices",
     "unknown_settlements", "unknown_categories", "delimiter_anomalies",
@@ -424,6 +515,34 @@ def write_dim(path: Path, header: List[str], lookup: Dict) -> None:
     partial.replace(path)
 
 
+def write_product_tokens(dim_path: Path, tokens_path: Path) -> int:
+    """
+    Derive the product search-token table from dim_product.csv.
+
+    Args:
+        dim_path:    dim_product.csv.
+        tokens_path: Destination CSV (PRODUCT_TOKENS_HEADER columns).
+
+    Returns:
+        Number of token rows written.
+
+    Side effects:
+        Writes tokens_path.partial then renames to tokens_path.
+    """
+    partial = tokens_path.with_suffix(tokens_path.suffix + ".partial")
+    rows = 0
+    with open(dim_path, encoding="utf-8", newline="") as src, \
+            open(partial, "w", encoding="utf-8", newline="") as dst:
+        writer = csv.writer(dst)
+        writer.writerow(PRODUCT_TOKENS_HEADER)
+        products = ((int(row["product_key"]), row["product_name"]) for row in csv.DictReader(src))
+        for token_row in product_token_rows(products):
+            writer.writerow(token_row)
+            rows += 1
+    partial.replace(tokens_path)
+    return rows
+
+
 # ---------------------------------------------------------------------------
 # CSV parsing helpers
 # ---------------------------------------------------------------------------
@@ -443,6 +562,37 @@ def detect_delimiter(first_line: str) -> str:
     return ","
 
 
+@contextmanager
+def open_csv_member(
+    zf: _zipfile.ZipFile, csv_name: str,
+) -> Iterator[Tuple[str, Optional[Iterator[List[str]]]]]:
+    """
+    Stream a CSV member of a ZIP without materialising its decoded text.
+
+    The member is decoded incrementally through io.TextIOWrapper
+    (utf-8-sig, so a leading BOM is dropped) and fed to csv.reader, so only
+    one read buffer is held in memory.  The delimiter is detected from the
+    first line only, which is then chained back in front of the stream.
+
+    Args:
+        zf:       Open ZipFile.
+        csv_name: Member name inside the archive.
+
+    Yields:
+        Tuple of (delimiter, reader).  reader is None (and delimiter ',')
+        for an empty member; otherwise it yields every row including the
+        header.
+    """
+    with zf.open(csv_name) as raw, \
+         io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as text:
+        first_line = text.readline()
+        if not first_line:
+            yield ",", None
+            return
+        delimiter = detect_delimiter(first_line.rstrip("\r\n"))
+        yield delimiter, csv.reader(chain([first_line], text), delimiter=delimiter)
+
+
 def parse_price(raw: str) -> Optional[str]:
     """
     Normalise a raw price string to a decimal string or None.
@@ -465,24 +615,720 @@ def parse_price(raw: str) -> Optional[str]:
         return ""
 
 
+def price_to_stotinki(cleaned: str) -> Optional[int]:
+    """
+    Convert a parse_price() result to whole stotinki.
+
+    Args:
+        cleaned: Normalised decimal string from parse_price() ('' for NULL).
+
+    Returns:
+        The price in stotinki, rounded half-up to the nearest stotinka, or
+        None for empty, non-finite or negative values (negative amounts
+        cannot be told apart from the PRICE_NULL sentinel).
+    """
+    if not cleaned:
+        return None
+    # Fast path for the common '123' / '3.1' / '3.17' spellings.
+    whole, _dot, frac = cleaned.partition(".")
+    if len(frac) <= 2 and whole.isdigit() and whole.isascii() and (
+        not frac or (frac.isdigit() and frac.isascii())
+    ):
+        return int(whole) * 100 + int(frac.ljust(2, "0") or "0")
+    try:
+        value = Decimal(cleaned)
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or value < 0:
+        return None
+    return int((value * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def effective_stotinki(retail: Optional[int], promo: Optional[int]) -> Optional[int]:
+    """
+    Return the price a shopper pays, as computed by the landing-page projection.
+
+    Args:
+        retail: Retail price in stotinki, or None.
+        promo:  Promotional price in stotinki, or None.
+
+    Returns:
+        min(retail, promo) when promo > 0 (promo alone when retail is None),
+        otherwise retail.
+    """
+    if promo is not None and promo > 0:
+        return promo if retail is None or promo < retail else retail
+    return retail
+
+
+# ---------------------------------------------------------------------------
+# Per-ZIP parsing (runs in the coordinator or in a worker process)
+# ---------------------------------------------------------------------------
+
+class ResolutionCache:
+    """
+    Per-run memo of settlement and category resolution keyed by raw cell value.
+
+    A daily ZIP has ~1.3M rows but only a few hundred distinct settlement and
+    category codes, so normalize_settlement_code(), resolve_settlement_name()
+    and the '(unknown:...)' formatting run once per distinct raw value instead
+    of once per row.  Entries never go stale within a run because the
+    nomenclature lookups are loaded once at start-up.
+
+    Attributes:
+        settlements: Raw settlement cell → (ekatte, settlement_name, is_unknown).
+        categories:  Raw category cell → (category_code, category_name, is_unknown).
+        hits:        Number of lookups answered from the memo.
+        misses:      Number of lookups that had to be resolved.
+    """
+
+    def __init__(self, settlement_names: Dict[str, str], category_names: Dict[str, str]) -> None:
+        """
+        Args:
+            settlement_names: Settlement name lookup from load_settlement_names().
+            category_names:   Category name lookup from load_category_names().
+        """
+        self.settlement_names = settlement_names
+        self.category_names = category_names
+        self.settlements: Dict[str, Tuple[str, str, bool]] = {}
+        self.categories: Dict[str, Tuple[str, str, bool]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def settlement(self, raw_code: str) -> Tuple[str, str, bool]:
+        """
+        Resolve a raw settlement cell to its canonical code and name.
+
+        Args:
+            raw_code: Settlement cell exactly as read from the CSV (may be
+                      quoted or padded).
+
+        Returns:
+            Tuple of (ekatte, settlement_name, is_unknown).
+        """
+        entry = self.settlements.get(raw_code)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        ekatte = normalize_settlement_code(raw_code.strip().strip('"'))
+        name = resolve_settlement_name(ekatte, self.settlement_names)
+        entry = (ekatte, name, name.startswith("(unknown:"))
+        self.settlements[raw_code] = entry
+        return entry
+
+    def category(self, raw_code: str) -> Tuple[str, str, bool]:
+        """
+        Resolve a raw category cell to its code and name.
+
+        Args:
+            raw_code: Category cell exactly as read from the CSV.
+
+        Returns:
+            Tuple of (category_code, category_name, is_unknown).
+        """
+        entry = self.categories.get(raw_code)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        category_code = raw_code.strip().strip('"')
+        name = self.category_names.get(category_code)
+        if name is None:
+            name = f"(unknown:{category_code})"
+        entry = (category_code, name, name.startswith("(unknown:"))
+        self.categories[raw_code] = entry
+        return entry
+
+
+# Resolution cache installed in each pool worker by _init_worker so that the
+# nomenclature lookups are pickled once per worker instead of once per
+# submitted ZIP, and the memo is shared by every ZIP the worker parses.
+_WORKER_RESOLVER: Optional[ResolutionCache] = None
+_WORKER_PRICE_FORMAT = PRICE_FORMAT_DECIMAL
+
+
+def parse_zip(
+    zip_path: Path,
+    resolver: ResolutionCache,
+    price_format: str = PRICE_FORMAT_DECIMAL,
+) -> Dict:
+    """
+    Parse one daily ZIP into a partial result keyed only by natural keys.
+
+    No surrogate keys are assigned here, so the function has no dependency on
+    the dimension lookups and can run in a worker process.  The coordinator
+    turns the partial result into fact rows with merge_zip_result().
+
+    Args:
+        zip_path: Path to the daily ZIP archive (stem is the ISO date).
+        resolver:     Per-run ResolutionCache for settlement and category codes.
+        price_format: PRICE_FORMAT_DECIMAL keeps prices as normalised decimal
+                      strings; PRICE_FORMAT_STOTINKI converts them to integer
+                      stotinki (None for NULL) and adds the effective price.
+
+    Returns:
+        Dict with keys:
+          'zip_date'  — ISO date string taken from the ZIP file name.
+          'csv_files' — list of per-CSV dicts in archive order, each holding
+                        'csv_name', 'uic', 'company_name' and 'rows'; every
+                        row is a tuple (ekatte, settlement_name, category_code,
+                        category_name, product_code, product_name, store_name,
+                        retail_price, promo_price), with a trailing
+                        effective price in the stotinki format.
+          'quality'   — per-ZIP quality counters (QUALITY_HEADER fields).
+          'resolution' — {'hits', 'misses'} of the resolver during this ZIP.
+
+    Raises:
+        zipfile.BadZipFile: If the archive is corrupt.
+    """
+    date_str = zip_path.stem
+    q_total = 0
+    q_null_prices = 0
+    q_unknown_settlements = 0
+    q_unknown_categories = 0
+    q_delimiter_anomalies = 0
+
+    csv_files: List[Dict] = []
+    # Stotinki conversion memo keyed by normalised price string: a day has
+    # ~1.3M prices but only a few thousand distinct values.
+    stotinki: Optional[Dict[str, Optional[int]]] = (
+        {} if price_format == PRICE_FORMAT_STOTINKI else None
+    )
+    hits_before = resolver.hits
+    misses_before = resolver.misses
+
+    with _zipfile.ZipFile(zip_path, "r") as zf:
+        csv_names = [n for n in zf.namelist() if n.lower().endswith(".csv")]
+
+        for csv_name in csv_names:
+            # --------------------------------------------------
+            # Parse company name and UIC from filename
+            # --------------------------------------------------
+            stem = csv_name
+            if stem.endswith(".csv"):
+                stem = stem[:-4]
+            parts = stem.rsplit("_", 1)
+            company_name = parts[0] if len(parts) == 2 else stem
+            uic = parts[1] if len(parts) == 2 else ""
+
+            rows: List[Tuple] = []
+            csv_files.append({
+                "csv_name": csv_name,
+                "uic": uic,
+                "company_name": company_name,
+                "rows": rows,
+            })
+
+            # --------------------------------------------------
+            # Stream CSV content straight out of the ZIP member
+            # --------------------------------------------------
+            with open_csv_member(zf, csv_name) as (delimiter, reader):
+                if reader is None:
+                    continue
+                if delimiter == ";":
+                    q_delimiter_anomalies += 1
+
+                # Skip header row
+                header_row = next(reader, None)
+                if header_row is None:
+                    continue
+
+                for raw_row in reader:
+                    # Validate column count; skip malformed rows silently.
+                    if len(raw_row) < EXPECTED_COLUMNS:
+                        continue
+
+                    ekatte, sett_name, sett_unknown = resolver.settlement(
+                        raw_row[COL_SETTLEMENT]
+                    )
+                    category_code, cat_name, cat_unknown = resolver.category(
+                        raw_row[COL_CATEGORY]
+                    )
+                    store_name = raw_row[COL_STORE].strip().strip('"')
+                    product_name = raw_row[COL_PRODUCT_NAME].strip().strip('"')
+                    product_code = raw_row[COL_PRODUCT_CODE].strip().strip('"')
+                    retail_price_str = parse_price(raw_row[COL_RETAIL_PRICE])
+                    promo_price_str = parse_price(raw_row[COL_PROMO_PRICE])
+
+                    q_total += 1
+                    if sett_unknown:
+                        q_unknown_settlements += 1
+                    if cat_unknown:
+                        q_unknown_categories += 1
+
+                    if stotinki is None:
+                        if not retail_price_str:
+                            q_null_prices += 1
+                        rows.append((
+                            ekatte, sett_name,
+                            category_code, cat_name,
+                            product_code, product_name,
+                            store_name,
+                            retail_price_str, promo_price_str,
+                        ))
+                        continue
+
+                    try:
+                        retail = stotinki[retail_price_str]
+                    except KeyError:
+                        retail = stotinki[retail_price_str] = price_to_stotinki(retail_price_str)
+                    try:
+                        promo = stotinki[promo_price_str]
+                    except KeyError:
+                        promo = stotinki[promo_price_str] = price_to_stotinki(promo_price_str)
+                    if retail is None:
+                        q_null_prices += 1
+                    rows.append((
+                        ekatte, sett_name,
+                        category_code, cat_name,
+                        product_code, product_name,
+                        store_name,
+                        retail, promo, effective_stotinki(retail, promo),
+                    ))
+
+    return {
+        "zip_date": date_str,
+        "csv_files": csv_files,
+        "quality": {
+            "zip_date": date_str,
+            "total_rows": q_total,
+            "null_prices": q_null_prices,
+            "unknown_settlements": q_unknown_settlements,
+            "unknown_categories": q_unknown_categories,
+            "delimiter_anomalies": q_delimiter_anomalies,
+        },
+        "resolution": {
+            "hits": resolver.hits - hits_before,
+            "misses": resolver.misses - misses_before,
+        },
+    }
+
+
+def _init_worker(
+    settlement_names: Dict[str, str],
+    category_names: Dict[str, str],
+    price_format: str = PRICE_FORMAT_DECIMAL,
+) -> None:
+    """
+    Pool initializer: install a ResolutionCache in the worker process.
+
+    Args:
+        settlement_names: Settlement name lookup from load_settlement_names().
+        category_names:   Category name lookup from load_category_names().
+        price_format:     Fact price format passed on to parse_zip().
+    """
+    global _WORKER_RESOLVER, _WORKER_PRICE_FORMAT
+    _WORKER_RESOLVER = ResolutionCache(settlement_names, category_names)
+    _WORKER_PRICE_FORMAT = price_format
+
+
+def _parse_zip_worker(zip_path: Path) -> Dict:
+    """
+    Pool task: parse_zip() using the resolver installed by _init_worker().
+
+    Args:
+        zip_path: Path to the daily ZIP archive.
+
+    Returns:
+        Partial result dict as returned by parse_zip().
+    """
+    return parse_zip(zip_path, _WORKER_RESOLVER, _WORKER_PRICE_FORMAT)
+
+
+def iter_zip_results(
+    zip_paths: List[Path],
+    workers: int,
+    settlement_names: Dict[str, str],
+    category_names: Dict[str, str],
+    price_format: str = PRICE_FORMAT_DECIMAL,
+) -> Iterator[Tuple[Path, Optional[Dict], Optional[Exception]]]:
+    """
+    Parse ZIPs serially or in a process pool, yielding results in input order.
+
+    With workers > 1 a ProcessPoolExecutor parses up to 2 × workers ZIPs
+    ahead of the consumer.  Results are always yielded in the order of
+    zip_paths (date order), which is what keeps surrogate-key assignment in
+    merge_zip_result() deterministic.  Each process (the coordinator when
+    serial, otherwise every worker) keeps one ResolutionCache for the run.
+
+    Args:
+        zip_paths:        ZIP archives to parse, in date order.
+        workers:          Number of worker processes; <= 1 parses in-process.
+        settlement_names: Settlement name lookup from load_settlement_names().
+        category_names:   Category name lookup from load_category_names().
+        price_format:     Fact price format passed on to parse_zip().
+
+    Yields:
+        Tuples of (zip_path, partial_result, error).  Exactly one of
+        partial_result / error is None; error is the BadZipFile raised while
+        parsing a corrupt archive.
+    """
+    if workers <= 1:
+        resolver = ResolutionCache(settlement_names, category_names)
+        for zip_path in zip_paths:
+            try:
+                yield zip_path, parse_zip(zip_path, resolver, price_format), None
+            except _zipfile.BadZipFile as exc:
+                yield zip_path, None, exc
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(settlement_names, category_names, price_format),
+    ) as pool:
+        # Bounded look-ahead: only a few finished partial results are held in
+        # memory while the coordinator merges the oldest outstanding ZIP.
+        pending: Deque = deque()
+        path_iter = iter(zip_paths)
+        for zip_path in islice(path_iter, workers * 2):
+            pending.append((zip_path, pool.submit(_parse_zip_worker, zip_path)))
+
+        while pending:
+            zip_path, future = pending.popleft()
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(_parse_zip_worker, next_path)))
+            try:
+                yield zip_path, future.result(), None
+            except _zipfile.BadZipFile as exc:
+                yield zip_path, None, exc
+
+
+def merge_zip_result(
+    result: Dict,
+    dims: Dict[str, Tuple[Dict, List[int]]],
+    key_cache: Optional[Dict[str, Dict]] = None,
+) -> List[List]:
+    """
+    Assign surrogate keys for one partial result and build its fact rows.
+
+    New dimension rows are inserted in exactly the order the original
+    single-pass loop used (company and file per CSV, then date, settlement,
+    category, product and store per row), so merging partial results in date
+    order yields the same surrogate keys regardless of how many workers
+    parsed them.
+
+    Everything that is constant for a ZIP or a CSV is resolved outside the
+    row loop: the date key once per ZIP (on its first row, so a ZIP without
+    rows adds no dim_date entry), the company and file keys once per CSV.
+    Per row only the settlement, category, product and store keys are looked
+    up, through key_cache first so known members cost a single dict probe.
+
+    Args:
+        result:    Partial result dict from parse_zip().
+        dims:      Dimension name → (lookup, counter) pairs from load_dims();
+                   lookups and counters are mutated in place (SCD Type 1).
+        key_cache: Optional per-run memo shared across calls, holding one
+                   natural key → surrogate key dict per row-level dimension
+                   ('settlement', 'category', 'product', 'store').  Surrogate
+                   keys never change once assigned, so a memoised key is
+                   always valid.  Created (and discarded) when omitted.
+
+    Returns:
+        List of fact rows for the ZIP, ordered like FACT_HEADER (or
+        FACT_HEADER_STOTINKI when parse_zip() produced stotinki prices).
+    """
+    if key_cache is None:
+        key_cache = {}
+    sett_keys = key_cache.setdefault("settlement", {})
+    cat_keys = key_cache.setdefault("category", {})
+    prod_keys = key_cache.setdefault("product", {})
+    store_keys = key_cache.setdefault("store", {})
+
+    date_str = result["zip_date"]
+    date_lkp, date_ctr = dims["date"]
+    comp_lkp, comp_ctr = dims["company"]
+    sett_lkp, sett_ctr = dims["settlement"]
+    cat_lkp, cat_ctr = dims["category"]
+    prod_lkp, prod_ctr = dims["product"]
+    store_lkp, store_ctr = dims["store"]
+    file_lkp, file_ctr = dims["file"]
+
+    fact_rows: List[List] = []
+    append_fact = fact_rows.append
+    d_key: Optional[int] = None
+
+    for csv_file in result["csv_files"]:
+        csv_name = csv_file["csv_name"]
+        uic = csv_file["uic"]
+
+        # --------------------------------------------------
+        # Per-CSV invariants: company and file keys
+        # --------------------------------------------------
+        comp_key = upsert_dim(
+            comp_lkp, comp_ctr, "company_key",
+            (uic,),
+            {"uic": uic, "company_name": csv_file["company_name"]},
+        )
+        file_key = upsert_dim(
+            file_lkp, file_ctr, "file_key",
+            (csv_name, date_str),
+            {"file_name": csv_name, "zip_date": date_str},
+        )
+
+        rows = csv_file["rows"]
+        if not rows:
+            continue
+
+        # --------------------------------------------------
+        # Per-ZIP invariant: date key, on the ZIP's first row
+        # --------------------------------------------------
+        if d_key is None:
+            d_key = upsert_dim(
+                date_lkp, date_ctr, "date_key",
+                (date_str,),
+                _date_extra(date_str),
+            )
+
+        comp_key_str = str(comp_key)
+
+        for (
+            ekatte, sett_name,
+            category_code, cat_name,
+            product_code, product_name,
+            store_name,
+            *prices,
+        ) in rows:
+            sett_key = sett_keys.get(ekatte)
+            if sett_key is None:
+                sett_key = upsert_dim(
+                    sett_lkp, sett_ctr, "settlement_key",
+                    (ekatte,),
+                    {"ekatte": ekatte, "settlement_name": sett_name},
+                )
+                sett_keys[ekatte] = sett_key
+
+            cat_key = cat_keys.get(category_code)
+            if cat_key is None:
+                cat_key = upsert_dim(
+                    cat_lkp, cat_ctr, "category_key",
+                    (category_code,),
+                    {"category_code": category_code, "category_name": cat_name},
+                )
+                cat_keys[category_code] = cat_key
+
+            prod_nk = (product_code, product_name)
+            prod_key = prod_keys.get(prod_nk)
+            if prod_key is None:
+                prod_key = upsert_dim(
+                    prod_lkp, prod_ctr, "product_key",
+                    prod_nk,
+                    {"product_code": product_code, "product_name": product_name},
+                )
+                prod_keys[prod_nk] = prod_key
+
+            # dim_store is a snowflake bridge to settlement/company.
+            store_ck = (store_name, sett_key, comp_key)
+            store_key = store_keys.get(store_ck)
+            if store_key is None:
+                sett_key_str = str(sett_key)
+                store_key = upsert_dim(
+                    store_lkp, store_ctr, "store_key",
+                    (store_name, sett_key_str, comp_key_str),
+                    {
+                        "store_name": store_name,
+                        "settlement_key": sett_key_str,
+                        "company_key": comp_key_str,
+                    },
+                )
+                store_keys[store_ck] = store_key
+
+            append_fact([
+                d_key, store_key, file_key,
+                cat_key, prod_key,
+                *prices,
+            ])
+
+    return fact_rows
+
+
 # ---------------------------------------------------------------------------
 # Main ETL loop
 # ---------------------------------------------------------------------------
 
-def build_schema(force_from: str) -> None:
+def load_dims() -> Dict[str, Tuple[Dict, List[int]]]:
+    """
+    Load all seven dimension CSVs from SCHEMA_DIR for SCD Type-1 upserts.
+
+    Returns:
+        Dict mapping dimension name (see DIM_SPECS) to a (lookup, counter)
+        pair, where counter is a single-element list holding the next
+        surrogate key so upsert_dim can mutate it.
+    """
+    dims: Dict[str, Tuple[Dict, List[int]]] = {}
+    for name, (file_name, _header, key_fields) in DIM_SPECS.items():
+        lookup, next_key = load_dim(SCHEMA_DIR / file_name, key_fields)
+        dims[name] = (lookup, [next_key])
+    return dims
+
+
+def write_dims(dims: Dict[str, Tuple[Dict, List[int]]]) -> None:
+    """
+    Write all seven dimension lookups to their CSVs under SCHEMA_DIR.
+
+    Args:
+        dims: Dimension name → (lookup, counter) pairs from load_dims().
+    """
+    for name, (file_name, header, _key_fields) in DIM_SPECS.items():
+        write_dim(SCHEMA_DIR / file_name, header, dims[name][0])
+
+
+# ---------------------------------------------------------------------------
+# Dimension journal (crash-safe checkpoint between per-run compactions)
+# ---------------------------------------------------------------------------
+
+def new_dim_rows(lookup: Dict, count: int) -> List[Dict]:
+    """
+    Return the last `count` rows inserted into a dimension lookup.
+
+    upsert_dim only ever appends to the lookup dict and load_dim reads rows
+    in surrogate-key order, so dict insertion order equals key order and the
+    newest rows are at the end.  Reading them via reversed() is O(count),
+    independent of the size of the dimension.
+
+    Args:
+        lookup: Dimension lookup dict (natural key tuple → row dict).
+        count:  Number of rows inserted since the last checkpoint.
+
+    Returns:
+        The newest `count` row dicts in insertion (surrogate-key) order.
+    """
+    if count <= 0:
+        return []
+    rows = list(islice(reversed(lookup.values()), count))
+    rows.reverse()
+    return rows
+
+
+def append_dim_journal(journal_path: Path, new_rows: Dict[str, List[Dict]]) -> int:
+    """
+    Append newly inserted dimension rows to the journal and fsync it.
+
+    Each row is written as one JSON line {"dim": <name>, "row": <row dict>}.
+
+    Args:
+        journal_path: Path to the JSON-lines journal (created if absent).
+        new_rows:     Dimension name → rows inserted since the last checkpoint.
+
+    Returns:
+        Number of rows appended.
+
+    Side effects:
+        Flushes and fsyncs the journal so the rows survive a crash before
+        the matching fact file is written.
+    """
+    appended = 0
+    with open(journal_path, "a", encoding="utf-8", newline="\n") as fh:
+        for name, rows in new_rows.items():
+            for row in rows:
+                fh.write(json.dumps({"dim": name, "row": row}, ensure_ascii=False))
+                fh.write("\n")
+                appended += 1
+        fh.flush()
+        os.fsync(fh.fileno())
+    return appended
+
+
+def replay_dim_journal(journal_path: Path, dims: Dict[str, Tuple[Dict, List[int]]]) -> int:
+    """
+    Re-apply journal rows left behind by an interrupted run.
+
+    Rows whose natural key is already present (e.g. the crash happened after
+    the dimension CSVs were compacted but before the journal was removed)
+    are ignored, so replay is idempotent.  A truncated final line from a
+    crash mid-append is skipped with a warning.
+
+    Args:
+        journal_path: Path to the JSON-lines journal.  Absent → no-op.
+        dims:         Dimension name → (lookup, counter) pairs from
+                      load_dims(); mutated in place.
+
+    Returns:
+        Number of rows added to the lookups.
+    """
+    if not journal_path.exists():
+        return 0
+
+    replayed = 0
+    with open(journal_path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                name = entry["dim"]
+                row = entry["row"]
+                _file_name, header, key_fields = DIM_SPECS[name]
+                nat_key = tuple(row[f] for f in key_fields)
+                sk = int(row[header[0]])
+            except (ValueError, KeyError, TypeError) as exc:
+                logging.warning(
+                    "Ignoring unreadable dim journal line %d in %s: %s",
+                    line_no, journal_path.name, exc,
+                )
+                continue
+
+            lookup, counter = dims[name]
+            if nat_key in lookup:
+                continue
+            lookup[nat_key] = row
+            if sk >= counter[0]:
+                counter[0] = sk + 1
+            replayed += 1
+
+    return replayed
+
+
+def build_schema(
+    force_from: str,
+    workers: int = 1,
+    price_format: str = PRICE_FORMAT_DECIMAL,
+    columnar: bool = False,
+) -> Tuple[str, List[Dict]]:
     """
     Read all ZIPs in data/raw/, populate all 7 dimensions, write fact CSVs.
 
+    ZIPs are parsed by parse_zip(), optionally in a pool of worker
+    processes, and merged one at a time in date order by merge_zip_result().
+    The output is identical for every value of workers.
+
     Args:
         force_from: ISO date string (YYYY-MM-DD).  Fact files for dates >=
                     force_from are deleted and re-created even when they
                     already exist.  Empty string disables forcing.
+        workers:    Number of worker processes used to parse ZIPs.  1 (the
+                    default) parses in the current process.
+        price_format: Format of newly written fact files: PRICE_FORMAT_DECIMAL
+                    (FACT_HEADER, the default) or PRICE_FORMAT_STOTINKI
+                    (FACT_HEADER_STOTINKI).  Existing fact files keep the
+                    format they were written in until reprocessed.
+        columnar:   Also write a columnar partition (YYYY-MM-DD.kcol, see
+                    columnar.py) next to each new fact CSV.
+
+    Dimension rows inserted by each ZIP are appended to the journal
+    (SCHEMA_DIR/dim_journal.jsonl) before that ZIP's fact file is written;
+    the seven dimension CSVs are rewritten once at the end of the run and
+    the journal is removed.  A run interrupted before compaction is
+    recovered by the next run, which replays the journal first.
+    dim_product_tokens.csv is rederived from dim_product.csv whenever the
+    dimensions are rewritten (or when it is missing).
+
+    Returns:
+        Tuple of (max_processed_date, quality_rows).
+
+    Raises:
+        ValueError: If price_format is not a known format.
 
     Side effects:
-        Creates SCHEMA_DIR/facts/, writes dimension CSVs and fact CSVs,
-        writes a quality report to data/quality/, saves last_processed_date
-        to config.ini.
+        Creates SCHEMA_DIR/facts/, writes dimension CSVs, fact CSVs and the
+        transient dimension journal.
     """
+    if price_format not in FACT_HEADERS:
+        raise ValueError(f"Unknown price_format {price_format!r}")
+    fact_header = FACT_HEADERS[price_format]
+
     SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
     FACTS_DIR.mkdir(parents=True, exist_ok=True)
     QUALITY_DIR.mkdir(parents=True, exist_ok=True)
@@ -494,44 +1340,26 @@ def build_schema(force_from: str) -> None:
     category_names = load_category_names()
 
     # ------------------------------------------------------------------
-    # Load existing dimensions (SCD Type 1: natural key → row)
+    # Load existing dimensions (SCD Type 1: natural key → row), then replay
+    # rows journaled by a previous run that did not reach compaction.
     # ------------------------------------------------------------------
-    dim_paths = {
-        "date":       SCHEMA_DIR / "dim_date.csv",
-        "company":    SCHEMA_DIR / "dim_company.csv",
-        "settlement": SCHEMA_DIR / "dim_settlement.csv",
-        "category":   SCHEMA_DIR / "dim_category.csv",
-        "product":    SCHEMA_DIR / "dim_product.csv",
-        "store":      SCHEMA_DIR / "dim_store.csv",
-        "file":       SCHEMA_DIR / "dim_file.csv",
-    }
-
-    date_lkp, date_ctr_val = load_dim(dim_paths["date"], ["date"])
-    comp_lkp, comp_ctr_val = load_dim(dim_paths["company"], ["uic"])
-    sett_lkp, sett_ctr_val = load_dim(dim_paths["settlement"], ["ekatte"])
-    cat_lkp, cat_ctr_val = load_dim(dim_paths["category"], ["category_code"])
-    prod_lkp, prod_ctr_val = load_dim(dim_paths["product"], ["product_code", "product_name"])
-    store_lkp, store_ctr_val = load_dim(dim_paths["store"], ["store_name", "settlement_key", "company_key"])
-    file_lkp, file_ctr_val = load_dim(dim_paths["file"], ["file_name", "zip_date"])
-
-    # Counters as single-element lists so upsert_dim can mutate them.
-    date_ctr = [date_ctr_val]
-    comp_ctr = [comp_ctr_val]
-    sett_ctr = [sett_ctr_val]
-    cat_ctr = [cat_ctr_val]
-    prod_ctr = [prod_ctr_val]
-    store_ctr = [store_ctr_val]
-    file_ctr = [file_ctr_val]
+    dims = load_dims()
+    journal_path = SCHEMA_DIR / DIM_JOURNAL_NAME
+    replayed = replay_dim_journal(journal_path, dims)
+    if replayed:
+        logging.info("Replayed %d dimension rows from %s", replayed, journal_path.name)
 
     # ------------------------------------------------------------------
     # Enumerate ZIPs
     # ------------------------------------------------------------------
     zips = sorted(p for p in RAW_DIR.iterdir() if p.suffix == ".zip")
     total_zips = len(zips)
+    zip_positions = {zip_path: idx for idx, zip_path in enumerate(zips, start=1)}
     quality_rows: List[Dict] = []
     max_processed_date = ""
 
-    for zip_idx, zip_path in enumerate(zips, start=1):
+    to_parse: List[Path] = []
+    for zip_path in zips:
         date_str = zip_path.stem  # e.g. "2026-02-15"
 
         # Check skip condition: fact file already exists and no forcing needed.
@@ -541,196 +1369,90 @@ def build_schema(force_from: str) -> None:
             logging.debug("Skipping already-processed ZIP %s", date_str)
             continue
 
-        # If force re-process: delete existing fact file.
+        # If force re-process: delete existing fact file and its partition.
         if fact_path.exists():
             fact_path.unlink()
+        if partition_path(fact_path).exists():
+            partition_path(fact_path).unlink()
 
-        # ------------------------------------------------------------------
-        # Parse ZIP
-        # ------------------------------------------------------------------
         if not _zipfile.is_zipfile(zip_path):
             logging.warning("Skipping non-ZIP or corrupt file: %s", zip_path.name)
             continue
 
-        q_total = 0
-        q_null_prices = 0
-        q_unknown_settlements = 0
-        q_unknown_categories = 0
-        q_delimiter_anomalies = 0
-
-        fact_rows: List[List] = []
-
-        try:
-            with _zipfile.ZipFile(zip_path, "r") as zf:
-                csv_names = [n for n in zf.namelist() if n.lower().endswith(".csv")]
-
-                for csv_name in csv_names:
-                    # --------------------------------------------------
-                    # Parse company name and UIC from filename
-                    # --------------------------------------------------
-                    stem = csv_name
-                    if stem.endswith(".csv"):
-                        stem = stem[:-4]
-                    parts = stem.rsplit("_", 1)
-                    company_name = parts[0] if len(parts) == 2 else stem
-                    uic = parts[1] if len(parts) == 2 else ""
-
-                    comp_key = upsert_dim(
-                        comp_lkp, comp_ctr, "company_key",
-                        (uic,),
-                        {"uic": uic, "company_name": company_name},
-                    )
-
-                    # --------------------------------------------------
-                    # Upsert dim_file
-                    # --------------------------------------------------
-                    file_key = upsert_dim(
-                        file_lkp, file_ctr, "file_key",
-                        (csv_name, date_str),
-                        {"file_name": csv_name, "zip_date": date_str},
-                    )
-
-                    # --------------------------------------------------
-                    # Read CSV content
-                    # --------------------------------------------------
-                    raw_bytes = zf.read(csv_name)
-                    text = raw_bytes.decode("utf-8-sig")
-                    lines = text.splitlines()
-                    if not lines:
-                        continue
-
-                    delimiter = detect_delimiter(lines[0])
-                    if delimiter == ";":
-                        q_delimiter_anomalies += 1
+        to_parse.append(zip_path)
 
-                    reader = csv.reader(lines, delimiter=delimiter)
-                    # Skip header row
-                    header_row = next(reader, None)
-                    if header_row is None:
-                        continue
+    if workers > 1 and to_parse:
+        logging.info("Parsing %d ZIPs with %d worker processes", len(to_parse), workers)
 
-                    for raw_row in reader:
-                        # Validate column count; skip malformed rows silently.
-                        if len(raw_row) < EXPECTED_COLUMNS:
-                            continue
+    key_cache: Dict[str, Dict] = {}
+    resolution_hits = 0
+    resolution_misses = 0
 
-                        ekatte = normalize_settlement_code(
-                            raw_row[COL_SETTLEMENT].strip().strip('"')
-                        )
-                        store_name = raw_row[COL_STORE].strip().strip('"')
-                        product_name = raw_row[COL_PRODUCT_NAME].strip().strip('"')
-                        product_code = raw_row[COL_PRODUCT_CODE].strip().strip('"')
-                        category_code = raw_row[COL_CATEGORY].strip().strip('"')
-                        retail_price_str = parse_price(raw_row[COL_RETAIL_PRICE])
-                        promo_price_str = parse_price(raw_row[COL_PROMO_PRICE])
-
-                        q_total += 1
-                        if not retail_price_str:
-                            q_null_prices += 1
+    for zip_path, result, error in iter_zip_results(
+        to_parse, workers, settlement_names, category_names, price_format,
+    ):
+        date_str = zip_path.stem
+        if error is not None:
+            logging.error("Corrupt ZIP %s: %s — skipping", zip_path.name, error)
+            continue
 
-                        # --------------------------------------------------
-                        # Upsert dim_date
-                        # --------------------------------------------------
-                        d_key = upsert_dim(
-                            date_lkp, date_ctr, "date_key",
-                            (date_str,),
-                            _date_extra(date_str),
-                        )
-
-                        # --------------------------------------------------
-                        # Upsert dim_settlement
-                        # --------------------------------------------------
-                        sett_name = resolve_settlement_name(ekatte, settlement_names)
-                        if sett_name.startswith("(unknown:"):
-                            q_unknown_settlements += 1
-                        sett_key = upsert_dim(
-                            sett_lkp, sett_ctr, "settlement_key",
-                            (ekatte,),
-                            {"ekatte": ekatte, "settlement_name": sett_name},
-                        )
-
-                        # --------------------------------------------------
-                        # Upsert dim_category
-                        # --------------------------------------------------
-                        cat_name = category_names.get(category_code, f"(unknown:{category_code})")
-                        if cat_name.startswith("(unknown:"):
-                            q_unknown_categories += 1
-                        cat_key = upsert_dim(
-                            cat_lkp, cat_ctr, "category_key",
-                            (category_code,),
-                            {"category_code": category_code, "category_name": cat_name},
-                        )
-
-                        # --------------------------------------------------
-                        # Upsert dim_product
-                        # --------------------------------------------------
-                        prod_key = upsert_dim(
-                            prod_lkp, prod_ctr, "product_key",
-                            (product_code, product_name),
-                            {"product_code": product_code, "product_name": product_name},
-                        )
-
-                        # --------------------------------------------------
-                        # Upsert dim_store (snowflake bridge to settlement/company)
-                        # --------------------------------------------------
-                        store_key = upsert_dim(
-                            store_lkp, store_ctr, "store_key",
-                            (store_name, str(sett_key), str(comp_key)),
-                            {
-                                "store_name": store_name,
-                                "settlement_key": str(sett_key),
-                                "company_key": str(comp_key),
-                            },
-                        )
-
-                        fact_rows.append([
-                            d_key, store_key, file_key,
-                            cat_key, prod_key,
-                            retail_price_str, promo_price_str,
-                        ])
+        counters_before = {name: counter[0] for name, (_lkp, counter) in dims.items()}
+        fact_rows = merge_zip_result(result, dims, key_cache)
+        resolution_hits += result["resolution"]["hits"]
+        resolution_misses += result["resolution"]["misses"]
 
-        except _zipfile.BadZipFile as exc:
-            logging.error("Corrupt ZIP %s: %s — skipping", zip_path.name, exc)
-            continue
+        # ------------------------------------------------------------------
+        # Journal the dimension rows this ZIP inserted BEFORE its fact file
+        # appears, so a restart that skips the fact file still has them.
+        # ------------------------------------------------------------------
+        append_dim_journal(journal_path, {
+            name: new_dim_rows(lookup, counter[0] - counters_before[name])
+            for name, (lookup, counter) in dims.items()
+        })
 
         # ------------------------------------------------------------------
         # Write fact file atomically
         # ------------------------------------------------------------------
+        fact_path = FACTS_DIR / f"{date_str}.csv"
         fact_partial = fact_path.with_suffix(fact_path.suffix + ".partial")
         with open(fact_partial, "w", encoding="utf-8", newline="") as fh:
             writer = csv.writer(fh)
-            writer.writerow(FACT_HEADER)
+            writer.writerow(fact_header)
             writer.writerows(fact_rows)
         fact_partial.replace(fact_path)
-
-        # ------------------------------------------------------------------
-        # Write all 7 dimension CSVs atomically after each ZIP (crash safety)
-        # ------------------------------------------------------------------
-        write_dim(dim_paths["date"], DIM_DATE_HEADER, date_lkp)
-        write_dim(dim_paths["company"], DIM_COMPANY_HEADER, comp_lkp)
-        write_dim(dim_paths["settlement"], DIM_SETTLEMENT_HEADER, sett_lkp)
-        write_dim(dim_paths["category"], DIM_CATEGORY_HEADER, cat_lkp)
-        write_dim(dim_paths["product"], DIM_PRODUCT_HEADER, prod_lkp)
-        write_dim(dim_paths["store"], DIM_STORE_HEADER, store_lkp)
-        write_dim(dim_paths["file"], DIM_FILE_HEADER, file_lkp)
+        if columnar:
+            write_fact_partition(fact_path, fact_header, fact_rows, price_format)
 
         if date_str > max_processed_date:
             max_processed_date = date_str
 
-        quality_rows.append({
-            "zip_date": date_str,
-            "total_rows": q_total,
-            "null_prices": q_null_prices,
-            "unknown_settlements": q_unknown_settlements,
-            "unknown_categories": q_unknown_categories,
-            "delimiter_anomalies": q_delimiter_anomalies,
-        })
+        quality_rows.append(result["quality"])
 
         logging.info(
             "Processed ZIP %d/%d (%s) — %d rows",
-            zip_idx, total_zips, date_str, q_total,
+            zip_positions[zip_path], total_zips, date_str, result["quality"]["total_rows"],
         )
 
+    if resolution_hits or resolution_misses:
+        logging.info(
+            "Settlement/category resolution cache: %d hits, %d misses",
+            resolution_hits, resolution_misses,
+        )
+
+    # ------------------------------------------------------------------
+    # Compact: write all 7 dimension CSVs once, then drop the journal.
+    # Then rederive the product search tokens (also for a schema built
+    # before they existed).
+    # ------------------------------------------------------------------
+    product_path = SCHEMA_DIR / DIM_SPECS["product"][0]
+    tokens_path = SCHEMA_DIR / PRODUCT_TOKENS_FILE
+    if journal_path.exists():
+        write_dims(dims)
+        journal_path.unlink()
+        write_product_tokens(product_path, tokens_path)
+    elif product_path.exists() and not tokens_path.exists():
+        write_product_tokens(product_path, tokens_path)
+
     return max_processed_date, quality_rows
 
 
@@ -762,54 +1484,819 @@ def load_fact_dict(fact_path: Path) -> Dict[Tuple, Tuple[str, str]]:
     predicate used by build_lookback_table for day-over-day lookback.
 
     Args:
-        fact_path: Path to a date-partitioned fact CSV (7-column FACT_HEADER
-                   format).  If the file does not exist, an empty dict is
-                   returned; no error is raised.
+        fact_path: Path to a date-partitioned fact CSV (FACT_HEADER or
+                   FACT_HEADER_STOTINKI format).  If the file does not exist,
+                   an empty dict is returned; no error is raised.
 
     Returns:
         Dict mapping (store_key, category_key, product_key) string tuples to
-        a (retail_price, promo_price) string pair.  Where a key appears more
-        than once (see Assumption A1 in request.md), the last row wins.
+        a (retail, promo) string pair in the file's price format (decimal
+        strings or stotinki).  Where a key appears more than once (see
+        Assumption A1 in request.md), the last row wins.  When the CSV has a
+        current columnar partition it is read instead, and decimal prices
+        come back in shortest form ('2.5' rather than '2.50').
     """
     lookup: Dict[Tuple, Tuple[str, str]] = {}
     if not fact_path.exists():
         return lookup
+    if current_partition(fact_path) is not None:
+        columns = read_fact_columns(fact_path)
+        if day_index_price_format(columns) == PRICE_FORMAT_STOTINKI:
+            format_value = _format_stotinki_value
+        else:
+            format_value = _format_price_value
+        for store, cat, prod, retail, promo in zip(*(
+            columns[name] for name in DAY_INDEX_KEY_COLUMNS + DAY_INDEX_PRICE_COLUMNS
+        )):
+            lookup[(str(store), str(cat), str(prod))] = (
+                format_value(retail), format_value(promo),
+            )
+        return lookup
     with open(fact_path, encoding="utf-8", newline="") as fh:
         reader = csv.DictReader(fh)
+        if reader.fieldnames is None:
+            return lookup
+        retail_col, promo_col = FACT_PRICE_COLUMNS[fact_price_format(reader.fieldnames)]
         for row in reader:
             composite_key = (
                 row["store_key"],
                 row["category_key"],
                 row["product_key"],
             )
-            lookup[composite_key] = (row["retail_price"], row["promo_price"])
+            lookup[composite_key] = (row[retail_col], row[promo_col])
     return lookup
 
 
-def build_lookback_table(facts_dir: Path, output_path: Path) -> None:
+def fact_price_format(header: List[str]) -> str:
+    """
+    Return the price format a fact CSV header was written in.
+
+    Args:
+        header: First row of a fact (or lookback) CSV.
+
+    Returns:
+        PRICE_FORMAT_STOTINKI or PRICE_FORMAT_DECIMAL.
+
+    Raises:
+        ValueError: If the header has neither format's price columns.
+    """
+    for price_format, (retail_col, promo_col) in FACT_PRICE_COLUMNS.items():
+        if retail_col in header and promo_col in header:
+            return price_format
+    raise ValueError(f"Fact header has no price columns: {header}")
+
+
+def read_fact_header(fact_path: Path) -> List[str]:
+    """
+    Return the header row of a fact CSV.
+
+    Args:
+        fact_path: Date-partitioned fact CSV.
+
+    Returns:
+        Header cells, or an empty list for an empty file.
+    """
+    with open(fact_path, encoding="utf-8", newline="") as fh:
+        return next(csv.reader(fh), [])
+
+
+# ---------------------------------------------------------------------------
+# Columnar fact partitions (.kcol files next to the fact CSVs)
+# ---------------------------------------------------------------------------
+
+def scale_price(cleaned: str, scale: int) -> int:
     """
-    Build the derived lookback fact table from the three most recent fact CSVs.
+    Convert a normalised decimal price string to an integer at a given scale.
 
-    Identifies D (latest fact date), D-1, and D-2 from facts_dir.  For each
-    row in D, produces an 11-column output row consisting of D's 7 original
-    columns plus retail_price_day1, promo_price_day1 (from the D-1 dict) and
-    retail_price_day2, promo_price_day2 (from the D-2 dict).  Missing
-    lookback values are stored as empty string (NULL equivalent in CSV),
-    consistent with the existing promo_price nullability convention.
+    Args:
+        cleaned: Decimal string from parse_price() ('' for NULL).
+        scale:   Multiplier applied before rounding (a power of ten).
+
+    Returns:
+        value × scale rounded half-up, or NULL_VALUE for an empty string or
+        a value that does not fit an int64 (inf, nan, huge amounts).
+    """
+    if not cleaned:
+        return NULL_VALUE
+    try:
+        value = Decimal(cleaned) * scale
+    except InvalidOperation:
+        return NULL_VALUE
+    if not value.is_finite() or abs(value) >= 2 ** 63 - 1:
+        return NULL_VALUE
+    return int(value.to_integral_value(ROUND_HALF_UP))
+
+
+def _partition_price_converter(price_format: str):
+    """
+    Return a memoised fact-cell → partition-integer converter for a format.
+
+    Args:
+        price_format: PRICE_FORMAT_DECIMAL or PRICE_FORMAT_STOTINKI.
+
+    Returns:
+        Callable mapping a price cell (decimal string, stotinki int or
+        string, '' or None for NULL) to its integer at
+        PARTITION_PRICE_SCALES[price_format], NULL_VALUE for NULL.
+    """
+    scale = PARTITION_PRICE_SCALES[price_format]
+    memo: Dict = {None: NULL_VALUE, "": NULL_VALUE}
+
+    def convert(cell) -> int:
+        value = memo.get(cell)
+        if value is None:
+            if isinstance(cell, int):
+                value = cell
+            elif price_format == PRICE_FORMAT_STOTINKI:
+                value = int(cell)
+            else:
+                value = scale_price(cell, scale)
+            memo[cell] = value
+        return value
+
+    return convert
+
+
+def fact_partition_columns(
+    header: List[str],
+    fact_rows: Iterable[List],
+    price_format: str,
+) -> Dict[str, array]:
+    """
+    Convert fact rows to the int64 columns stored in a partition.
+
+    Args:
+        header:       Fact header the rows follow (FACT_HEADERS[price_format]).
+        fact_rows:    Fact rows as produced by merge_zip_result() or read
+                      back from the CSV (keys may be ints or strings).
+        price_format: Price format of the rows.
+
+    Returns:
+        Column name → array('q') in header order; prices at
+        PARTITION_PRICE_SCALES[price_format] with NULL_VALUE for NULL.
+    """
+    n_keys = len(FACT_HEADER) - 2
+    columns = {name: array("q") for name in header}
+    key_appends = [columns[name].append for name in header[:n_keys]]
+    price_appends = [columns[name].append for name in header[n_keys:]]
+    convert = _partition_price_converter(price_format)
+    for row in fact_rows:
+        for append, cell in zip(key_appends, row):
+            append(int(cell))
+        for append, cell in zip(price_appends, row[n_keys:]):
+            append(convert(cell))
+    return columns
+
+
+def write_fact_partition(
+    fact_path: Path,
+    header: List[str],
+    fact_rows: Iterable[List],
+    price_format: str,
+) -> Path:
+    """
+    Write the columnar partition that mirrors a just-written fact CSV.
+
+    Args:
+        fact_path:    Fact CSV (already in place; its signature is recorded).
+        header:       Header the CSV was written with.
+        fact_rows:    The rows written to the CSV.
+        price_format: Price format of the rows.
+
+    Returns:
+        Path of the written .kcol partition.
+    """
+    path = partition_path(fact_path)
+    columns = fact_partition_columns(header, fact_rows, price_format)
+    scale = PARTITION_PRICE_SCALES[price_format]
+    write_partition(
+        path, columns,
+        scales={name: scale for name in header[len(FACT_HEADER) - 2:]},
+        source=fact_path,
+        meta={"price_format": price_format},
+    )
+    return path
+
+
+def read_fact_partition(fact_path: Path) -> Tuple[str, Dict[str, array], Dict[str, int]]:
+    """
+    Return every column of a fact file as partition integers.
+
+    Uses the file's current partition when there is one, otherwise parses
+    the CSV.
+
+    Args:
+        fact_path: Date-partitioned fact CSV.
+
+    Returns:
+        Tuple of (price_format, column name → array('q') in header order,
+        column name → scale).
+    """
+    part = current_partition(fact_path)
+    if part is not None:
+        try:
+            header, columns = read_partition(part)
+            return header["meta"]["price_format"], columns, column_scales(header)
+        except (OSError, KeyError, ValueError) as exc:
+            logging.warning("Ignoring unreadable partition %s: %s", part.name, exc)
+    with open(fact_path, encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None) or list(FACT_HEADER)
+        price_format = fact_price_format(header)
+        columns = fact_partition_columns(header, reader, price_format)
+    scale = PARTITION_PRICE_SCALES[price_format]
+    return price_format, columns, {
+        name: (scale if idx >= len(FACT_HEADER) - 2 else 1)
+        for idx, name in enumerate(header)
+    }
+
+
+def _day_columns_from_partition(part: Path) -> Dict[str, array]:
+    """
+    Load the day-index columns (see read_fact_columns()) from a partition.
+
+    Args:
+        part: Current .kcol partition of a fact CSV.
+
+    Returns:
+        Same dict read_fact_columns() builds from the CSV.
+    """
+    header = read_partition_header(part)
+    price_format = header["meta"]["price_format"]
+    price_names = FACT_PRICE_COLUMNS[price_format]
+    _, raw = read_partition(part, DAY_INDEX_KEY_COLUMNS + price_names)
+    scale = column_scales(header)[price_names[0]]
+
+    columns = {name: raw[name] for name in DAY_INDEX_KEY_COLUMNS}
+    for name, source in zip(DAY_INDEX_PRICE_COLUMNS, price_names):
+        if price_format == PRICE_FORMAT_STOTINKI:
+            columns[name] = array("q", [
+                PRICE_NULL if value == NULL_VALUE else value for value in raw[source]
+            ])
+        else:
+            columns[name] = array("d", [
+                _NAN if value == NULL_VALUE else value / scale for value in raw[source]
+            ])
+    return columns
+
+
+# ---------------------------------------------------------------------------
+# Lookback day indexes (columnar, sorted by composite key) and their cache
+# ---------------------------------------------------------------------------
+
+def _parse_price_value(raw: str) -> float:
+    """
+    Convert a fact-CSV price string to a float, with NaN standing for NULL.
+
+    Args:
+        raw: Price string as written by build_schema ('' for NULL).
+
+    Returns:
+        The price as a float, or NaN for an empty string.
+    """
+    return float(raw) if raw else _NAN
+
+
+def _format_price_value(value: float) -> str:
+    """
+    Format a day-index price for the lookback CSV.
+
+    Args:
+        value: Price float; NaN means NULL.
+
+    Returns:
+        Shortest round-trip decimal string, or '' for NaN.
+    """
+    return "" if value != value else repr(value)
+
+
+def _parse_stotinki_value(raw: str) -> int:
+    """
+    Convert a stotinki fact-CSV cell to an int, with PRICE_NULL for NULL.
+
+    Args:
+        raw: Stotinki string as written by build_schema ('' for NULL).
+
+    Returns:
+        The price in stotinki, or PRICE_NULL for an empty string.
+    """
+    return int(raw) if raw else PRICE_NULL
+
+
+def _format_stotinki_value(value: int) -> str:
+    """
+    Format a stotinki day-index price for the lookback CSV.
+
+    Args:
+        value: Price in stotinki; PRICE_NULL means NULL.
+
+    Returns:
+        Decimal integer string, or '' for PRICE_NULL.
+    """
+    return "" if value == PRICE_NULL else str(value)
+
+
+def read_fact_columns(fact_path: Path) -> Dict[str, array]:
+    """
+    Read a fact CSV into typed column arrays in file order.
+
+    When the CSV has a current columnar partition (see columnar.py) the
+    columns are taken from it instead of parsing the CSV.
+
+    Args:
+        fact_path: Date-partitioned fact CSV (FACT_HEADER or
+                   FACT_HEADER_STOTINKI format, detected from its header).
+
+    Returns:
+        Dict with array('q') columns 'store_key', 'category_key' and
+        'product_key' and price columns 'retail_price' and 'promo_price',
+        one element per fact row.  Prices are array('d') with NaN for NULL
+        for a decimal file, array('q') stotinki with PRICE_NULL for NULL for
+        a stotinki file.
+    """
+    part = current_partition(fact_path)
+    if part is not None:
+        try:
+            return _day_columns_from_partition(part)
+        except (OSError, KeyError, ValueError) as exc:
+            logging.warning("Ignoring unreadable partition %s: %s", part.name, exc)
+
+    columns = {name: array("q") for name in DAY_INDEX_KEY_COLUMNS}
+    columns.update({name: array("d") for name in DAY_INDEX_PRICE_COLUMNS})
+    with open(fact_path, encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return columns
+        price_format = fact_price_format(header)
+        if price_format == PRICE_FORMAT_STOTINKI:
+            parse_value = _parse_stotinki_value
+            columns.update({name: array("q") for name in DAY_INDEX_PRICE_COLUMNS})
+        else:
+            parse_value = _parse_price_value
+        positions = [
+            header.index(name)
+            for name in DAY_INDEX_KEY_COLUMNS + FACT_PRICE_COLUMNS[price_format]
+        ]
+        s_pos, c_pos, p_pos, r_pos, pr_pos = positions
+        stores, cats, prods = (columns[name].append for name in DAY_INDEX_KEY_COLUMNS)
+        retails, promos = (columns[name].append for name in DAY_INDEX_PRICE_COLUMNS)
+        for row in reader:
+            stores(int(row[s_pos]))
+            cats(int(row[c_pos]))
+            prods(int(row[p_pos]))
+            retails(parse_value(row[r_pos]))
+            promos(parse_value(row[pr_pos]))
+    return columns
+
+
+def day_index_price_format(index: Dict[str, array]) -> str:
+    """
+    Return the price format of a day index or fact column dict.
+
+    Args:
+        index: Columns from read_fact_columns() or a day index.
+
+    Returns:
+        PRICE_FORMAT_STOTINKI for integer price arrays, else
+        PRICE_FORMAT_DECIMAL.
+    """
+    if index["retail_price"].typecode == DAY_INDEX_PRICE_TYPECODES[PRICE_FORMAT_STOTINKI]:
+        return PRICE_FORMAT_STOTINKI
+    return PRICE_FORMAT_DECIMAL
+
+
+def convert_day_prices(index: Dict[str, array], price_format: str) -> Dict[str, array]:
+    """
+    Return a day index with its prices in the requested format.
+
+    Needed only while facts/ holds both formats (after price_format was
+    switched), so that every day in a lookback window compares like with like.
+
+    Args:
+        index:        Day index from sort_day_index() / load_day_index().
+        price_format: Target PRICE_FORMAT_DECIMAL or PRICE_FORMAT_STOTINKI.
+
+    Returns:
+        The index itself when it is already in price_format, otherwise a
+        copy sharing the key arrays with converted price arrays.
+    """
+    if day_index_price_format(index) == price_format:
+        return index
+    converted = dict(index)
+    for name in DAY_INDEX_PRICE_COLUMNS:
+        if price_format == PRICE_FORMAT_STOTINKI:
+            values = []
+            for value in index[name]:
+                stotinki = price_to_stotinki("" if value != value else repr(value))
+                values.append(PRICE_NULL if stotinki is None else stotinki)
+            converted[name] = array("q", values)
+        else:
+            converted[name] = array("d", [
+                _NAN if value == PRICE_NULL else value / 100 for value in index[name]
+            ])
+    return converted
+
+
+def _key_widths(indexes: List[Dict[str, array]]) -> Tuple[int, int]:
+    """
+    Return the bit widths that pack (category_key, product_key) losslessly.
+
+    Args:
+        indexes: Day indexes or fact column dicts that will be compared.
+
+    Returns:
+        Tuple (category_bits, product_bits) large enough for every key in
+        every index, so composite keys built by _composite_keys() order
+        exactly like (store_key, category_key, product_key) tuples.
+    """
+    cat_max = max((max(ix["category_key"], default=0) for ix in indexes), default=0)
+    prod_max = max((max(ix["product_key"], default=0) for ix in indexes), default=0)
+    return cat_max.bit_length(), prod_max.bit_length()
+
+
+def _composite_keys(columns: Dict[str, array], widths: Tuple[int, int]) -> List[int]:
+    """
+    Pack each row's (store_key, category_key, product_key) into one integer.
+
+    Args:
+        columns: Day index or fact column dict.
+        widths:  (category_bits, product_bits) from _key_widths().
+
+    Returns:
+        List of composite integer keys, one per row, in the columns' order.
+    """
+    cat_bits, prod_bits = widths
+    store_shift = cat_bits + prod_bits
+    return [
+        (s << store_shift) | (c << prod_bits) | p
+        for s, c, p in zip(
+            columns["store_key"], columns["category_key"], columns["product_key"],
+        )
+    ]
+
+
+def sort_day_index(columns: Dict[str, array], order: List[int]) -> Dict[str, array]:
+    """
+    Build a day index: columns permuted into composite-key order, deduplicated.
+
+    Where a composite key occurs more than once (see Assumption A1 in
+    request.md) the row that comes last in the fact file wins, matching
+    load_fact_dict().
+
+    Args:
+        columns: Fact column dict from read_fact_columns() (file order).
+        order:   Row positions sorted stably by composite key.
+
+    Returns:
+        Dict of the same five arrays, sorted by (store_key, category_key,
+        product_key) with one element per distinct key.
+    """
+    stores, cats, prods = (columns[name] for name in DAY_INDEX_KEY_COLUMNS)
+    kept: List[int] = []
+    previous = None
+    for pos in order:
+        key = (stores[pos], cats[pos], prods[pos])
+        if key == previous:
+            kept[-1] = pos
+        else:
+            kept.append(pos)
+            previous = key
+    return {
+        name: array(col.typecode, [col[pos] for pos in kept])
+        for name, col in columns.items()
+    }
+
+
+def align_day_prices(
+    d_keys: List[int],
+    d_order: List[int],
+    prior: Dict[str, array],
+    widths: Tuple[int, int],
+) -> Tuple[array, array]:
+    """
+    Merge-join D's rows against a prior day index and return aligned prices.
+
+    Both sides are walked once in composite-key order, so the cost is
+    O(len(D) + len(prior)) with no hash table.
+
+    Args:
+        d_keys:  D's composite keys in file order (from _composite_keys()).
+        d_order: D's row positions sorted by composite key.
+        prior:   Prior day index from sort_day_index() / load_day_index().
+        widths:  (category_bits, product_bits) shared by both sides.
+
+    Returns:
+        Tuple of (retail, promo) arrays of the prior index's typecode with
+        one element per D row in file order; NULL (NaN, or PRICE_NULL for
+        stotinki) where the prior day has no matching key or a NULL price.
+    """
+    n_rows = len(d_keys)
+    prior_retail = prior["retail_price"]
+    prior_promo = prior["promo_price"]
+    typecode = prior_retail.typecode
+    null = _NAN if typecode == DAY_INDEX_PRICE_TYPECODES[PRICE_FORMAT_DECIMAL] else PRICE_NULL
+    retail_out = array(typecode, [null]) * n_rows
+    promo_out = array(typecode, [null]) * n_rows
+    prior_keys = _composite_keys(prior, widths)
+    n_prior = len(prior_keys)
+
+    j = 0
+    for pos in d_order:
+        key = d_keys[pos]
+        while j < n_prior and prior_keys[j] < key:
+            j += 1
+        if j == n_prior:
+            break
+        if prior_keys[j] == key:
+            retail_out[pos] = prior_retail[j]
+            promo_out[pos] = prior_promo[j]
+    return retail_out, promo_out
+
+
+def _file_signature(path: Path) -> List[int]:
+    """
+    Return the (mtime_ns, size) signature used to validate cached day indexes.
+
+    Args:
+        path: Existing file.
+
+    Returns:
+        Two-element list [st_mtime_ns, st_size] (a list so it round-trips
+        through JSON unchanged).
+    """
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_day_index_cache(cache_dir: Path, fact_path: Path) -> Optional[Dict[str, array]]:
+    """
+    Return the cached day index for a fact CSV if it is still valid.
+
+    Args:
+        cache_dir: Lookback cache directory.
+        fact_path: Fact CSV the index was built from.
+
+    Returns:
+        The day index, or None when there is no cache entry, the fact file's
+        mtime/size changed, or the cache file is unreadable.
+    """
+    cache_path = cache_dir / f"{fact_path.stem}{LOOKBACK_CACHE_SUFFIX}"
+    if not cache_path.exists():
+        return None
+    try:
+        # marshal.loads on the whole buffer: marshal.load(fh) issues a read
+        # per object and is an order of magnitude slower on large entries.
+        entry = marshal.loads(cache_path.read_bytes())
+        if (
+            entry["version"] != LOOKBACK_CACHE_VERSION
+            or list(entry["signature"]) != _file_signature(fact_path)
+        ):
+            return None
+        price_typecode = DAY_INDEX_PRICE_TYPECODES[entry["price_format"]]
+        index: Dict[str, array] = {}
+        for name in DAY_INDEX_KEY_COLUMNS + DAY_INDEX_PRICE_COLUMNS:
+            col = array("q" if name in DAY_INDEX_KEY_COLUMNS else price_typecode)
+            col.frombytes(entry["columns"][name])
+            index[name] = col
+        if len({len(col) for col in index.values()}) > 1:
+            raise ValueError("column lengths differ")
+        return index
+    except (OSError, EOFError, KeyError, TypeError, ValueError) as exc:
+        logging.warning("Ignoring unreadable lookback cache %s: %s", cache_path.name, exc)
+        return None
+
+
+def save_day_index_cache(
+    cache_dir: Path,
+    fact_path: Path,
+    signature: List[int],
+    index: Dict[str, array],
+) -> None:
+    """
+    Atomically write a day index to the lookback cache.
+
+    Columns are stored as raw array bytes, so loading an entry allocates
+    five buffers rather than one object per row.
+
+    Args:
+        cache_dir: Lookback cache directory (created if absent).
+        fact_path: Fact CSV the index was built from.
+        signature: _file_signature(fact_path) taken before the file was read.
+        index:     Day index from sort_day_index().
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / f"{fact_path.stem}{LOOKBACK_CACHE_SUFFIX}"
+    partial_path = cache_path.with_suffix(cache_path.suffix + ".partial")
+    with open(partial_path, "wb") as fh:
+        fh.write(marshal.dumps({
+            "version": LOOKBACK_CACHE_VERSION,
+            "signature": signature,
+            "price_format": day_index_price_format(index),
+            "columns": {
+                name: index[name].tobytes()
+                for name in DAY_INDEX_KEY_COLUMNS + DAY_INDEX_PRICE_COLUMNS
+            },
+        }))
+    partial_path.replace(cache_path)
+
+
+def load_day_index(cache_dir: Path, fact_path: Path) -> Dict[str, array]:
+    """
+    Return a fact CSV's day index, from the cache when possible.
+
+    On a cache miss the CSV is read with read_fact_columns(), sorted, and
+    the result is cached for the next run.
+
+    Args:
+        cache_dir: Lookback cache directory.
+        fact_path: Date-partitioned fact CSV.
+
+    Returns:
+        Day index sorted by (store_key, category_key, product_key).
+    """
+    index = load_day_index_cache(cache_dir, fact_path)
+    if index is not None:
+        logging.debug("Lookback cache hit for %s", fact_path.name)
+        return index
+    signature = _file_signature(fact_path)
+    columns = read_fact_columns(fact_path)
+    keys = _composite_keys(columns, _key_widths([columns]))
+    index = sort_day_index(columns, sorted(range(len(keys)), key=keys.__getitem__))
+    save_day_index_cache(cache_dir, fact_path, signature, index)
+    logging.debug(
+        "Lookback cache miss for %s — indexed %d keys",
+        fact_path.name, len(index["store_key"]),
+    )
+    return index
+
+
+def lookback_header(lookback_days: int, price_format: str = PRICE_FORMAT_DECIMAL) -> List[str]:
+    """
+    Return the lookback table header for an N-day window.
+
+    Args:
+        lookback_days: Number of prior fact days joined to D (>= 1).
+        price_format:  Price format of D's fact file.
+
+    Returns:
+        FACT_HEADER followed by retail_price_dayK, promo_price_dayK for
+        K = 1..lookback_days; for stotinki, FACT_HEADER_STOTINKI followed by
+        retail_stotinki_dayK, promo_stotinki_dayK.
+    """
+    header = list(FACT_HEADERS[price_format])
+    retail_col, promo_col = FACT_PRICE_COLUMNS[price_format]
+    for k in range(1, lookback_days + 1):
+        header += [f"{retail_col}_day{k}", f"{promo_col}_day{k}"]
+    return header
+
+
+def _lookback_manifest(
+    window: List[Path],
+    output_path: Path,
+    header: List[str],
+    columnar: bool = False,
+) -> Dict:
+    """
+    Describe the inputs and output of a lookback build for up-to-date checks.
+
+    Args:
+        window:      Fact CSVs used, newest first (D, D-1, ..., D-N).
+        output_path: Written lookback CSV.
+        header:      Lookback header the output was written with.
+        columnar:    Whether a columnar partition of the output is wanted.
+
+    Returns:
+        JSON-serialisable dict of cache version, header, input signatures,
+        output signature and (when columnar) the output partition's
+        signature.
+    """
+    part = partition_path(output_path)
+    return {
+        "version": LOOKBACK_CACHE_VERSION,
+        "header": header,
+        "days": [[p.name] + _file_signature(p) for p in window],
+        "output": _file_signature(output_path) if output_path.exists() else None,
+        "columnar": columnar,
+        "partition": _file_signature(part) if columnar and part.exists() else None,
+    }
+
+
+def write_lookback_partition(
+    output_path: Path,
+    header: List[str],
+    fact_d: Path,
+    aligned: List[Tuple[array, array]],
+    lookback_days: int,
+) -> Path:
+    """
+    Write the columnar partition that mirrors a just-written lookback CSV.
+
+    Args:
+        output_path:   Lookback CSV (already in place; its signature is
+                       recorded in the partition).
+        header:        Lookback header the CSV was written with.
+        fact_d:        Fact CSV of day D.
+        aligned:       Prior-day (retail, promo) arrays in D's row order and
+                       price format, from align_day_prices().
+        lookback_days: Window size; days beyond len(aligned) are all NULL.
+
+    Returns:
+        Path of the written .kcol partition.
+    """
+    price_format, d_columns, scales = read_fact_partition(fact_d)
+    scale = PARTITION_PRICE_SCALES[price_format]
+    n_rows = len(d_columns["store_key"])
+    fact_header = FACT_HEADERS[price_format]
+    columns = {name: d_columns[name] for name in fact_header}
+
+    prior_columns: List[array] = []
+    for retail_k, promo_k in aligned:
+        for col in (retail_k, promo_k):
+            if price_format == PRICE_FORMAT_STOTINKI:
+                prior_columns.append(array("q", [
+                    NULL_VALUE if value == PRICE_NULL else value for value in col
+                ]))
+            else:
+                prior_columns.append(array("q", [
+                    NULL_VALUE if value != value else round(value * scale) for value in col
+                ]))
+    missing = array("q", [NULL_VALUE]) * n_rows
+    prior_columns += [missing] * (2 * (lookback_days - len(aligned)))
+    columns.update(zip(header[len(fact_header):], prior_columns))
+
+    path = partition_path(output_path)
+    write_partition(
+        path, columns,
+        scales={name: scales.get(name, scale) for name in header},
+        source=output_path,
+        meta={"price_format": price_format, "lookback_days": lookback_days},
+    )
+    return path
+
+
+def build_lookback_table(
+    facts_dir: Path,
+    output_path: Path,
+    cache_dir: Optional[Path] = None,
+    lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+    columnar: bool = False,
+) -> bool:
+    """
+    Build the derived lookback fact table from the most recent fact CSVs.
+
+    Identifies D (latest fact date) and the lookback_days fact files before
+    it (D-1 … D-N).  For each row in D, produces an output row consisting of
+    D's original columns plus retail_price_dayK, promo_price_dayK for each
+    K.  Missing lookback values are stored as empty string (NULL equivalent
+    in CSV), consistent with the existing promo_price nullability convention.
+
+    Each day is held as a columnar day index — key and price arrays sorted
+    by (store_key, category_key, product_key) — and prior-day prices are
+    aligned to D's rows with a merge-join, so memory grows linearly with
+    rows × days without a dict entry per row.
+
+    Prior-day indexes are cached in cache_dir, keyed by the fact file's
+    mtime and size, and D's index is cached after D is read, so after a run
+    that adds one new day only that day's CSV is read.  A manifest of the
+    window's signatures lets a run whose inputs, header and output are all
+    unchanged skip regeneration entirely.
+
+    The output uses D's price format (see lookback_header()); prior days
+    written in the other format are converted with convert_day_prices().
+    Fact files with a current columnar partition are read from it, and with
+    columnar=True a partition of the output (fact_prices_lookback.kcol) is
+    written next to it for load_supabase.py.
 
     The output file is written atomically via a .partial → rename pattern.
-    It is always fully replaced on each call (no incremental append).
+    When regenerated it is fully replaced (no incremental append).
 
     Args:
-        facts_dir:   Directory containing date-partitioned fact CSV files
-                     named YYYY-MM-DD.csv.
-        output_path: Destination path for the lookback CSV
-                     (data/schema/fact_prices_lookback.csv).
+        facts_dir:     Directory containing date-partitioned fact CSV files
+                       named YYYY-MM-DD.csv.
+        output_path:   Destination path for the lookback CSV
+                       (data/schema/fact_prices_lookback.csv).
+        cache_dir:     Day-index cache directory.  Defaults to
+                       LOOKBACK_CACHE_DIR_NAME next to output_path.
+        lookback_days: Number of prior fact days to join (>= 1); default 2
+                       gives the original D-1 / D-2 table.
+        columnar:      Also write a columnar partition of the output.
+
+    Returns:
+        True when the lookback CSV was written, False when it was already up
+        to date or there were no fact files.
+
+    Raises:
+        ValueError: If lookback_days < 1.
 
     Side effects:
-        Creates output_path (via output_path + '.partial' → rename).
+        Creates output_path (via output_path + '.partial' → rename) and the
+        cache directory; removes cache entries for days outside the window.
         Logs a warning and returns without writing when no fact files exist.
     """
+    if lookback_days < 1:
+        raise ValueError(f"lookback_days must be >= 1, got {lookback_days}")
+
     # Collect and sort fact CSVs lexicographically; ISO date stems sort
     # correctly as strings (YYYY-MM-DD ascending).
     fact_files = sorted(
@@ -821,50 +2308,103 @@ def build_lookback_table(facts_dir: Path, output_path: Path) -> None:
             "build_lookback_table: no fact files found in %s — skipping.",
             facts_dir,
         )
-        return
+        return False
+
+    if cache_dir is None:
+        cache_dir = output_path.parent / LOOKBACK_CACHE_DIR_NAME
+    manifest_path = cache_dir / LOOKBACK_MANIFEST_NAME
 
-    # Identify D, D-1, D-2 (at most) from the sorted list.
+    # D is the newest fact file; priors are D-1 … D-N (fewer when not enough
+    # history exists — missing days produce all-empty lookback columns).
     fact_d = fact_files[-1]
-    fact_d1 = fact_files[-2] if len(fact_files) >= 2 else None
-    fact_d2 = fact_files[-3] if len(fact_files) >= 3 else None
+    d_header = read_fact_header(fact_d)
+    price_format = fact_price_format(d_header) if d_header else PRICE_FORMAT_DECIMAL
+    header = lookback_header(lookback_days, price_format)
+    priors = fact_files[-(lookback_days + 1):-1][::-1]
+    window = [fact_d] + priors
 
-    # Load prior-day dicts; load_fact_dict returns {} when path is None
-    # or absent, so missing prior days produce all-empty lookback columns.
-    d1_lookup = load_fact_dict(fact_d1) if fact_d1 is not None else {}
-    d2_lookup = load_fact_dict(fact_d2) if fact_d2 is not None else {}
+    if output_path.exists() and manifest_path.exists():
+        try:
+            with open(manifest_path, encoding="utf-8") as fh:
+                previous = json.load(fh)
+        except (OSError, ValueError):
+            previous = None
+        if previous == _lookback_manifest(window, output_path, header, columnar):
+            logging.info("Lookback table is up to date (%s) — skipping.", fact_d.stem)
+            return False
+
+    prior_indexes = [
+        convert_day_prices(load_day_index(cache_dir, p), price_format) for p in priors
+    ]
 
+    # Index D: its columns in file order, then sorted by composite key with
+    # widths shared with the prior days so the merge-join compares like keys.
+    d_signature = _file_signature(fact_d)
+    d_columns = read_fact_columns(fact_d)
+    widths = _key_widths([d_columns] + prior_indexes)
+    d_keys = _composite_keys(d_columns, widths)
+    d_order = sorted(range(len(d_keys)), key=d_keys.__getitem__)
+
+    aligned = [align_day_prices(d_keys, d_order, ix, widths) for ix in prior_indexes]
+    del d_keys, prior_indexes
+    part = partition_path(output_path)
+    if part.exists():
+        part.unlink()
+    missing_days = lookback_days - len(aligned)
+
+    # Stream D a second time so its own columns are copied verbatim.
     partial_path = output_path.with_suffix(output_path.suffix + ".partial")
     with open(fact_d, encoding="utf-8", newline="") as in_fh, \
          open(partial_path, "w", encoding="utf-8", newline="") as out_fh:
-        reader = csv.DictReader(in_fh)
+        reader = csv.reader(in_fh)
         writer = csv.writer(out_fh)
-        writer.writerow(LOOKBACK_HEADER)
+        writer.writerow(header)
+
+        if next(reader, None) is not None:
+            positions = [d_header.index(name) for name in FACT_HEADERS[price_format]]
+            empty_tail = ["", ""] * missing_days
+            # Prices repeat heavily, so memoise their formatted text (NaN is
+            # handled first: it never compares equal and cannot be a dict key).
+            if price_format == PRICE_FORMAT_STOTINKI:
+                format_value = _format_stotinki_value
+            else:
+                format_value = _format_price_value
+            formatted: Dict[float, str] = {}
+            for i, row in enumerate(reader):
+                out_row = [row[pos] for pos in positions]
+                for retail_k, promo_k in aligned:
+                    for value in (retail_k[i], promo_k[i]):
+                        if value != value:
+                            out_row.append("")
+                            continue
+                        text = formatted.get(value)
+                        if text is None:
+                            text = formatted[value] = format_value(value)
+                        out_row.append(text)
+                out_row += empty_tail
+                writer.writerow(out_row)
 
-        for row in reader:
-            composite_key = (
-                row["store_key"],
-                row["category_key"],
-                row["product_key"],
-            )
-            d1_retail, d1_promo = d1_lookup.get(composite_key, ("", ""))
-            d2_retail, d2_promo = d2_lookup.get(composite_key, ("", ""))
+    partial_path.replace(output_path)
+    logging.info(
+        "Lookback table written to %s (%d lookback days)", output_path, lookback_days,
+    )
+    if columnar:
+        write_lookback_partition(output_path, header, fact_d, aligned, lookback_days)
+    del aligned
 
-            writer.writerow([
-                row["date_key"],
-                row["store_key"],
-                row["file_key"],
-                row["category_key"],
-                row["product_key"],
-                row["retail_price"],
-                row["promo_price"],
-                d1_retail,
-                d1_promo,
-                d2_retail,
-                d2_promo,
-            ])
+    save_day_index_cache(cache_dir, fact_d, d_signature, sort_day_index(d_columns, d_order))
 
-    partial_path.replace(output_path)
-    logging.info("Lookback table written to %s", output_path)
+    # Only the current window can be reused as a prior day later; drop the rest.
+    keep = {f"{p.stem}{LOOKBACK_CACHE_SUFFIX}" for p in window}
+    for cached in cache_dir.glob(f"*{LOOKBACK_CACHE_SUFFIX}"):
+        if cached.name not in keep:
+            cached.unlink()
+
+    manifest_partial = manifest_path.with_suffix(manifest_path.suffix + ".partial")
+    with open(manifest_partial, "w", encoding="utf-8") as fh:
+        json.dump(_lookback_manifest(window, output_path, header, columnar), fh)
+    manifest_partial.replace(manifest_path)
+    return True
 
 
 def write_quality_report(quality_rows: List[Dict], run_ts: str) -> None:
@@ -887,20 +2427,59 @@ def write_quality_report(quality_rows: List[Dict], run_ts: str) -> None:
     logging.info("Quality report written to %s", report_path)
 
 
-def main() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse transform.py command-line options.
+
+    Args:
+        argv: Argument list (defaults to sys.argv[1:]).
+
+    Returns:
+        Namespace with 'workers' (int or None when not given).
+    """
+    parser = argparse.ArgumentParser(
+        description="Transform raw ZIP archives into the star-schema data layer.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes used to parse ZIPs "
+             "(default: [settings] workers in config.ini, else 1).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Entry point: load config, run schema build loop, write quality report,
     update last_processed_date in config.ini.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:]).
     """
+    args = parse_args(argv)
     run_ts = datetime.now().strftime("%Y-%m-%d_%H%M%S")
     cfg = load_config(CONFIG_PATH)
     log_level = cfg.get("settings", "log_level", fallback="INFO")
     setup_logging(log_level, run_ts)
 
+    workers = args.workers
+    if workers is None:
+        workers = cfg.getint("settings", "workers", fallback=1)
+
+    price_format = cfg.get("settings", "price_format", fallback=PRICE_FORMAT_DECIMAL)
+    columnar = cfg.getboolean("settings", "columnar_facts", fallback=False)
+
     force_from: str = cfg.get("state", "last_processed_date", fallback="")
-    logging.info("Starting transform run %s (force_from=%r)", run_ts, force_from)
+    logging.info(
+        "Starting transform run %s (force_from=%r, workers=%d, price_format=%s)",
+        run_ts, force_from, workers, price_format,
+    )
 
-    max_date, quality_rows = build_schema(force_from)
+    max_date, quality_rows = build_schema(
+        force_from, workers=workers, price_format=price_format, columnar=columnar,
+    )
 
     if quality_rows:
         write_quality_report(quality_rows, run_ts)
@@ -922,9 +2501,18 @@ def main() -> None:
     else:
         logging.info("No unknown settlement entries required patching.")
 
-    # Always regenerate the lookback table so it reflects the current state of
-    # data/schema/facts/ after this run (see request R-20260420-2055, Task 2).
-    build_lookback_table(FACTS_DIR, SCHEMA_DIR / "fact_prices_lookback.csv")
+    # Bring the lookback table in line with data/schema/facts/ after this run
+    # (see request R-20260420-2055, Task 2).  build_lookback_table() only
+    # rebuilds it when the fact window, header or output changed since the
+    # manifest it wrote last time, and reports whether it wrote the table.
+    lookback_days = cfg.getint("settings", "lookback_days", fallback=DEFAULT_LOOKBACK_DAYS)
+    if build_lookback_table(
+        FACTS_DIR, SCHEMA_DIR / "fact_prices_lookback.csv",
+        lookback_days=lookback_days, columnar=columnar,
+    ):
+        logging.info("Lookback table rebuilt.")
+    else:
+        logging.info("Lookback table not rebuilt (already up to date, or no fact files).")
 
     logging.info("Transform run complete.")
 
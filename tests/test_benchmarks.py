@@ -0,0 +1,97 @@
+"""
+test_benchmarks.py: Unit tests for the benchmarks/ package.
+Part of the kolko-ni-struva ETL pipeline benchmarks.
+Responsibilities: verify that the synthetic ZIP generator is deterministic and
+produces the source-data quirks the transform must handle, and that the
+benchmark runners report per-phase and per-query timings on tiny data sets.
+"""
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+# Add the project root to sys.path so the benchmarks package resolves.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generate_zips import generate_days  # noqa: E402
+from benchmarks.run_product_search import run_benchmark as run_search_benchmark  # noqa: E402
+from benchmarks.run_transform import run_benchmark  # noqa: E402
+
+
+class TestGenerateDays(unittest.TestCase):
+    """Tests for generate_days(): deterministic, realistically messy ZIPs."""
+
+    def test_same_seed_writes_identical_archives(self) -> None:
+        """Two runs with the same arguments produce byte-identical ZIPs."""
+        with tempfile.TemporaryDirectory() as tmp:
+            first = generate_days(Path(tmp) / "a", 2, seed=7, rows=2000, companies=10)
+            second = generate_days(Path(tmp) / "b", 2, seed=7, rows=2000, companies=10)
+            self.assertEqual([p.name for p in first], ["2026-04-01.zip", "2026-04-02.zip"])
+            for a, b in zip(first, second):
+                self.assertEqual(a.read_bytes(), b.read_bytes())
+
+    def test_archive_has_expected_shape_and_quirks(self) -> None:
+        """Company count, semicolon files, BOMs and raion codes match the request."""
+        with tempfile.TemporaryDirectory() as tmp:
+            (zip_path,) = generate_days(
+                Path(tmp), 1, rows=20000, companies=20, semicolon_files=3,
+            )
+            with zipfile.ZipFile(zip_path) as zf:
+                members = {name: zf.read(name) for name in zf.namelist()}
+
+        self.assertEqual(len(members), 20)
+        semicolon = bom = rows = 0
+        text = ""
+        for data in members.values():
+            bom += data.startswith(b"\xef\xbb\xbf")
+            decoded = data.decode("utf-8-sig")
+            header = decoded.split("\n", 1)[0]
+            semicolon += header.count(";") > header.count(",")
+            rows += decoded.count("\n") - 1
+            text += decoded
+        self.assertEqual(semicolon, 3)
+        self.assertGreater(bom, 0)
+        self.assertAlmostEqual(rows, 20000, delta=100)
+        self.assertIn("68134-", text)
+
+
+class TestRunBenchmark(unittest.TestCase):
+    """Tests for run_benchmark(): JSON report of transform phase timings."""
+
+    def test_reports_all_phases(self) -> None:
+        """run_benchmark times every phase and counts the rows it parsed."""
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run_benchmark(Path(tmp), days=2, rows=1000, companies=5)
+
+        self.assertEqual(
+            set(report["phases"]),
+            {"generate", "build_schema", "build_lookback_table", "patch_unknown_settlements"},
+        )
+        self.assertGreater(report["rows"], 1900)
+        self.assertEqual(report["phases"]["build_schema"]["rows"], report["rows"])
+        self.assertGreater(report["phases"]["build_lookback_table"]["rows"], 0)
+        self.assertIn("self", report["peak_rss_mb"])
+
+
+
+class TestRunProductSearch(unittest.TestCase):
+    """Tests for run_product_search.run_benchmark(): substring vs token-prefix search."""
+
+    def test_reports_every_query_shape(self) -> None:
+        """Each query is timed both ways; token prefixes also match transliterations."""
+        report = run_search_benchmark(products=2000, repeats=1)
+
+        self.assertEqual(
+            set(report["queries"]),
+            {"short_cyrillic", "word", "multi_word", "latin_transliteration"},
+        )
+        word = report["queries"]["word"]
+        self.assertEqual(word["substring_matches"], word["token_prefix_matches"])
+        latin = report["queries"]["latin_transliteration"]
+        self.assertEqual(latin["substring_matches"], 0)
+        self.assertGreater(latin["token_prefix_matches"], 0)
+        self.assertGreater(report["token_rows"], 2000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+test_columnar.py: Unit tests for src/columnar.py.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: verify that partitions round-trip int64 columns and their
+metadata, that only requested columns are loaded, that corrupt or foreign
+files are rejected, and that current_partition() tracks its source CSV.
+"""
+import sys
+import tempfile
+import unittest
+from array import array
+from pathlib import Path
+
+# Add src/ to sys.path so the module resolves without installation.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from columnar import (  # noqa: E402
+    NULL_VALUE,
+    column_scales,
+    current_partition,
+    partition_path,
+    read_partition,
+    read_partition_header,
+    write_partition,
+)
+
+
+class TestWriteReadPartition(unittest.TestCase):
+    """Tests for write_partition() / read_partition() round trips."""
+
+    def test_round_trips_columns_scales_and_meta(self) -> None:
+        """Columns come back identical, in order, with their scales and metadata."""
+        columns = {
+            "store_key": array("q", [1, 2, 3]),
+            "retail_price": array("q", [31700, NULL_VALUE, -5]),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "2026-04-29.kcol"
+            write_partition(
+                path, columns, scales={"retail_price": 10000}, meta={"price_format": "decimal"},
+            )
+            header, loaded = read_partition(path)
+
+        self.assertEqual(loaded, columns)
+        self.assertEqual(list(loaded), ["store_key", "retail_price"])
+        self.assertEqual(header["rows"], 3)
+        self.assertEqual(header["meta"], {"price_format": "decimal"})
+        self.assertEqual(column_scales(header), {"store_key": 1, "retail_price": 10000})
+
+    def test_reads_only_requested_columns(self) -> None:
+        """names selects and orders the decompressed columns."""
+        columns = {name: array("q", range(5)) for name in ("a", "b", "c")}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "x.kcol"
+            write_partition(path, columns)
+            _, loaded = read_partition(path, ["c", "a"])
+            with self.assertRaises(KeyError):
+                read_partition(path, ["missing"])
+        self.assertEqual(list(loaded), ["c", "a"])
+
+    def test_rejects_mismatched_lengths_and_typecodes(self) -> None:
+        """Only equal-length int64 columns can be written."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "x.kcol"
+            with self.assertRaises(ValueError):
+                write_partition(path, {"a": array("q", [1]), "b": array("q", [1, 2])})
+            with self.assertRaises(ValueError):
+                write_partition(path, {"a": array("d", [1.0])})
+            self.assertFalse(path.exists())
+
+    def test_rejects_foreign_and_corrupt_files(self) -> None:
+        """A bad magic or a damaged column block raises ValueError."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "x.kcol"
+            path.write_bytes(b"date_key,store_key\n")
+            with self.assertRaises(ValueError):
+                read_partition_header(path)
+
+            write_partition(path, {"a": array("q", range(1000))})
+            data = bytearray(path.read_bytes())
+            data[-10:] = b"\x00" * 10
+            path.write_bytes(bytes(data))
+            with self.assertRaises(ValueError):
+                read_partition(path)
+
+
+class TestCurrentPartition(unittest.TestCase):
+    """Tests for current_partition(): staleness against the source CSV."""
+
+    def test_tracks_source_signature(self) -> None:
+        """The partition is current until its CSV changes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "2026-04-29.csv"
+            csv_path.write_text("a\n1\n", encoding="utf-8")
+            self.assertIsNone(current_partition(csv_path))
+
+            write_partition(partition_path(csv_path), {"a": array("q", [1])}, source=csv_path)
+            self.assertEqual(current_partition(csv_path), Path(tmp) / "2026-04-29.kcol")
+
+            csv_path.write_text("a\n1\n2\n", encoding="utf-8")
+            self.assertIsNone(current_partition(csv_path))
+
+    def test_partition_without_source_is_never_current(self) -> None:
+        """A partition written without a source CSV does not shadow that CSV."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "f.csv"
+            csv_path.write_text("a\n", encoding="utf-8")
+            write_partition(partition_path(csv_path), {"a": array("q")})
+            self.assertIsNone(current_partition(csv_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
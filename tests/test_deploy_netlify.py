@@ -274,7 +274,8 @@ class TestAutoSaveOnInteractiveEntry(unittest.TestCase):
             with patch.object(deploy_netlify, "find_netlify_cmd", return_value=["netlify"]):
                 with patch.object(deploy_netlify, "get_credential", side_effect=["tok", "sid"]):
                     with patch.object(deploy_netlify, "_save_credential_to_env") as mock_save:
-                        with patch.object(deploy_netlify, "build_react_app", return_value=True):
+                        with patch.object(deploy_netlify, "build_react_app", return_value=True), \
+                                patch.object(deploy_netlify, "publish_data_snapshots", return_value=True):
                             with patch.object(
                                 deploy_netlify, "deploy_to_netlify", return_value=True
                             ):
@@ -295,7 +296,8 @@ class TestAutoSaveOnInteractiveEntry(unittest.TestCase):
                     deploy_netlify, "get_credential", side_effect=["preloaded-tok", "preloaded-sid"]
                 ):
                     with patch.object(deploy_netlify, "_save_credential_to_env") as mock_save:
-                        with patch.object(deploy_netlify, "build_react_app", return_value=True):
+                        with patch.object(deploy_netlify, "build_react_app", return_value=True), \
+                                patch.object(deploy_netlify, "publish_data_snapshots", return_value=True):
                             with patch.object(
                                 deploy_netlify, "deploy_to_netlify", return_value=True
                             ):
@@ -304,5 +306,36 @@ class TestAutoSaveOnInteractiveEntry(unittest.TestCase):
         mock_save.assert_not_called()
 
 
+
+class TestPublishDataSnapshots(unittest.TestCase):
+    """Tests for the snapshot step between the React build and the deploy."""
+
+    def test_runs_publish_script_after_build_and_before_deploy(self) -> None:
+        """main() builds, publishes snapshots, then deploys."""
+        calls = []
+        env = {deploy_netlify.ENV_AUTH_TOKEN: "tok", deploy_netlify.ENV_SITE_ID: "sid"}
+        with patch.dict("os.environ", env), \
+                patch.object(deploy_netlify, "find_netlify_cmd", return_value=["netlify"]), \
+                patch.object(deploy_netlify, "get_credential", side_effect=["tok", "sid"]), \
+                patch.object(deploy_netlify, "build_react_app",
+                             side_effect=lambda: calls.append("build") or True), \
+                patch.object(deploy_netlify, "publish_data_snapshots",
+                             side_effect=lambda: calls.append("publish") or True), \
+                patch.object(deploy_netlify, "deploy_to_netlify",
+                             side_effect=lambda *a: calls.append("deploy") or True), \
+                patch("sys.stdout", io.StringIO()):
+            deploy_netlify.main()
+        self.assertEqual(calls, ["build", "publish", "deploy"])
+
+    def test_failure_is_reported_but_not_fatal(self) -> None:
+        """A failing publish script returns False and prints a warning."""
+        captured = io.StringIO()
+        with patch("subprocess.run", return_value=MagicMock(returncode=1)) as mock_run, \
+                patch("sys.stdout", captured):
+            result = deploy_netlify.publish_data_snapshots()
+        self.assertFalse(result)
+        self.assertIn("publish_snapshots.py", mock_run.call_args[0][0][1])
+        self.assertIn("deploying without snapshots", captured.getvalue())
+
 if __name__ == "__main__":
     unittest.main()
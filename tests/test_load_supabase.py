@@ -9,8 +9,13 @@ All tests use mocked psycopg2 connections and extras helpers.
 import csv
 import sys
 import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
+from array import array
 from pathlib import Path
+from typing import List
 from unittest.mock import MagicMock, patch
 
 # Add src/ to sys.path so the module resolves without installation.
@@ -41,26 +46,60 @@ with patch.dict(
     {
         "psycopg2": _mock_psycopg2,
         "psycopg2.extras": _mock_psycopg2_extras,
+        "psycopg2.pool": _mock_psycopg2.pool,
         "dotenv": _mock_dotenv,
     },
 ):
     from load_supabase import (  # noqa: E402
+        DIM_TABLES,
+        FILTER_COMBINATIONS_VERSION,
+        LANDING_PAGE_EXACT_COUNT_LIMIT,
+        LANDING_PAGE_FILTER_COMBINATIONS,
         LANDING_PAGE_ROW_PROJECTION,
+        PRODUCT_SEARCH_TOKENS,
+        REPORT_PRICE_AGGREGATES,
+        dim_dependencies,
+        dim_sync_waves,
+        sync_dims,
         create_tables,
         execute_batch_rows,
+        _iter_pages,
         execute_sql,
+        file_digest,
+        group_dates,
+        migrate_to_partitioned,
+        _CREATE_PARTITIONED_DDL,
         _CREATE_RPC_FUNCTIONS,
         get_retained_local_dates,
         get_date_keys_for_dates,
         prune_dim_category,
         prune_dim_date,
         refresh_landing_page_projection,
+        refresh_report_aggregates,
         insert_lookback,
-        upsert_dim,
+        copy_lookback,
+        copy_product_tokens,
+        ensure_lookback_columns,
+        lookback_columns,
+        lookback_csv_layout,
+        lookback_days_from_csv,
+        lookback_stotinki_columns,
+        parse_args,
+        load_dim_manifest,
+        lookback_groups,
+        projection_changes,
+        replace_table,
+        save_dim_manifest,
+        swap_staging_table,
+        sync_dim,
+        sync_landing_page_projection,
         _CREATE_DDL,
         _CREATE_INDEXES,
+        _ENSURE_NULLABLE_DDL,
     )
 
+from columnar import NULL_VALUE, write_partition  # noqa: E402
+
 # Capture the extras mock as used by the imported module.  Any call to
 # psycopg2.extras.execute_batch inside load_supabase resolves through this object.
 _EXECUTE_BATCH = _mock_psycopg2_extras.execute_batch
@@ -186,7 +225,9 @@ class TestCreateTables(unittest.TestCase):
         """_CREATE_INDEXES provisions landing-page projection paging and filter indexes."""
         self.assertIn("idx_lp_row_projection_page", _CREATE_INDEXES)
         self.assertIn("idx_lp_row_projection_filter_keys", _CREATE_INDEXES)
-        self.assertIn("idx_lp_row_projection_product_name_trgm", _CREATE_INDEXES)
+        self.assertIn("idx_lp_row_projection_product", _CREATE_INDEXES)
+        self.assertIn("idx_dim_product_tokens_token", _CREATE_INDEXES)
+        self.assertNotIn("gin_trgm_ops", _CREATE_INDEXES)
 
     def test_index_ddl_contains_report_slice_index(self) -> None:
         """_CREATE_INDEXES provisions the report-oriented date/store/category index."""
@@ -223,6 +264,196 @@ class TestCreateTables(unittest.TestCase):
         )
 
 
+    def test_keyset_rows_rpc_seeks_past_cursor_in_index_order(self) -> None:
+        """get_landing_page_rows_keyset compares the page sort key instead of skipping rows."""
+        body = _CREATE_RPC_FUNCTIONS.split("FUNCTION get_landing_page_rows_keyset_set(", 1)[1]
+        body = body.split("$$;", 1)[0]
+        self.assertIn(
+            "(product_name, store_name, product_key, store_key, file_key, date_key)\n"
+            "              > (COALESCE($9, ''''), COALESCE($10, ''''), $11, $12, $13, $14)",
+            body,
+        )
+        self.assertIn("IF p_after_product_key IS NOT NULL THEN", body)
+        self.assertIn("OFFSET $15 LIMIT $16", body)
+        self.assertIn(
+            "GRANT EXECUTE ON FUNCTION get_landing_page_rows_keyset(INT, INT, INT, INT, INT, "
+            "TEXT, NUMERIC, NUMERIC, TEXT, TEXT, INT, INT, INT, INT, INT, INT) TO anon;",
+            _CREATE_RPC_FUNCTIONS,
+        )
+
+    def test_page_sort_key_names_are_never_null(self) -> None:
+        """A NULL name on a page boundary would make the keyset comparison NULL."""
+        projection = _CREATE_DDL.split(f"CREATE TABLE IF NOT EXISTS {LANDING_PAGE_ROW_PROJECTION} (", 1)[1]
+        projection = projection.split(")", 1)[0]
+        self.assertIn("product_name    TEXT NOT NULL DEFAULT ''", projection)
+        self.assertIn("store_name      TEXT NOT NULL DEFAULT ''", projection)
+        self.assertIn("category_name   TEXT,", projection)
+        # Projections created before the constraint are backfilled once.
+        migration = _ENSURE_NULLABLE_DDL.split("DO $$", 1)[1]
+        self.assertIn("ARRAY['product_name', 'store_name']", migration)
+        self.assertIn(f"'UPDATE {LANDING_PAGE_ROW_PROJECTION} SET %I = '''' WHERE %I IS NULL'", migration)
+        self.assertIn("ALTER COLUMN %I SET NOT NULL", migration)
+
+    def test_row_and_grouped_rpcs_return_typed_rows_with_json_wrappers(self) -> None:
+        """*_set RPCs RETURN QUERY typed rows; the JSON and *_columns wrappers keep their order."""
+        for name, first_column in (
+            ("get_landing_page_rows_keyset", "file_name"),
+            ("get_landing_page_grouped", "group1"),
+        ):
+            with self.subTest(function=name):
+                body = _CREATE_RPC_FUNCTIONS.split(f"FUNCTION {name}_set(", 1)[1]
+                body = body.split("$$;", 1)[0]
+                self.assertIn(f"RETURNS TABLE({first_column} TEXT,", body)
+                self.assertIn("RETURN QUERY EXECUTE v_sql", body)
+                self.assertNotIn("json_agg", body)
+
+                rows = _CREATE_RPC_FUNCTIONS.split(f"FUNCTION {name}(", 1)[1]
+                rows = rows.split("$$;", 1)[0]
+                self.assertIn("LANGUAGE sql", rows)
+                self.assertIn(f"'{first_column}', t.{first_column},", rows)
+                self.assertIn(") ORDER BY t.ordinality), '[]'::json)", rows)
+                self.assertIn(f"FROM {name}_set(p_date_key, ", rows)
+                self.assertIn("WITH ORDINALITY AS t;", rows)
+
+                columns = _CREATE_RPC_FUNCTIONS.split(f"FUNCTION {name}_columns(", 1)[1]
+                columns = columns.split("$$;", 1)[0]
+                self.assertIn(
+                    f"'{first_column}', COALESCE(json_agg(t.{first_column} ORDER BY t.ordinality), "
+                    "'[]'::json),",
+                    columns,
+                )
+                for variant in ("_set", "", "_columns"):
+                    self.assertIn(
+                        f"GRANT EXECUTE ON FUNCTION {name}{variant}(INT, INT, INT, INT, INT, "
+                        "TEXT, NUMERIC, NUMERIC, ",
+                        _CREATE_RPC_FUNCTIONS,
+                    )
+        grouped = _CREATE_RPC_FUNCTIONS.split("FUNCTION get_landing_page_grouped_set(", 1)[1]
+        self.assertIn("v_select_group2 TEXT := ', NULL::TEXT AS group2';", grouped)
+
+    def test_report_rpcs_read_pre_aggregated_table(self) -> None:
+        """Report 1 and the unfiltered grouped view re-aggregate report_price_aggregates."""
+        report_1 = _CREATE_RPC_FUNCTIONS.split("FUNCTION get_report_1_category_prices(", 1)[1]
+        report_1 = report_1.split("$$;", 1)[0]
+        self.assertIn(f"FROM {REPORT_PRICE_AGGREGATES} a", report_1)
+        self.assertNotIn("fact_prices_lookback", report_1)
+        self.assertIn("/ SUM(a.row_count) AS avg_price", report_1)
+
+        grouped = _CREATE_RPC_FUNCTIONS.split("FUNCTION get_landing_page_grouped_set(", 1)[1]
+        fast_path, fallback = grouped.split("END IF;\n\n    -- Dynamically assemble", 1)
+        self.assertIn(f"FROM {REPORT_PRICE_AGGREGATES} a", fast_path)
+        self.assertIn("p_group_by_1 <> 'store_name'", fast_path)
+        self.assertIn("FROM fact_prices_lookback f", fallback)
+        # The fact-path price and both price filters reuse the stored price.
+        self.assertEqual(fallback.count("COALESCE(\n                        f.effective_price,"), 3)
+        self.assertIn(f"GRANT SELECT ON {REPORT_PRICE_AGGREGATES} TO anon;", _CREATE_RPC_FUNCTIONS)
+        self.assertIn(f"CREATE TABLE IF NOT EXISTS {REPORT_PRICE_AGGREGATES} (", _CREATE_DDL)
+        self.assertIn("idx_report_price_aggregates_grain", _CREATE_INDEXES)
+
+    def test_option_rpcs_read_combinations_with_dynamic_predicates(self) -> None:
+        """Each get_lp_options_* RPC appends only the set filters and runs EXECUTE … USING."""
+        for dimension, own_param in (
+            ("settlement", "p_settlement_key"),
+            ("category", "p_category_key"),
+            ("company", "p_company_key"),
+            ("store", "p_store_key"),
+            ("date", "p_date_key"),
+        ):
+            with self.subTest(dimension=dimension):
+                body = _CREATE_RPC_FUNCTIONS.split(f"FUNCTION get_lp_options_{dimension}(", 1)[1]
+                signature, body = body.split("$$", 1)
+                body = body.split("$$;", 1)[0]
+                self.assertNotIn(own_param, signature)
+                self.assertIn("LANGUAGE plpgsql", signature)
+                self.assertIn(f"FROM {LANDING_PAGE_FILTER_COMBINATIONS}", body)
+                self.assertNotIn(LANDING_PAGE_ROW_PROJECTION, body)
+                self.assertNotIn("IS NULL OR", body)
+                self.assertIn("RETURN QUERY EXECUTE", body)
+                self.assertEqual(body.count(" IS NOT NULL THEN"), 4)
+                self.assertIn("= $4 ';", body)
+                self.assertIn(
+                    f"GRANT EXECUTE ON FUNCTION get_lp_options_{dimension}(INT, INT, INT, INT) TO anon;",
+                    _CREATE_RPC_FUNCTIONS,
+                )
+        for column in ("settlement_key", "category_key", "company_key", "store_key"):
+            self.assertIn(f"{LANDING_PAGE_FILTER_COMBINATIONS}({column}, date_key)", _CREATE_INDEXES)
+
+    def test_total_rpc_sums_combination_counts_or_estimates(self) -> None:
+        """get_landing_page_total sums key-filtered counts and bounds free-text counts."""
+        body = _CREATE_RPC_FUNCTIONS.split("FUNCTION get_landing_page_total(", 1)[1]
+        body = body.split("$$;", 1)[0]
+        exact, fallback = body.split("IF v_product_keys IS NOT NULL THEN", 1)
+        self.assertIn(
+            f"SELECT COALESCE(SUM(row_count), 0) FROM {LANDING_PAGE_FILTER_COMBINATIONS}", exact,
+        )
+        self.assertIn("'is_exact', true", exact)
+        self.assertIn(f"LIMIT {LANDING_PAGE_EXACT_COUNT_LIMIT + 1}) t", fallback)
+        self.assertIn("EXPLAIN (FORMAT JSON)", fallback)
+        self.assertIn("'is_exact', false", fallback)
+        self.assertIn(
+            "GRANT EXECUTE ON FUNCTION get_landing_page_total(INT, INT, INT, INT, INT, "
+            "TEXT, NUMERIC, NUMERIC) TO anon;",
+            _CREATE_RPC_FUNCTIONS,
+        )
+        self.assertIn(
+            f"GRANT SELECT ON {LANDING_PAGE_FILTER_COMBINATIONS} TO anon;", _CREATE_RPC_FUNCTIONS,
+        )
+        self.assertIn(f"CREATE TABLE IF NOT EXISTS {LANDING_PAGE_FILTER_COMBINATIONS} (", _CREATE_DDL)
+        self.assertIn("idx_lp_filter_combinations_keys", _CREATE_INDEXES)
+
+    def test_product_filter_resolves_keys_through_search_tokens(self) -> None:
+        """Row, total and grouped RPCs filter product_key = ANY(search_product_keys())."""
+        body = _CREATE_RPC_FUNCTIONS.split("FUNCTION search_product_keys(p_term TEXT)", 1)[1]
+        body = body.split("$$;", 1)[0]
+        self.assertIn(f"JOIN {PRODUCT_SEARCH_TOKENS} t", body)
+        self.assertIn("t.token >= terms.term AND t.token < terms.term || '{'", body)
+        self.assertIn("HAVING COUNT(DISTINCT terms.term) = (SELECT COUNT(*) FROM terms)", body)
+        self.assertIn("replace(", body)
+        for function in (
+            "get_landing_page_rows", "get_landing_page_rows_keyset_set",
+            "get_landing_page_total", "get_landing_page_grouped_set",
+        ):
+            with self.subTest(function=function):
+                rpc = _CREATE_RPC_FUNCTIONS.split(f"FUNCTION {function}(", 1)[1]
+                rpc = rpc.split("$$;", 1)[0]
+                self.assertRegex(rpc, r"v_product_keys +INT\[\] := search_product_keys\(p_product_name\);")
+                self.assertIn("product_key = ANY($6)", rpc)
+                self.assertNotIn("ILIKE", rpc)
+        self.assertNotIn("pg_trgm", _CREATE_INDEXES)
+        self.assertIn(
+            f"CREATE TABLE IF NOT EXISTS {PRODUCT_SEARCH_TOKENS} (", _CREATE_DDL,
+        )
+        self.assertIn(
+            "GRANT EXECUTE ON FUNCTION search_product_keys(TEXT) TO anon;", _CREATE_RPC_FUNCTIONS,
+        )
+
+
+class TestReportAggregates(unittest.TestCase):
+    """Tests for refresh_report_aggregates()."""
+
+    def test_aggregates_into_staging_and_swaps(self) -> None:
+        """One GROUP BY fills the staging copy, which is then swapped in."""
+        mock_conn, mock_cursor = _make_mock_conn()
+
+        refresh_report_aggregates(mock_conn)
+
+        executed = _executed_sql_calls_for_conn(mock_conn)
+        inserts = [sql for sql in executed if sql.lstrip().startswith("INSERT INTO")]
+        self.assertEqual(len(inserts), 1)
+        self.assertTrue(inserts[0].lstrip().startswith(f"INSERT INTO {REPORT_PRICE_AGGREGATES}_staging ("))
+        self.assertIn(
+            "GROUP BY f.date_key, ds.settlement_key, f.category_key, ds.company_key", inserts[0],
+        )
+        # eff_* reuse the stored effective price; price_sum* keep NULL retail as 0.
+        self.assertIn("COALESCE(\n            f.effective_price,", inserts[0])
+        self.assertIn("LEAST(COALESCE(f.retail_price, 0), f.promo_price)", inserts[0])
+        self.assertIn(
+            f"ALTER TABLE {REPORT_PRICE_AGGREGATES}_staging RENAME TO {REPORT_PRICE_AGGREGATES}",
+            executed,
+        )
+        self.assertEqual(mock_conn.commit.call_count, 2)
+
+
 class TestSqlHelpers(unittest.TestCase):
     """Tests for the generic SQL execution helper functions."""
 
@@ -257,26 +488,94 @@ class TestLandingPageProjection(unittest.TestCase):
     """Tests for the landing-page projection refresh helper."""
 
     def test_refresh_landing_page_projection_executes_refresh_and_commits(self) -> None:
-        """refresh_landing_page_projection truncates and repopulates the projection table, then commits."""
+        """refresh_landing_page_projection rebuilds a staging projection, then swaps it in."""
         mock_conn, mock_cursor = _make_mock_conn()
 
         refresh_landing_page_projection(mock_conn)
 
         executed_sql = " ".join(_executed_sql_calls(mock_cursor))
+        staging = f"{LANDING_PAGE_ROW_PROJECTION}_staging"
+        self.assertNotIn(f"TRUNCATE TABLE {LANDING_PAGE_ROW_PROJECTION}", executed_sql)
+        self.assertIn(f"INSERT INTO {staging} (", executed_sql)
+        self.assertIn(f"ANALYZE {staging}", executed_sql)
         self.assertIn(
-            f"TRUNCATE TABLE {LANDING_PAGE_ROW_PROJECTION}",
-            executed_sql,
-        )
-        self.assertIn(
-            f"INSERT INTO {LANDING_PAGE_ROW_PROJECTION}",
-            executed_sql,
+            f"ALTER TABLE {staging} RENAME TO {LANDING_PAGE_ROW_PROJECTION}",
+            _executed_sql_calls_for_conn(mock_conn),
         )
+        combinations = [
+            sql for sql in _executed_sql_calls_for_conn(mock_conn)
+            if sql.lstrip().startswith(f"INSERT INTO {LANDING_PAGE_FILTER_COMBINATIONS}_staging")
+        ]
+        self.assertEqual(len(combinations), 1)
+        self.assertIn(f"FROM {LANDING_PAGE_ROW_PROJECTION}\nGROUP BY", combinations[0])
+        self.assertIn("settlement_name, category_name, company_name, store_name;", combinations[0])
         self.assertIn(
-            f"ANALYZE {LANDING_PAGE_ROW_PROJECTION}",
-            executed_sql,
+            f"ALTER TABLE {LANDING_PAGE_FILTER_COMBINATIONS}_staging "
+            f"RENAME TO {LANDING_PAGE_FILTER_COMBINATIONS}",
+            _executed_sql_calls_for_conn(mock_conn),
         )
+        # One load commit and one swap commit per table.
+        self.assertEqual(mock_conn.commit.call_count, 4)
+
+    def test_incremental_refresh_replaces_only_changed_groups(self) -> None:
+        """Changed (date_key, file_key) groups are deleted and reinserted in place."""
+        mock_conn, mock_cursor = _make_mock_conn()
+
+        refresh_landing_page_projection(mock_conn, [(20260429, 7), (20260429, 9)])
+
+        calls = mock_cursor.execute.call_args_list
+        self.assertIn(f"DELETE FROM {LANDING_PAGE_ROW_PROJECTION}", calls[0].args[0])
+        self.assertIn(f"INSERT INTO {LANDING_PAGE_ROW_PROJECTION} (", calls[1].args[0])
+        self.assertIn("unnest(%s::int[], %s::int[])", calls[1].args[0])
+        self.assertEqual(calls[1].args[1], ([20260429, 20260429], [7, 9]))
+        self.assertIn(f"DELETE FROM {LANDING_PAGE_FILTER_COMBINATIONS}", calls[3].args[0])
+        self.assertEqual(calls[3].args[1], ([20260429],))
+        self.assertIn(f"INSERT INTO {LANDING_PAGE_FILTER_COMBINATIONS} (", calls[4].args[0])
+        self.assertIn("WHERE date_key = ANY(%s)", calls[4].args[0])
+        self.assertEqual(calls[4].args[1], ([20260429],))
+        executed = _executed_sql_calls_for_conn(mock_conn)
+        self.assertFalse(any("_staging" in sql for sql in executed))
         mock_conn.commit.assert_called_once()
 
+    def test_incremental_refresh_without_changes_is_a_no_op(self) -> None:
+        """An empty change list touches nothing."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        refresh_landing_page_projection(mock_conn, [])
+        mock_cursor.execute.assert_not_called()
+        mock_conn.commit.assert_not_called()
+
+    def test_lookback_groups_drive_projection_changes(self) -> None:
+        """Only groups whose rows changed, appeared or disappeared are refreshed."""
+        columns = lookback_columns(1)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+
+            def write(rows):
+                with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                    writer = csv.writer(fh)
+                    writer.writerow(columns)
+                    writer.writerows(rows)
+                return lookback_groups(csv_path)
+
+            before = write([
+                [20260429, 1, 7, 1, 1, "3.17", "", "3.20", ""],
+                [20260429, 2, 8, 1, 1, "1.50", "", "", ""],
+                [20260429, 3, 9, 1, 1, "2.00", "", "", ""],
+            ])
+            after = write([
+                [20260429, 1, 7, 1, 1, "3.17", "", "3.20", ""],
+                [20260429, 2, 8, 1, 1, "1.55", "", "", ""],
+                [20260429, 4, 10, 1, 1, "9.99", "", "", ""],
+            ])
+
+        self.assertEqual(set(before), {"20260429:7", "20260429:8", "20260429:9"})
+        self.assertEqual(
+            projection_changes(before, after),
+            [(20260429, 8), (20260429, 9), (20260429, 10)],
+        )
+        self.assertEqual(projection_changes(after, after), [])
+        self.assertEqual(lookback_groups(Path("/nonexistent/fact_prices_lookback.csv")), {})
+
     def test_execute_batch_rows_preserves_page_boundaries(self) -> None:
         """execute_batch_rows preserves page batching across multiple pages."""
         mock_conn, mock_cursor = _make_mock_conn()
@@ -298,71 +597,247 @@ class TestLandingPageProjection(unittest.TestCase):
         self.assertEqual(mock_conn.cursor.call_count, 0)
 
 
-class TestUpsertDimSQL(unittest.TestCase):
-    """Tests that upsert_dim generates SQL containing ON CONFLICT … DO UPDATE."""
+class TestSyncDim(unittest.TestCase):
+    """Tests for sync_dim(): change-detection sync of dimension tables."""
 
-    def setUp(self) -> None:
-        """Reset the execute_batch mock call history before each test."""
-        _EXECUTE_BATCH.reset_mock()
+    COLUMNS = ["product_key", "product_code", "product_name"]
+
+    def _write_csv(self, path: Path, rows) -> None:
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(rows)
 
-    def test_upsert_sql_contains_on_conflict_clause(self) -> None:
-        """upsert_dim generates SQL with ON CONFLICT (pk_col) DO UPDATE SET."""
+    @staticmethod
+    def _conn(remote_max=None):
+        """Mock connection whose copy_expert captures the streamed CSV."""
         mock_conn, mock_cursor = _make_mock_conn()
+        for cursor in mock_conn._cursor_mocks:
+            cursor.fetchone.return_value = (remote_max,)
+        captured = []
+        for cursor in mock_conn._cursor_mocks:
+            cursor.copy_expert.side_effect = (
+                lambda sql, fh, size=8192: captured.append((sql, fh.read()))
+            )
+        return mock_conn, captured
 
+    def test_first_sync_sends_every_row_through_copy_and_merge(self) -> None:
+        """Without a manifest entry all rows are copied and merged in one statement."""
+        mock_conn, captured = self._conn()
         with tempfile.TemporaryDirectory() as tmp:
-            csv_path = Path(tmp) / "dim_settlement.csv"
-            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
-                writer = csv.writer(fh)
-                writer.writerow(["settlement_key", "ekatte", "settlement_name"])
-                writer.writerow([1, "68134", "Sofia"])
-
-            upsert_dim(
-                mock_conn,
-                "dim_settlement",
-                csv_path,
-                "settlement_key",
-                ["settlement_key", "ekatte", "settlement_name"],
+            csv_path = Path(tmp) / "dim_product.csv"
+            self._write_csv(csv_path, [[1, "A1", "Мляко"], [2, "", "Хляб, бял"]])
+            sent, skipped, updated, entry = sync_dim(
+                mock_conn, "dim_product", csv_path, "product_key", self.COLUMNS,
             )
 
-            # Verify execute_batch was called with the correct SQL.
-            self.assertTrue(_EXECUTE_BATCH.called, "execute_batch should have been called")
-            captured_sql = _EXECUTE_BATCH.call_args.args[1]
-            self.assertIn("ON CONFLICT", captured_sql)
-            self.assertIn("DO UPDATE SET", captured_sql)
+        self.assertEqual((sent, skipped, updated), (2, 0, None))
+        self.assertEqual(entry["max_key"], 2)
+        self.assertEqual(set(entry["hashes"]), {"1", "2"})
+        sql, data = captured[0]
+        self.assertIn("COPY dim_product_sync (product_key, product_code, product_name)", sql)
+        self.assertEqual(data.decode("utf-8"), '1,A1,Мляко\n2,,"Хляб, бял"\n')
+        executed = " ".join(_executed_sql_calls_for_conn(mock_conn))
+        self.assertIn("CREATE TEMP TABLE dim_product_sync (LIKE dim_product", executed)
+        self.assertIn("ON CONFLICT (product_key) DO UPDATE SET", executed)
+        self.assertIn(
+            "WHERE (dim_product.product_code, dim_product.product_name) IS DISTINCT FROM "
+            "(EXCLUDED.product_code, EXCLUDED.product_name)",
+            executed,
+        )
+        mock_conn.commit.assert_called_once()
 
-    def test_upsert_rows_match_csv_content(self) -> None:
-        """upsert_dim passes the exact CSV rows to execute_batch."""
-        mock_conn, mock_cursor = _make_mock_conn()
+    def test_unchanged_rows_are_skipped(self) -> None:
+        """Only new keys and rows whose hash changed are sent on the next sync."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "dim_product.csv"
+            self._write_csv(csv_path, [[1, "A1", "Мляко"], [2, "B2", "Хляб"]])
+            *_, entry = sync_dim(
+                self._conn()[0], "dim_product", csv_path, "product_key", self.COLUMNS,
+            )
+
+            mock_conn, captured = self._conn(remote_max=2)
+            self.assertEqual(
+                sync_dim(mock_conn, "dim_product", csv_path, "product_key", self.COLUMNS, entry)[:3],
+                (0, 2, 0),
+            )
+            self.assertEqual(captured, [])
+            mock_conn.commit.assert_not_called()
 
+            self._write_csv(csv_path, [[1, "A1", "Мляко"], [2, "B2", "Хляб бял"], [3, "C3", "Сирене"]])
+            mock_conn, captured = self._conn(remote_max=2)
+            sent, skipped, updated, _ = sync_dim(
+                mock_conn, "dim_product", csv_path, "product_key", self.COLUMNS, entry,
+            )
+
+        self.assertEqual((sent, skipped, updated), (2, 1, 1))
+        self.assertEqual(captured[0][1].decode("utf-8"), "2,B2,Хляб бял\n3,C3,Сирене\n")
+
+    def test_entry_ignored_when_remote_table_was_reset(self) -> None:
+        """A remote max(key) below the manifest's max_key forces a full send."""
         with tempfile.TemporaryDirectory() as tmp:
-            csv_path = Path(tmp) / "dim_company.csv"
-            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
-                writer = csv.writer(fh)
-                writer.writerow(["company_key", "uic", "company_name"])
-                writer.writerow([1, "123456789", "Test Company"])
-
-            count = upsert_dim(
-                mock_conn,
-                "dim_company",
-                csv_path,
-                "company_key",
-                ["company_key", "uic", "company_name"],
+            csv_path = Path(tmp) / "dim_product.csv"
+            self._write_csv(csv_path, [[1, "A1", "Мляко"], [2, "B2", "Хляб"]])
+            *_, entry = sync_dim(
+                self._conn()[0], "dim_product", csv_path, "product_key", self.COLUMNS,
+            )
+            for remote_max in (None, 1):
+                mock_conn, _ = self._conn(remote_max=remote_max)
+                self.assertEqual(
+                    sync_dim(mock_conn, "dim_product", csv_path, "product_key",
+                             self.COLUMNS, entry)[:2],
+                    (2, 0),
+                )
+
+    def test_send_all_sends_every_row_but_counts_updates(self) -> None:
+        """send_all (remotely pruned tables) sends all rows and still reports updates."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "dim_product.csv"
+            self._write_csv(csv_path, [[1, "A1", "Мляко"], [2, "B2", "Хляб"]])
+            *_, entry = sync_dim(
+                self._conn()[0], "dim_product", csv_path, "product_key", self.COLUMNS,
+            )
+            mock_conn, captured = self._conn()
+            result = sync_dim(
+                mock_conn, "dim_product", csv_path, "product_key", self.COLUMNS, entry,
+                send_all=True,
             )
-            self.assertEqual(count, 1)
-            rows_passed = _EXECUTE_BATCH.call_args.args[2]
-            # First (and only) row: ('1', '123456789', 'Test Company').
-            self.assertEqual(rows_passed[0], ("1", "123456789", "Test Company"))
+
+        self.assertEqual(result[:3], (2, 0, 0))
+        self.assertEqual(captured[0][1].decode("utf-8"), "1,A1,Мляко\n2,B2,Хляб\n")
+        # No remote max(key) probe: pruned tables legitimately shrink.
+        self.assertNotIn("SELECT max(product_key) FROM dim_product", _executed_sql_calls_for_conn(mock_conn))
+
+    def test_manifest_round_trip_is_scoped_to_target(self) -> None:
+        """A manifest written for one database is empty for another."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "manifest.json"
+            manifest = load_dim_manifest(path, "db:5432/postgres")
+            self.assertEqual(manifest["tables"], {})
+            manifest["tables"]["dim_product"] = {"columns": self.COLUMNS, "max_key": 1, "hashes": {}}
+            save_dim_manifest(path, manifest)
+
+            self.assertEqual(load_dim_manifest(path, "db:5432/postgres"), manifest)
+            self.assertEqual(load_dim_manifest(path, "other:5432/postgres")["tables"], {})
+
+
+class TestParallelDimSync(unittest.TestCase):
+    """Tests for the FK-aware concurrent dimension sync (sync_dims())."""
+
+    def test_waves_follow_foreign_keys(self) -> None:
+        """Only dim_store waits, for dim_settlement and dim_company."""
+        self.assertEqual(
+            dim_dependencies(DIM_TABLES)["dim_store"], {"dim_settlement", "dim_company"},
+        )
+        waves = [[spec[0] for spec in wave] for wave in dim_sync_waves(DIM_TABLES)]
+        self.assertEqual(waves, [
+            ["dim_date", "dim_company", "dim_settlement", "dim_category", "dim_product", "dim_file"],
+            ["dim_store"],
+        ])
+        cyclic = [("a", Path("a.csv"), "a_key", ["a_key", "b_key"]),
+                  ("b", Path("b.csv"), "b_key", ["b_key", "a_key"])]
+        with self.assertRaises(ValueError):
+            dim_sync_waves(cyclic)
+
+    def test_runs_independent_tables_concurrently(self) -> None:
+        """Wave tables overlap on pooled connections; dependents start afterwards."""
+        lock = threading.Lock()
+        running: List[str] = []
+        finished: List[str] = []
+        peak = [0]
+
+        def fake_sync_dim(conn, table, *args, **kwargs):
+            with lock:
+                if table == "dim_store":
+                    self.assertTrue({"dim_settlement", "dim_company"} <= set(finished))
+                running.append(table)
+                peak[0] = max(peak[0], len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(table)
+                finished.append(table)
+            return 1, 2, 1 if table == "dim_product" else 0, {"table": table}
+
+        pool = MagicMock()
+        _mock_psycopg2.pool.ThreadedConnectionPool.return_value = pool
+        manifest = {"tables": {}}
+        with patch.dict(sync_dims.__globals__, {
+            "sync_dim": fake_sync_dim,
+            "save_dim_manifest": MagicMock(),
+        }):
+            sent, skipped, names_changed = sync_dims("postgresql://db", manifest, workers=3)
+
+        self.assertEqual((sent, skipped, names_changed), (7, 14, True))
+        self.assertEqual(peak[0], 3)
+        self.assertEqual(_mock_psycopg2.pool.ThreadedConnectionPool.call_args.args, (1, 3, "postgresql://db"))
+        self.assertEqual(pool.getconn.call_count, pool.putconn.call_count)
+        pool.closeall.assert_called_once()
+        self.assertEqual(manifest["tables"]["dim_store"], {"table": "dim_store"})
+        self.assertEqual(len(manifest["tables"]), len(DIM_TABLES))
+
+    def test_failure_stops_later_waves(self) -> None:
+        """A failing table is raised after its wave; dependents never run."""
+        calls: List[str] = []
+
+        def fake_sync_dim(conn, table, *args, **kwargs):
+            calls.append(table)
+            if table == "dim_company":
+                raise FakeDatabaseError("simulated")
+            return 0, 0, 0, {}
+
+        manifest = {"tables": {}}
+        with patch.dict(sync_dims.__globals__, {
+            "sync_dim": fake_sync_dim,
+            "save_dim_manifest": MagicMock(),
+        }):
+            with self.assertRaises(FakeDatabaseError):
+                sync_dims("postgresql://db", manifest)
+
+        self.assertNotIn("dim_store", calls)
+        self.assertNotIn("dim_company", manifest["tables"])
+        self.assertIn("dim_product", manifest["tables"])
+
+    def test_name_change_survives_a_run_that_fails_before_the_refresh(self) -> None:
+        """projection_dirty is saved with the hashes; the next run rebuilds in full."""
+        def fake_sync_dim(conn, table, *args, **kwargs):
+            return 1, 0, 1 if table == "dim_store" else 0, {"table": table}
+
+        _mock_psycopg2.pool.ThreadedConnectionPool.return_value = MagicMock()
+        refresh = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "manifest.json"
+            missing = Path(tmp) / "fact_prices_lookback.csv"
+            manifest = load_dim_manifest(path, "db:5432/postgres")
+            manifest.update(projection_groups={}, filter_combinations=FILTER_COMBINATIONS_VERSION)
+            with patch.dict(sync_dims.__globals__, {
+                "DIM_SYNC_MANIFEST_PATH": path,
+                "sync_dim": fake_sync_dim,
+                "is_partitioned": MagicMock(return_value=False),
+                "refresh_landing_page_projection": refresh,
+            }):
+                sync_dims("postgresql://db", manifest)
+                # The run fails here (e.g. in copy_lookback); the next run
+                # finds the dimension hashes unchanged.
+                manifest = load_dim_manifest(path, "db:5432/postgres")
+                sync_landing_page_projection(MagicMock(), manifest, missing)
+                full = refresh.call_args
+                sync_landing_page_projection(MagicMock(), load_dim_manifest(path, "db:5432/postgres"), missing)
+                incremental = refresh.call_args
+
+        self.assertEqual(len(full.args), 1)
+        self.assertNotIn("projection_dirty", manifest)
+        self.assertEqual(incremental.args[1], [])
 
 
 class TestInsertLookback(unittest.TestCase):
-    """Tests for insert_lookback(): TRUNCATE + reinsert of fact_prices_lookback."""
+    """Tests for insert_lookback(): staging reload + swap of fact_prices_lookback."""
 
     def setUp(self) -> None:
         """Reset the execute_batch mock before each test."""
         _EXECUTE_BATCH.reset_mock()
 
-    def test_truncates_and_inserts_rows(self) -> None:
-        """insert_lookback truncates fact_prices_lookback then inserts rows from CSV."""
+    def test_loads_staging_and_swaps(self) -> None:
+        """insert_lookback fills a staging copy from the CSV, then swaps it in."""
         mock_conn, mock_cursor = _make_mock_conn()
 
         columns = [
@@ -381,34 +856,39 @@ class TestInsertLookback(unittest.TestCase):
             result = insert_lookback(mock_conn, csv_path)
 
         self.assertEqual(result, 1)
-        # Verify TRUNCATE was called.
-        executed_statements = [str(c.args[0]) for c in mock_cursor.execute.call_args_list]
-        self.assertTrue(
-            any("TRUNCATE" in s for s in executed_statements),
-            "TRUNCATE TABLE fact_prices_lookback must be called",
+        executed_statements = _executed_sql_calls_for_conn(mock_conn)
+        self.assertNotIn("TRUNCATE TABLE fact_prices_lookback", executed_statements)
+        self.assertIn(
+            "CREATE TABLE fact_prices_lookback_staging (LIKE fact_prices_lookback "
+            "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)",
+            executed_statements,
         )
-        # Verify execute_batch was called with INSERT.
+        self.assertIn(
+            "ALTER TABLE fact_prices_lookback_staging RENAME TO fact_prices_lookback",
+            executed_statements,
+        )
+        # Verify execute_batch was called with INSERT into the staging table.
         self.assertTrue(_EXECUTE_BATCH.called, "execute_batch should have been called for insert")
         captured_sql = _EXECUTE_BATCH.call_args.args[1]
-        self.assertIn("INSERT INTO fact_prices_lookback", captured_sql)
-        mock_conn.commit.assert_called_once()
+        self.assertIn("INSERT INTO fact_prices_lookback_staging", captured_sql)
+        # One commit for the staging load, one for the swap.
+        self.assertEqual(mock_conn.commit.call_count, 2)
 
-    def test_truncates_only_when_csv_empty(self) -> None:
-        """insert_lookback truncates and returns 0 when CSV is absent."""
+    def test_swaps_in_empty_table_when_csv_absent(self) -> None:
+        """insert_lookback replaces the table with an empty one and returns 0 when CSV is absent."""
         mock_conn, mock_cursor = _make_mock_conn()
 
         # Pass a path that does not exist.
         result = insert_lookback(mock_conn, Path("/nonexistent/fact_prices_lookback.csv"))
 
         self.assertEqual(result, 0)
-        executed_statements = [str(c.args[0]) for c in mock_cursor.execute.call_args_list]
-        self.assertTrue(
-            any("TRUNCATE" in s for s in executed_statements),
-            "TRUNCATE must still be executed even when CSV is absent",
+        self.assertIn(
+            "ALTER TABLE fact_prices_lookback_staging RENAME TO fact_prices_lookback",
+            _executed_sql_calls_for_conn(mock_conn),
         )
         # execute_batch must NOT be called when there are no rows to insert.
         _EXECUTE_BATCH.assert_not_called()
-        mock_conn.commit.assert_called_once()
+        self.assertEqual(mock_conn.commit.call_count, 2)
 
     def test_rollback_on_db_error(self) -> None:
         """insert_lookback rolls back and re-raises on a database error."""
@@ -431,6 +911,604 @@ class TestInsertLookback(unittest.TestCase):
         mock_conn.rollback.assert_called_once()
 
 
+    def test_inserts_columns_from_wider_csv_header(self) -> None:
+        """A lookback_days=3 CSV inserts day3 columns taken from its header."""
+        mock_conn, _ = _make_mock_conn()
+        columns = lookback_columns(3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(columns)
+                writer.writerow([1, 1, 1, 1, 1, "3.17", "", "3.2", "", "3.1", "", "2.9", ""])
+
+            result = insert_lookback(mock_conn, csv_path)
+
+        self.assertEqual(result, 1)
+        captured_sql = _EXECUTE_BATCH.call_args.args[1]
+        self.assertIn("retail_price_day3, promo_price_day3)", captured_sql)
+        self.assertEqual(len(_EXECUTE_BATCH.call_args.args[2][0]), 13)
+
+    def test_partition_inserts_integers_divided_by_scale(self) -> None:
+        """A .kcol partition sends ints (None for NULL) and divides prices by their scale."""
+        mock_conn, _ = _make_mock_conn()
+        columns = lookback_columns(2)
+        values = [20260429, 1, 1, 1, 1, 31700, NULL_VALUE, 32000, NULL_VALUE, NULL_VALUE, NULL_VALUE]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            part = Path(tmp) / "fact_prices_lookback.kcol"
+            write_partition(
+                part, {name: array("q", [v]) for name, v in zip(columns, values)},
+                scales={name: 10000 for name in columns[5:]},
+            )
+            result = insert_lookback(mock_conn, part)
+
+        self.assertEqual(result, 1)
+        captured_sql = _EXECUTE_BATCH.call_args.args[1]
+        self.assertIn("VALUES (%s, %s, %s, %s, %s, %s / 10000.0,", captured_sql)
+        self.assertEqual(
+            _EXECUTE_BATCH.call_args.args[2][0],
+            (20260429, 1, 1, 1, 1, 31700, None, 32000, None, None, None),
+        )
+
+    def test_stotinki_csv_inserts_integers_scaled_in_sql(self) -> None:
+        """A stotinki CSV sends ints, divides prices by 100 in SQL and fills effective_price."""
+        mock_conn, _ = _make_mock_conn()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(lookback_stotinki_columns(2))
+                writer.writerow([20260429, 1, 1, 1, 1, 317, "", 317, 320, "", "", ""])
+
+            result = insert_lookback(mock_conn, csv_path)
+
+        self.assertEqual(result, 1)
+        captured_sql = _EXECUTE_BATCH.call_args.args[1]
+        self.assertIn("retail_price, promo_price, effective_price, retail_price_day1", captured_sql)
+        self.assertIn("VALUES (%s, %s, %s, %s, %s, %s / 100.0,", captured_sql)
+        self.assertEqual(
+            _EXECUTE_BATCH.call_args.args[2][0],
+            (20260429, 1, 1, 1, 1, 317, None, 317, 320, None, None, None),
+        )
+
+
+class TestStreamingPages(unittest.TestCase):
+    """Tests for the streaming CSV pipelines behind execute_batch_rows() and sync_dim()."""
+
+    def test_reader_errors_reach_the_caller(self) -> None:
+        """An exception raised while producing rows is re-raised to the sender."""
+        def rows():
+            yield (1,)
+            raise ValueError("bad row")
+
+        with self.assertRaises(ValueError):
+            list(_iter_pages(rows(), 1))
+        self.assertEqual(list(_iter_pages(iter([(1,), (2,), (3,)]), 2, prefetch=0)),
+                         [[(1,), (2,)], [(3,)]])
+
+    def test_lookback_load_memory_is_bounded_by_pages(self) -> None:
+        """Peak traced memory stays near a few pages, not the whole file."""
+        n_rows = 100_000
+        sent = []
+
+        def execute_batch(cur, sql, page, page_size):
+            sent.append(len(page))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(lookback_columns(2))
+                for i in range(n_rows):
+                    writer.writerow([20260429, i % 900, i % 40, i % 300, i,
+                                     "3.1700", "", "3.2000", "", "3.1000", "2.9900"])
+
+            mock_conn, _ = _make_mock_conn()
+            with patch.object(_mock_psycopg2_extras, "execute_batch", execute_batch):
+                tracemalloc.start()
+                try:
+                    result = insert_lookback(mock_conn, csv_path)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+
+        self.assertEqual(result, n_rows)
+        self.assertEqual(sum(sent), n_rows)
+        self.assertEqual(max(sent), 2000)
+        # Materialising the file as row tuples takes well over 50 MB.
+        self.assertLess(peak, 8 * 1024 * 1024)
+
+    def test_dim_sync_memory_is_bounded_by_the_manifest(self) -> None:
+        """sync_dim streams changed rows into COPY; only the hashes are retained."""
+        n_rows = 100_000
+        columns = ["product_key", "product_code", "product_name"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "dim_product.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(columns)
+                for i in range(1, n_rows + 1):
+                    writer.writerow([i, f"C{i:08d}", f"Продукт {i} кисело мляко 400 г"])
+
+            mock_conn, _ = _make_mock_conn()
+            streamed = []
+
+            def copy_expert(sql, fh, size=8192):
+                streamed.append(sum(len(chunk) for chunk in iter(lambda: fh.read(size), b"")))
+
+            for cursor in mock_conn._cursor_mocks:
+                cursor.copy_expert.side_effect = copy_expert
+            tracemalloc.start()
+            try:
+                sent, skipped, _, entry = sync_dim(
+                    mock_conn, "dim_product", csv_path, "product_key", columns,
+                )
+                retained, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual((sent, skipped, len(entry["hashes"])), (n_rows, 0, n_rows))
+        self.assertGreater(streamed[0], 0)
+        # The returned hashes stay in memory; collecting the changed rows
+        # before the COPY would add another 30 MB on top of them.
+        self.assertLess(peak - retained, 8 * 1024 * 1024)
+
+
+class TestCopyLookback(unittest.TestCase):
+    """Tests for copy_lookback(): COPY FROM STDIN into a staging fact_prices_lookback."""
+
+    def setUp(self) -> None:
+        """Reset the execute_batch mock before each test."""
+        _EXECUTE_BATCH.reset_mock()
+
+    @staticmethod
+    def _capture_copy(mock_cursor):
+        """Make copy_expert drain its file in small reads; return the captured (sql, data)."""
+        captured = []
+
+        def _copy_expert(sql, fh, size=8192):
+            data = b""
+            while True:
+                chunk = fh.read(7)
+                if not chunk:
+                    break
+                data += chunk
+            captured.append((sql, data))
+
+        mock_cursor.copy_expert.side_effect = _copy_expert
+        return captured
+
+    def test_streams_decimal_csv_straight_into_table(self) -> None:
+        """A decimal CSV is streamed unchanged with CSV/HEADER/NULL '' options."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        captured = self._capture_copy(mock_cursor)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(lookback_columns(2))
+                writer.writerow([20260429, 1, 1, 1, 1, "3.17", None, "3.20", None, "3.10", None])
+                writer.writerow([20260429, 2, 1, 1, 1, "", "1.5", "", "", "", ""])
+            raw = csv_path.read_bytes()
+
+            result = copy_lookback(mock_conn, csv_path)
+
+        self.assertEqual(result, 2)
+        self.assertEqual(len(captured), 1)
+        sql, data = captured[0]
+        self.assertIn("COPY fact_prices_lookback_staging (date_key,", sql)
+        self.assertIn("FROM STDIN WITH (FORMAT csv, HEADER true, NULL '')", sql)
+        self.assertEqual(data, raw)
+        _EXECUTE_BATCH.assert_not_called()
+        self.assertEqual(mock_conn.commit.call_count, 2)
+
+    def test_stotinki_csv_goes_through_scaled_temp_table(self) -> None:
+        """Stotinki CSVs are copied as BIGINTs and divided by 100 server-side."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        captured = self._capture_copy(mock_cursor)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(lookback_stotinki_columns(1))
+                writer.writerow([20260429, 1, 1, 1, 1, 317, "", 317, 320, ""])
+
+            result = copy_lookback(mock_conn, csv_path)
+
+        self.assertEqual(result, 1)
+        self.assertIn("COPY fact_prices_lookback_copy (", captured[0][0])
+        executed = " ".join(_executed_sql_calls(mock_cursor))
+        self.assertIn("effective_price BIGINT", executed)
+        self.assertIn("ON COMMIT DROP", executed)
+        self.assertIn(
+            "SELECT date_key, store_key, file_key, category_key, product_key, "
+            "retail_price / 100.0, promo_price / 100.0, effective_price / 100.0, "
+            "retail_price_day1 / 100.0, promo_price_day1 / 100.0 "
+            "FROM fact_prices_lookback_copy",
+            executed,
+        )
+
+    def test_partition_is_streamed_as_csv_with_empty_nulls(self) -> None:
+        """A .kcol partition is rendered to CSV on the fly, NULL_VALUE as ''."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        captured = self._capture_copy(mock_cursor)
+        columns = lookback_columns(1)
+        values = [20260429, 1, 1, 1, 1, 31700, NULL_VALUE, 32000, NULL_VALUE]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            part = Path(tmp) / "fact_prices_lookback.kcol"
+            write_partition(
+                part, {name: array("q", [v]) for name, v in zip(columns, values)},
+                scales={name: 10000 for name in columns[5:]},
+            )
+            result = copy_lookback(mock_conn, part)
+
+        self.assertEqual(result, 1)
+        self.assertEqual(
+            captured[0][1].decode("ascii").splitlines(),
+            [",".join(columns), "20260429,1,1,1,1,31700,,32000,"],
+        )
+        self.assertIn("retail_price / 10000.0", " ".join(_executed_sql_calls(mock_cursor)))
+
+    def test_swaps_in_empty_table_when_csv_absent(self) -> None:
+        """A missing file still replaces the table and copies nothing."""
+        mock_conn, mock_cursor = _make_mock_conn()
+
+        result = copy_lookback(mock_conn, Path("/nonexistent/fact_prices_lookback.csv"))
+
+        self.assertEqual(result, 0)
+        self.assertIn("DROP TABLE fact_prices_lookback_retired", _executed_sql_calls_for_conn(mock_conn))
+        mock_cursor.copy_expert.assert_not_called()
+        self.assertEqual(mock_conn.commit.call_count, 2)
+
+    def test_rollback_on_db_error(self) -> None:
+        """copy_lookback rolls back and re-raises when COPY fails."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.copy_expert.side_effect = FakeDatabaseError("simulated")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            csv_path.write_text(",".join(lookback_columns(2)) + "\n", encoding="utf-8")
+            with self.assertRaises(FakeDatabaseError):
+                copy_lookback(mock_conn, csv_path)
+
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+
+    def test_execute_batch_flag_defaults_to_copy(self) -> None:
+        """COPY is the default; --execute-batch selects the INSERT fallback."""
+        self.assertFalse(parse_args([]).execute_batch)
+        self.assertTrue(parse_args(["--execute-batch"]).execute_batch)
+
+
+class TestCopyProductTokens(unittest.TestCase):
+    """Tests for copy_product_tokens(): digest-gated rebuild of dim_product_tokens."""
+
+    def test_copies_changed_file_and_skips_it_next_time(self) -> None:
+        """The file is COPYed into the staging table once per distinct digest."""
+        manifest = {"tables": {}}
+
+        def _copy(csv_path):
+            mock_conn, mock_cursor = _make_mock_conn()
+            captured = TestCopyLookback._capture_copy(mock_cursor)
+            return copy_product_tokens(mock_conn, csv_path, manifest), captured
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "dim_product_tokens.csv"
+            csv_path.write_text("product_key,token\n1,kiselo\n1,mlyako\n", encoding="utf-8")
+            first, captured = _copy(csv_path)
+            second, skipped = _copy(csv_path)
+            csv_path.write_text("product_key,token\n1,kiselo\n", encoding="utf-8")
+            third, _ = _copy(csv_path)
+
+        self.assertEqual((first, second, third), (2, 0, 1))
+        self.assertEqual(skipped, [])
+        self.assertEqual(
+            captured[0][0],
+            f"COPY {PRODUCT_SEARCH_TOKENS}_staging (product_key, token) "
+            "FROM STDIN WITH (FORMAT csv, HEADER true)",
+        )
+        self.assertIn("product_tokens", manifest)
+
+    def test_unchanged_file_is_copied_again_into_an_empty_table(self) -> None:
+        """A matching digest does not skip the copy when the remote table is empty."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "dim_product_tokens.csv"
+            csv_path.write_text("product_key,token\n1,kiselo\n", encoding="utf-8")
+            manifest = {"product_tokens": file_digest(csv_path)}
+            mock_conn, _ = _make_mock_conn()
+            captured = []
+            for cursor in mock_conn._cursor_mocks:
+                cursor.fetchone.return_value = (False,)
+                cursor.copy_expert.side_effect = (
+                    lambda sql, fh, size=8192: captured.append(b"".join(iter(lambda: fh.read(7), b"")))
+                )
+
+            result = copy_product_tokens(mock_conn, csv_path, manifest)
+
+        self.assertEqual(result, 1)
+        self.assertEqual(len(captured), 1)
+        self.assertIn(
+            f"SELECT EXISTS (SELECT 1 FROM {PRODUCT_SEARCH_TOKENS})",
+            _executed_sql_calls_for_conn(mock_conn),
+        )
+
+    def test_missing_file_leaves_table_alone(self) -> None:
+        """Without a token file nothing is sent or swapped."""
+        mock_conn, mock_cursor = _make_mock_conn()
+
+        result = copy_product_tokens(mock_conn, Path("/nonexistent/dim_product_tokens.csv"), {})
+
+        self.assertEqual(result, 0)
+        mock_cursor.execute.assert_not_called()
+        mock_conn.commit.assert_not_called()
+
+class TestStagingSwap(unittest.TestCase):
+    """Tests for replace_table() / swap_staging_table(): zero-downtime table refresh."""
+
+    def test_replays_foreign_keys_indexes_and_grants_on_staging(self) -> None:
+        """Catalog FKs, indexes and grants of the live table are recreated on staging."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.fetchall.side_effect = [
+            [("fpl_date_key_fkey", "FOREIGN KEY (date_key) REFERENCES dim_date(date_key)")],
+            [("idx_fpl_file_key",
+              "CREATE INDEX idx_fpl_file_key ON public.fact_prices_lookback USING btree (file_key)")],
+            [("anon", "SELECT"), ("PUBLIC", "SELECT")],
+        ]
+        load = MagicMock()
+
+        replace_table(mock_conn, "fact_prices_lookback", load)
+
+        load.assert_called_once_with(mock_cursor, "fact_prices_lookback_staging")
+        executed = _executed_sql_calls_for_conn(mock_conn)
+        self.assertIn(
+            'ALTER TABLE fact_prices_lookback_staging ADD CONSTRAINT "fpl_date_key_fkey" '
+            "FOREIGN KEY (date_key) REFERENCES dim_date(date_key)",
+            executed,
+        )
+        self.assertIn(
+            'CREATE INDEX "idx_fpl_file_key_staging" ON fact_prices_lookback_staging '
+            "USING btree (file_key)",
+            executed,
+        )
+        self.assertIn('GRANT SELECT ON fact_prices_lookback_staging TO "anon"', executed)
+        self.assertIn("GRANT SELECT ON fact_prices_lookback_staging TO PUBLIC", executed)
+        # The swap renames the staging index to the live name after the old table is dropped.
+        swap = executed[executed.index("SET LOCAL lock_timeout = '500ms'"):]
+        self.assertEqual(swap[1:], [
+            "ALTER TABLE fact_prices_lookback RENAME TO fact_prices_lookback_retired",
+            "ALTER TABLE fact_prices_lookback_staging RENAME TO fact_prices_lookback",
+            "DROP TABLE fact_prices_lookback_retired",
+            'ALTER INDEX "idx_fpl_file_key_staging" RENAME TO "idx_fpl_file_key"',
+        ])
+
+    def test_load_error_rolls_back_without_swapping(self) -> None:
+        """A failing load leaves the live table alone."""
+        mock_conn, _ = _make_mock_conn()
+        load = MagicMock(side_effect=FakeDatabaseError("simulated"))
+
+        with self.assertRaises(FakeDatabaseError):
+            replace_table(mock_conn, "fact_prices_lookback", load)
+
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+        self.assertNotIn(
+            "ALTER TABLE fact_prices_lookback RENAME TO fact_prices_lookback_retired",
+            _executed_sql_calls_for_conn(mock_conn),
+        )
+
+    def test_swap_retries_on_lock_timeout(self) -> None:
+        """A lock timeout (55P03) is rolled back and retried; other errors are raised."""
+        mock_conn, _ = _make_mock_conn()
+        busy = FakeOperationalError("canceling statement due to lock timeout")
+        busy.pgcode = "55P03"
+        first, second = mock_conn._cursor_mocks[:2]
+        first.execute.side_effect = [None, busy]
+
+        with patch("load_supabase.time.sleep") as sleep:
+            swap_staging_table(mock_conn, "t", "t_staging", [])
+
+        sleep.assert_called_once()
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_called_once()
+        self.assertIn("ALTER TABLE t_staging RENAME TO t", _executed_sql_calls(second))
+
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.execute.side_effect = FakeOperationalError("connection lost")
+        with self.assertRaises(FakeOperationalError):
+            swap_staging_table(mock_conn, "t", "t_staging", [])
+
+
+class TestPartitionByDate(unittest.TestCase):
+    """Tests for the optional date_key partitioning of lookback and projection."""
+
+    def test_partitioned_replace_attaches_one_partition_per_day(self) -> None:
+        """A single-day load is renamed, CHECKed and attached; old days are dropped."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.fetchone.return_value = ("p",)
+        mock_cursor.fetchall.side_effect = [
+            [],
+            [("idx_fpl_file_key",
+              "CREATE INDEX idx_fpl_file_key ON ONLY public.fact_prices_lookback "
+              "USING btree (file_key)")],
+            [],
+            [(20260429,)],
+        ]
+        mock_conn._cursor_mocks[1].fetchall.return_value = [
+            ("fact_prices_lookback_p20260428",), ("fact_prices_lookback_p20260429",),
+        ]
+
+        replace_table(mock_conn, "fact_prices_lookback", MagicMock())
+
+        executed = _executed_sql_calls_for_conn(mock_conn)
+        part = "fact_prices_lookback_p20260429"
+        self.assertIn(f"ALTER TABLE fact_prices_lookback_staging RENAME TO {part}_staging", executed)
+        self.assertIn(
+            f"ALTER TABLE {part}_staging ADD CONSTRAINT {part}_date_key_check "
+            "CHECK (date_key = 20260429)",
+            executed,
+        )
+        self.assertIn(
+            f'CREATE INDEX "idx_fpl_file_key_p20260429_staging" ON {part}_staging '
+            "USING btree (file_key)",
+            executed,
+        )
+        swap = executed[executed.index("SET LOCAL lock_timeout = '500ms'") + 2:]
+        self.assertEqual(swap, [
+            'ALTER TABLE fact_prices_lookback DETACH PARTITION "fact_prices_lookback_p20260428"',
+            'DROP TABLE "fact_prices_lookback_p20260428"',
+            f'ALTER TABLE fact_prices_lookback DETACH PARTITION "{part}"',
+            f'DROP TABLE "{part}"',
+            f"ALTER TABLE {part}_staging RENAME TO {part}",
+            f"ALTER TABLE fact_prices_lookback ATTACH PARTITION {part} FOR VALUES IN (20260429)",
+            'ALTER INDEX "idx_fpl_file_key_p20260429_staging" RENAME TO "idx_fpl_file_key_p20260429"',
+        ])
+        self.assertEqual(mock_conn.commit.call_count, 2)
+
+    def test_multi_day_load_is_split_per_day(self) -> None:
+        """Each day is copied into its own staged partition and the staging table dropped."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.fetchone.return_value = ("p",)
+        mock_cursor.fetchall.side_effect = [[], [], [], [(20260428,), (20260429,)]]
+
+        replace_table(mock_conn, LANDING_PAGE_ROW_PROJECTION, MagicMock())
+
+        executed = _executed_sql_calls_for_conn(mock_conn)
+        for date_key in (20260428, 20260429):
+            self.assertIn(
+                f"ALTER TABLE {LANDING_PAGE_ROW_PROJECTION} ATTACH PARTITION "
+                f"{LANDING_PAGE_ROW_PROJECTION}_p{date_key} FOR VALUES IN ({date_key})",
+                executed,
+            )
+            self.assertIn(
+                f"INSERT INTO {LANDING_PAGE_ROW_PROJECTION}_p{date_key}_staging "
+                f"SELECT * FROM {LANDING_PAGE_ROW_PROJECTION}_staging WHERE date_key = %s",
+                executed,
+            )
+        self.assertIn(f"DROP TABLE {LANDING_PAGE_ROW_PROJECTION}_staging", executed)
+
+    def test_migration_moves_rows_into_date_partitions(self) -> None:
+        """An ordinary table is renamed aside, recreated partitioned and refilled."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.fetchone.return_value = ("r",)
+        mock_cursor.fetchall.side_effect = [
+            [],
+            [("idx_fpl_file_key",
+              "CREATE INDEX idx_fpl_file_key ON public.fact_prices_lookback USING btree (file_key)")],
+            [("anon", "SELECT")],
+            [(20260429,)],
+        ]
+
+        self.assertTrue(migrate_to_partitioned(mock_conn, "fact_prices_lookback"))
+
+        executed = _executed_sql_calls(mock_cursor)
+        self.assertEqual(executed[4:], [
+            "ALTER TABLE fact_prices_lookback RENAME TO fact_prices_lookback_unpartitioned",
+            "CREATE TABLE fact_prices_lookback (LIKE fact_prices_lookback_unpartitioned "
+            "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+            "PARTITION BY LIST (date_key)",
+            "SELECT DISTINCT date_key FROM fact_prices_lookback_unpartitioned ORDER BY 1",
+            "CREATE TABLE fact_prices_lookback_p20260429 "
+            "PARTITION OF fact_prices_lookback FOR VALUES IN (20260429)",
+            "INSERT INTO fact_prices_lookback SELECT * FROM fact_prices_lookback_unpartitioned",
+            "DROP TABLE fact_prices_lookback_unpartitioned",
+            'CREATE INDEX "idx_fpl_file_key" ON fact_prices_lookback USING btree (file_key)',
+            'GRANT SELECT ON fact_prices_lookback TO "anon"',
+            "ANALYZE fact_prices_lookback",
+        ])
+        mock_conn.commit.assert_called_once()
+
+        mock_conn, mock_cursor = _make_mock_conn()
+        mock_cursor.fetchone.return_value = ("p",)
+        self.assertFalse(migrate_to_partitioned(mock_conn, "fact_prices_lookback"))
+        self.assertEqual(len(_executed_sql_calls(mock_cursor)), 1)
+
+    def test_create_tables_uses_partitioned_ddl_when_requested(self) -> None:
+        """partition_by_date creates both tables PARTITION BY LIST and migrates them."""
+        self.assertEqual(_CREATE_PARTITIONED_DDL.count(") PARTITION BY LIST (date_key);"), 2)
+        self.assertNotIn("PARTITION BY", _CREATE_DDL)
+        mock_conn, mock_cursor = _make_mock_conn()
+        migrate = MagicMock()
+        # Patch the function's own globals: load_supabase was imported under patch.dict.
+        with patch.dict(create_tables.__globals__, {"migrate_to_partitioned": migrate}):
+            create_tables(mock_conn, partition_by_date=True)
+        self.assertIn(_CREATE_PARTITIONED_DDL, _executed_sql_calls(mock_cursor))
+        self.assertEqual(
+            [c.args[1] for c in migrate.call_args_list],
+            ["fact_prices_lookback", LANDING_PAGE_ROW_PROJECTION],
+        )
+        self.assertTrue(parse_args(["--partition-by-date"]).partition_by_date)
+        self.assertFalse(parse_args([]).partition_by_date)
+
+    def test_group_dates(self) -> None:
+        """group_dates() extracts the date_keys of lookback_groups() keys."""
+        self.assertEqual(group_dates({"20260428:1": "a", "20260429:1": "b", "20260429:2": "c"}),
+                         {20260428, 20260429})
+
+
+class TestLookbackColumns(unittest.TestCase):
+    """Tests for the generated N-day fact_prices_lookback column helpers."""
+
+    def test_default_columns_match_ddl(self) -> None:
+        """The default two-day column list is what _CREATE_DDL provisions."""
+        for column in lookback_columns(2):
+            self.assertIn(column, _CREATE_DDL)
+        self.assertNotIn("retail_price_day3", _CREATE_DDL)
+
+    def test_days_from_csv_header(self) -> None:
+        """lookback_days_from_csv counts day pairs and rejects foreign headers."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            self.assertEqual(lookback_days_from_csv(csv_path), 2)
+            csv_path.write_text(",".join(lookback_columns(7)) + "\n", encoding="utf-8")
+            self.assertEqual(lookback_days_from_csv(csv_path), 7)
+            csv_path.write_text("date_key,store_key\n", encoding="utf-8")
+            with self.assertRaises(ValueError):
+                lookback_days_from_csv(csv_path)
+
+    def test_layout_reads_partition_column_names(self) -> None:
+        """A .kcol partition is recognised by its column names."""
+        with tempfile.TemporaryDirectory() as tmp:
+            part = Path(tmp) / "fact_prices_lookback.kcol"
+            write_partition(part, {name: array("q") for name in lookback_columns(4)})
+            self.assertEqual(lookback_csv_layout(part), (4, False))
+
+    def test_layout_detects_stotinki_header(self) -> None:
+        """lookback_csv_layout reports the price format alongside the day count."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "fact_prices_lookback.csv"
+            csv_path.write_text(",".join(lookback_stotinki_columns(3)) + "\n", encoding="utf-8")
+            self.assertEqual(lookback_csv_layout(csv_path), (3, True))
+            csv_path.write_text(",".join(lookback_columns(3)) + "\n", encoding="utf-8")
+            self.assertEqual(lookback_csv_layout(csv_path), (3, False))
+
+    def test_effective_price_column_feeds_projection(self) -> None:
+        """effective_price is provisioned and preferred by the projection refresh."""
+        self.assertIn("effective_price   NUMERIC(12, 4)", _CREATE_DDL)
+        mock_conn, mock_cursor = _make_mock_conn()
+        refresh_landing_page_projection(mock_conn)
+        executed_sql = " ".join(_executed_sql_calls(mock_cursor))
+        self.assertIn("COALESCE(\n        f.effective_price,", executed_sql)
+
+    def test_ensure_columns_adds_only_days_beyond_default(self) -> None:
+        """ensure_lookback_columns adds day3+ columns and is a no-op for <= 2 days."""
+        mock_conn, mock_cursor = _make_mock_conn()
+        ensure_lookback_columns(mock_conn, 2)
+        self.assertEqual(_executed_sql_calls(mock_cursor), [])
+
+        ensure_lookback_columns(mock_conn, 4)
+        ddl = " ".join(_executed_sql_calls(mock_cursor))
+        self.assertIn("ADD COLUMN IF NOT EXISTS retail_price_day3", ddl)
+        self.assertIn("ADD COLUMN IF NOT EXISTS promo_price_day4", ddl)
+        self.assertNotIn("price_day2", ddl)
+        mock_conn.commit.assert_called_once()
+
 class TestGetRetainedLocalDates(unittest.TestCase):
     """Tests for get_retained_local_dates(): rolling retention window calculation."""
 
@@ -0,0 +1,222 @@
+"""
+test_publish_snapshots.py: Unit tests for src/publish_snapshots.py.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: verify that shards are deterministic gzip JSON, that every
+retained date gets its options, grouped and report-1 shards in column-compact
+form, that row shards are dictionary-encoded and named after their content,
+that the index records the data version, and that a failed run leaves an
+existing data/ untouched.
+All tests use a scripted fake cursor instead of a database.
+"""
+import sys
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add src/ to sys.path so the module resolves without installation.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+with patch.dict("sys.modules", {"psycopg2": MagicMock(), "dotenv": MagicMock()}):
+    from publish_snapshots import (  # noqa: E402
+        ROW_SHARD_MAX_ROWS,
+        SNAPSHOT_GROUPINGS,
+        SNAPSHOT_VERSION,
+        encode_row_shard,
+        publish_snapshots,
+        read_shard,
+        shard_key,
+        write_shard,
+    )
+
+
+# Rows of _ROW_SHARD_SQL: (key, name) per dictionary column, then prices.
+ROW_SHARD_ROWS = [
+    (10, "Кисело мляко", 5, "Мляко", 3, "Верига", 100, "Магазин А", 1, "a.csv",
+     Decimal("2.00"), None, Decimal("2.00")),
+    (10, "Кисело мляко", 5, "Мляко", None, None, 101, "Магазин Б", 1, "a.csv",
+     Decimal("2.20"), Decimal("1.90"), Decimal("1.90")),
+    (11, "Хляб", 6, "Хлебни", 3, "Верига", 100, "Магазин А", 1, "a.csv",
+     Decimal("1.10"), None, Decimal("1.10")),
+]
+
+
+class FakeCursor:
+    """Cursor returning canned results chosen by a substring of the SQL."""
+
+    def __init__(self, fail_on: str = "") -> None:
+        self.fail_on = fail_on
+        self.queries = []
+        self.description = []
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def execute(self, sql, params=()) -> None:
+        self.queries.append((sql, params))
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("simulated")
+        if "get_lp_options_date" in sql:
+            self._result(["date_key", "date"], [(20260429, date(2026, 4, 29))])
+        elif "get_lp_options_settlement" in sql:
+            self._result(["settlement_key", "name"], [(1, "София"), (2, "Пловдив")])
+        elif "get_lp_options_" in sql:
+            self._result(["key", "name"], [(7, "x")])
+        elif "HAVING SUM(row_count)" in sql:
+            self._result(["settlement_key", "min"], [(1, "София")])
+        elif "FROM landing_page_row_projection" in sql:
+            self._result([], ROW_SHARD_ROWS)
+        elif "COALESCE(SUM(row_count), 0)" in sql:
+            self._result(["sum"], [(30,)])
+        elif "SUM(row_count)" in sql:
+            self._result(["key", "sum"], [(1, 20), (2, 10)])
+        elif "get_landing_page_grouped_set" in sql:
+            self._result(["group1", "group2", "price_avg"], [(params[1], params[2], Decimal("2.50"))])
+        elif "get_report_1_category_prices" in sql:
+            self._result(["settlement_key", "category_key", "avg_price"],
+                         [(1, 5, Decimal("1.10")), (1, 6, Decimal("2.20")), (2, 5, Decimal("1.30"))])
+        else:
+            self._result([], [])
+
+    def _result(self, names, rows) -> None:
+        self.description = [(name,) for name in names]
+        self._rows = rows
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchone(self):
+        return self._rows[0]
+
+
+def _conn(cursor: FakeCursor) -> MagicMock:
+    conn = MagicMock()
+    conn.cursor.return_value = cursor
+    return conn
+
+
+class TestWriteShard(unittest.TestCase):
+    """Tests for write_shard() / read_shard()."""
+
+    def test_round_trips_and_is_byte_identical(self) -> None:
+        """Decimals and dates are encoded; the same payload gives the same bytes."""
+        payload = {"price": Decimal("1.25"), "date": date(2026, 4, 29), "name": "мляко"}
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = Path(tmp) / "a" / "x.json.gz", Path(tmp) / "b.json.gz"
+            write_shard(first, payload)
+            write_shard(second, payload)
+            self.assertEqual(first.read_bytes(), second.read_bytes())
+            self.assertEqual(read_shard(first), {"price": 1.25, "date": "2026-04-29", "name": "мляко"})
+
+
+class TestEncodeRowShard(unittest.TestCase):
+    """Tests for encode_row_shard(): dictionary-encoded row columns."""
+
+    def test_repeated_dimensions_are_stored_once(self) -> None:
+        """Rows hold dictionary indexes; products carry their search tokens."""
+        shard = encode_row_shard(20260429, 1, "София", ROW_SHARD_ROWS)
+        dictionaries, rows = shard["dictionaries"], shard["rows"]
+
+        self.assertEqual(dictionaries["product"], {
+            "key": [10, 11], "name": ["Кисело мляко", "Хляб"], "tokens": ["kiselo mlyako", "hlyab"],
+        })
+        self.assertEqual(dictionaries["company"], {"key": [3, None], "name": ["Верига", None]})
+        self.assertEqual(dictionaries["file"], {"key": [1], "name": ["a.csv"]})
+        self.assertEqual(rows["product"], [0, 0, 1])
+        self.assertEqual(rows["store"], [0, 1, 0])
+        self.assertEqual(rows["company"], [0, 1, 0])
+        self.assertEqual(rows["promo_price"], [None, Decimal("1.90"), None])
+        self.assertEqual(rows["price"], [Decimal("2.00"), Decimal("1.90"), Decimal("1.10")])
+
+
+class TestPublishSnapshots(unittest.TestCase):
+    """Tests for publish_snapshots(): per-date shards and the index."""
+
+    def test_writes_index_and_column_compact_shards_per_date(self) -> None:
+        """Each retained date gets options, grouped and report_1 shards."""
+        cursor = FakeCursor()
+        with tempfile.TemporaryDirectory() as tmp:
+            dist = Path(tmp)
+            publish_snapshots(_conn(cursor), dist)
+            data = dist / "data"
+            index = read_shard(data / "index.json.gz")
+            options = read_shard(data / "20260429" / "options.json.gz")
+            grouped = read_shard(data / "20260429" / "grouped.json.gz")
+            report = read_shard(data / "20260429" / "report_1.json.gz")
+            self.assertFalse((dist / "data.partial").exists())
+
+        self.assertEqual(index["version"], SNAPSHOT_VERSION)
+        self.assertEqual(index["data_version"], "20260429")
+        self.assertEqual(index["dates"], {"date_key": [20260429], "date": ["2026-04-29"]})
+        self.assertEqual(index["shards"]["20260429"]["grouped"], "20260429/grouped.json.gz")
+        self.assertEqual(
+            options["options"]["settlement"],
+            {"settlement_key": [1, 2], "name": ["София", "Пловдив"]},
+        )
+        self.assertEqual(options["totals"]["all"], 30)
+        self.assertEqual(options["totals"]["settlement_key"], {"1": 20, "2": 10})
+        self.assertEqual(set(grouped["grouped"]), {shard_key(*g) for g in SNAPSHOT_GROUPINGS})
+        self.assertEqual(
+            grouped["grouped"]["settlement_name|category_name"],
+            {"group1": ["settlement_name"], "group2": ["category_name"], "price_avg": [2.5]},
+        )
+        self.assertEqual(
+            report["report_1"]["current"],
+            {"1": {"category_key": [5, 6], "avg_price": [1.1, 2.2]},
+             "2": {"category_key": [5], "avg_price": [1.3]}},
+        )
+        self.assertEqual(set(report["report_1"]), {"current", "day1", "day2"})
+
+    def test_row_shards_are_content_hashed_and_listed_in_the_index(self) -> None:
+        """Small settlements get a hashed row shard; the name changes with the data."""
+        with tempfile.TemporaryDirectory() as tmp:
+            dist = Path(tmp)
+            cursor = FakeCursor()
+            publish_snapshots(_conn(cursor), dist)
+            index = read_shard(dist / "data" / "index.json.gz")
+            path = index["rows"]["20260429"]["1"]
+            shard = read_shard(dist / "data" / path)
+
+            publish_snapshots(_conn(FakeCursor()), dist)
+            self.assertEqual(read_shard(dist / "data" / "index.json.gz")["rows"], index["rows"])
+
+            ROW_SHARD_ROWS.append(ROW_SHARD_ROWS[0])
+            try:
+                publish_snapshots(_conn(FakeCursor()), dist)
+            finally:
+                ROW_SHARD_ROWS.pop()
+            changed = read_shard(dist / "data" / "index.json.gz")["rows"]["20260429"]["1"]
+
+        self.assertRegex(path, r"^rows/20260429/1\.[0-9a-f]{16}\.json\.gz$")
+        self.assertNotEqual(changed, path)
+        self.assertEqual(shard["settlement_name"], "София")
+        self.assertEqual(len(shard["rows"]["price"]), 3)
+        sizing = next(params for sql, params in cursor.queries if "HAVING" in sql)
+        self.assertEqual(sizing, (20260429, ROW_SHARD_MAX_ROWS))
+
+    def test_failure_keeps_previous_snapshot(self) -> None:
+        """A database error removes the partial output and leaves data/ untouched."""
+        with tempfile.TemporaryDirectory() as tmp:
+            dist = Path(tmp)
+            write_shard(dist / "data" / "index.json.gz", {"version": 0})
+            conn = _conn(FakeCursor(fail_on="get_report_1_category_prices"))
+            with self.assertRaises(RuntimeError):
+                publish_snapshots(conn, dist)
+            self.assertEqual(read_shard(dist / "data" / "index.json.gz"), {"version": 0})
+            self.assertFalse((dist / "data.partial").exists())
+        conn.rollback.assert_called_once()
+
+    def test_missing_build_is_rejected(self) -> None:
+        """Without react-app/dist there is nothing to publish into."""
+        with self.assertRaises(FileNotFoundError):
+            publish_snapshots(_conn(FakeCursor()), Path("/nonexistent/dist"))
+
+
+if __name__ == "__main__":
+    unittest.main()
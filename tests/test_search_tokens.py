@@ -0,0 +1,87 @@
+"""
+test_search_tokens.py: Unit tests for src/search_tokens.py.
+Part of the kolko-ni-struva ETL pipeline.
+Responsibilities: verify that product names and search terms normalise to the
+same transliterated tokens, that terms match products by token prefix, and
+that the SQL rendering of the normalisation covers every mapping.
+"""
+import sys
+import unittest
+from pathlib import Path
+
+# Add src/ to sys.path so the module resolves without installation.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from search_tokens import (  # noqa: E402
+    TRANSLITERATION,
+    build_token_index,
+    match_product_keys,
+    product_token_rows,
+    search_key_sql,
+    search_tokens,
+)
+
+
+class TestSearchTokens(unittest.TestCase):
+    """Tests for search_tokens(): case folding, transliteration and splitting."""
+
+    def test_cyrillic_and_latin_spellings_agree(self) -> None:
+        """Both scripts and any case produce the same tokens."""
+        self.assertEqual(search_tokens("Кисело МЛЯКО 2%"), ["kiselo", "mlyako", "2"])
+        self.assertEqual(search_tokens("kiselo mlyako 2"), ["kiselo", "mlyako", "2"])
+        self.assertEqual(search_tokens("Щастие ЖЪЛТО"), ["shtastie", "zhalto"])
+
+    def test_separators_duplicates_and_empty_input(self) -> None:
+        """Punctuation splits tokens, repeats are dropped and blanks yield nothing."""
+        self.assertEqual(search_tokens("Coca-Cola 1,5л coca"), ["coca", "cola", "1", "5l"])
+        self.assertEqual(search_tokens(" -- "), [])
+        self.assertEqual(search_tokens(None), [])
+
+
+class TestMatchProductKeys(unittest.TestCase):
+    """Tests for match_product_keys(): prefix AND-matching over the token index."""
+
+    def setUp(self) -> None:
+        products = [
+            (1, "Кисело мляко Верея 2%"),
+            (2, "Прясно мляко Верея 3%"),
+            (3, "Шоколад Milka"),
+            (4, "Кисели краставички"),
+        ]
+        self.index = build_token_index(product_token_rows(products))
+
+    def test_every_term_token_must_prefix_a_product_token(self) -> None:
+        """Short prefixes, multi-word terms and cross-script terms resolve correctly."""
+        self.assertEqual(match_product_keys(self.index, "кис"), {1, 4})
+        self.assertEqual(match_product_keys(self.index, "мляко вер"), {1, 2})
+        self.assertEqual(match_product_keys(self.index, "kiselo mlyako"), {1})
+        self.assertEqual(match_product_keys(self.index, "милка"), {3})
+        self.assertEqual(match_product_keys(self.index, "мляко милка"), set())
+
+    def test_term_without_tokens_is_no_filter(self) -> None:
+        """A blank or punctuation-only term does not filter products."""
+        self.assertIsNone(match_product_keys(self.index, ""))
+        self.assertIsNone(match_product_keys(self.index, "%"))
+
+
+class TestSearchKeySql(unittest.TestCase):
+    """Tests for search_key_sql(): the SQL twin of search_tokens()."""
+
+    def test_renders_every_mapping_in_both_cases(self) -> None:
+        """Multi-letter spellings use replace(); single letters share one translate()."""
+        sql = search_key_sql("p_term")
+        self.assertTrue(sql.startswith("regexp_replace("))
+        self.assertIn("lower(p_term)", sql)
+        self.assertIn("replace(", sql)
+        self.assertIn("'Щ', 'sht'", sql)
+        self.assertIn("'щ', 'sht'", sql)
+        self.assertIn("'[^a-z0-9]+', ' ', 'g'", sql)
+        translate = sql[sql.index("translate("):]
+        for letter, latin in TRANSLITERATION.items():
+            if len(latin) == 1:
+                self.assertIn(letter, translate)
+                self.assertIn(letter.upper(), translate)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ import io
 import sys
 import tempfile
 import unittest
+import unittest.mock
 import zipfile
 from pathlib import Path
 
@@ -21,14 +22,108 @@ from transform import (  # noqa: E402
     normalize_settlement_code,
     upsert_dim,
     write_dim,
+    write_product_tokens,
     write_quality_report,
     load_settlement_names,
     resolve_settlement_name,
     patch_unknown_settlements,
+    build_schema,
+    build_lookback_table,
+    open_csv_member,
+    parse_zip,
+    merge_zip_result,
+    ResolutionCache,
     DIM_SETTLEMENT_HEADER,
+    DIM_SPECS,
+    PRODUCT_TOKENS_FILE,
     QUALITY_DIR,
 )
 
+import transform as tr  # noqa: E402
+
+
+_RAW_CSV_HEADER = "Населено място,Търговски обект,Наименование,Код,Категория,Цена,Промо"
+
+
+def _write_daily_zip(raw_dir: Path, date_str: str, members: dict) -> Path:
+    """
+    Write a synthetic daily ZIP whose members are CSV texts keyed by name.
+
+    Args:
+        raw_dir:  Directory receiving the ZIP (data/raw equivalent).
+        date_str: ISO date used as the ZIP stem.
+        members:  Mapping of CSV member name → CSV text.
+
+    Returns:
+        Path to the written ZIP.
+    """
+    zip_path = raw_dir / f"{date_str}.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text.encode("utf-8-sig"))
+    return zip_path
+
+
+class _SchemaDirs:
+    """Context manager that points transform's data directories at a temp tree."""
+
+    _NAMES = ("RAW_DIR", "SCHEMA_DIR", "FACTS_DIR", "QUALITY_DIR")
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.raw_dir = root / "raw"
+        self.schema_dir = root / "schema"
+        self.raw_dir.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self) -> "_SchemaDirs":
+        self._saved = {name: getattr(tr, name) for name in self._NAMES}
+        tr.RAW_DIR = self.raw_dir
+        tr.SCHEMA_DIR = self.schema_dir
+        tr.FACTS_DIR = self.schema_dir / "facts"
+        tr.QUALITY_DIR = self.root / "quality"
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for name, value in self._saved.items():
+            setattr(tr, name, value)
+
+    def snapshot(self) -> dict:
+        """Return relative path → bytes for every file written under schema/."""
+        return {
+            str(p.relative_to(self.schema_dir)): p.read_bytes()
+            for p in sorted(self.schema_dir.rglob("*")) if p.is_file()
+        }
+
+
+def _write_fixture_zips(raw_dir: Path) -> None:
+    """Write three small daily ZIPs with overlapping stores and products."""
+    _write_daily_zip(raw_dir, "2026-04-27", {
+        "Верига А_111.csv": (
+            _RAW_CSV_HEADER + "\n"
+            "68134,Магазин 1,Мляко,P1,1,\"2,50\",\n"
+            "68134,Магазин 1,Хляб,P2,2,1.20,0.99\n"
+        ),
+        "Верига Б_222.csv": (
+            "a;b;c;d;e;f;g\n"
+            "2659;Магазин 2;Мляко;P1;1;2.40;\n"
+            "bad;row\n"
+        ),
+    })
+    _write_daily_zip(raw_dir, "2026-04-28", {
+        "Верига Б_222.csv": (
+            _RAW_CSV_HEADER + "\n"
+            "02659,Магазин 2,Сирене,P3,999,9.90,\n"
+        ),
+        "Празен_333.csv": "",
+    })
+    _write_daily_zip(raw_dir, "2026-04-29", {
+        "Верига А_111.csv": (
+            _RAW_CSV_HEADER + "\n"
+            "068134,Магазин 1,Мляко,P1,1,2.55,2.10\n"
+            "98226,Магазин 3,Мляко,P1,1,n/a,\n"
+        ),
+    })
+
 
 class TestDetectDelimiter(unittest.TestCase):
     """Tests for detect_delimiter(): comma vs semicolon detection."""
@@ -55,6 +150,43 @@ class TestDetectDelimiter(unittest.TestCase):
         self.assertEqual(detect_delimiter(header), ";")
 
 
+class TestOpenCsvMember(unittest.TestCase):
+    """Tests for open_csv_member(): streaming decode of ZIP CSV members."""
+
+    def _zip_with(self, tmp: str, payload: bytes) -> Path:
+        zip_path = Path(tmp) / "2026-04-29.zip"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("chain_1.csv", payload)
+        return zip_path
+
+    def test_strips_bom_and_detects_semicolon_from_first_line(self) -> None:
+        """A BOM-prefixed semicolon file streams with ';' and a clean header."""
+        payload = "\ufeffa;b;c\r\n1;\"x,y\";3\r\n".encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            with zipfile.ZipFile(self._zip_with(tmp, payload)) as zf:
+                with open_csv_member(zf, "chain_1.csv") as (delimiter, reader):
+                    rows = list(reader)
+        self.assertEqual(delimiter, ";")
+        self.assertEqual(rows, [["a", "b", "c"], ["1", "x,y", "3"]])
+
+    def test_delimiter_ignores_lines_after_the_first(self) -> None:
+        """Only the first line decides the delimiter, as with detect_delimiter."""
+        payload = "a,b,c\n1;2;3;4;5\n".encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            with zipfile.ZipFile(self._zip_with(tmp, payload)) as zf:
+                with open_csv_member(zf, "chain_1.csv") as (delimiter, reader):
+                    rows = list(reader)
+        self.assertEqual(delimiter, ",")
+        self.assertEqual(rows[1], ["1;2;3;4;5"])
+
+    def test_empty_member_yields_no_reader(self) -> None:
+        """An empty member yields reader None so the caller can skip it."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with zipfile.ZipFile(self._zip_with(tmp, b"")) as zf:
+                with open_csv_member(zf, "chain_1.csv") as (_delimiter, reader):
+                    self.assertIsNone(reader)
+
+
 class TestUpsertDim(unittest.TestCase):
     """Tests for upsert_dim(): SCD Type-1 dimension insert and lookup."""
 
@@ -158,6 +290,34 @@ class TestWriteDim(unittest.TestCase):
             self.assertFalse(partial.exists(), ".partial file must not remain after write")
 
 
+
+class TestWriteProductTokens(unittest.TestCase):
+    """Tests for write_product_tokens(): search tokens derived from dim_product.csv."""
+
+    def test_writes_one_row_per_distinct_normalised_token(self) -> None:
+        """Each product name yields its distinct transliterated, case-folded tokens."""
+        with tempfile.TemporaryDirectory() as tmp:
+            dim_path = Path(tmp) / "dim_product.csv"
+            tokens_path = Path(tmp) / PRODUCT_TOKENS_FILE
+            with open(dim_path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["product_key", "product_code", "product_name"])
+                writer.writerow(["1", "A1", "Кисело мляко 2% Кисело"])
+                writer.writerow(["2", "B2", "MILKA шоколад"])
+                writer.writerow(["3", "C3", ""])
+            written = write_product_tokens(dim_path, tokens_path)
+            with open(tokens_path, encoding="utf-8", newline="") as fh:
+                rows = list(csv.reader(fh))
+            partial_exists = tokens_path.with_suffix(".csv.partial").exists()
+
+        self.assertEqual(rows[0], ["product_key", "token"])
+        self.assertEqual(rows[1:], [
+            ["1", "kiselo"], ["1", "mlyako"], ["1", "2"],
+            ["2", "milka"], ["2", "shokolad"],
+        ])
+        self.assertEqual(written, 5)
+        self.assertFalse(partial_exists)
+
 class TestWriteQualityReport(unittest.TestCase):
     """Tests for write_quality_report(): CSV output to data/quality/."""
 
@@ -423,5 +583,437 @@ class TestPatchUnknownSettlements(unittest.TestCase):
             self.assertEqual(count, 0)
 
 
+class TestParseZip(unittest.TestCase):
+    """Tests for parse_zip(): natural-key partial results for one daily ZIP."""
+
+    def test_partial_result_holds_natural_keys_and_quality(self) -> None:
+        """parse_zip returns per-CSV natural-key rows plus quality counters."""
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_dir = Path(tmp)
+            _write_fixture_zips(raw_dir)
+            resolver = ResolutionCache({"68134": "София"}, {"1": "Мляко"})
+            result = parse_zip(raw_dir / "2026-04-27.zip", resolver)
+
+        self.assertEqual(result["zip_date"], "2026-04-27")
+        self.assertEqual(
+            [f["uic"] for f in result["csv_files"]], ["111", "222"],
+        )
+        first_row = result["csv_files"][0]["rows"][0]
+        self.assertEqual(first_row[:2], ("68134", "София"))
+        self.assertEqual(first_row[-2:], ("2.50", ""))
+        self.assertEqual(result["quality"]["total_rows"], 3)
+        self.assertEqual(result["quality"]["delimiter_anomalies"], 1)
+        self.assertEqual(result["quality"]["unknown_categories"], 1)
+        self.assertEqual(result["resolution"], {"hits": 2, "misses": 4})
+
+    def test_stotinki_rows_carry_integer_and_effective_prices(self) -> None:
+        """The stotinki format yields (retail, promo, effective) ints with None for NULL."""
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_dir = Path(tmp)
+            _write_fixture_zips(raw_dir)
+            resolver = ResolutionCache({"68134": "София"}, {"1": "Мляко"})
+            first = parse_zip(raw_dir / "2026-04-27.zip", resolver, tr.PRICE_FORMAT_STOTINKI)
+            last = parse_zip(raw_dir / "2026-04-29.zip", resolver, tr.PRICE_FORMAT_STOTINKI)
+
+        rows = first["csv_files"][0]["rows"]
+        self.assertEqual(rows[0][-3:], (250, None, 250))
+        self.assertEqual(rows[1][-3:], (120, 99, 99))
+        self.assertEqual(
+            [row[-3:] for row in last["csv_files"][0]["rows"]],
+            [(255, 210, 210), (None, None, None)],
+        )
+        self.assertEqual(last["quality"]["null_prices"], 1)
+
+
+class TestStotinkiPrices(unittest.TestCase):
+    """Tests for price_to_stotinki() and effective_stotinki()."""
+
+    def test_converts_rounding_half_up(self) -> None:
+        """Decimal strings become whole stotinki; sub-stotinka amounts round half-up."""
+        cases = {"3.17": 317, "2": 200, "0.005": 1, "1.004": 100, "12.5": 1250}
+        for text, expected in cases.items():
+            self.assertEqual(tr.price_to_stotinki(text), expected, text)
+
+    def test_null_for_missing_negative_or_non_finite(self) -> None:
+        """Values that cannot be stored next to the PRICE_NULL sentinel become None."""
+        for text in ["", "-1.50", "inf", "nan"]:
+            self.assertIsNone(tr.price_to_stotinki(text), text)
+
+    def test_effective_price_rule(self) -> None:
+        """min(retail, promo) when promo > 0, promo without retail, else retail."""
+        self.assertEqual(tr.effective_stotinki(250, 199), 199)
+        self.assertEqual(tr.effective_stotinki(150, 199), 150)
+        self.assertEqual(tr.effective_stotinki(None, 199), 199)
+        self.assertEqual(tr.effective_stotinki(250, 0), 250)
+        self.assertEqual(tr.effective_stotinki(250, None), 250)
+        self.assertIsNone(tr.effective_stotinki(None, None))
+
+
+class TestMergeZipResult(unittest.TestCase):
+    """Tests for merge_zip_result(): surrogate-key assignment per partial result."""
+
+    @staticmethod
+    def _dims() -> dict:
+        return {name: ({}, [1]) for name in DIM_SPECS}
+
+    @staticmethod
+    def _result(zip_date: str, rows: list) -> dict:
+        return {
+            "zip_date": zip_date,
+            "csv_files": [
+                {"csv_name": "A_111.csv", "uic": "111", "company_name": "A", "rows": rows},
+            ],
+        }
+
+    def test_zip_without_rows_adds_no_date_row(self) -> None:
+        """Company and file are upserted per CSV, but dim_date only on a first row."""
+        dims = self._dims()
+        fact_rows = merge_zip_result(self._result("2026-04-27", []), dims)
+        self.assertEqual(fact_rows, [])
+        self.assertEqual(len(dims["company"][0]), 1)
+        self.assertEqual(len(dims["file"][0]), 1)
+        self.assertEqual(dims["date"][0], {})
+
+    def test_shared_key_cache_yields_same_keys_as_fresh_lookups(self) -> None:
+        """A per-run key_cache must not change the surrogate keys assigned."""
+        rows = [
+            ("68134", "София", "1", "Мляко", "P1", "Мляко", "S1", "2.50", ""),
+            ("02659", "Банкя", "2", "Хляб", "P2", "Хляб", "S2", "1.20", "0.99"),
+            ("68134", "София", "1", "Мляко", "P1", "Мляко", "S1", "2.40", ""),
+        ]
+        cached_dims, plain_dims = self._dims(), self._dims()
+        key_cache: dict = {}
+        for zip_date in ["2026-04-27", "2026-04-28"]:
+            cached = merge_zip_result(self._result(zip_date, rows), cached_dims, key_cache)
+            plain = merge_zip_result(self._result(zip_date, rows), plain_dims)
+            self.assertEqual(cached, plain)
+        self.assertEqual(cached_dims, plain_dims)
+        self.assertEqual(cached[0][:5], [2, 1, 2, 1, 1])
+        self.assertEqual(cached[2][1], cached[0][1])
+
+
+class TestResolutionCache(unittest.TestCase):
+    """Tests for ResolutionCache: memoised settlement/category resolution."""
+
+    def test_settlement_matches_uncached_resolution(self) -> None:
+        """settlement() agrees with normalize_settlement_code + resolve_settlement_name."""
+        lookup = {"02659": "Банкя", "68134": "София", "68134-04": "София-Изгрев"}
+        cache = ResolutionCache(lookup, {})
+        for raw in ["2659", '"068134"', " 68134-04 ", "99999", ""]:
+            ekatte = normalize_settlement_code(raw.strip().strip('"'))
+            name = resolve_settlement_name(ekatte, lookup)
+            self.assertEqual(
+                cache.settlement(raw), (ekatte, name, name.startswith("(unknown:")),
+            )
+
+    def test_category_formats_unknown_placeholder(self) -> None:
+        """category() strips quotes and formats '(unknown:<code>)' for misses."""
+        cache = ResolutionCache({}, {"1": "Мляко"})
+        self.assertEqual(cache.category('"1"'), ("1", "Мляко", False))
+        self.assertEqual(cache.category("999"), ("999", "(unknown:999)", True))
+
+    def test_counts_hits_and_misses_per_distinct_raw_value(self) -> None:
+        """Each distinct raw value is resolved once; repeats count as hits."""
+        cache = ResolutionCache({"68134": "София"}, {"1": "Мляко"})
+        for _ in range(3):
+            cache.settlement("68134")
+            cache.category("1")
+        cache.settlement("068134")
+        self.assertEqual(cache.misses, 3)
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(len(cache.settlements), 2)
+
+
+class TestBuildSchemaWorkers(unittest.TestCase):
+    """Tests for build_schema(): serial and process-pool runs must agree."""
+
+    def _run(self, root: Path, workers: int, force_from: str = "") -> tuple:
+        with _SchemaDirs(root) as dirs:
+            if not any(dirs.raw_dir.iterdir()):
+                _write_fixture_zips(dirs.raw_dir)
+            max_date, quality_rows = build_schema(force_from, workers=workers)
+            return max_date, quality_rows, dirs.snapshot()
+
+    def test_parallel_output_is_byte_identical_to_serial(self) -> None:
+        """build_schema(workers=2) writes exactly the same files as workers=1."""
+        with tempfile.TemporaryDirectory() as tmp:
+            serial = self._run(Path(tmp) / "serial", workers=1)
+            parallel = self._run(Path(tmp) / "parallel", workers=2)
+
+        self.assertEqual(serial[0], "2026-04-29")
+        self.assertEqual(serial[1], parallel[1])
+        self.assertEqual(serial[2], parallel[2])
+        expected_files = {spec[0] for spec in DIM_SPECS.values()} | {
+            PRODUCT_TOKENS_FILE,
+            "facts/2026-04-27.csv", "facts/2026-04-28.csv", "facts/2026-04-29.csv",
+        }
+        self.assertEqual(set(serial[2]), expected_files)
+
+    def test_rerun_skips_processed_zips_unless_forced(self) -> None:
+        """A second run skips existing fact files; force_from reprocesses later dates."""
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            first = self._run(root, workers=2)
+            skipped = self._run(root, workers=2)
+            forced = self._run(root, workers=2, force_from="2026-04-29")
+
+        self.assertEqual(skipped[0], "")
+        self.assertEqual(skipped[1], [])
+        self.assertEqual(forced[0], "2026-04-29")
+        self.assertEqual([q["zip_date"] for q in forced[1]], ["2026-04-29"])
+        # SCD Type 1: reprocessing reuses existing surrogate keys.
+        self.assertEqual(first[2], forced[2])
+
+    def test_columnar_partitions_mirror_fact_csvs(self) -> None:
+        """columnar=True writes a .kcol per fact CSV that read_fact_columns prefers."""
+        with tempfile.TemporaryDirectory() as tmp, _SchemaDirs(Path(tmp)) as dirs:
+            _write_fixture_zips(dirs.raw_dir)
+            build_schema("", columnar=True)
+            fact_path = tr.FACTS_DIR / "2026-04-29.csv"
+            part = tr.partition_path(fact_path)
+            self.assertEqual(tr.current_partition(fact_path), part)
+
+            from_part = tr.read_fact_columns(fact_path)
+            fact_dict = tr.load_fact_dict(fact_path)
+            part.unlink()
+            from_csv = tr.read_fact_columns(fact_path)
+            price_format, columns, scales = tr.read_fact_partition(fact_path)
+
+        self.assertEqual(from_part["store_key"], from_csv["store_key"])
+        self.assertEqual(list(from_part["retail_price"])[:1], [2.55])
+        self.assertEqual(str(from_part["retail_price"]), str(from_csv["retail_price"]))
+        self.assertEqual(list(fact_dict.values()), [("2.55", "2.1"), ("", "")])
+        self.assertEqual(price_format, tr.PRICE_FORMAT_DECIMAL)
+        self.assertEqual(list(columns["promo_price"]), [21000, tr.NULL_VALUE])
+        self.assertEqual(scales["promo_price"], 10000)
+
+    def test_stotinki_format_writes_self_describing_fact_files(self) -> None:
+        """price_format='stotinki' writes FACT_HEADER_STOTINKI fact files; unknown formats fail."""
+        with tempfile.TemporaryDirectory() as tmp, _SchemaDirs(Path(tmp)) as dirs:
+            _write_fixture_zips(dirs.raw_dir)
+            with self.assertRaises(ValueError):
+                build_schema("", price_format="cents")
+            build_schema("", price_format=tr.PRICE_FORMAT_STOTINKI)
+            with open(tr.FACTS_DIR / "2026-04-27.csv", encoding="utf-8", newline="") as fh:
+                rows = list(csv.reader(fh))
+
+        self.assertEqual(rows[0], tr.FACT_HEADER_STOTINKI)
+        self.assertEqual([row[5:] for row in rows[1:]], [
+            ["250", "", "250"], ["120", "99", "99"], ["240", "", "240"],
+        ])
+
+
+class TestDimJournal(unittest.TestCase):
+    """Tests for the dimension journal: per-ZIP checkpoints and crash replay."""
+
+    def test_dims_written_once_and_journal_removed(self) -> None:
+        """build_schema compacts the dimension CSVs once and leaves no journal."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with _SchemaDirs(Path(tmp)) as dirs:
+                _write_fixture_zips(dirs.raw_dir)
+                original_write_dims = tr.write_dims
+                calls = []
+                tr.write_dims = lambda dims: (calls.append(1), original_write_dims(dims))
+                try:
+                    build_schema("")
+                finally:
+                    tr.write_dims = original_write_dims
+                self.assertEqual(len(calls), 1)
+                self.assertFalse((dirs.schema_dir / tr.DIM_JOURNAL_NAME).exists())
+
+    def test_restart_after_crash_replays_journal(self) -> None:
+        """A run that dies before compaction is completed by the next run."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with _SchemaDirs(Path(tmp) / "clean") as dirs:
+                _write_fixture_zips(dirs.raw_dir)
+                build_schema("")
+                expected = dirs.snapshot()
+
+            with _SchemaDirs(Path(tmp) / "crashed") as dirs:
+                _write_fixture_zips(dirs.raw_dir)
+                original_write_dims = tr.write_dims
+
+                def _crash(dims):
+                    raise RuntimeError("simulated crash before compaction")
+
+                tr.write_dims = _crash
+                try:
+                    with self.assertRaises(RuntimeError):
+                        build_schema("")
+                finally:
+                    tr.write_dims = original_write_dims
+
+                journal = dirs.schema_dir / tr.DIM_JOURNAL_NAME
+                self.assertTrue(journal.exists())
+                # Fact files were written, so the restart skips every ZIP and
+                # must recover the dimensions from the journal alone.
+                max_date, _ = build_schema("")
+                self.assertEqual(max_date, "")
+                self.assertFalse(journal.exists())
+                self.assertEqual(dirs.snapshot(), expected)
+
+    def test_replay_is_idempotent_and_advances_counter(self) -> None:
+        """replay_dim_journal skips known natural keys and bumps the counter."""
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp) / "dim_journal.jsonl"
+            tr.append_dim_journal(journal, {
+                "category": [
+                    {"category_key": "1", "category_code": "101", "category_name": "A"},
+                    {"category_key": "2", "category_code": "102", "category_name": "B"},
+                ],
+            })
+            with open(journal, "a", encoding="utf-8") as fh:
+                fh.write('{"dim": "category", "row": {"categ')  # torn write
+            dims = {name: ({}, [1]) for name in DIM_SPECS}
+            dims["category"][0][("101",)] = {
+                "category_key": "1", "category_code": "101", "category_name": "A",
+            }
+            dims["category"][1][0] = 2
+            replayed = tr.replay_dim_journal(journal, dims)
+        self.assertEqual(replayed, 1)
+        self.assertIn(("102",), dims["category"][0])
+        self.assertEqual(dims["category"][1][0], 3)
+
+    def test_new_dim_rows_returns_newest_rows_in_order(self) -> None:
+        """new_dim_rows returns only the rows inserted since the checkpoint."""
+        lookup = {}
+        counter = [1]
+        for code in ("a", "b", "c"):
+            upsert_dim(lookup, counter, "k", (code,), {"code": code})
+        rows = tr.new_dim_rows(lookup, 2)
+        self.assertEqual([r["code"] for r in rows], ["b", "c"])
+        self.assertEqual(tr.new_dim_rows(lookup, 0), [])
+
+
+def _write_fact_csv(facts_dir: Path, date_str: str, rows: list, header: list = None) -> Path:
+    """Write a fact CSV (FACT_HEADER unless header is given) from key + price rows."""
+    facts_dir.mkdir(parents=True, exist_ok=True)
+    path = facts_dir / f"{date_str}.csv"
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header or tr.FACT_HEADER)
+        writer.writerows(rows)
+    return path
+
+
+class TestBuildLookbackTable(unittest.TestCase):
+    """Tests for build_lookback_table(): D rows merge-joined to cached prior-day prices."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.facts = self.root / "facts"
+        self.output = self.root / "fact_prices_lookback.csv"
+        _write_fact_csv(self.facts, "2026-04-27", [[1, 10, 1, 5, 100, "2.00", ""]])
+        _write_fact_csv(self.facts, "2026-04-28", [[2, 10, 2, 5, 100, "2.10", "1.90"]])
+        _write_fact_csv(self.facts, "2026-04-29", [
+            [3, 11, 3, 5, 100, "3.00", ""],
+            [3, 10, 3, 5, 100, "2.20", ""],
+        ])
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _output_rows(self) -> list:
+        with open(self.output, encoding="utf-8", newline="") as fh:
+            return list(csv.reader(fh))
+
+    def test_joins_prior_two_days_by_composite_key(self) -> None:
+        """Each D row carries D-1 and D-2 prices; unmatched keys get empty strings."""
+        self.assertTrue(build_lookback_table(self.facts, self.output))
+        rows = self._output_rows()
+        self.assertEqual(rows[0], tr.LOOKBACK_HEADER)
+        self.assertEqual(rows[1][7:], ["", "", "", ""])
+        self.assertEqual(rows[2], ["3", "10", "3", "5", "100", "2.20", "", "2.1", "1.9", "2.0", ""])
+
+    def test_configurable_window_generates_header_and_pads_missing_days(self) -> None:
+        """lookback_days=4 adds day1..day4 columns; days without history stay empty."""
+        self.assertTrue(build_lookback_table(self.facts, self.output, lookback_days=4))
+        rows = self._output_rows()
+        self.assertEqual(rows[0], tr.lookback_header(4))
+        self.assertEqual(rows[0][-2:], ["retail_price_day4", "promo_price_day4"])
+        self.assertEqual(rows[2][7:], ["2.1", "1.9", "2.0", "", "", "", "", ""])
+
+    def test_window_of_one_day(self) -> None:
+        """lookback_days=1 joins only D-1; lookback_days < 1 is rejected."""
+        build_lookback_table(self.facts, self.output, lookback_days=1)
+        self.assertEqual(self._output_rows()[2][5:], ["2.20", "", "2.1", "1.9"])
+        with self.assertRaises(ValueError):
+            build_lookback_table(self.facts, self.output, lookback_days=0)
+
+    def test_duplicate_keys_last_row_wins_in_prior_day(self) -> None:
+        """A composite key repeated in a prior day resolves to its last row."""
+        _write_fact_csv(self.facts, "2026-04-28", [
+            [2, 10, 2, 5, 100, "9.99", ""],
+            [2, 10, 2, 5, 100, "2.15", ""],
+        ])
+        build_lookback_table(self.facts, self.output)
+        self.assertEqual(self._output_rows()[2][7:9], ["2.15", ""])
+
+    def test_unchanged_window_skips_regeneration(self) -> None:
+        """A second run with the same fact files neither reads nor rewrites anything."""
+        build_lookback_table(self.facts, self.output)
+        before = self.output.stat().st_mtime_ns
+        with unittest.mock.patch.object(tr, "read_fact_columns", side_effect=AssertionError):
+            self.assertFalse(build_lookback_table(self.facts, self.output))
+        self.assertEqual(self.output.stat().st_mtime_ns, before)
+
+    def test_changed_window_size_regenerates(self) -> None:
+        """The manifest covers the header, so a new lookback_days forces a rebuild."""
+        build_lookback_table(self.facts, self.output)
+        self.assertTrue(build_lookback_table(self.facts, self.output, lookback_days=1))
+
+    def test_new_day_reads_only_that_day(self) -> None:
+        """After one new day, prior days come from the cache, not from CSV."""
+        build_lookback_table(self.facts, self.output)
+        new_day = _write_fact_csv(self.facts, "2026-04-30", [[4, 10, 4, 5, 100, "2.30", ""]])
+        with unittest.mock.patch.object(
+            tr, "read_fact_columns", wraps=tr.read_fact_columns,
+        ) as reader:
+            self.assertTrue(build_lookback_table(self.facts, self.output))
+        reader.assert_called_once_with(new_day)
+        self.assertEqual(self._output_rows()[1][5:], ["2.30", "", "2.2", "", "2.1", "1.9"])
+        cached = sorted(p.name for p in (self.root / tr.LOOKBACK_CACHE_DIR_NAME).glob("*.marshal"))
+        self.assertEqual(cached, ["2026-04-28.marshal", "2026-04-29.marshal", "2026-04-30.marshal"])
+
+    def test_rewritten_prior_day_invalidates_its_cache(self) -> None:
+        """A fact file whose size/mtime changed is re-read instead of served stale."""
+        build_lookback_table(self.facts, self.output)
+        _write_fact_csv(self.facts, "2026-04-28", [[2, 10, 2, 5, 100, "12.10", ""]])
+        self.assertTrue(build_lookback_table(self.facts, self.output))
+        self.assertEqual(self._output_rows()[2][7:9], ["12.1", ""])
+
+    def test_columnar_output_partition_matches_csv(self) -> None:
+        """columnar=True writes fact_prices_lookback.kcol with the CSV's columns as ints."""
+        self.assertTrue(build_lookback_table(self.facts, self.output, lookback_days=3, columnar=True))
+        header, columns = tr.read_partition(tr.partition_path(self.output))
+        self.assertEqual(list(columns), tr.lookback_header(3))
+        self.assertEqual(header["source"], tr._file_signature(self.output))
+        null = tr.NULL_VALUE
+        self.assertEqual(
+            [list(col)[1] for col in columns.values()],
+            [3, 10, 3, 5, 100, 22000, null, 21000, 19000, 20000, null, null, null],
+        )
+        # Switching the partition off makes the manifest stale and drops it.
+        self.assertFalse(build_lookback_table(self.facts, self.output, lookback_days=3, columnar=True))
+        self.assertTrue(build_lookback_table(self.facts, self.output, lookback_days=3))
+        self.assertFalse(tr.partition_path(self.output).exists())
+
+    def test_stotinki_day_converts_decimal_prior_days(self) -> None:
+        """A stotinki D writes a stotinki header; decimal prior days are converted."""
+        _write_fact_csv(self.facts, "2026-04-29", [
+            [3, 10, 3, 5, 100, 220, "", 220],
+        ], header=tr.FACT_HEADER_STOTINKI)
+        self.assertTrue(build_lookback_table(self.facts, self.output))
+        rows = self._output_rows()
+        self.assertEqual(rows[0], tr.lookback_header(2, tr.PRICE_FORMAT_STOTINKI))
+        self.assertEqual(rows[0][-1], "promo_stotinki_day2")
+        self.assertEqual(rows[1], ["3", "10", "3", "5", "100", "220", "", "220", "210", "190", "200", ""])
+
+        # Switching D back to decimal converts the cached stotinki index of D-1.
+        _write_fact_csv(self.facts, "2026-04-30", [[4, 10, 4, 5, 100, "2.30", ""]])
+        self.assertTrue(build_lookback_table(self.facts, self.output))
+        self.assertEqual(self._output_rows()[1][5:], ["2.30", "", "2.2", "", "2.1", "1.9"])
+
 if __name__ == "__main__":
     unittest.main()